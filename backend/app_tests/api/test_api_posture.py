@@ -444,6 +444,110 @@ class TestPostureIngestion:
         assert get_posture(s["client"], s["pa"])["score"] is None
 
 
+def trend_scores(client, pa):
+    points = client.get(f"/api/automation/posture-assessments/{pa.id}/trend/").json()[
+        "points"
+    ]
+    return [p["score"] for p in points]
+
+
+@pytest.mark.django_db
+class TestMaterializedPosture:
+    def current(self, pa):
+        return sorted(
+            (r["asset_id"], r["requirement_id"], r["result"], r["run_id"])
+            for r in pa.current_posture()
+        )
+
+    def from_history(self, pa):
+        return sorted(
+            pa._latest_results(pa.results).values_list(
+                "asset_id", "requirement_id", "result", "run_id"
+            )
+        )
+
+    def test_current_results_follow_the_history(self, setup):
+        s = setup
+        upload(
+            s["client"],
+            s["pa"],
+            s["asset1"],
+            [
+                {"ref_id": "1.1", "result": "fail"},
+                {"ref_id": "1.2", "result": "fail"},
+            ],
+        )
+        second = upload(
+            s["client"], s["pa"], s["asset1"], [{"ref_id": "1.1", "result": "pass"}]
+        ).json()["run_id"]
+        upload(s["client"], s["pa"], s["asset2"], [{"ref_id": "1.1", "result": "pass"}])
+        # Re-upload into an existing run
+        upload(
+            s["client"],
+            s["pa"],
+            s["asset1"],
+            [{"ref_id": "1.2", "result": "pass"}],
+            run_id=second,
+        )
+        assert self.current(s["pa"]) == self.from_history(s["pa"])
+        assert s["pa"].get_score() == 100.0
+        assert trend_scores(s["client"], s["pa"]) == [0.0, 33.3, 100.0]
+
+        s["client"].delete(
+            f"/api/automation/posture-assessments/{s['pa'].id}/runs/{second}/"
+        )
+        assert self.current(s["pa"]) == self.from_history(s["pa"])
+        assert s["pa"].get_score() == 33.3
+        assert trend_scores(s["client"], s["pa"]) == [0.0, 33.3]
+
+    def test_trend_reads_the_snapshots(self, setup, django_assert_max_num_queries):
+        s = setup
+        upload(s["client"], s["pa"], s["asset1"], [{"ref_id": "1.1", "result": "fail"}])
+        upload(s["client"], s["pa"], s["asset2"], [{"ref_id": "1.1", "result": "pass"}])
+        expected = s["pa"].trend()
+        assert [p["score"] for p in expected] == [0.0, 50.0]
+        with django_assert_max_num_queries(1):
+            assert s["pa"].trend() == expected
+
+    def test_migration_backfills_the_snapshots(self, setup):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        s = setup
+        upload(s["client"], s["pa"], s["asset1"], [{"ref_id": "1.1", "result": "fail"}])
+        upload(
+            s["client"],
+            s["pa"],
+            s["asset1"],
+            [
+                {"ref_id": "1.1", "result": "pass"},
+                {"ref_id": "1.2", "result": "fail"},
+            ],
+        )
+        upload(s["client"], s["pa"], s["asset2"], [{"ref_id": "1.1", "result": "pass"}])
+        snapshots = list(
+            s["pa"]
+            .run_snapshots.order_by("taken_at")
+            .values("run_id", "counts", "checks")
+        )
+        expected = s["pa"].trend()
+
+        s["pa"].run_snapshots.all().delete()
+        import_module(
+            "automation.migrations.0004_posture_current_results"
+        ).backfill_run_snapshots(apps, None)
+        assert (
+            list(
+                s["pa"]
+                .run_snapshots.order_by("taken_at")
+                .values("run_id", "counts", "checks")
+            )
+            == snapshots
+        )
+        assert s["pa"].trend() == expected
+
+
 @pytest.mark.django_db
 class TestRunDetail:
     def test_run_detail_multi_asset(self, setup):
@@ -708,6 +812,24 @@ class TestImplementationGroups:
         )
         assert points[-1]["counts"] == {"pass": 1, "fail": 1}
 
+    def test_selection_change_keeps_the_snapshots(self, ig_setup):
+        s = ig_setup
+        snapshots = list(s["pa"].run_snapshots.values("id", "counts", "checks"))
+        for groups, counts in (
+            (["B"], {"fail": 2}),
+            (["A", "B"], {"pass": 1, "fail": 2}),
+            (None, {"pass": 1, "fail": 3}),
+        ):
+            self.select(s, groups)
+            assert s["pa"].trend()[-1]["counts"] == counts
+        assert list(s["pa"].run_snapshots.values("id", "counts", "checks")) == snapshots
+
+    def test_run_outside_selection_leaves_no_point(self, ig_setup):
+        s = ig_setup
+        self.select(s, ["A"])
+        upload(s["client"], s["pa"], s["asset"], [{"ref_id": "1.2", "result": "pass"}])
+        assert len(s["pa"].trend()) == 1
+
     def test_runs_stay_unfiltered(self, ig_setup):
         s = ig_setup
         self.select(s, ["A"])
@@ -873,6 +995,97 @@ class TestImportResults:
         assert s["pa"].assets.filter(id=newcomer.id).exists()
 
 
+def ndjson(rows):
+    import json
+
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+@pytest.mark.django_db
+class TestBulkIngest:
+    def ingest(self, s, body, content_type="application/x-ndjson", tool=""):
+        url = f"/api/automation/posture-assessments/{s['pa'].id}/bulk-ingest/"
+        if tool:
+            url += f"?tool={tool}"
+        return s["client"].generic("POST", url, body, content_type=content_type)
+
+    def test_ndjson_stream_in_chunks(self, setup, monkeypatch):
+        from automation.views import PostureAssessmentViewSet
+
+        s = setup
+        monkeypatch.setattr(PostureAssessmentViewSet, "BULK_INGEST_CHUNK_SIZE", 2)
+        body = ndjson(
+            [
+                {"asset": str(s["asset1"].id), "ref_id": "1.1", "result": "fail"},
+                {"asset": "vm-2", "ref_id": "CIS-1.1", "result": "pass"},
+                {"asset": str(s["asset1"].id), "ref_id": "1.2", "result": "pass"},
+                {"asset": "vm-404", "ref_id": "1.1", "result": "pass"},
+                {"asset": "vm-2", "ref_id": "404.1", "result": "pass"},
+                # Same pair in a later chunk: the row of the run is updated
+                {
+                    "asset": str(s["asset1"].id),
+                    "ref_id": "1.1",
+                    "result": "pass",
+                    "actual": 644,
+                },
+            ]
+        )
+        res = self.ingest(s, body + b"{not json\n", tool="fleet-scan")
+        assert res.status_code == 200
+        data = res.json()
+        assert data["rows"] == 6
+        assert (data["created"], data["updated"]) == (3, 1)
+        assert data["assets_imported"] == 2
+        assert data["unknown_ref_ids"] == ["404.1"]
+        assert data["skipped_assets"] == ["vm-404"]
+        assert data["parse_errors"] == [{"line": 7}]
+
+        run = PostureRun.objects.get(posture_assessment=s["pa"])
+        assert str(run.id) == data["run_id"]
+        assert run.tool == "fleet-scan"
+        updated = run.results.get(asset=s["asset1"], requirement=s["nodes"]["1.1"])
+        assert (updated.result, updated.actual) == ("pass", "644")
+        assert s["pa"].get_score() == 100.0
+        assert trend_scores(s["client"], s["pa"]) == [100.0]
+
+    def test_csv_file_enrolls_and_prunes(self, setup):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        s = setup
+        newcomer = Asset.objects.create(name="vm-bulk", folder=s["domain"])
+        for result in ("fail", "pass", "pass"):
+            res = s["client"].post(
+                f"/api/automation/posture-assessments/{s['pa'].id}/bulk-ingest/",
+                {
+                    "file": SimpleUploadedFile(
+                        "fleet.csv",
+                        f"asset,ref_id,result\nvm-bulk,1.1,{result}\n"
+                        f"{s['asset1'].id},1.1,fail\n".encode(),
+                    )
+                },
+                format="multipart",
+            )
+            assert res.status_code == 200
+        assert res.json()["enrolled_assets"] == 0
+        assert s["pa"].assets.filter(id=newcomer.id).exists()
+        # history_depth=2
+        assert s["pa"].results.filter(asset=newcomer).count() == 2
+        assert s["pa"].runs.count() == 2
+        assert s["pa"].get_score() == 50.0
+
+    def test_rejections(self, setup):
+        s = setup
+        assert self.ingest(s, b"ref_id,result\n1.1,pass\n", "text/csv").json() == {
+            "error": "missing header row with at least asset,ref_id,result columns"
+        }
+        res = self.ingest(s, ndjson([{"asset": "vm-404", "ref_id": "1.1"}]))
+        assert res.status_code == 400
+        assert res.json()["error"] == "no rows could be applied to an asset"
+        res = self.ingest(s, b"", "application/json")
+        assert res.status_code == 400
+        assert not PostureRun.objects.exists()
+
+
 SCANNER_CSV = (
     b"PROVIDER;REQUIREMENTS_ID;STATUS;STATUSEXTENDED;RESOURCENAME\n"
     b"kubernetes;1.1;PASS;pod a ok;pod-a\n"
@@ -16,7 +16,7 @@ with (
 ):
     _fw_mock.all.return_value = []
     _sl_mock.filter.return_value = []
-    from core.mappings.engine import MappingEngine
+    from core.mappings.engine import CompiledMappingSet, MappingEngine
 
 
 # ---------------------------------------------------------------------------
@@ -656,3 +656,77 @@ class TestBestMappingInferences:
         assert best_path == ["urn:fw:A", "urn:fw:C", "urn:fw:D"]
         assert "urn:req:D1" in inferences["requirement_assessments"]
         assert "urn:req:D2" in inferences["requirement_assessments"]
+
+
+# ---------------------------------------------------------------------------
+# Compiled mapping sets
+# ---------------------------------------------------------------------------
+
+
+class TestCompiledMappingSet:
+    MAPPINGS = [
+        ("urn:req:A2", "urn:req:B1", "intersect"),
+        ("urn:req:A1", "urn:req:B1", "equal"),
+        ("urn:req:A3", "urn:req:B3", "not_related"),
+        ("urn:req:A1", "urn:req:B2", "subset"),
+        ("urn:req:A2", "urn:req:B2", "superset"),
+    ]
+
+    def _rms(self):
+        return _rms(
+            requirement_mappings=[
+                {
+                    "source_requirement_urn": src,
+                    "target_requirement_urn": dst,
+                    "relationship": rel,
+                }
+                for src, dst, rel in self.MAPPINGS
+            ]
+        )
+
+    def test_compile(self):
+        compiled = CompiledMappingSet.from_rms(self._rms())
+        assert [edge[:3] for edge in compiled.edges] == self.MAPPINGS
+        assert [edge[3] for edge in compiled.edges] == [1, 2, 0, 1, 2]
+        assert (compiled.partial_count, compiled.full_count) == (2, 2)
+        assert compiled.info["urn"] == "urn:rms:A-to-B"
+
+    def test_same_results_as_mapping_set_dict(self):
+        engine = _make_engine(
+            frameworks={
+                "urn:fw:A": {"min_score": 0, "max_score": 100},
+                "urn:fw:B": {"min_score": 0, "max_score": 100},
+            }
+        )
+        source = _source_audit(
+            {
+                f"urn:req:A{i}": {
+                    "result": result,
+                    "score": 10 * i,
+                    "is_scored": True,
+                    "applied_controls": [f"ctrl-{i}"],
+                    "name": f"RA {i}",
+                    "id": f"ra-{i}",
+                }
+                for i, result in enumerate(["compliant", "non_compliant"], start=1)
+            }
+        )
+        path = ["urn:fw:A", "urn:fw:B"]
+        engine.all_rms[("urn:fw:A", "urn:fw:B")] = engine._compress_rms(self._rms())
+
+        compiled = engine.get_compiled_rms(("urn:fw:A", "urn:fw:B"))
+        assert engine.get_compiled_rms(("urn:fw:A", "urn:fw:B")) is compiled
+        assert engine.map_audit_results(
+            source, compiled, 1, path
+        ) == engine.map_audit_results(source, self._rms(), 1, path)
+
+    def test_compiled_path_and_cache_reset(self):
+        engine = _make_engine()
+        engine.all_rms = {
+            ("urn:fw:A", "urn:fw:B"): engine._compress_rms(self._rms()),
+        }
+        hops = engine.compile_path(["urn:fw:A", "urn:fw:B", "urn:fw:C"])
+        assert [hop.target_framework_urn for hop in hops] == ["urn:fw:B"]
+
+        engine.all_rms = {}
+        assert engine.compile_path(["urn:fw:A", "urn:fw:B"]) == []
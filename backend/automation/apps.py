@@ -18,3 +18,27 @@ class AutomationConfig(AppConfig):
             sender=LogEntry,
             dispatch_uid="automation_internal_event_producer",
         )
+        self._connect_trigger_index()
+
+    def _connect_trigger_index(self):
+        """Rebuild the internal-event trigger index when what it compiles
+        changes. Bulk updates go through the model querysets instead."""
+        from django.db.models.signals import post_delete, post_save
+
+        from .workflows.models import Workflow, WorkflowTrigger, WorkflowVersion
+        from .workflows.trigger_index import invalidate_event_trigger_index
+
+        def _changed(sender, instance, **kwargs):
+            # Draft edits never reach the index: publishing saves the version.
+            if sender is WorkflowVersion and instance.is_draft:
+                return
+            invalidate_event_trigger_index()
+
+        for model in (Workflow, WorkflowVersion, WorkflowTrigger):
+            for name, signal in (("save", post_save), ("delete", post_delete)):
+                signal.connect(
+                    _changed,
+                    sender=model,
+                    weak=False,
+                    dispatch_uid=f"automation_trigger_index_{name}_{model._meta.model_name}",
+                )
@@ -304,3 +304,79 @@ def parse_file(file):
         if name.endswith(suffix):
             return parser(file)
     raise ImportError_("unsupported file type (expected .csv, .xlsx or .json)")
+
+
+# Bulk ingestion: one stream of results for many assets, read line by line.
+BULK_PARSERS_BY_SUFFIX = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+BULK_PARSERS_BY_CONTENT_TYPE = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+def _decoded_lines(lines):
+    for number, line in enumerate(lines):
+        try:
+            yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+        except UnicodeDecodeError as e:
+            raise ImportError_("file is not valid UTF-8 text") from e
+
+
+def _bulk_row(row, extras):
+    asset = (row.get("asset") or "").strip()
+    if not asset:
+        _record_parse_error(extras, row)
+        return None
+    entry = _entry(row, extras)
+    return (asset, entry) if entry else None
+
+
+def iter_bulk_ndjson(lines, extras):
+    """(asset, entry) of each {"asset", "ref_id", "result", ...} line."""
+    for number, text in enumerate(_decoded_lines(lines), start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError:
+            _record_parse_error(extras, {"line": number})
+            continue
+        if not isinstance(row, dict):
+            _record_parse_error(extras, {"line": number})
+            continue
+        item = _bulk_row(
+            {key: "" if value is None else str(value) for key, value in row.items()},
+            extras,
+        )
+        if item:
+            yield item
+
+
+def iter_bulk_csv(lines, extras):
+    """(asset, entry) of each row of a CSV with asset,ref_id,result columns."""
+    reader = csv.DictReader(_decoded_lines(lines))
+    if not reader.fieldnames or not {"asset", "ref_id", "result"} <= set(
+        reader.fieldnames
+    ):
+        raise ImportError_(
+            "missing header row with at least asset,ref_id,result columns"
+        )
+    for row in reader:
+        if not any((value or "").strip() for value in row.values()):
+            continue
+        item = _bulk_row(row, extras)
+        if item:
+            yield item
+
+
+BULK_PARSERS = {"ndjson": iter_bulk_ndjson, "csv": iter_bulk_csv}
+
+
+def iter_bulk_file(lines, bulk_format):
+    """
+    Lazily parse a bulk stream of bytes `lines`. Returns the (asset, entry)
+    iterator and the extras it fills while it is consumed.
+    """
+    extras = {"parse_errors": []}
+    return BULK_PARSERS[bulk_format](lines, extras), extras
@@ -0,0 +1,159 @@
+"""
+Benchmark of posture ingestion on synthetic scanner output: one upload-results
+request per asset against a single bulk-ingest NDJSON stream, night after
+night (from the second night on, every write also prunes history). Writes into
+the configured database, inside a transaction that is rolled back.
+
+    python manage.py benchmark_posture_ingest --assets 500 --checks 300 --nights 2
+"""
+
+import json
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from automation.models import PostureAssessment
+from automation.views import PostureAssessmentViewSet
+from core.models import Asset, Framework, RequirementNode
+from iam.models import Folder, User
+
+RESULTS = ["pass"] * 8 + ["fail", "not_applicable"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark bulk posture ingestion against per-asset uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assets", type=int, default=500)
+        parser.add_argument("--checks", type=int, default=300)
+        parser.add_argument("--nights", type=int, default=2)
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--skip-per-asset",
+            action="store_true",
+            help="Only time the bulk ingestion.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options["chunk_size"]:
+            PostureAssessmentViewSet.BULK_INGEST_CHUNK_SIZE = options["chunk_size"]
+        with transaction.atomic():
+            self.benchmark(options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, options):
+        rng = random.Random(options["seed"])
+        suffix = uuid.uuid4().hex[:8]
+        root = Folder.get_root_folder()
+        domain = Folder.objects.create(
+            parent_folder=root,
+            name=f"benchmark-posture-{suffix}",
+            content_type=Folder.ContentType.DOMAIN,
+        )
+        framework = Framework.objects.create(
+            name=f"benchmark-posture-{suffix}", folder=root, is_published=True
+        )
+        ref_ids = [
+            f"{index // 20 + 1}.{index % 20 + 1}" for index in range(options["checks"])
+        ]
+        RequirementNode.objects.bulk_create(
+            [
+                RequirementNode(
+                    framework=framework,
+                    urn=f"urn:benchmark:posture:{suffix}:{ref_id}",
+                    ref_id=ref_id,
+                    assessable=True,
+                    folder=root,
+                    is_published=True,
+                )
+                for ref_id in ref_ids
+            ]
+        )
+        assets = Asset.objects.bulk_create(
+            [
+                Asset(name=f"host-{index:05d}", folder=domain)
+                for index in range(options["assets"])
+            ]
+        )
+        user = User.objects.create_superuser(f"benchmark-{suffix}@localhost")
+        factory = APIRequestFactory()
+
+        def assessment(name):
+            pa = PostureAssessment.objects.create(
+                name=name, folder=domain, framework=framework
+            )
+            pa.assets.set(assets)
+            return pa
+
+        def call(action, pa, request):
+            force_authenticate(request, user)
+            view = PostureAssessmentViewSet.as_view({"post": action})
+            response = view(request, pk=pa.pk)
+            assert response.status_code == 200, response.data
+            return response
+
+        def night():
+            return {
+                asset.name: [
+                    {"ref_id": ref_id, "result": rng.choice(RESULTS)}
+                    for ref_id in ref_ids
+                ]
+                for asset in assets
+            }
+
+        rows = len(assets) * len(ref_ids)
+        self.stdout.write(
+            f"{len(assets)} assets x {len(ref_ids)} checks = {rows} results per night"
+        )
+        nights = [night() for _ in range(options["nights"])]
+
+        bulk = assessment(f"bulk-{suffix}")
+        for number, results in enumerate(nights, start=1):
+            body = "".join(
+                json.dumps({"asset": name, **entry}) + "\n"
+                for name, entries in results.items()
+                for entry in entries
+            ).encode()
+            start = time.perf_counter()
+            call(
+                "bulk_ingest",
+                bulk,
+                factory.generic(
+                    "POST",
+                    f"/api/automation/posture-assessments/{bulk.pk}/bulk-ingest/",
+                    body,
+                    content_type="application/x-ndjson",
+                ),
+            )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"night {number}: bulk-ingest {elapsed:.2f} s "
+                f"({rows / elapsed:,.0f} results/s)"
+            )
+        if options["skip_per_asset"]:
+            return
+
+        per_asset = assessment(f"per-asset-{suffix}")
+        ids = {asset.name: str(asset.id) for asset in assets}
+        for number, results in enumerate(nights, start=1):
+            start = time.perf_counter()
+            for name, entries in results.items():
+                call(
+                    "upload_results",
+                    per_asset,
+                    factory.post(
+                        f"/api/automation/posture-assessments/{per_asset.pk}/upload-results/",
+                        {"asset": ids[name], "results": entries},
+                        format="json",
+                    ),
+                )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"night {number}: upload-results per asset {elapsed:.2f} s "
+                f"({rows / elapsed:,.0f} results/s)"
+            )
@@ -7,7 +7,13 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils import timezone
 
-from automation.models import PostureAssessment, PostureResult, PostureRun
+from automation.models import (
+    PostureAssessment,
+    PostureResult,
+    PostureRun,
+    PostureRunSnapshot,
+    groups_signature,
+)
 from core.models import (
     Asset,
     Finding,
@@ -146,6 +152,7 @@ class Command(BaseCommand):
         now = timezone.now()
         rows = []
         runs = []
+        snapshots = []
         for day in range(days):
             timestamp = now - timedelta(days=days - 1 - day, hours=random.randint(0, 5))
             pass_probability = 0.6 + 0.32 * (day / max(days - 1, 1))
@@ -157,6 +164,16 @@ class Command(BaseCommand):
                     tool="populate-posture 1.0",
                 )
                 runs.append(run)
+                # Every run checks all the requirements: its counts are the posture
+                snapshot = PostureRunSnapshot(
+                    posture_assessment=pa,
+                    run=run,
+                    asset=asset,
+                    taken_at=timestamp,
+                    counts={},
+                    checks={},
+                )
+                snapshots.append(snapshot)
                 for check in checks:
                     if check in not_applicable:
                         result = "not_applicable"
@@ -172,6 +189,10 @@ class Command(BaseCommand):
                             result = "not_checked"
                         else:
                             result = "fail"
+                    signature = groups_signature(check.implementation_groups)
+                    by_result = snapshot.counts.setdefault(signature, {})
+                    by_result[result] = by_result.get(result, 0) + 1
+                    snapshot.checks[signature] = snapshot.checks.get(signature, 0) + 1
                     rows.append(
                         PostureResult(
                             requirement=check,
@@ -187,6 +208,8 @@ class Command(BaseCommand):
                     )
         PostureRun.objects.bulk_create(runs, batch_size=2000)
         PostureResult.objects.bulk_create(rows, batch_size=2000)
+        PostureRunSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+        pa.refresh_current_results()
 
         follow_up = FindingsAssessment.objects.create(
             name=f"{pa.name} — follow-up",
@@ -0,0 +1,230 @@
+# Generated by Django 6.0.7 on 2026-10-17 10:38
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+def backfill_current_results(apps, schema_editor):
+    PostureResult = apps.get_model("automation", "PostureResult")
+    PostureCurrentResult = apps.get_model("automation", "PostureCurrentResult")
+    latest = (
+        PostureResult.objects.annotate(
+            rn=Window(
+                expression=RowNumber(),
+                partition_by=[
+                    F("run__posture_assessment_id"),
+                    F("asset_id"),
+                    F("requirement_id"),
+                ],
+                order_by=[F("timestamp").desc(), F("created_at").desc()],
+            )
+        )
+        .filter(rn=1)
+        .values_list(
+            "id",
+            "run__posture_assessment_id",
+            "asset_id",
+            "requirement_id",
+            "result",
+            "timestamp",
+        )
+    )
+    PostureCurrentResult.objects.bulk_create(
+        (
+            PostureCurrentResult(
+                posture_result_id=result_id,
+                posture_assessment_id=assessment_id,
+                asset_id=asset_id,
+                requirement_id=requirement_id,
+                result=result,
+                timestamp=timestamp,
+            )
+            for result_id, assessment_id, asset_id, requirement_id, result, timestamp in latest
+        ),
+        batch_size=2000,
+    )
+
+
+def backfill_run_snapshots(apps, schema_editor):
+    """Replay the history of each assessment to snapshot its runs."""
+    PostureAssessment = apps.get_model("automation", "PostureAssessment")
+    PostureResult = apps.get_model("automation", "PostureResult")
+    PostureRunSnapshot = apps.get_model("automation", "PostureRunSnapshot")
+    for assessment_id in PostureAssessment.objects.values_list("id", flat=True):
+        latest = {}
+        counts = {}
+        snapshots = {}
+        for run_id, asset_id, requirement_id, groups, result, timestamp in (
+            PostureResult.objects.filter(run__posture_assessment_id=assessment_id)
+            .order_by("timestamp", "created_at")
+            .values_list(
+                "run_id",
+                "asset_id",
+                "requirement_id",
+                "requirement__implementation_groups",
+                "result",
+                "timestamp",
+            )
+            .iterator(chunk_size=2000)
+        ):
+            signature = ",".join(sorted(groups or []))
+            asset_counts = counts.setdefault(asset_id, {})
+            previous = latest.setdefault(asset_id, {}).get(requirement_id)
+            if previous is not None:
+                asset_counts[signature][previous] -= 1
+            asset_counts.setdefault(signature, Counter())[result] += 1
+            latest[asset_id][requirement_id] = result
+            snapshot = snapshots.get((run_id, asset_id))
+            if snapshot is None:
+                snapshot = snapshots[(run_id, asset_id)] = PostureRunSnapshot(
+                    posture_assessment_id=assessment_id,
+                    run_id=run_id,
+                    asset_id=asset_id,
+                    checks={},
+                )
+            snapshot.taken_at = timestamp
+            snapshot.checks[signature] = snapshot.checks.get(signature, 0) + 1
+            snapshot.counts = {
+                signature: dict(+by_result)
+                for signature, by_result in asset_counts.items()
+                if +by_result
+            }
+        PostureRunSnapshot.objects.bulk_create(snapshots.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("automation", "0003_workflow_engine"),
+        ("core", "0182_complianceassessmentaggregate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostureCurrentResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "result",
+                    models.CharField(
+                        choices=[
+                            ("pass", "Pass"),
+                            ("fail", "Fail"),
+                            ("not_applicable", "Not applicable"),
+                            ("error", "Error"),
+                            ("not_checked", "Not checked"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.asset",
+                    ),
+                ),
+                (
+                    "posture_assessment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="current_results",
+                        to="automation.postureassessment",
+                    ),
+                ),
+                (
+                    "posture_result",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="current",
+                        to="automation.postureresult",
+                    ),
+                ),
+                (
+                    "requirement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.requirementnode",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("posture_assessment", "asset", "requirement"),
+                        name="unique_posture_current_result",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PostureRunSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("taken_at", models.DateTimeField()),
+                ("counts", models.JSONField(default=dict)),
+                ("checks", models.JSONField(default=dict)),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.asset",
+                    ),
+                ),
+                (
+                    "posture_assessment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="run_snapshots",
+                        to="automation.postureassessment",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="automation.posturerun",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["posture_assessment", "taken_at"],
+                        name="automation__posture_ae80b5_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "asset"), name="unique_posture_run_snapshot"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_current_results, migrations.RunPython.noop),
+        migrations.RunPython(backfill_run_snapshots, migrations.RunPython.noop),
+    ]
@@ -3,7 +3,7 @@ from collections import Counter
 from auditlog.registry import auditlog
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import F, Q, Window
+from django.db.models import Count, F, Q, Window
 from django.db.models.functions import RowNumber
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
@@ -21,6 +21,19 @@ from core.models import (
 from iam.models import User
 
 
+def posture_score(counts) -> float | None:
+    """Pass rate of the applicable (pass or fail) results of `counts`."""
+    applicable = counts["pass"] + counts["fail"]
+    if not applicable:
+        return None
+    return round(100 * counts["pass"] / applicable, 1)
+
+
+def groups_signature(implementation_groups) -> str:
+    """The key of the run snapshot counts of requirements in these groups."""
+    return ",".join(sorted(implementation_groups or []))
+
+
 class PostureAssessment(Assessment):
     framework = models.ForeignKey(
         Framework, on_delete=models.CASCADE, verbose_name=_("Framework")
@@ -78,8 +91,18 @@ class PostureAssessment(Assessment):
     def results(self):
         return PostureResult.objects.filter(run__posture_assessment=self)
 
-    def current_posture(self, asset_id=None, asset_ids=None) -> list[dict]:
-        qs = self.results
+    def _latest_results(self, results):
+        """The latest of `results` per (asset, requirement)."""
+        return results.annotate(
+            rn=Window(
+                expression=RowNumber(),
+                partition_by=[F("asset_id"), F("requirement_id")],
+                order_by=[F("timestamp").desc(), F("created_at").desc()],
+            )
+        ).filter(rn=1)
+
+    def _current_results(self, asset_id=None, asset_ids=None):
+        qs = self.current_results.all()
         if asset_id:
             qs = qs.filter(asset_id=asset_id)
         if asset_ids is not None:
@@ -87,16 +110,13 @@ class PostureAssessment(Assessment):
         selected_ids = self.selected_requirement_ids()
         if selected_ids is not None:
             qs = qs.filter(requirement_id__in=selected_ids)
+        return qs
+
+    def current_posture(self, asset_id=None, asset_ids=None) -> list[dict]:
         return list(
-            qs.annotate(
-                rn=Window(
-                    expression=RowNumber(),
-                    partition_by=[F("asset_id"), F("requirement_id")],
-                    order_by=[F("timestamp").desc(), F("created_at").desc()],
-                )
-            )
-            .filter(rn=1)
-            .values(
+            PostureResult.objects.filter(
+                current__in=self._current_results(asset_id, asset_ids)
+            ).values(
                 "id",
                 "requirement_id",
                 "asset_id",
@@ -115,14 +135,207 @@ class PostureAssessment(Assessment):
             )
         )
 
+    def current_counts(self, asset_id=None, asset_ids=None) -> Counter:
+        """Number of current results per result value."""
+        return Counter(
+            dict(
+                self._current_results(asset_id, asset_ids)
+                .order_by()
+                .values_list("result")
+                .annotate(count=Count("id"))
+            )
+        )
+
     def get_score(self) -> float | None:
-        counts = Counter(row["result"] for row in self.current_posture())
-        applicable = counts["pass"] + counts["fail"]
-        if not applicable:
-            return None
-        return round(100 * counts["pass"] / applicable, 1)
+        return posture_score(self.current_counts())
+
+    def record_current_results(self, results):
+        """
+        Make the PostureResult rows `results` the current ones of their
+        (asset, requirement). They must be the latest of their pairs: ingestion
+        stamps them with the current time.
+        """
+        PostureCurrentResult.objects.bulk_create(
+            [
+                PostureCurrentResult(
+                    posture_assessment_id=self.id,
+                    asset_id=result.asset_id,
+                    requirement_id=result.requirement_id,
+                    posture_result_id=result.id,
+                    result=result.result,
+                    timestamp=result.timestamp,
+                )
+                for result in results
+            ],
+            update_conflicts=True,
+            unique_fields=["posture_assessment", "asset", "requirement"],
+            update_fields=["posture_result", "result", "timestamp"],
+            batch_size=500,
+        )
+
+    def refresh_current_results(self, pairs=None):
+        """
+        Recompute the current results from the history: those of the
+        (asset_id, requirement_id) `pairs`, or all of them. Needed after
+        results are deleted or written out of timestamp order.
+        """
+        current = self.current_results.all()
+        history = self.results
+        if pairs is not None:
+            if not pairs:
+                return
+            scope = {
+                "asset_id__in": {a for a, _ in pairs},
+                "requirement_id__in": {r for _, r in pairs},
+            }
+            current = current.filter(**scope)
+            history = history.filter(**scope)
+        latest = self._latest_results(history).values_list(
+            "id", "asset_id", "requirement_id", "result", "timestamp"
+        )
+        current.delete()
+        PostureCurrentResult.objects.bulk_create(
+            (
+                PostureCurrentResult(
+                    posture_assessment=self,
+                    asset_id=asset_id,
+                    requirement_id=requirement_id,
+                    posture_result_id=result_id,
+                    result=result,
+                    timestamp=timestamp,
+                )
+                for result_id, asset_id, requirement_id, result, timestamp in latest
+            ),
+            batch_size=2000,
+        )
+
+    def _counts_by_groups(self, asset_ids) -> dict:
+        """Current result counts of each asset, by requirement groups signature."""
+        counts = {}
+        for asset_id, groups, result, count in (
+            self.current_results.filter(asset_id__in=asset_ids)
+            .order_by()
+            .values_list("asset_id", "requirement__implementation_groups", "result")
+            .annotate(count=Count("id"))
+        ):
+            by_result = counts.setdefault(asset_id, {}).setdefault(
+                groups_signature(groups), {}
+            )
+            by_result[result] = by_result.get(result, 0) + count
+        return counts
+
+    def record_run_snapshot(self, run, asset, timestamp):
+        """Snapshot the current counts of `asset` once `run` wrote its results."""
+        self.record_run_snapshots(run, [asset.id], timestamp)
+
+    def record_run_snapshots(self, run, asset_ids, timestamp):
+        """record_run_snapshot for many assets, in two queries."""
+        counts = self._counts_by_groups(asset_ids)
+        checks = {}
+        for asset_id, groups, count in (
+            run.results.filter(asset_id__in=asset_ids)
+            .order_by()
+            .values_list("asset_id", "requirement__implementation_groups")
+            .annotate(count=Count("id"))
+        ):
+            asset_checks = checks.setdefault(asset_id, {})
+            signature = groups_signature(groups)
+            asset_checks[signature] = asset_checks.get(signature, 0) + count
+        PostureRunSnapshot.objects.bulk_create(
+            [
+                PostureRunSnapshot(
+                    posture_assessment=self,
+                    run=run,
+                    asset_id=asset_id,
+                    taken_at=timestamp,
+                    counts=counts.get(asset_id, {}),
+                    checks=checks.get(asset_id, {}),
+                )
+                for asset_id in asset_ids
+            ],
+            update_conflicts=True,
+            unique_fields=["run", "asset"],
+            update_fields=["taken_at", "counts", "checks"],
+            batch_size=2000,
+        )
+
+    def refresh_latest_run_snapshots(self, asset_ids):
+        """
+        Align the latest snapshot of each of `asset_ids` with its current
+        results, so the last trend point follows refresh_current_results().
+        The earlier snapshots keep the posture as it was measured.
+        """
+        latest = list(
+            self.run_snapshots.filter(asset_id__in=asset_ids)
+            .annotate(
+                rn=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("asset_id")],
+                    order_by=[F("taken_at").desc(), F("id").desc()],
+                )
+            )
+            .filter(rn=1)
+        )
+        counts = self._counts_by_groups([snapshot.asset_id for snapshot in latest])
+        for snapshot in latest:
+            snapshot.counts = counts.get(snapshot.asset_id, {})
+        PostureRunSnapshot.objects.bulk_update(latest, ["counts"], batch_size=2000)
+
+    def trend(self, asset_id=None, asset_ids=None) -> list[dict]:
+        """
+        Score after each run, from the run snapshots, counting the
+        requirements of the implementation groups selection.
+        """
+        matches = {}
+
+        def in_selection(signature) -> bool:
+            if signature not in matches:
+                matches[signature] = self.requirement_matches_selected_groups(
+                    signature.split(",") if signature else []
+                )
+            return matches[signature]
+
+        snapshots = self.run_snapshots.all()
+        if asset_id:
+            snapshots = snapshots.filter(asset_id=asset_id)
+        if asset_ids is not None:
+            snapshots = snapshots.filter(asset_id__in=asset_ids)
+        counts_by_asset = {}
+        counts = Counter()
+        points = []
+        for snapshot in snapshots.order_by("taken_at", "id").values(
+            "run_id", "asset_id", "taken_at", "counts", "checks", "run__tool"
+        ):
+            # Runs that checked nothing in the selection leave no point
+            if not any(
+                checks and in_selection(signature)
+                for signature, checks in snapshot["checks"].items()
+            ):
+                continue
+            snapshot_counts = Counter()
+            for signature, by_result in snapshot["counts"].items():
+                if in_selection(signature):
+                    snapshot_counts.update(by_result)
+            counts.subtract(counts_by_asset.get(snapshot["asset_id"], {}))
+            counts.update(snapshot_counts)
+            counts_by_asset[snapshot["asset_id"]] = snapshot_counts
+            counts = +counts
+            point = {
+                "run_id": str(snapshot["run_id"]),
+                "timestamp": snapshot["taken_at"],
+                "tool": snapshot["run__tool"],
+                "score": posture_score(counts),
+                "counts": dict(counts),
+            }
+            # The assets of a run make a single point
+            if points and points[-1]["run_id"] == point["run_id"]:
+                points[-1] = point
+            else:
+                points.append(point)
+        return points
 
     def prune_history(self, pairs):
+        # The latest result of a pair is never pruned: the current results stay.
         if not pairs:
             return
         stale = list(
@@ -222,6 +435,73 @@ class PostureResult(AbstractBaseModel):
         return f"{self.requirement.ref_id or self.requirement.urn} on {self.asset}: {self.result}"
 
 
+class PostureCurrentResult(models.Model):
+    """
+    The latest PostureResult of each (asset, requirement) of a posture
+    assessment, with its result value, so the current posture and the score
+    read these rows instead of ranking the whole history.
+
+    Ingestion upserts the rows of the results it writes
+    (PostureAssessment.record_current_results). Deleting results deletes their
+    rows: refresh_current_results() restores the previous results as current.
+    """
+
+    posture_assessment = models.ForeignKey(
+        PostureAssessment, on_delete=models.CASCADE, related_name="current_results"
+    )
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="+")
+    requirement = models.ForeignKey(
+        RequirementNode, on_delete=models.CASCADE, related_name="+"
+    )
+    posture_result = models.OneToOneField(
+        PostureResult, on_delete=models.CASCADE, related_name="current"
+    )
+    result = models.CharField(max_length=20, choices=PostureResult.Result.choices)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["posture_assessment", "asset", "requirement"],
+                name="unique_posture_current_result",
+            ),
+        ]
+
+
+class PostureRunSnapshot(models.Model):
+    """
+    Result counts of the current posture of an asset once a run wrote its
+    results for it, and `checks`, the number of results of the run for the
+    asset. Both are keyed by the groups signature of the requirements
+    (groups_signature), so trend() sums those of the implementation groups
+    selection at read time instead of replaying the history.
+
+    Ingestion writes the snapshots (PostureAssessment.record_run_snapshot) and
+    the migration creating them backfilled the history. Pruning keeps them,
+    and deleting a run only aligns the latest snapshots with the current
+    results: the trend shows the posture as it was measured.
+    """
+
+    posture_assessment = models.ForeignKey(
+        PostureAssessment, on_delete=models.CASCADE, related_name="run_snapshots"
+    )
+    run = models.ForeignKey(
+        PostureRun, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name="+")
+    taken_at = models.DateTimeField()
+    counts = models.JSONField(default=dict)
+    checks = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run", "asset"], name="unique_posture_run_snapshot"
+            ),
+        ]
+        indexes = [models.Index(fields=["posture_assessment", "taken_at"])]
+
+
 @receiver(post_delete, sender=PostureRun)
 def delete_run_attachment(sender, instance, **kwargs):
     if instance.attachment:
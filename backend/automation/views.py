@@ -6,6 +6,7 @@ import os
 import re
 import uuid
 from collections import Counter
+from itertools import batched
 from uuid import UUID
 
 from django.conf import settings
@@ -31,7 +32,15 @@ from core.views import (
 )
 from iam.models import Folder, RoleAssignment
 
-from .importers import ImportError_, analyze_csv, parse_file, parse_mapped_csv
+from .importers import (
+    BULK_PARSERS_BY_CONTENT_TYPE,
+    BULK_PARSERS_BY_SUFFIX,
+    ImportError_,
+    analyze_csv,
+    iter_bulk_file,
+    parse_file,
+    parse_mapped_csv,
+)
 from .models import PostureAssessment, PostureResult, PostureRun
 
 LONG_CACHE_TTL = 60  # mn
@@ -365,7 +374,12 @@ class PostureAssessmentViewSet(BaseModelViewSet):
             return locked
         if run.attachment:
             run.attachment.delete(save=False)
-        run.delete()
+        with transaction.atomic():
+            pairs = set(run.results.values_list("asset_id", "requirement_id"))
+            run.delete()
+            # The previous results of the run's checks become current again
+            assessment.refresh_current_results(pairs)
+            assessment.refresh_latest_run_snapshots({asset_id for asset_id, _ in pairs})
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -523,42 +537,9 @@ class PostureAssessmentViewSet(BaseModelViewSet):
         asset_id, error = self._asset_param(request)
         if error:
             return error
-        qs = assessment.results.filter(asset_id__in=self._viewable_asset_ids())
-        if asset_id:
-            qs = qs.filter(asset_id=asset_id)
-        selected_ids = assessment.selected_requirement_ids()
-        if selected_ids is not None:
-            qs = qs.filter(requirement_id__in=selected_ids)
-        rows = qs.order_by("timestamp", "created_at").values(
-            "asset_id", "requirement_id", "result", "run_id", "timestamp", "run__tool"
+        points = assessment.trend(
+            asset_id=asset_id, asset_ids=self._viewable_asset_ids()
         )
-        latest = {}
-        points = []
-        current_run = None
-        current_ts = None
-        current_tool = ""
-
-        def snapshot():
-            counts = Counter(latest.values())
-            applicable = counts["pass"] + counts["fail"]
-            score = round(100 * counts["pass"] / applicable, 1) if applicable else None
-            return {
-                "run_id": str(current_run),
-                "timestamp": current_ts,
-                "tool": current_tool,
-                "score": score,
-                "counts": dict(counts),
-            }
-
-        for row in rows:
-            if current_run is not None and row["run_id"] != current_run:
-                points.append(snapshot())
-            current_run = row["run_id"]
-            current_ts = row["timestamp"]
-            current_tool = row["run__tool"]
-            latest[(row["asset_id"], row["requirement_id"])] = row["result"]
-        if current_run is not None:
-            points.append(snapshot())
         return Response({"points": points})
 
     @action(detail=True, methods=["post"], url_path="upload-results")
@@ -583,6 +564,53 @@ class PostureAssessmentViewSet(BaseModelViewSet):
             tool=request.data.get("tool", ""),
         )
 
+    RESULT_UPDATE_FIELDS = [
+        "result",
+        "timestamp",
+        "actual",
+        "expected",
+        "message",
+        "source",
+        "imported_by",
+    ]
+
+    @staticmethod
+    def _result_fields(entry, timestamp, source, user):
+        return {
+            "result": entry["result"],
+            "timestamp": timestamp,
+            "actual": str(entry.get("actual") or "")[:255],
+            "expected": str(entry.get("expected") or "")[:255],
+            "message": str(entry.get("message") or ""),
+            "source": source,
+            "imported_by": user,
+        }
+
+    @staticmethod
+    def _requirement_resolver(assessment):
+        """
+        ref_id -> id of the assessable requirement of the framework, or None.
+        A scanner prefix ("CIS-1.1") is dropped when the exact ref_id is unknown.
+        """
+        nodes = {
+            ref_id: node_id
+            for ref_id, node_id in RequirementNode.objects.filter(
+                framework=assessment.framework, assessable=True
+            ).values_list("ref_id", "id")
+            if ref_id
+        }
+        resolved = {}
+
+        def match(ref_id):
+            if ref_id not in resolved:
+                node_id = nodes.get(ref_id)
+                if node_id is None and ref_id:
+                    node_id = nodes.get(re.sub(r"^[^0-9]+", "", str(ref_id)))
+                resolved[ref_id] = node_id
+            return resolved[ref_id]
+
+        return match
+
     def _ingest(self, request, assessment, *, asset_id, entries, run_id, source, tool):
         if not asset_id or not isinstance(entries, list) or not entries:
             return Response(
@@ -653,39 +681,17 @@ class PostureAssessmentViewSet(BaseModelViewSet):
 
         timestamp = timezone.now()
 
-        nodes = {
-            node.ref_id: node
-            for node in RequirementNode.objects.filter(
-                framework=assessment.framework, assessable=True
-            )
-            if node.ref_id
-        }
-
-        def match(ref_id):
-            node = nodes.get(ref_id)
-            if node is None and ref_id:
-                node = nodes.get(re.sub(r"^[^0-9]+", "", str(ref_id)))
-            return node
-
+        match = self._requirement_resolver(assessment)
         unknown_refs = [
             e.get("ref_id") for e in entries if match(e.get("ref_id")) is None
         ]
 
         matched = {}
         for entry in entries:
-            node = match(entry.get("ref_id"))
-            if node is not None:
-                matched[node.id] = entry
-
-        update_fields = [
-            "result",
-            "timestamp",
-            "actual",
-            "expected",
-            "message",
-            "source",
-            "imported_by",
-        ]
+            node_id = match(entry.get("ref_id"))
+            if node_id is not None:
+                matched[node_id] = entry
+
         try:
             with transaction.atomic():
                 run, run_created = PostureRun.objects.get_or_create(
@@ -699,15 +705,7 @@ class PostureAssessmentViewSet(BaseModelViewSet):
                 }
                 to_create, to_update = [], []
                 for node_id, entry in matched.items():
-                    fields = {
-                        "result": entry["result"],
-                        "timestamp": timestamp,
-                        "actual": str(entry.get("actual") or "")[:255],
-                        "expected": str(entry.get("expected") or "")[:255],
-                        "message": str(entry.get("message") or ""),
-                        "source": source,
-                        "imported_by": request.user,
-                    }
+                    fields = self._result_fields(entry, timestamp, source, request.user)
                     obj = existing.get(node_id)
                     if obj is None:
                         to_create.append(
@@ -722,12 +720,14 @@ class PostureAssessmentViewSet(BaseModelViewSet):
                 PostureResult.objects.bulk_create(to_create, batch_size=500)
                 if to_update:
                     PostureResult.objects.bulk_update(
-                        to_update, update_fields, batch_size=500
+                        to_update, self.RESULT_UPDATE_FIELDS, batch_size=500
                     )
                 if matched:
+                    assessment.record_current_results([*to_create, *to_update])
                     assessment.prune_history(
                         {(asset.id, node_id) for node_id in matched}
                     )
+                    assessment.record_run_snapshot(run, asset, timestamp)
                 elif run_created:
                     run.delete()
         except IntegrityError:
@@ -1032,6 +1032,216 @@ class PostureAssessmentViewSet(BaseModelViewSet):
             response.data.update(extras)
         return response
 
+    BULK_INGEST_CHUNK_SIZE = 5000
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="bulk-ingest",
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def bulk_ingest(self, request, pk=None):
+        """
+        Results of many assets in one stream: an uploaded `file` (.ndjson,
+        .jsonl or .csv) or the request body itself (application/x-ndjson or
+        text/csv). Each row names its `asset` (UUID or unique name) next to the
+        ref_id, result, actual, expected and message fields of upload-results.
+
+        The stream is read line by line and written into a single run, in
+        chunks of BULK_INGEST_CHUNK_SIZE rows that each commit on their own.
+        """
+        assessment = self.get_object()
+        if not RoleAssignment.is_access_allowed(
+            user=request.user,
+            perm=Permission.objects.get(codename="change_postureassessment"),
+            folder=assessment.folder,
+        ):
+            raise PermissionDenied()
+        locked = self._locked(assessment)
+        if locked:
+            return locked
+
+        content_type = (request.content_type or "").split(";")[0].strip().lower()
+        bulk_format = BULK_PARSERS_BY_CONTENT_TYPE.get(content_type)
+        if bulk_format:
+            lines = request.stream or ()
+            tool = request.query_params.get("tool", "")[:100]
+        else:
+            file = request.FILES.get("file")
+            if file is None:
+                return Response(
+                    {"error": "file is required"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            name = (file.name or "").lower()
+            bulk_format = next(
+                (
+                    parser
+                    for suffix, parser in BULK_PARSERS_BY_SUFFIX.items()
+                    if name.endswith(suffix)
+                ),
+                None,
+            )
+            if bulk_format is None:
+                return Response(
+                    {
+                        "error": "unsupported file type (expected .ndjson, .jsonl or .csv)"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            lines = file
+            tool = (request.data.get("tool") or file.name or "")[:100]
+
+        rows, extras = iter_bulk_file(lines, bulk_format)
+        state = {
+            "timestamp": timezone.now(),
+            "tool": tool,
+            "run": None,
+            "resolve": self._requirement_resolver(assessment),
+            "viewable": set(self._viewable_asset_ids()),
+            "enrolled": set(assessment.assets.values_list("id", flat=True)),
+            "assets": {},
+            "written_assets": set(),
+            "rows": 0,
+            "created": 0,
+            "updated": 0,
+            "unknown_ref_ids": {},
+            "enrolled_assets": 0,
+            "skipped_assets": set(),
+        }
+        try:
+            for chunk in batched(rows, self.BULK_INGEST_CHUNK_SIZE):
+                state["rows"] += len(chunk)
+                self._ingest_bulk_chunk(request, assessment, chunk, state)
+        except ImportError_ as e:
+            error = {"error": e.message}
+            if state["run"] is not None:
+                # The chunks read before the error are committed
+                error["run_id"] = str(state["run"].id)
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        summary = {
+            "unknown_ref_ids": list(state["unknown_ref_ids"]),
+            "skipped_assets": sorted(state["skipped_assets"])[:20],
+            "parse_errors": extras["parse_errors"],
+        }
+        if state["run"] is None:
+            return Response(
+                {"error": "no rows could be applied to an asset", **summary},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {
+                "run_id": str(state["run"].id),
+                "rows": state["rows"],
+                "created": state["created"],
+                "updated": state["updated"],
+                "assets_imported": len(state["written_assets"]),
+                "enrolled_assets": state["enrolled_assets"],
+                **summary,
+            }
+        )
+
+    def _resolve_bulk_assets(self, values, state):
+        """Map the new asset `values` (UUID or unique name) to viewable asset ids."""
+        values = {value for value in values if value not in state["assets"]}
+        if not values:
+            return
+        ids = {}
+        for value in values:
+            try:
+                ids[value] = UUID(value)
+            except ValueError:
+                pass
+        found = set()
+        by_name = {}
+        for asset_id, name in Asset.objects.filter(
+            Q(id__in=ids.values()) | Q(name__in=values - ids.keys())
+        ).values_list("id", "name"):
+            if asset_id in state["viewable"]:
+                found.add(asset_id)
+                by_name.setdefault(name, []).append(asset_id)
+        for value in values:
+            if value in ids:
+                asset_id = ids[value] if ids[value] in found else None
+            else:
+                matches = by_name.get(value, [])
+                asset_id = matches[0] if len(matches) == 1 else None
+            state["assets"][value] = asset_id
+
+    def _ingest_bulk_chunk(self, request, assessment, chunk, state):
+        """Write a chunk of (asset, entry) rows: a handful of set-based queries."""
+        self._resolve_bulk_assets({asset for asset, _ in chunk}, state)
+        matched = {}
+        for asset_value, entry in chunk:
+            asset_id = state["assets"][asset_value]
+            if asset_id is None:
+                state["skipped_assets"].add(asset_value)
+                continue
+            node_id = state["resolve"](entry["ref_id"])
+            if node_id is None:
+                state["unknown_ref_ids"][entry["ref_id"]] = None
+                continue
+            # The last row of a pair wins, as in upload-results
+            matched[(asset_id, node_id)] = entry
+        if not matched:
+            return
+
+        timestamp = state["timestamp"]
+        asset_ids = {asset_id for asset_id, _ in matched}
+        with transaction.atomic():
+            new_assets = asset_ids - state["enrolled"]
+            if new_assets:
+                assessment.assets.add(*new_assets)
+                state["enrolled"] |= new_assets
+                state["enrolled_assets"] += len(new_assets)
+            run = state["run"]
+            if run is None:
+                run = PostureRun.objects.create(
+                    posture_assessment=assessment,
+                    started_at=timestamp,
+                    tool=state["tool"],
+                )
+            # Only assets of the previous chunks can have rows in the run
+            seen = asset_ids & state["written_assets"]
+            existing = {}
+            if seen:
+                for result in run.results.filter(
+                    asset_id__in=seen,
+                    requirement_id__in={node_id for _, node_id in matched},
+                ):
+                    existing[(result.asset_id, result.requirement_id)] = result
+            to_create, to_update = [], []
+            for (asset_id, node_id), entry in matched.items():
+                fields = self._result_fields(
+                    entry, timestamp, PostureResult.Source.IMPORT, request.user
+                )
+                obj = existing.get((asset_id, node_id))
+                if obj is None:
+                    to_create.append(
+                        PostureResult(
+                            run_id=run.id,
+                            asset_id=asset_id,
+                            requirement_id=node_id,
+                            **fields,
+                        )
+                    )
+                else:
+                    for key, value in fields.items():
+                        setattr(obj, key, value)
+                    to_update.append(obj)
+            PostureResult.objects.bulk_create(to_create, batch_size=2000)
+            if to_update:
+                PostureResult.objects.bulk_update(
+                    to_update, self.RESULT_UPDATE_FIELDS, batch_size=2000
+                )
+            assessment.record_current_results([*to_create, *to_update])
+            assessment.prune_history(set(matched))
+            assessment.record_run_snapshots(run, asset_ids, timestamp)
+        state["run"] = run
+        state["written_assets"] |= asset_ids
+        state["created"] += len(to_create)
+        state["updated"] += len(to_update)
+
     @action(detail=True, methods=["post"], url_path="purge-asset")
     def purge_asset(self, request, pk=None):
         assessment = self.get_object()
@@ -1052,12 +1262,13 @@ class PostureAssessmentViewSet(BaseModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         with transaction.atomic():
-            deleted, _ = assessment.results.filter(asset_id=asset_id).delete()
+            _, deleted = assessment.results.filter(asset_id=asset_id).delete()
+            assessment.run_snapshots.filter(asset_id=asset_id).delete()
             assessment.runs.filter(results__isnull=True).filter(
                 Q(observation=""), Q(attachment="") | Q(attachment__isnull=True)
             ).delete()
             assessment.assets.remove(asset_id)
-        return Response({"deleted_results": deleted})
+        return Response({"deleted_results": deleted.get(PostureResult._meta.label, 0)})
 
     def _follow_up_findings(self, assessment):
         if not assessment.follow_up_assessment_id:
@@ -4,13 +4,23 @@ Advancement is synchronous inside the triggering request, guarded by a
 row lock on the instance (PG) / SQLite's writer lock, with a max-steps
 guard against runaway action loops. Task and event nodes park their token
 as `waiting`; everything else executes and advances in the same call.
+
+By default a run is batched (WORKFLOWS_BATCHED_EXECUTION, see _Pass): the
+live tokens and the version graph are loaded once per pass and the token and
+log rows are written in bulk at checkpoints, instead of one pick query and
+one write per row on every step.
 """
 
 import contextvars
+import copy
+import json
 import re
+from collections import deque
 from datetime import date, timedelta
 
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from .actions import (
@@ -53,6 +63,10 @@ LIVE_TOKEN_STATUSES = [
 # internal-event producer (workflows/events.py).
 current_trigger_depth = contextvars.ContextVar("workflow_trigger_depth", default=0)
 
+# Batched pass (_Pass) whose step is executing in this context; None in
+# step-by-step mode and outside a run.
+_current_pass = contextvars.ContextVar("workflow_engine_pass", default=None)
+
 
 class EngineError(Exception):
     """Raised with a deliberate, user-facing message (never internals or
@@ -439,6 +453,26 @@ def _timeout_instance(instance):
     _abandon_children(instance)
 
 
+def _exceed_max_steps(instance):
+    # Leave no ACTIVE/WAITING tokens behind, or a later run resumes them.
+    instance.tokens.filter(status__in=LIVE_TOKEN_STATUSES).update(
+        status=WorkflowToken.Status.ERROR
+    )
+    _fail_instance(instance, "Max execution steps exceeded")
+
+
+def _next_token(instance):
+    # Deterministic pick: an unordered .first() lets SQLite and PG execute
+    # parallel branches in different orders, so the last writer of a shared
+    # variable diverges between backends. "id" breaks created_at ties
+    # between siblings created in the same statement.
+    return (
+        instance.tokens.filter(status=WorkflowToken.Status.ACTIVE)
+        .order_by("created_at", "id")
+        .first()
+    )
+
+
 def _run(instance):
     # A failed/completed instance must not resume (e.g. a duplicate task
     # enqueue after a max-steps failure would run another MAX_STEPS).
@@ -449,32 +483,235 @@ def _run(instance):
     if _is_over_ttl(instance):
         _timeout_instance(instance)
         return
-    for _ in range(MAX_STEPS):
-        # Re-check each step: a long synchronous pass (big loop / subprocess
-        # fan-out) could blow the wall clock inside one _run call.
-        if _is_over_ttl(instance):
-            _timeout_instance(instance)
-            return
-        # Deterministic pick: an unordered .first() lets SQLite and PG execute
-        # parallel branches in different orders, so the last writer of a shared
-        # variable diverges between backends. "id" breaks created_at ties
-        # between siblings created in the same statement.
-        token = (
-            instance.tokens.filter(status=WorkflowToken.Status.ACTIVE)
-            .order_by("created_at", "id")
-            .first()
+    run_pass = None
+    if getattr(settings, "WORKFLOWS_BATCHED_EXECUTION", True):
+        run_pass = _Pass(instance)
+    stop = None
+    context = _current_pass.set(run_pass)
+    try:
+        for _ in range(MAX_STEPS):
+            # Re-check each step: a long synchronous pass (big loop / subprocess
+            # fan-out) could blow the wall clock inside one _run call.
+            if _is_over_ttl(instance):
+                stop = _timeout_instance
+                break
+            if run_pass is not None:
+                token = run_pass.next_token()
+            else:
+                token = _next_token(instance)
+            if token is None:
+                break
+            _process(token)
+        else:
+            stop = _exceed_max_steps
+        if run_pass is not None:
+            run_pass.flush()
+    finally:
+        _current_pass.reset(context)
+    (stop or _refresh_status)(instance)
+
+
+class _Pass:
+    """A batched _run pass over one instance.
+
+    The version graph and the instance's active tokens (with the loop
+    controllers they report to) are loaded once. Tokens are then picked from
+    memory in the order of _next_token: the loaded ones by (created_at, id),
+    followed by the tokens the pass creates, in creation order.
+
+    The token and log rows of the instance are buffered (_save_token,
+    _arrive, _log) and written with bulk_create/bulk_update at checkpoints:
+    before the steps that run foreign code (action, subprocess), before any
+    bulk write or new read of the tokens, and at the end of the pass. A step
+    whose savepoint rolls back discards what it buffered.
+    """
+
+    # Steps whose code may read or write the instance's rows behind the pass
+    # (actions broadcast events and start runs, subprocesses reference the
+    # token, the end node bulk-updates the tokens): the buffer is flushed
+    # before their savepoint opens, so a rollback never takes it away.
+    CHECKPOINT_NODE_TYPES = (
+        WorkflowNode.Type.ACTION,
+        WorkflowNode.Type.SUBPROCESS,
+        WorkflowNode.Type.END,
+    )
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.outer = _current_pass.get()
+        # A pass over the same instance is running further up the stack (a
+        # resume from a nested run): hand it the rows, then have it reload.
+        outer = self.outer
+        while outer is not None:
+            if outer.instance.id == instance.id:
+                outer.flush()
+                outer.stale = True
+            outer = outer.outer
+        self.nodes = {
+            node.id: node
+            for node in instance.version.nodes.prefetch_related("outgoing_edges")
+        }
+        for node in self.nodes.values():
+            for edge in node.outgoing_edges.all():
+                if edge.target_node_id in self.nodes:
+                    edge.target_node = self.nodes[edge.target_node_id]
+        self.new_tokens = []
+        self.updates = []
+        self.logs = []
+        self.flushes = 0
+        self.last_logged_at = None
+        self.load_tokens()
+
+    def load_tokens(self):
+        self.flush()
+        tokens = self.instance.tokens.filter(
+            Q(status=WorkflowToken.Status.ACTIVE)
+            | Q(
+                status=WorkflowToken.Status.WAITING,
+                current_node__type=WorkflowNode.Type.LOOP,
+            )
+        ).order_by("created_at", "id")
+        active = deque()
+        # One object per controller: every body token must update the same
+        # loop_state.
+        controllers = {}
+        for token in tokens:
+            self._attach(token)
+            if token.status == WorkflowToken.Status.ACTIVE:
+                active.append(token)
+            else:
+                controllers[token.id] = token
+        for token in [*active, *controllers.values()]:
+            if token.loop_controller_id in controllers:
+                token.loop_controller = controllers[token.loop_controller_id]
+        self.tokens = active
+        self.stale = False
+
+    def _attach(self, token):
+        # Pin the pass's instance and graph objects: lazily-loaded copies
+        # would cost a query each and carry stale node_outputs.
+        token.instance = self.instance
+        node = self.nodes.get(token.current_node_id)
+        if node is not None:
+            token.current_node = node
+
+    def next_token(self):
+        if self.stale:
+            self.load_tokens()
+        while self.tokens and self.tokens[0].status != WorkflowToken.Status.ACTIVE:
+            self.tokens.popleft()
+        return self.tokens[0] if self.tokens else None
+
+    def create_token(self, **fields):
+        token = WorkflowToken(
+            instance=self.instance, folder_id=self.instance.folder_id, **fields
         )
-        if token is None:
-            break
-        _process(token)
-    else:
-        # Leave no ACTIVE/WAITING tokens behind, or a later run resumes them.
-        instance.tokens.filter(status__in=LIVE_TOKEN_STATUSES).update(
-            status=WorkflowToken.Status.ERROR
+        self._attach(token)
+        self.new_tokens.append(token)
+        self.tokens.append(token)
+        return token
+
+    def save_token(self, token, update_fields):
+        token.updated_at = timezone.now()
+        # An unsaved token is inserted with its latest state.
+        if not token._state.adding:
+            self.updates.append((token, update_fields))
+
+    def log(self, **fields):
+        # Serialized now, like a save would: an unserializable payload fails
+        # its step, not the flush.
+        fields["data"] = json.loads(json.dumps(fields["data"]))
+        self.logs.append(
+            WorkflowInstanceLog(
+                instance=self.instance, folder_id=self.instance.folder_id, **fields
+            )
         )
-        _fail_instance(instance, "Max execution steps exceeded")
-        return
-    _refresh_status(instance)
+
+    def mark(self):
+        # Unsaved tokens are inserted with their latest state: keep the one
+        # they have now, for a step that rolls back after changing them.
+        states = [(token, _token_state(token)) for token in self.new_tokens]
+        return (
+            self.flushes,
+            len(self.new_tokens),
+            len(self.updates),
+            len(self.logs),
+            states,
+        )
+
+    def discard(self, mark):
+        """Drop the writes buffered since `mark`: their savepoint rolled back.
+        The tokens in memory may disagree with the rows now, reload them."""
+        flushes, new_tokens, updates, logs, states = mark
+        if flushes != self.flushes:
+            new_tokens = updates = logs = 0
+        else:
+            for token, state in states:
+                for attname, value in state.items():
+                    setattr(token, attname, value)
+                self._attach(token)
+        del self.new_tokens[new_tokens:]
+        del self.updates[updates:]
+        del self.logs[logs:]
+        self.stale = True
+
+    def flush(self):
+        if self.new_tokens:
+            WorkflowToken.objects.bulk_create(self.new_tokens)
+        fields_by_token = {}
+        for token, update_fields in self.updates:
+            fields_by_token.setdefault(token.id, (token, set()))[1].update(
+                update_fields
+            )
+        tokens_by_fields = {}
+        for token, update_fields in fields_by_token.values():
+            tokens_by_fields.setdefault(frozenset(update_fields), []).append(token)
+        for update_fields, tokens in tokens_by_fields.items():
+            WorkflowToken.objects.bulk_update(tokens, sorted(update_fields))
+        if self.logs:
+            WorkflowInstanceLog.objects.bulk_create(self.logs)
+            self._order_logs()
+        self.new_tokens = []
+        self.updates = []
+        self.logs = []
+        self.flushes += 1
+
+    def _order_logs(self):
+        # The log reads in created_at order, and bulk_create stamps each row
+        # separately: make ties strictly increasing.
+        tied = []
+        previous = self.last_logged_at
+        for log in self.logs:
+            if previous is not None and log.created_at <= previous:
+                log.created_at = previous + timedelta(microseconds=1)
+                tied.append(log)
+            previous = log.created_at
+        self.last_logged_at = previous
+        if tied:
+            WorkflowInstanceLog.objects.bulk_update(tied, ["created_at"])
+
+
+def _token_state(token):
+    return {
+        field.attname: copy.deepcopy(field.value_from_object(token))
+        for field in WorkflowToken._meta.concrete_fields
+    }
+
+
+def _pass_for(instance):
+    """The batched pass buffering the rows of `instance`, if any."""
+    run_pass = _current_pass.get()
+    if run_pass is not None and run_pass.instance.id == instance.id:
+        return run_pass
+    return None
+
+
+def _save_token(token, update_fields):
+    run_pass = _current_pass.get()
+    if run_pass is not None and run_pass.instance.id == token.instance_id:
+        run_pass.save_token(token, update_fields)
+    else:
+        token.save(update_fields=update_fields)
 
 
 def _set_iteration_overlay(token):
@@ -491,6 +728,11 @@ def _process(token):
     _log(instance, WorkflowInstanceLog.EventType.NODE_ENTERED, node=node)
     _set_iteration_overlay(token)
 
+    run_pass = _pass_for(instance)
+    if run_pass is not None:
+        if node.type in _Pass.CHECKPOINT_NODE_TYPES:
+            run_pass.flush()
+        mark = run_pass.mark()
     failure = None
     try:
         # Savepoint: a DB error here would otherwise poison run_instance's
@@ -507,7 +749,7 @@ def _process(token):
                     # Human-task materialization (TaskNode integration) is the next
                     # milestone; until then the run parks here, visible in the log.
                     token.status = WorkflowToken.Status.WAITING
-                    token.save(update_fields=["status", "updated_at"])
+                    _save_token(token, ["status", "updated_at"])
                     _log(
                         instance,
                         WorkflowInstanceLog.EventType.TASK_WAITING,
@@ -518,7 +760,7 @@ def _process(token):
 
                 if node.type == WorkflowNode.Type.EVENT:
                     token.status = WorkflowToken.Status.WAITING
-                    token.save(update_fields=["status", "updated_at"])
+                    _save_token(token, ["status", "updated_at"])
                     _log(
                         instance,
                         WorkflowInstanceLog.EventType.EVENT_WAITING,
@@ -553,6 +795,8 @@ def _process(token):
                 failure = str(e)
     except Exception as e:  # noqa: BLE001 — a buggy action must not 500 the request
         failure = f"{type(e).__name__}: {e}"
+        if run_pass is not None:
+            run_pass.discard(mark)
     if failure is not None:
         _handle_failure(token, failure)
 
@@ -583,7 +827,7 @@ def _handle_failure(token, message):
                 )
                 token.status = WorkflowToken.Status.COMPLETED
                 token.error_message = message
-                token.save(update_fields=["status", "error_message", "updated_at"])
+                _save_token(token, ["status", "error_message", "updated_at"])
                 _loop_body_returned(controller, failed=message)
                 return
             # stop policy: fail the body token AND the parked controller, or the
@@ -598,7 +842,7 @@ def _handle_failure(token, message):
     token.retry_count += 1
     token.status = WorkflowToken.Status.RETRYING
     token.error_message = message
-    token.save(update_fields=["retry_count", "status", "error_message", "updated_at"])
+    _save_token(token, ["retry_count", "status", "error_message", "updated_at"])
     delay = node.retry_delay_seconds
     if node.retry_backoff == WorkflowNode.RetryBackoff.EXPONENTIAL:
         delay *= 2 ** (token.retry_count - 1)
@@ -645,7 +889,7 @@ def _process_loop(token):
         # node_outputs and clobber sibling writes on save.
         controller.instance = instance
         token.status = WorkflowToken.Status.COMPLETED
-        token.save(update_fields=["status", "updated_at"])
+        _save_token(token, ["status", "updated_at"])
         _loop_body_returned(controller, failed=None)
         return
 
@@ -675,7 +919,7 @@ def _process_loop(token):
         "results": [],
         "errors": [],
     }
-    token.save(update_fields=["status", "loop_state", "updated_at"])
+    _save_token(token, ["status", "loop_state", "updated_at"])
     _loop_next_iteration(token)
 
 
@@ -695,7 +939,7 @@ def _loop_next_iteration(controller):
     item = state["items"][state["index"]]
     state["outstanding"] = len(each_edges)
     controller.loop_state = state
-    controller.save(update_fields=["loop_state", "updated_at"])
+    _save_token(controller, ["loop_state", "updated_at"])
     stack = list(controller.iteration_context or []) + [
         {"item": item, "index": state["index"]}
     ]
@@ -714,7 +958,7 @@ def _loop_body_returned(controller, failed):
         state["errors"].append({"index": state["index"], "message": failed})
     state["outstanding"] -= 1
     controller.loop_state = state
-    controller.save(update_fields=["loop_state", "updated_at"])
+    _save_token(controller, ["loop_state", "updated_at"])
     if state["outstanding"] > 0:
         return
 
@@ -736,7 +980,7 @@ def _loop_body_returned(controller, failed):
         controller.instance._iteration_context = None
         state["results"].append(value)
         controller.loop_state = state
-        controller.save(update_fields=["loop_state", "updated_at"])
+        _save_token(controller, ["loop_state", "updated_at"])
     _loop_next_iteration(controller)
 
 
@@ -762,7 +1006,7 @@ def _loop_finish(controller):
         data=_truncate_log_data(output),
     )
     controller.loop_state = {}
-    controller.save(update_fields=["loop_state", "updated_at"])
+    _save_token(controller, ["loop_state", "updated_at"])
     _advance(controller)
 
 
@@ -819,7 +1063,7 @@ def _start_subprocess(token):
         _persist_node_output(node, child.variables, instance)
     elif child.status == WorkflowInstance.Status.ACTIVE:
         token.status = WorkflowToken.Status.WAITING
-        token.save(update_fields=["status", "updated_at"])
+        _save_token(token, ["status", "updated_at"])
     else:
         raise EngineError(f"Subprocess failed ({child})")
 
@@ -911,7 +1155,7 @@ def _advance(token):
         # A leaf is an implicit terminal: this branch is done, siblings keep
         # running. Stopping the WHOLE run is the end node's job.
         token.status = WorkflowToken.Status.COMPLETED
-        token.save(update_fields=["status", "updated_at"])
+        _save_token(token, ["status", "updated_at"])
         return
 
     if node.type == WorkflowNode.Type.CONDITION:
@@ -919,18 +1163,22 @@ def _advance(token):
         # default last (always matches), first match wins; follow its wire.
         # Prefetch the whole branch subtree so evaluation doesn't N+1 over
         # groups/conditions/variables (mirrors graph.serialize_graph's shape).
+        # Kept on the node: a batched pass revisits the same node object.
         chosen = []
-        branches = sorted(
-            node.branches.prefetch_related(
-                "condition_groups__conditions__variable",
-                "condition_groups__children",
-            ),
-            key=lambda b: (b.is_default, b.order),
-        )
+        branches = getattr(node, "_engine_branches", None)
+        if branches is None:
+            branches = node._engine_branches = sorted(
+                node.branches.prefetch_related(
+                    "condition_groups__conditions__variable",
+                    "condition_groups__children",
+                    "edges",
+                ),
+                key=lambda b: (b.is_default, b.order),
+            )
         context = _render_context(instance)
         for branch in branches:
             if _evaluate_branch(branch, context):
-                edge = branch.edges.first()
+                edge = next(iter(branch.edges.all()), None)
                 if edge is None:
                     raise EngineError(
                         f"Branch '{branch}' of '{node}' matched but has no wire"
@@ -951,7 +1199,7 @@ def _advance(token):
         chosen = edges
 
     token.status = WorkflowToken.Status.CONSUMED
-    token.save(update_fields=["status", "updated_at"])
+    _save_token(token, ["status", "updated_at"])
     for edge in chosen:
         _arrive(
             instance,
@@ -966,13 +1214,17 @@ def _arrive(instance, edge, iteration_context=None, loop_controller=None):
     # travel with the moving token.
     # Convergence = run once per arriving token (n8n default). Waiting for all
     # branches becomes the merge node's job.
-    WorkflowToken.objects.create(
-        instance=instance,
-        current_node=edge.target_node,
-        arrived_via_edge=edge,
-        iteration_context=iteration_context or [],
-        loop_controller=loop_controller,
-    )
+    fields = {
+        "current_node": edge.target_node,
+        "arrived_via_edge": edge,
+        "iteration_context": iteration_context or [],
+        "loop_controller": loop_controller,
+    }
+    run_pass = _pass_for(instance)
+    if run_pass is not None:
+        run_pass.create_token(**fields)
+    else:
+        WorkflowToken.objects.create(instance=instance, **fields)
 
 
 def _evaluate_branch(branch, variables):
@@ -1064,13 +1316,18 @@ def _terminate_run(token, node):
     already errored still fails the run (terminate never launders a failure).
     """
     instance = token.instance
+    run_pass = _pass_for(instance)
+    if run_pass is not None:
+        # The bulk update below changes tokens the pass holds in memory (the
+        # buffer was flushed before this step's savepoint opened).
+        run_pass.stale = True
     cancelled = (
         instance.tokens.filter(status__in=LIVE_TOKEN_STATUSES)
         .exclude(pk=token.pk)
         .update(status=WorkflowToken.Status.CONSUMED)
     )
     token.status = WorkflowToken.Status.COMPLETED
-    token.save(update_fields=["status", "updated_at"])
+    _save_token(token, ["status", "updated_at"])
     _abandon_children(instance)
     message = "Run stopped"
     if cancelled:
@@ -1105,7 +1362,7 @@ def _abandon_children(instance):
 def _fail_token(token, message):
     token.status = WorkflowToken.Status.ERROR
     token.error_message = message
-    token.save(update_fields=["status", "error_message", "updated_at"])
+    _save_token(token, ["status", "error_message", "updated_at"])
     _log(
         token.instance,
         WorkflowInstanceLog.EventType.ERROR,
@@ -1199,11 +1456,15 @@ def _truncate_log_data(output, limit=2000):
 
 
 def _log(instance, event_type, node=None, edge=None, message="", data=None):
-    WorkflowInstanceLog.objects.create(
-        instance=instance,
-        node=node,
-        edge=edge,
-        event_type=event_type,
-        message=message,
-        data=data or {},
-    )
+    fields = {
+        "node": node,
+        "edge": edge,
+        "event_type": event_type,
+        "message": message,
+        "data": data or {},
+    }
+    run_pass = _pass_for(instance)
+    if run_pass is not None:
+        run_pass.log(**fields)
+    else:
+        WorkflowInstanceLog.objects.create(instance=instance, **fields)
@@ -17,13 +17,20 @@ d dispatch events at depth d, which start instances at depth d+1, capped at
 MAX_TRIGGER_DEPTH.
 """
 
+from functools import partial
+from uuid import UUID
+
 from django.utils import timezone
 
 import structlog
 
-from iam.models import Folder
-
-from .models import Condition, WorkflowInstance, WorkflowNode, WorkflowTrigger
+from .models import (
+    Condition,
+    WorkflowInstance,
+    WorkflowNode,
+    WorkflowTrigger,
+    WorkflowVersion,
+)
 
 logger = structlog.get_logger(__name__)
 
@@ -79,49 +86,67 @@ def event_key_catalog():
 
 def dispatch_internal_event(event_key, payload, folder_id, origin_depth=0):
     """Match triggers and start workflows. Returns started instances."""
+    from iam.cache_builders import get_folder_state, is_descendant_id
+
     from .engine import EngineError, create_instance
     from .tasks import run_instance_task
+    from .trigger_index import get_event_triggers
 
     started = []
-    triggers = WorkflowTrigger.objects.filter(
-        type=WorkflowTrigger.Type.INTERNAL_EVENT,
-        enabled=True,
-        event_key=event_key,
-        workflow__is_active=True,
-    ).select_related("workflow")
-    state_cache = {}
-    for trigger in triggers:
-        # Hard security boundary: the event's object must live within the
-        # workflow's folder subtree, regardless of user filters. Events from
-        # models that carry no folder count as root-scoped, so only workflows
-        # whose scope includes the root folder may receive them — never a
-        # bypass.
+    indexed_triggers = get_event_triggers(event_key)
+    if not indexed_triggers:
+        return started
+    # Hard security boundary: the event's object must live within the
+    # workflow's folder subtree, regardless of user filters. Events from
+    # models that carry no folder count as root-scoped, so only workflows
+    # whose scope includes the root folder may receive them — never a
+    # bypass.
+    folder_state = get_folder_state()
+    try:
         effective_folder = (
-            str(folder_id)
+            UUID(str(folder_id))
             if folder_id is not None
-            else str(Folder.get_root_folder().id)
+            else folder_state.root_folder_id
         )
-        if effective_folder not in _workflow_scope(trigger.workflow):
+    except ValueError:
+        return started
+    state_cache = {}
+    for indexed in indexed_triggers:
+        if not is_descendant_id(folder_state, effective_folder, indexed.folder_id):
             continue
-        filters = (trigger.config or {}).get("filters") or {}
-        if not _filters_match(filters, payload, state_cache):
+        if indexed.matcher is not None and not indexed.matcher(payload, state_cache):
             continue
 
         if origin_depth + 1 > MAX_TRIGGER_DEPTH:
-            _bookkeep(trigger, WorkflowTrigger.Result.SKIPPED_DEPTH)
+            _bookkeep(indexed, WorkflowTrigger.Result.SKIPPED_DEPTH)
             logger.warning(
                 "event trigger skipped: chain depth exceeded",
-                trigger=str(trigger.id),
+                trigger=str(indexed.id),
                 event_key=event_key,
                 origin_depth=origin_depth,
             )
             continue
-        version = trigger.workflow.published_version
-        entry = None
-        if version is not None:
-            entry = version.nodes.filter(
-                type=WorkflowNode.Type.TRIGGER, ref=trigger.node_ref
-            ).first()
+        # The index may lag behind the database: re-read the rows of the run.
+        trigger = (
+            WorkflowTrigger.objects.filter(
+                id=indexed.id, enabled=True, workflow__is_active=True
+            )
+            .select_related("workflow")
+            .first()
+        )
+        if trigger is None:
+            continue
+        version = entry = None
+        if indexed.entry_node_id is not None:
+            entry = (
+                WorkflowNode.objects.filter(
+                    id=indexed.entry_node_id,
+                    version__status=WorkflowVersion.Status.PUBLISHED,
+                )
+                .select_related("version__run_as")
+                .first()
+            )
+            version = entry.version if entry is not None else None
         if version is None or entry is None:
             _bookkeep(trigger, WorkflowTrigger.Result.SKIPPED_UNPUBLISHED)
             continue
@@ -206,29 +231,39 @@ def walk_conditions(group):
 # ---------- filter tree evaluation ----------
 
 
-def _filters_match(tree, payload, state_cache):
+def compile_filter_tree(tree):
+    """Compile a validated filter tree into a `matcher(payload, state_cache)`
+    callable, or None when the tree matches everything."""
     if not tree or (not tree.get("conditions") and not tree.get("children")):
-        return True
-    return _evaluate_group(tree, payload, state_cache)
+        return None
+    return _compile_group(tree)
 
 
-def _evaluate_group(group, payload, state_cache):
-    results = [
-        _evaluate_condition(condition, payload, state_cache)
+def _compile_group(group):
+    tests = [
+        partial(_evaluate_condition, condition)
         for condition in group.get("conditions", [])
     ]
-    results += [
-        _evaluate_group(child, payload, state_cache)
-        for child in group.get("children", [])
-    ]
-    if not results:
-        return True
+    tests += [_compile_group(child) for child in group.get("children", [])]
+    if not tests:
+        return lambda payload, state_cache: True
     operator = group.get("operator", "and")
     if operator == "or":
-        return any(results)
+        return lambda payload, state_cache: any(
+            [test(payload, state_cache) for test in tests]
+        )
     if operator == "not":
-        return not all(results)
-    return all(results)
+        return lambda payload, state_cache: (
+            not all([test(payload, state_cache) for test in tests])
+        )
+    return lambda payload, state_cache: all(
+        [test(payload, state_cache) for test in tests]
+    )
+
+
+def _filters_match(tree, payload, state_cache):
+    matcher = compile_filter_tree(tree)
+    return matcher is None or matcher(payload, state_cache)
 
 
 def _evaluate_condition(condition, payload, state_cache):
@@ -362,12 +397,15 @@ def forward_log_entry(sender, instance, created, **kwargs):
     verb = _log_entry_verb(instance.action)
     if verb is None or instance.content_type_id is None:
         return
-    key = make_event_key(instance.content_type.model, verb)
-    # Cheap indexed gate: one query per audited save, no enqueue when nothing
-    # listens for this key.
-    if not WorkflowTrigger.objects.filter(
-        type=WorkflowTrigger.Type.INTERNAL_EVENT, enabled=True, event_key=key
-    ).exists():
+    from django.contrib.contenttypes.models import ContentType
+
+    from .trigger_index import get_event_triggers
+
+    content_type = ContentType.objects.get_for_id(instance.content_type_id)
+    key = make_event_key(content_type.model, verb)
+    # In-memory gate (trigger index): no query per audited save, no enqueue
+    # when nothing listens for this key.
+    if not get_event_triggers(key):
         return
 
     from .engine import current_trigger_depth
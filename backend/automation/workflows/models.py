@@ -8,6 +8,8 @@ from core.base_models import AbstractBaseModel, NameDescriptionMixin
 from core.models import FilteringLabelMixin
 from iam.models import FolderMixin
 
+from .trigger_index import invalidate_event_trigger_index
+
 
 class NameDescriptionFolderMixin(NameDescriptionMixin, FolderMixin):
     class Meta:
@@ -28,6 +30,39 @@ class DraftExistsError(Exception):
         super().__init__("draftAlreadyExists")
 
 
+class TriggerIndexQuerySet(models.QuerySet):
+    """Bulk updates send no signal: drop the internal-event trigger index
+    when they touch one of the `indexed_fields` (bookkeeping updates don't)."""
+
+    indexed_fields = frozenset()
+
+    def update(self, **kwargs):
+        count = super().update(**kwargs)
+        if count and not self.indexed_fields.isdisjoint(kwargs):
+            invalidate_event_trigger_index()
+        return count
+
+
+class WorkflowVersionQuerySet(TriggerIndexQuerySet):
+    indexed_fields = frozenset(
+        {"status", "is_active", "run_as", "run_as_id", "workflow", "workflow_id"}
+    )
+
+
+class WorkflowTriggerQuerySet(TriggerIndexQuerySet):
+    indexed_fields = frozenset(
+        {
+            "type",
+            "enabled",
+            "event_key",
+            "config",
+            "node_ref",
+            "workflow",
+            "workflow_id",
+        }
+    )
+
+
 class Workflow(NameDescriptionFolderMixin, FilteringLabelMixin):
     ref_id = models.CharField(max_length=100, blank=True)
     # Master switch: gates AUTOMATIC execution only — manual runs
@@ -122,6 +157,7 @@ class WorkflowVersion(AbstractBaseModel, FolderMixin):
         on_delete=models.CASCADE,
         related_name="versions",
     )
+    objects = WorkflowVersionQuerySet.as_manager()
     version_number = models.PositiveIntegerField(default=1)
     # Mirrors Workflow.is_active — set by the cascade, checked by
     # every automatic execution path.
@@ -809,6 +845,7 @@ class WorkflowTrigger(AbstractBaseModel, FolderMixin):
         on_delete=models.CASCADE,
         related_name="triggers",
     )
+    objects = WorkflowTriggerQuerySet.as_manager()
     node_ref = models.CharField(max_length=100)
     type = models.CharField(max_length=20, choices=Type.choices)
     # Snapshot of the published node's trigger_config, so the scheduler and
@@ -14,6 +14,7 @@ from automation.workflows.models import Workflow, WorkflowTrigger, WorkflowVersi
 from automation.workflows.tasks import dispatch_internal_event_task
 from automation.workflows.validation import validate_graph
 from automation.workflows.tests.helpers import publisher_user
+from automation.workflows.trigger_index import get_event_triggers
 
 
 @pytest.fixture
@@ -320,6 +321,67 @@ class TestDispatch:
         assert started[0].trigger_depth == 3
 
 
+@pytest.mark.django_db
+class TestTriggerIndex:
+    def test_gate_and_match_do_not_query(self, capture_runs, django_assert_num_queries):
+        make_workflow(
+            filters={
+                "operator": "and",
+                "conditions": [
+                    {"field": "status", "op": "eq", "value": "active", "changed": True}
+                ],
+            },
+        )
+        # Warm the index and the folder snapshot
+        assert (
+            len(
+                dispatch_internal_event(
+                    "appliedcontrol.updated",
+                    payload(changes={"status": ["--", "active"]}),
+                    None,
+                )
+            )
+            == 1
+        )
+        with django_assert_num_queries(0):
+            assert not get_event_triggers("incident.created")
+            assert not dispatch_internal_event(
+                "appliedcontrol.updated",
+                payload(changes={"status": ["--", "deprecated"]}),
+                None,
+            )
+
+    def test_index_follows_the_registrations(self, capture_runs):
+        workflow = make_workflow()
+        (indexed,) = get_event_triggers("appliedcontrol.updated")
+        registration = get_registration(workflow)
+        assert indexed.id == registration.id
+        assert indexed.entry_node_id == (
+            workflow.published_version.nodes.get(ref="on_event").id
+        )
+
+        # Disarmed through the API (save) or in bulk (update)
+        registration.enabled = False
+        registration.save()
+        assert not get_event_triggers("appliedcontrol.updated")
+        WorkflowTrigger.objects.filter(id=registration.id).update(enabled=True)
+        assert get_event_triggers("appliedcontrol.updated")
+
+        workflow.is_active = False
+        workflow.save()
+        assert not get_event_triggers("appliedcontrol.updated")
+        assert not dispatch_internal_event("appliedcontrol.updated", payload(), None)
+
+    def test_stale_index_rereads_the_trigger(self, capture_runs):
+        workflow = make_workflow()
+        assert get_event_triggers("appliedcontrol.updated")
+        # Workflow.objects.update() sends no signal: the index lags behind
+        Workflow.objects.filter(id=workflow.id).update(is_active=False)
+        assert get_event_triggers("appliedcontrol.updated")
+        assert not dispatch_internal_event("appliedcontrol.updated", payload(), None)
+        assert not capture_runs
+
+
 @pytest.mark.django_db
 class TestCudProducer:
     def test_end_to_end_from_auditlog(self, capture_runs):
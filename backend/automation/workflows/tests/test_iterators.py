@@ -2,14 +2,23 @@
 in-body conditions on {{item}}, failure policies, caps, nesting, validation."""
 
 import uuid
+from unittest.mock import patch
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from core.models import AppliedControl, Incident
 from iam.models import Folder
+from automation.workflows import engine
 from automation.workflows.engine import start_instance
 from automation.workflows.graph import save_graph
-from automation.workflows.models import Workflow, WorkflowInstance, WorkflowVersion
+from automation.workflows.models import (
+    Workflow,
+    WorkflowInstance,
+    WorkflowToken,
+    WorkflowVersion,
+)
 from automation.workflows.validation import validate_graph
 from automation.workflows.tests.helpers import publisher_user
 
@@ -726,3 +735,162 @@ class TestLoopValidation:
         )
         codes = [e["code"] for e in validate_graph(version)]
         assert "loop_body_fan_out" not in codes
+
+
+def run_loop_flow(settings, batched, items):
+    settings.WORKFLOWS_BATCHED_EXECUTION = batched
+    domain = make_domain(f"Batched {batched} domain")
+    version = loop_flow(
+        domain,
+        {
+            "collection": "{{items}}",
+            "collect": "{{nodes.body_1.message}}",
+            "on_item_error": "continue",
+        },
+        [
+            {"type": "log", "message": "first {{item.name}}"},
+            {"type": "log", "message": "second {{item.name}} #{{index}}"},
+            {
+                "type": "create_object",
+                "model": "incident",
+                "fields": {"name": "{{item.name}}"},
+            },
+        ],
+        variables=items_variable(),
+        input_mapping={"items": "items"},
+    )
+    execute_action = engine.execute_action
+
+    def crash_on_item_7(node, instance):
+        output = execute_action(node, instance)
+        if node.ref == "body_2" and instance._iteration_context["index"] == 7:
+            raise RuntimeError("crash after the write")
+        return output
+
+    with (
+        patch.object(engine, "execute_action", crash_on_item_7),
+        CaptureQueriesContext(connection) as queries,
+    ):
+        instance = start_instance(version, payload={"items": items})
+    assert Incident.objects.filter(folder=domain).count() == len(items) - 2
+    trail = [
+        (log.event_type, log.node.ref if log.node else None, log.message)
+        for log in instance.logs.select_related("node")
+    ]
+    statuses = sorted(instance.tokens.values_list("status", flat=True))
+    return instance, trail, statuses, len(queries)
+
+
+@pytest.mark.django_db
+class TestBatchedExecution:
+    def test_matches_the_step_by_step_run(self, settings):
+        items = [{"name": f"Item {index}"} for index in range(20)]
+        # Item 3 fails the action, item 7 crashes it: its savepoint rolls back
+        items[3] = {}
+        stepped, stepped_trail, stepped_statuses, stepped_queries = run_loop_flow(
+            settings, False, items
+        )
+        batched, batched_trail, batched_statuses, batched_queries = run_loop_flow(
+            settings, True, items
+        )
+
+        assert batched.status == stepped.status == WorkflowInstance.Status.COMPLETED
+        assert batched.node_outputs["per_item"] == stepped.node_outputs["per_item"]
+        errors = batched.node_outputs["per_item"]["errors"]
+        assert [error["index"] for error in errors] == [3, 7]
+        assert batched_trail == stepped_trail
+        assert batched_statuses == stepped_statuses
+        assert batched_queries < stepped_queries * 0.7
+
+    def test_terminate_reloads_the_tokens(self, settings):
+        settings.WORKFLOWS_BATCHED_EXECUTION = True
+        workflow = Workflow.objects.create(
+            name="Terminate", folder=make_domain("Terminate domain")
+        )
+        version = WorkflowVersion.objects.create(
+            workflow=workflow, run_as=publisher_user()
+        )
+        trigger = node("trigger", trigger_config={"type": "manual"})
+        end = node("end")
+        # Runs after the end node: the terminate consumes it
+        late = node("action", label="Late", action_config={"type": "log"})
+        save_graph(
+            version,
+            {
+                "nodes": [trigger, end, late],
+                "edges": [edge(trigger, end), edge(trigger, late)],
+                "variables": [],
+            },
+        )
+        instance = start_instance(version)
+        assert instance.status == WorkflowInstance.Status.COMPLETED
+        assert not instance.logs.filter(event_type="action_executed").exists()
+        terminated = instance.logs.get(event_type="run_terminated")
+        assert "1 running branch(es) cancelled" in terminated.message
+
+    def run_failing_end(self, settings, batched):
+        settings.WORKFLOWS_BATCHED_EXECUTION = batched
+        workflow = Workflow.objects.create(
+            name=f"Failing end {batched}", folder=make_domain(f"End {batched}")
+        )
+        version = WorkflowVersion.objects.create(
+            workflow=workflow, run_as=publisher_user()
+        )
+        trigger = node("trigger", trigger_config={"type": "manual"})
+        task = node("task", label="Review")
+        end = node("end")
+        save_graph(
+            version,
+            {
+                "nodes": [trigger, task, end],
+                # The task branch parks a token; the other reaches the end
+                "edges": [edge(trigger, task), edge(trigger, end)],
+                "variables": [],
+            },
+        )
+        with patch.object(
+            engine, "_abandon_children", side_effect=RuntimeError("end crashed")
+        ):
+            instance = start_instance(version)
+        trail = [
+            (log.event_type, log.node.ref if log.node else None, log.message)
+            for log in instance.logs.select_related("node")
+        ]
+        statuses = sorted(instance.tokens.values_list("status", flat=True))
+        return instance, trail, statuses
+
+    def test_end_step_failure_keeps_the_earlier_steps(self, settings):
+        stepped, stepped_trail, stepped_statuses = self.run_failing_end(settings, False)
+        batched, batched_trail, batched_statuses = self.run_failing_end(settings, True)
+
+        assert batched.status == stepped.status
+        # Buffered before the end step raised
+        assert "task_waiting" in [event for event, _, _ in batched_trail]
+        assert batched_trail == stepped_trail
+        assert batched_statuses == stepped_statuses
+
+    def test_discard_restores_unsaved_tokens(self):
+        domain = make_domain("Discard domain")
+        workflow = Workflow.objects.create(name="Discard", folder=domain)
+        version = WorkflowVersion.objects.create(
+            workflow=workflow, run_as=publisher_user()
+        )
+        trigger = node("trigger", trigger_config={"type": "manual"})
+        save_graph(version, {"nodes": [trigger], "edges": [], "variables": []})
+        instance = WorkflowInstance.objects.create(
+            workflow=workflow,
+            version=version,
+            folder=domain,
+            status=WorkflowInstance.Status.ACTIVE,
+        )
+        run_pass = engine._Pass(instance)
+        token = run_pass.create_token(current_node=version.nodes.get())
+        mark = run_pass.mark()
+        token.status = WorkflowToken.Status.ERROR
+        token.error_message = "rolled back"
+        run_pass.discard(mark)
+        run_pass.flush()
+
+        token.refresh_from_db()
+        assert token.status == WorkflowToken.Status.ACTIVE
+        assert token.error_message == ""
@@ -0,0 +1,108 @@
+"""Compiled index of the armed internal-event triggers.
+
+Every audited save asks "does anything listen for this event key?" and every
+dispatch needs the listening triggers with their entry node, scope and filter
+tree. Both are served from the ``automation.event_triggers`` snapshot of the
+CacheRegistry: event key -> IndexedTrigger tuple, with the published version
+and entry node resolved and the filter tree compiled, so the gate and the
+match cost no query.
+
+The snapshot is rebuilt when a trigger, a version or a workflow changes
+(signals, and the querysets of WorkflowTrigger and WorkflowVersion for bulk
+updates). Scope checks go through the folder snapshot at dispatch time, so
+folder moves need no rebuild. The index may lag a version check behind the
+database: dispatch re-reads the rows of a trigger before starting a run.
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional, Tuple
+from uuid import UUID
+
+from iam.snapshot_cache import CacheRegistry
+
+EVENT_TRIGGER_INDEX_KEY = "automation.event_triggers"
+
+
+@dataclass(frozen=True, slots=True)
+class IndexedTrigger:
+    """
+    An armed internal-event trigger. version_id and entry_node_id are None
+    when the workflow has no published version holding the trigger node;
+    matcher is None when the trigger has no filters. folder_id is the root of
+    the workflow's scope.
+    """
+
+    id: UUID
+    workflow_id: UUID
+    folder_id: UUID
+    version_id: Optional[UUID]
+    entry_node_id: Optional[UUID]
+    matcher: Optional[Callable[[dict, dict], bool]]
+
+
+def build_event_trigger_index() -> Mapping[str, Tuple[IndexedTrigger, ...]]:
+    """Three queries: the armed triggers, their versions and entry nodes."""
+    from .events import compile_filter_tree
+    from .models import WorkflowNode, WorkflowTrigger, WorkflowVersion
+
+    triggers = list(
+        WorkflowTrigger.objects.filter(
+            type=WorkflowTrigger.Type.INTERNAL_EVENT,
+            enabled=True,
+            workflow__is_active=True,
+        )
+        .order_by("created_at")
+        .values_list(
+            "id",
+            "workflow_id",
+            "workflow__folder_id",
+            "node_ref",
+            "event_key",
+            "config",
+        )
+    )
+    if not triggers:
+        return MappingProxyType({})
+
+    versions = dict(
+        WorkflowVersion.objects.filter(
+            workflow_id__in={trigger[1] for trigger in triggers},
+            status=WorkflowVersion.Status.PUBLISHED,
+        ).values_list("workflow_id", "id")
+    )
+    entry_nodes = {
+        (version_id, ref): node_id
+        for node_id, version_id, ref in WorkflowNode.objects.filter(
+            version_id__in=versions.values(),
+            type=WorkflowNode.Type.TRIGGER,
+        ).values_list("id", "version_id", "ref")
+    }
+
+    index: dict[str, list[IndexedTrigger]] = {}
+    for trigger_id, workflow_id, folder_id, node_ref, event_key, config in triggers:
+        version_id = versions.get(workflow_id)
+        index.setdefault(event_key, []).append(
+            IndexedTrigger(
+                id=trigger_id,
+                workflow_id=workflow_id,
+                folder_id=folder_id,
+                version_id=version_id,
+                entry_node_id=entry_nodes.get((version_id, node_ref)),
+                matcher=compile_filter_tree((config or {}).get("filters") or {}),
+            )
+        )
+    return MappingProxyType({key: tuple(entries) for key, entries in index.items()})
+
+
+def get_event_triggers(event_key: str) -> Tuple[IndexedTrigger, ...]:
+    """The armed triggers listening for `event_key`, in creation order."""
+    return CacheRegistry.hydrate(EVENT_TRIGGER_INDEX_KEY).get(event_key, ())
+
+
+def invalidate_event_trigger_index() -> Optional[int]:
+    return CacheRegistry.invalidate(EVENT_TRIGGER_INDEX_KEY)
+
+
+# Import-time registration (DB-free). Lazy: only event producers hydrate it.
+CacheRegistry.register(EVENT_TRIGGER_INDEX_KEY, build_event_trigger_index, lazy=True)
@@ -0,0 +1,254 @@
+"""
+Persistent, content-addressed cache of embeddings.
+
+Re-indexing the library knowledge base, repeated RAG queries and re-saved
+objects whose text did not change all ask the embedder for vectors it has
+already computed. CachedEmbedder wraps any Embedder and serves those from a
+local SQLite file (EMBEDDING_CACHE_PATH), keyed by (model name, sha256 of the
+normalized text). Vectors are stored as float16 blobs; the least recently used
+ones are evicted once the file holds more than EMBEDDING_CACHE_MAX_ENTRIES.
+
+The file is shared by the processes of a host (gunicorn workers, Huey
+consumer), which also share the hit/miss counters. A lookup that only hits
+writes nothing most of the time: the last use of an entry is refreshed once it
+is LAST_USED_RESOLUTION old, and each process adds up its counts in memory,
+written with the next new vectors or every COUNTER_FLUSH_INTERVAL. Cache errors
+are logged and never fail an embedding: the inner embedder is used instead.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Share of the entries kept when the cache is over its size
+EVICTION_RATIO = 0.9
+# SQLite caps the number of host parameters of a statement
+LOOKUP_BATCH_SIZE = 500
+# Seconds: the eviction order is only kept to this precision
+LAST_USED_RESOLUTION = 3600.0
+# Seconds between two writes of the counts of a process without new vectors
+COUNTER_FLUSH_INTERVAL = 60.0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS embedding ("
+    " model TEXT NOT NULL,"
+    " digest BLOB NOT NULL,"
+    " vector BLOB NOT NULL,"
+    " last_used REAL NOT NULL,"
+    " PRIMARY KEY (model, digest)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS embedding_last_used ON embedding (last_used)",
+    "CREATE TABLE IF NOT EXISTS counter ("
+    " name TEXT PRIMARY KEY, value INTEGER NOT NULL"
+    ") WITHOUT ROWID",
+)
+
+
+def normalize_text(text: str) -> str:
+    """NFC, whitespace runs collapsed, stripped."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite file of float16 vectors with LRU eviction."""
+
+    def __init__(self, path: str | Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._counts_lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._counts_flushed_at = time.monotonic()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, digests: list[bytes]) -> dict[bytes, list[float]]:
+        """The cached vectors of `digests`. The last use of those last used
+        more than LAST_USED_RESOLUTION ago is refreshed."""
+        conn = self._connection()
+        found: dict[bytes, list[float]] = {}
+        now = time.time()
+        stale = []
+        unique = list(dict.fromkeys(digests))
+        for start in range(0, len(unique), LOOKUP_BATCH_SIZE):
+            batch = unique[start : start + LOOKUP_BATCH_SIZE]
+            rows = conn.execute(
+                "SELECT digest, vector, last_used FROM embedding WHERE model = ?"
+                f" AND digest IN ({','.join('?' * len(batch))})",
+                [model, *batch],
+            ).fetchall()
+            for digest, vector, last_used in rows:
+                found[digest] = (
+                    np.frombuffer(vector, dtype=np.float16).astype(np.float32).tolist()
+                )
+                if now - last_used >= LAST_USED_RESOLUTION:
+                    stale.append(digest)
+        if stale:
+            with conn:
+                conn.executemany(
+                    "UPDATE embedding SET last_used = ? WHERE model = ? AND digest = ?",
+                    [(now, model, digest) for digest in stale],
+                )
+        return found
+
+    def put_many(self, model: str, items: dict[bytes, list[float]]) -> None:
+        if not items:
+            return
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding (model, digest, vector, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                [
+                    (model, digest, np.asarray(vector, dtype=np.float16).tobytes(), now)
+                    for digest, vector in items.items()
+                ],
+            )
+            self._evict(conn)
+            self._write_counts(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT count(*) FROM embedding").fetchone()
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * EVICTION_RATIO)
+        conn.execute(
+            "DELETE FROM embedding WHERE (model, digest) IN ("
+            " SELECT model, digest FROM embedding ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        logger.info("embedding_cache_evicted", entries=excess)
+
+    def count(self, hits: int, misses: int) -> None:
+        """Add to the counts of this process, written by flush_counts()."""
+        with self._counts_lock:
+            self._counts.update(hits=hits, misses=misses)
+
+    def flush_counts(self, force: bool = False) -> None:
+        """Write the counts of this process, at most once every
+        COUNTER_FLUSH_INTERVAL unless `force`."""
+        if (
+            not force
+            and time.monotonic() - self._counts_flushed_at < COUNTER_FLUSH_INTERVAL
+        ):
+            return
+        conn = self._connection()
+        with conn:
+            self._write_counts(conn)
+
+    def _write_counts(self, conn: sqlite3.Connection) -> None:
+        with self._counts_lock:
+            counts, self._counts = +self._counts, Counter()
+            self._counts_flushed_at = time.monotonic()
+        if not counts:
+            return
+        try:
+            conn.executemany(
+                "INSERT INTO counter (name, value) VALUES (?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                counts.items(),
+            )
+        except sqlite3.Error:
+            # Kept for the next write
+            with self._counts_lock:
+                self._counts.update(counts)
+            raise
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        self.flush_counts(force=True)
+        counters = dict(conn.execute("SELECT name, value FROM counter").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        (entries,) = conn.execute("SELECT count(*) FROM embedding").fetchone()
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+
+    def clear(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM embedding")
+            conn.execute("DELETE FROM counter")
+        with self._counts_lock:
+            self._counts.clear()
+
+
+class CachedEmbedder:
+    """Embedder serving known texts from an EmbeddingCache."""
+
+    def __init__(self, inner, model_name: str, cache: EmbeddingCache):
+        self.inner = inner
+        self.model_name = model_name
+        self.cache = cache
+
+    @property
+    def dimensions(self) -> int:
+        return self.inner.dimensions
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        digests = [text_digest(text) for text in texts]
+        try:
+            found = self.cache.get_many(self.model_name, digests)
+        except sqlite3.Error as e:
+            logger.warning("embedding_cache_read_failed", error=str(e))
+            return self.inner.embed(texts)
+
+        # Identical texts of the batch are embedded once
+        missing: dict[bytes, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in found:
+                missing.setdefault(digest, text)
+        if missing:
+            vectors = self.inner.embed(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            found.update(computed)
+        else:
+            computed = {}
+        self.cache.count(hits=len(texts) - len(missing), misses=len(missing))
+        try:
+            # Writes the counts too when there are new vectors
+            self.cache.put_many(self.model_name, computed)
+            self.cache.flush_counts()
+        except sqlite3.Error as e:
+            logger.warning("embedding_cache_write_failed", error=str(e))
+        return [found[digest] for digest in digests]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed([text])[0]
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, **self.cache.stats()}
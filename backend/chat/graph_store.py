@@ -0,0 +1,485 @@
+"""
+Columnar, memory-mapped file format of the knowledge graph and its text index.
+
+Unpickling the DiGraph gave every process (gunicorn workers, Huey consumer) a
+private copy of the graph and of its attribute dicts. The graph is written
+instead to one file that every process maps read-only, so they share its pages
+and loading it costs next to nothing:
+
+- strings: every distinct string (node ids, attribute keys and values), as an
+  offset array into UTF-8 data
+- values: every distinct attribute value, as a (tag, payload) pair: a string
+  number, an integer, a boolean, None, a list of value numbers, or JSON
+- node and edge attribute columns: one value number per node (edge) and
+  attribute key, MISSING where the attribute is absent
+- out and in adjacency in compressed sparse row form, in insertion order; the
+  in-edges point to the edge numbers of the out-edges, which own the
+  attributes
+- the arrays of the TextIndex, with the sorted vocabulary as a string table
+
+MappedGraph reads it through the DiGraph API. Attribute dicts are decoded on
+access: they are fresh objects, and changing them changes nothing.
+
+The file is written to a temporary name and renamed, so processes mapping an
+older version keep reading it until they reload.
+"""
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+MAGIC = b"CAKGRAPH"
+FORMAT_VERSION = 1
+MISSING = 0xFFFFFFFF
+_ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")  # magic, version, header length
+
+TAG_STR, TAG_INT, TAG_BOOL, TAG_NONE, TAG_LIST, TAG_JSON = range(6)
+
+# memoryview formats of the section dtypes
+_FORMATS = {"|u1": "B", "<u2": "H", "<u4": "I", "<u8": "Q", "<i8": "q", "<f4": "f"}
+
+
+class StringTable:
+    """Sequence of the strings of an offsets/data pair of sections."""
+
+    __slots__ = ("_mm", "_offsets", "_base")
+
+    def __init__(self, mm: mmap.mmap, offsets: memoryview, base: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._base = base
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return self._mm[
+            self._base + self._offsets[i] : self._base + self._offsets[i + 1]
+        ]
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.raw(i).decode("utf-8")
+
+
+class _DocIds:
+    """The node ids of the documents of a mapped TextIndex."""
+
+    __slots__ = ("_graph", "_nodes")
+
+    def __init__(self, graph: "MappedGraph", nodes: memoryview):
+        self._graph = graph
+        self._nodes = nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __getitem__(self, i: int) -> str:
+        return self._graph._node_id(self._nodes[i])
+
+
+class MappedGraph:
+    """Read-only DiGraph served from a memory-mapped graph file."""
+
+    __slots__ = (
+        "path",
+        "_mm",
+        "_sections",
+        "_strings",
+        "_node_ids",
+        "_node_order",
+        "_out_offsets",
+        "_out_targets",
+        "_in_offsets",
+        "_in_sources",
+        "_in_edges",
+        "_value_tags",
+        "_value_payloads",
+        "_list_offsets",
+        "_list_items",
+        "_node_columns",
+        "_edge_columns",
+        "_value_numbers",
+        "_header",
+    )
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREAMBLE.unpack_from(self._mm)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(
+                f"{self.path} is not a version {FORMAT_VERSION} graph file"
+            )
+        self._header = json.loads(
+            self._mm[_PREAMBLE.size : _PREAMBLE.size + header_length]
+        )
+        self._sections = self._header["sections"]
+        self._strings = self._string_table("strings")
+        self._node_ids = self._view("node_ids")
+        self._node_order = self._view("node_order")
+        self._out_offsets = self._view("out_offsets")
+        self._out_targets = self._view("out_targets")
+        self._in_offsets = self._view("in_offsets")
+        self._in_sources = self._view("in_sources")
+        self._in_edges = self._view("in_edges")
+        self._value_tags = self._view("value_tags")
+        self._value_payloads = self._view("value_payloads")
+        self._list_offsets = self._view("list_offsets")
+        self._list_items = self._view("list_items")
+        self._node_columns = [
+            (key, self._view(f"node.{key}")) for key in self._header["node_keys"]
+        ]
+        self._edge_columns = [
+            (key, self._view(f"edge.{key}")) for key in self._header["edge_keys"]
+        ]
+        self._value_numbers = self._header["value_numbers"]
+
+    # -- Sections ----------------------------------------------------------
+
+    def _view(self, name: str) -> memoryview:
+        offset, dtype, count = self._sections[name]
+        size = np.dtype(dtype).itemsize * count
+        return memoryview(self._mm)[offset : offset + size].cast(_FORMATS[dtype])
+
+    def array(self, name: str) -> np.ndarray:
+        """Zero-copy numpy view of a section."""
+        offset, dtype, count = self._sections[name]
+        return np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+
+    def _string_table(self, name: str) -> StringTable:
+        return StringTable(
+            self._mm, self._view(f"{name}.offsets"), self._sections[f"{name}.data"][0]
+        )
+
+    # -- Decoding ----------------------------------------------------------
+
+    def _node_id(self, i: int) -> str:
+        return self._strings[self._node_ids[i]]
+
+    def _index(self, node_id: str) -> int | None:
+        """Binary search of the nodes sorted by id."""
+        key = node_id.encode("utf-8")
+        lo, hi = 0, len(self._node_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._strings.raw(self._node_ids[self._node_order[mid]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._node_order):
+            i = self._node_order[lo]
+            if self._strings.raw(self._node_ids[i]) == key:
+                return i
+        return None
+
+    def _value(self, number: int) -> Any:
+        tag, payload = self._value_tags[number], self._value_payloads[number]
+        if tag == TAG_STR:
+            return self._strings[payload]
+        if tag == TAG_INT:
+            return payload
+        if tag == TAG_BOOL:
+            return bool(payload)
+        if tag == TAG_NONE:
+            return None
+        if tag == TAG_LIST:
+            return [
+                self._value(item)
+                for item in self._list_items[
+                    self._list_offsets[payload] : self._list_offsets[payload + 1]
+                ]
+            ]
+        return json.loads(self._strings[payload])
+
+    def _attrs(self, columns: list, i: int) -> dict[str, Any]:
+        attrs = {}
+        for key, column in columns:
+            number = column[i]
+            if number != MISSING:
+                attrs[key] = self._value(number)
+        return attrs
+
+    # -- DiGraph API -------------------------------------------------------
+
+    def nodes(self, data: bool = False) -> Iterator:
+        if data:
+            return (
+                (self._node_id(i), self._attrs(self._node_columns, i))
+                for i in range(len(self._node_ids))
+            )
+        return (self._node_id(i) for i in range(len(self._node_ids)))
+
+    def nodes_of_type(self, node_type: str) -> Iterator[tuple[str, dict[str, Any]]]:
+        number = self._value_numbers.get(node_type)
+        if number is None or "node_type" not in self._header["node_keys"]:
+            return iter(())
+        matches = np.flatnonzero(self.array("node.node_type") == number)
+        return (
+            (self._node_id(i), self._attrs(self._node_columns, i))
+            for i in matches.tolist()
+        )
+
+    def out_edges(self, node_id: str, data: bool = False) -> Iterator[tuple]:
+        i = self._index(node_id)
+        if i is None:
+            return iter(())
+        edges = range(self._out_offsets[i], self._out_offsets[i + 1])
+        if data:
+            return (
+                (
+                    node_id,
+                    self._node_id(self._out_targets[e]),
+                    self._attrs(self._edge_columns, e),
+                )
+                for e in edges
+            )
+        return ((node_id, self._node_id(self._out_targets[e])) for e in edges)
+
+    def in_edges(self, node_id: str, data: bool = False) -> Iterator[tuple]:
+        i = self._index(node_id)
+        if i is None:
+            return iter(())
+        positions = range(self._in_offsets[i], self._in_offsets[i + 1])
+        if data:
+            return (
+                (
+                    self._node_id(self._in_sources[p]),
+                    node_id,
+                    self._attrs(self._edge_columns, self._in_edges[p]),
+                )
+                for p in positions
+            )
+        return ((self._node_id(self._in_sources[p]), node_id) for p in positions)
+
+    def number_of_nodes(self) -> int:
+        return len(self._node_ids)
+
+    def number_of_edges(self) -> int:
+        return len(self._out_targets)
+
+    def __contains__(self, node_id: str) -> bool:
+        return self._index(node_id) is not None
+
+    def __getitem__(self, node_id: str) -> dict[str, Any]:
+        i = self._index(node_id)
+        if i is None:
+            raise KeyError(node_id)
+        return self._attrs(self._node_columns, i)
+
+    def get(self, node_id: str, default=None):
+        i = self._index(node_id)
+        if i is None:
+            return default
+        return self._attrs(self._node_columns, i)
+
+    # -- Text index --------------------------------------------------------
+
+    def text_index(self):
+        """The TextIndex stored with the graph, reading its arrays in place."""
+        from chat.knowledge_graph import TextIndex
+
+        return TextIndex.from_arrays(
+            doc_ids=_DocIds(self, self._view("index.doc_nodes")),
+            doc_lengths=self.array("index.doc_lengths"),
+            terms=self._string_table("index.terms"),
+            offsets=self.array("index.offsets"),
+            postings_docs=self.array("index.postings_docs"),
+            postings_tfs=self.array("index.postings_tfs"),
+            type_ranges={
+                key: tuple(value) for key, value in self._header["type_ranges"].items()
+            },
+            framework_ranges={
+                key: tuple(value)
+                for key, value in self._header["framework_ranges"].items()
+            },
+        )
+
+
+class _Interner:
+    def __init__(self):
+        self.strings: list[str] = []
+        self._string_numbers: dict[str, int] = {}
+        self.tags: list[int] = []
+        self.payloads: list[int] = []
+        self._value_numbers: dict[tuple, int] = {}
+        self.lists: list[list[int]] = []
+
+    def string(self, text: str) -> int:
+        number = self._string_numbers.get(text)
+        if number is None:
+            number = self._string_numbers[text] = len(self.strings)
+            self.strings.append(text)
+        return number
+
+    def value(self, value: Any) -> int:
+        if isinstance(value, bool):
+            key = (TAG_BOOL, value)
+        elif isinstance(value, int) and -(2**63) <= value < 2**63:
+            key = (TAG_INT, value)
+        elif isinstance(value, str):
+            key = (TAG_STR, value)
+        elif value is None:
+            key = (TAG_NONE, None)
+        elif isinstance(value, (list, tuple)):
+            key = (TAG_LIST, tuple(self.value(item) for item in value))
+        else:
+            key = (TAG_JSON, json.dumps(value, sort_keys=True, default=str))
+        number = self._value_numbers.get(key)
+        if number is not None:
+            return number
+
+        tag, content = key
+        if tag in (TAG_STR, TAG_JSON):
+            payload = self.string(content)
+        elif tag == TAG_LIST:
+            payload = len(self.lists)
+            self.lists.append(list(content))
+        elif tag == TAG_NONE:
+            payload = 0
+        else:
+            payload = int(content)
+        number = self._value_numbers[key] = len(self.tags)
+        self.tags.append(tag)
+        self.payloads.append(payload)
+        return number
+
+    def value_number(self, value: Any) -> int | None:
+        return self._value_numbers.get((TAG_STR, value))
+
+
+def _offsets(lengths: list[int]) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum(lengths, dtype=np.uint64)
+    return offsets
+
+
+def _columns(records: list[dict], interner: _Interner) -> dict[str, np.ndarray]:
+    keys = list(dict.fromkeys(key for attrs in records for key in attrs))
+    columns = {key: np.full(len(records), MISSING, dtype=np.uint32) for key in keys}
+    for i, attrs in enumerate(records):
+        for key, value in attrs.items():
+            columns[key][i] = interner.value(value)
+    return columns
+
+
+def write_graph_file(path: Path, graph, index) -> None:
+    """Write `graph` (a DiGraph) and its TextIndex `index` to `path`."""
+    interner = _Interner()
+    node_ids = list(graph.nodes())
+    node_numbers = {node_id: i for i, node_id in enumerate(node_ids)}
+    id_strings = [interner.string(node_id) for node_id in node_ids]
+    encoded = [node_id.encode("utf-8") for node_id in node_ids]
+    node_order = sorted(range(len(node_ids)), key=encoded.__getitem__)
+
+    out_lengths, out_targets, edge_records = [], [], []
+    edge_numbers: dict[tuple[str, str], int] = {}
+    for node_id in node_ids:
+        edges = list(graph.out_edges(node_id, data=True))
+        out_lengths.append(len(edges))
+        for _, dst, attrs in edges:
+            edge_numbers[(node_id, dst)] = len(out_targets)
+            out_targets.append(node_numbers[dst])
+            edge_records.append(attrs)
+    in_lengths, in_sources, in_edges = [], [], []
+    for node_id in node_ids:
+        edges = list(graph.in_edges(node_id))
+        in_lengths.append(len(edges))
+        for src, _ in edges:
+            in_sources.append(node_numbers[src])
+            in_edges.append(edge_numbers[(src, node_id)])
+
+    node_columns = _columns([attrs for _, attrs in graph.nodes(data=True)], interner)
+    edge_columns = _columns(edge_records, interner)
+
+    sections: dict[str, np.ndarray] = {
+        "node_ids": np.asarray(id_strings, dtype=np.uint32),
+        "node_order": np.asarray(node_order, dtype=np.uint32),
+        "out_offsets": _offsets(out_lengths),
+        "out_targets": np.asarray(out_targets, dtype=np.uint32),
+        "in_offsets": _offsets(in_lengths),
+        "in_sources": np.asarray(in_sources, dtype=np.uint32),
+        "in_edges": np.asarray(in_edges, dtype=np.uint32),
+        "list_offsets": _offsets([len(items) for items in interner.lists]),
+        "list_items": np.asarray(
+            [item for items in interner.lists for item in items], dtype=np.uint32
+        ),
+        "index.doc_nodes": np.asarray(
+            [node_numbers[node_id] for node_id in index.doc_ids], dtype=np.uint32
+        ),
+        "index.doc_lengths": np.asarray(index.doc_lengths, dtype=np.float32),
+        "index.offsets": np.asarray(index.offsets, dtype=np.int64),
+        "index.postings_docs": np.asarray(index.postings_docs, dtype=np.uint32),
+        "index.postings_tfs": np.asarray(index.postings_tfs, dtype=np.uint16),
+    }
+    for key, column in node_columns.items():
+        sections[f"node.{key}"] = column
+    for key, column in edge_columns.items():
+        sections[f"edge.{key}"] = column
+    # After the columns: they intern the last strings and values
+    sections["value_tags"] = np.asarray(interner.tags, dtype=np.uint8)
+    sections["value_payloads"] = np.asarray(interner.payloads, dtype=np.int64)
+    for name, strings in (("strings", interner.strings), ("index.terms", index.terms)):
+        data = [text.encode("utf-8") for text in strings]
+        sections[f"{name}.offsets"] = _offsets([len(item) for item in data])
+        sections[f"{name}.data"] = np.frombuffer(b"".join(data), dtype=np.uint8)
+
+    header = {
+        "node_keys": list(node_columns),
+        "edge_keys": list(edge_columns),
+        # Value numbers of the node types, for nodes_of_type()
+        "value_numbers": {
+            node_type: number
+            for node_type in {
+                attrs.get("node_type") for _, attrs in graph.nodes(data=True)
+            }
+            if isinstance(node_type, str)
+            and (number := interner.value_number(node_type)) is not None
+        },
+        "type_ranges": index.type_ranges,
+        "framework_ranges": index.framework_ranges,
+        "sections": {},
+    }
+    # Section offsets depend on the header length, which depends on them:
+    # reserve room for the offsets with a first pass
+    layout = {
+        name: [0, array.dtype.str, len(array)] for name, array in sections.items()
+    }
+    header["sections"] = layout
+    header_length = len(json.dumps(header).encode()) + 32 * len(sections)
+    position = _align(_PREAMBLE.size + header_length)
+    for name, array in sections.items():
+        layout[name][0] = position
+        position = _align(position + array.nbytes)
+    header_bytes = json.dumps(header).encode()
+    assert len(header_bytes) <= header_length
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in sections.items():
+                f.seek(layout[name][0])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(max(position, f.tell()))
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _align(position: int) -> int:
+    return -(-position // _ALIGNMENT) * _ALIGNMENT
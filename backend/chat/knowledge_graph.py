@@ -9,18 +9,31 @@ the library system. It lives in-process memory (60k+ nodes fits easily)
 and is rebuilt on demand.
 
 Uses a lightweight DiGraph implementation — no external dependency needed.
+Text search goes through a TextIndex built with the graph: an inverted index
+of the framework, threat, reference control and requirement nodes, scored
+with BM25, so tool calls do not scan the whole graph.
+
+The graph is persisted in db/cache as a columnar file that every process
+memory-maps (see graph_store.py): the graph served by get_graph() is then a
+read-only MappedGraph sharing its pages across processes.
 
 Node types: framework, requirement_node, threat, reference_control
 Edge types: has_requirement, parent_child, addresses_threat,
             implemented_by, has_mapping, maps_to
 """
 
+import math
+import re
 import structlog
 import threading
 import time
+from bisect import bisect_left
+from collections import Counter
 from pathlib import Path
 from typing import Any, Iterator
 
+import numpy as np
+
 logger = structlog.get_logger(__name__)
 
 
@@ -65,6 +78,13 @@ class DiGraph:
             return iter(self._nodes.items())
         return iter(self._nodes)
 
+    def nodes_of_type(self, node_type: str) -> Iterator[tuple[str, dict[str, Any]]]:
+        return (
+            (node_id, attrs)
+            for node_id, attrs in self._nodes.items()
+            if attrs.get("node_type") == node_type
+        )
+
     def out_edges(self, node_id: str, data: bool = False) -> Iterator[tuple]:
         targets = self._out.get(node_id, {})
         if data:
@@ -93,33 +113,219 @@ class DiGraph:
         return self._nodes.get(node_id, default)
 
 
+# ---------------------------------------------------------------------------
+# Inverted text index
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Node types searched through the index, in document order
+INDEXED_NODE_TYPES = ("framework", "threat", "reference_control", "requirement_node")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Query terms of this length or more also match the terms they prefix
+# ("ransom" → "ransomware"), with a lower weight
+PREFIX_MIN_LENGTH = 3
+PREFIX_WEIGHT = 0.8
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _searchable_text(attrs: dict[str, Any]) -> str:
+    # Name and ref_id count twice: a hit there beats one in the description
+    heading = f"{attrs.get('name', '') or ''} {attrs.get('ref_id', '') or ''}"
+    text = f"{heading} {heading} {attrs.get('description', '') or ''}"
+    if attrs.get("node_type") == "framework":
+        text = f"{text} {attrs.get('provider', '') or ''}"
+    return text
+
+
+class TextIndex:
+    """
+    Inverted index of the searchable graph nodes, in compressed sparse row
+    form: the postings of terms[i] are postings_docs/postings_tfs[offsets[i]
+    : offsets[i + 1]], sorted by document number.
+
+    Documents are numbered so that every node type, and the requirement nodes
+    of every framework, form a contiguous range: restricting a search to a
+    framework is a binary search in each posting list.
+    """
+
+    __slots__ = (
+        "doc_ids",
+        "doc_lengths",
+        "terms",
+        "offsets",
+        "postings_docs",
+        "postings_tfs",
+        "type_ranges",
+        "framework_ranges",
+    )
+
+    def __init__(self, G: DiGraph):
+        docs: list[str] = []
+        self.type_ranges: dict[str, tuple[int, int]] = {}
+        self.framework_ranges: dict[str, tuple[int, int]] = {}
+        frameworks = [node_id for node_id, _ in G.nodes_of_type("framework")]
+        for node_type in INDEXED_NODE_TYPES:
+            start = len(docs)
+            if node_type == "framework":
+                docs.extend(frameworks)
+            elif node_type == "requirement_node":
+                for fw_urn in frameworks:
+                    fw_start = len(docs)
+                    docs.extend(
+                        target
+                        for _, target, d in G.out_edges(fw_urn, data=True)
+                        if d.get("edge_type") == "has_requirement"
+                        and G[target].get("node_type") == "requirement_node"
+                    )
+                    self.framework_ranges[fw_urn] = (fw_start, len(docs))
+            else:
+                docs.extend(node_id for node_id, _ in G.nodes_of_type(node_type))
+            self.type_ranges[node_type] = (start, len(docs))
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = []
+        for doc, node_id in enumerate(docs):
+            tokens = tokenize(_searchable_text(G[node_id]))
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        self.doc_ids = docs
+        self.doc_lengths = np.asarray(lengths, dtype=np.float32)
+        self.terms = sorted(postings)
+        self.offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(postings[term]) for term in self.terms])
+        pairs = np.asarray(
+            [pair for term in self.terms for pair in postings[term]],
+            dtype=np.uint32,
+        ).reshape(-1, 2)
+        self.postings_docs = np.ascontiguousarray(pairs[:, 0])
+        self.postings_tfs = np.minimum(pairs[:, 1], 0xFFFF).astype(np.uint16)
+
+    @classmethod
+    def from_arrays(cls, **fields) -> "TextIndex":
+        """An index over stored arrays (see MappedGraph.text_index)."""
+        index = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(index, name, fields[name])
+        return index
+
+    def _expand(self, term: str) -> list[tuple[int, float]]:
+        """(term number, weight) of the index terms matching a query term."""
+        i = bisect_left(self.terms, term)
+        matches = []
+        if i < len(self.terms) and self.terms[i] == term:
+            matches.append((i, 1.0))
+            i += 1
+        if len(term) >= PREFIX_MIN_LENGTH:
+            end = min(i + MAX_PREFIX_EXPANSIONS, len(self.terms))
+            while i < end and self.terms[i].startswith(term):
+                matches.append((i, PREFIX_WEIGHT))
+                i += 1
+        return matches
+
+    def search(
+        self,
+        query: str,
+        node_type: str,
+        framework_urn: str | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[str, float]]:
+        """
+        (node id, score) of the nodes of `node_type` (requirement nodes of
+        `framework_urn` only, when given) matching every term of `query`, best
+        first. An empty query returns the nodes in library order.
+        """
+        if framework_urn is not None:
+            start, end = self.framework_ranges.get(framework_urn, (0, 0))
+        else:
+            start, end = self.type_ranges.get(node_type, (0, 0))
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            stop = end if limit is None else min(end, start + limit)
+            return [(self.doc_ids[doc], 0.0) for doc in range(start, stop)]
+        if start == end:
+            return []
+
+        n = end - start
+        lengths = self.doc_lengths[start:end]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+        scores = np.zeros(n, dtype=np.float32)
+        matched = np.ones(n, dtype=bool)
+        for term in terms:
+            term_scores = np.zeros(n, dtype=np.float32)
+            for term_number, weight in self._expand(term):
+                lo, hi = self.offsets[term_number], self.offsets[term_number + 1]
+                docs = self.postings_docs[lo:hi]
+                first, last = np.searchsorted(docs, (start, end))
+                if first == last:
+                    continue
+                docs = docs[first:last] - start
+                tfs = self.postings_tfs[lo + first : lo + last].astype(np.float32)
+                df = last - first
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                term_scores[docs] = np.maximum(
+                    term_scores[docs],
+                    weight * idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs]),
+                )
+            matched &= term_scores > 0
+            if not matched.any():
+                return []
+            scores += term_scores
+
+        hits = np.flatnonzero(matched)
+        # Best score first, library order between ties
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        if limit is not None:
+            hits = hits[:limit]
+        return [
+            (self.doc_ids[start + doc], round(float(scores[doc]), 3)) for doc in hits
+        ]
+
+
 # ---------------------------------------------------------------------------
 # Singleton graph management
 # ---------------------------------------------------------------------------
 
 _graph: DiGraph | None = None
+_text_index: TextIndex | None = None
 _graph_lock = threading.Lock()
 
 _CACHE_DIR = Path(__file__).resolve().parent.parent / "db" / "cache"
-_CACHE_FILE = _CACHE_DIR / "knowledge_graph.pkl"
+_CACHE_FILE = _CACHE_DIR / "knowledge_graph.bin"
+# Pickled DiGraph written by earlier versions, removed on save
+_LEGACY_CACHE_FILE = _CACHE_DIR / "knowledge_graph.pkl"
 
 
 def get_graph() -> DiGraph:
     """Get or build the singleton knowledge graph, using disk cache when available."""
-    global _graph
+    global _graph, _text_index
     if _graph is None:
         with _graph_lock:
             if _graph is None:
-                _graph = _load_or_build()
+                _graph, _text_index = _load_or_build()
     return _graph
 
 
+def get_text_index() -> TextIndex:
+    """The text index of the singleton knowledge graph."""
+    get_graph()
+    return _text_index
+
+
 def rebuild_graph() -> DiGraph:
     """Force rebuild of the knowledge graph (invalidates cache)."""
-    global _graph
+    global _graph, _text_index
     with _graph_lock:
-        _graph = _build_graph()
-        _save_cache(_graph)
+        graph = _build_graph()
+        _graph, _text_index = _save_cache(graph, _build_text_index(graph))
     return _graph
 
 
@@ -138,9 +344,9 @@ def _get_library_mtime() -> float:
     return mtime
 
 
-def _load_or_build() -> DiGraph:
-    """Try loading from disk cache; rebuild from YAML if stale or missing."""
-    import pickle
+def _load_or_build() -> tuple[DiGraph, TextIndex]:
+    """Try mapping the disk cache; rebuild from YAML if stale or missing."""
+    from chat.graph_store import MappedGraph
 
     try:
         if _CACHE_FILE.exists():
@@ -148,38 +354,52 @@ def _load_or_build() -> DiGraph:
             lib_mtime = _get_library_mtime()
             if cache_mtime >= lib_mtime:
                 t0 = time.time()
-                with open(_CACHE_FILE, "rb") as f:
-                    # SECURITY: This pickle file is application-generated
-                    # (written by _save_cache below), not user-uploaded.
-                    # The cache directory (db/cache/) is not web-accessible.
-                    graph = pickle.load(f)  # nosec B301
+                graph = MappedGraph(_CACHE_FILE)
+                index = graph.text_index()
                 logger.info(
                     "knowledge_graph_loaded_from_cache",
                     duration=round(time.time() - t0, 2),
                     nodes=graph.number_of_nodes(),
                 )
-                return graph
+                return graph, index
             else:
                 logger.info("knowledge_graph_cache_stale")
     except Exception as e:
         logger.warning("knowledge_graph_cache_load_failed", error=e)
 
     graph = _build_graph()
-    _save_cache(graph)
-    return graph
+    index = _build_text_index(graph)
+    return _save_cache(graph, index)
 
 
-def _save_cache(graph: DiGraph) -> None:
-    """Persist the graph to disk for fast loading."""
-    import pickle
+def _save_cache(graph: DiGraph, index: TextIndex) -> tuple[DiGraph, TextIndex]:
+    """
+    Write the graph and its text index to disk, and return them mapped from
+    there, or as they are when the file cannot be written.
+    """
+    from chat.graph_store import MappedGraph, write_graph_file
 
     try:
-        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        with open(_CACHE_FILE, "wb") as f:
-            pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        write_graph_file(_CACHE_FILE, graph, index)
+        _LEGACY_CACHE_FILE.unlink(missing_ok=True)
         logger.info("knowledge_graph_cache_saved", path=str(_CACHE_FILE))
+        mapped = MappedGraph(_CACHE_FILE)
+        return mapped, mapped.text_index()
     except Exception as e:
         logger.warning("knowledge_graph_cache_save_failed", error=e)
+        return graph, index
+
+
+def _build_text_index(graph: DiGraph) -> TextIndex:
+    t0 = time.time()
+    index = TextIndex(graph)
+    logger.info(
+        "knowledge_graph_text_index_built",
+        documents=len(index.doc_ids),
+        terms=len(index.terms),
+        duration=round(time.time() - t0, 2),
+    )
+    return index
 
 
 def _build_graph() -> DiGraph:
@@ -349,25 +569,19 @@ def _process_library(G: DiGraph, data: dict):
 def find_frameworks(
     query: str = "", provider: str = "", locale: str = ""
 ) -> list[dict]:
-    """Search frameworks by name, provider, or locale."""
+    """
+    Search frameworks by name, provider, or locale. Matches of `query` come
+    best first, the whole list is sorted by name otherwise.
+    """
     G = get_graph()
     results = []
-    query_lower = query.lower()
 
-    for node_id, attrs in G.nodes(data=True):
-        if attrs.get("node_type") != "framework":
-            continue
+    for node_id, _ in get_text_index().search(query, "framework"):
+        attrs = G[node_id]
         if provider and attrs.get("provider", "").lower() != provider.lower():
             continue
         if locale and attrs.get("locale", "") != locale:
             continue
-        if query_lower:
-            searchable = (
-                f"{attrs.get('name', '')} {attrs.get('ref_id', '')} "
-                f"{attrs.get('description', '')} {attrs.get('provider', '')}"
-            ).lower()
-            if query_lower not in searchable:
-                continue
 
         req_count = sum(
             1
@@ -387,7 +601,9 @@ def find_frameworks(
             }
         )
 
-    return sorted(results, key=lambda x: x["name"])
+    if not tokenize(query):
+        results.sort(key=lambda x: x["name"])
+    return results
 
 
 def get_framework_detail(identifier: str) -> dict | None:
@@ -516,26 +732,18 @@ def compare_frameworks(identifier_a: str, identifier_b: str) -> dict:
 
 
 def search_requirements(query: str, framework: str = "", limit: int = 20) -> list[dict]:
-    """Search requirement nodes by text, optionally within a specific framework."""
+    """
+    Search requirement nodes by text, optionally within a specific framework.
+    Best matches first.
+    """
     G = get_graph()
-    query_lower = query.lower()
-    results = []
-
     fw_urn = _resolve_framework(G, framework) if framework else None
 
-    for node_id, attrs in G.nodes(data=True):
-        if attrs.get("node_type") != "requirement_node":
-            continue
-        if fw_urn and attrs.get("framework_urn") != fw_urn:
-            continue
-
-        searchable = (
-            f"{attrs.get('name', '')} {attrs.get('ref_id', '')} "
-            f"{attrs.get('description', '')}"
-        ).lower()
-        if query_lower not in searchable:
-            continue
-
+    results = []
+    for node_id, _ in get_text_index().search(
+        query, "requirement_node", framework_urn=fw_urn, limit=limit
+    ):
+        attrs = G[node_id]
         results.append(
             {
                 "urn": node_id,
@@ -548,9 +756,6 @@ def search_requirements(query: str, framework: str = "", limit: int = 20) -> lis
             }
         )
 
-        if len(results) >= limit:
-            break
-
     return results
 
 
@@ -603,21 +808,16 @@ def find_mappings(
 
 
 def find_controls_for_threat(threat_query: str) -> list[dict]:
-    """Given a threat name, find requirements and controls that address it."""
+    """
+    Given a threat name, find requirements and controls that address it, for
+    the best matching threats first.
+    """
     G = get_graph()
-    query_lower = threat_query.lower()
 
-    # Find matching threats
-    threat_urns = []
-    for node_id, attrs in G.nodes(data=True):
-        if attrs.get("node_type") != "threat":
-            continue
-        searchable = (
-            f"{attrs.get('name', '')} {attrs.get('ref_id', '')} "
-            f"{attrs.get('description', '')}"
-        ).lower()
-        if query_lower in searchable:
-            threat_urns.append(node_id)
+    # Find matching threats, best first
+    threat_urns = [
+        node_id for node_id, _ in get_text_index().search(threat_query, "threat")
+    ]
 
     if not threat_urns:
         return []
@@ -669,13 +869,11 @@ def get_graph_stats() -> dict:
     """Return summary statistics about the knowledge graph."""
     G = get_graph()
     type_counts: dict[str, int] = {}
-    for _, attrs in G.nodes(data=True):
+    edge_counts: dict[str, int] = {}
+    for node_id, attrs in G.nodes(data=True):
         nt = attrs.get("node_type", "unknown")
         type_counts[nt] = type_counts.get(nt, 0) + 1
-
-    edge_counts: dict[str, int] = {}
-    for node_id in G._out:
-        for _, edge_attrs in G._out[node_id].items():
+        for _, _, edge_attrs in G.out_edges(node_id, data=True):
             et = edge_attrs.get("edge_type", "unknown")
             edge_counts[et] = edge_counts.get(et, 0) + 1
 
@@ -707,10 +905,7 @@ def _resolve_framework(G: DiGraph, identifier: str) -> str | None:
     best_match = None
     best_score = 0.0
 
-    for node_id, attrs in G.nodes(data=True):
-        if attrs.get("node_type") != "framework":
-            continue
-
+    for node_id, attrs in G.nodes_of_type("framework"):
         ref_id = (attrs.get("ref_id", "") or "").lower()
         name = (attrs.get("name", "") or "").lower()
 
@@ -0,0 +1,52 @@
+"""Report the hit ratio of the embedding cache, or empty it.
+
+Usage:
+    python manage.py embedding_cache
+    python manage.py embedding_cache --json
+    python manage.py embedding_cache --clear
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.embedding_cache import EmbeddingCache
+
+
+class Command(BaseCommand):
+    help = "Show embedding cache statistics, or clear the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete every cached vector and reset the counters.",
+        )
+        parser.add_argument("--json", action="store_true", help="Output JSON.")
+
+    def handle(self, *args, **options):
+        if not settings.EMBEDDING_CACHE_PATH:
+            raise CommandError(
+                "The embedding cache is disabled (EMBEDDING_CACHE_PATH)."
+            )
+        cache = EmbeddingCache(
+            settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES
+        )
+        if options["clear"]:
+            cache.clear()
+            self.stdout.write("Embedding cache cleared.")
+            return
+
+        stats = cache.stats()
+        if options["json"]:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+        ratio = stats["hit_ratio"]
+        self.stdout.write(f"Cache file: {stats['path']}")
+        self.stdout.write(
+            f"Entries:    {stats['entries']:,} / {stats['max_entries']:,}"
+        )
+        self.stdout.write(f"Hits:       {stats['hits']:,}")
+        self.stdout.write(f"Misses:     {stats['misses']:,}")
+        self.stdout.write(f"Hit ratio:  {'n/a' if ratio is None else f'{ratio:.1%}'}")
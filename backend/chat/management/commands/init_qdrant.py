@@ -47,6 +47,12 @@ class Command(BaseCommand):
         dimensions = embedder.dimensions
         self.stdout.write(f"Embedding dimensions: {dimensions}")
 
+        # The collection starts empty: forget the hashes of the indexed objects
+        # so that the next change of each of them is embedded again
+        from chat.models import IndexedObject
+
+        IndexedObject.objects.all().delete()
+
         # Create collection
         self.stdout.write(f"Creating collection '{COLLECTION_NAME}'...")
         client.create_collection(
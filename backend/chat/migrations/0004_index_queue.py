@@ -0,0 +1,56 @@
+# Generated by Django 6.0.7 on 2026-10-17 11:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0003_agentrun_agentaction_questionnairerun_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexedObject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_label", models.CharField(max_length=100)),
+                ("object_id", models.UUIDField()),
+                ("content_hash", models.CharField(max_length=64)),
+                ("indexed_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("model_label", "object_id"),
+                        name="unique_indexed_object",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="IndexQueueEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("model_label", models.CharField(max_length=100)),
+                ("object_id", models.UUIDField()),
+                ("queued_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("model_label", "object_id"),
+                        name="unique_index_queue_entry",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ import uuid
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from core.base_models import AbstractBaseModel
@@ -176,6 +177,53 @@ class IndexedDocument(AbstractBaseModel, FolderMixin):
         return f"{self.filename} ({self.status})"
 
 
+class IndexQueueEntry(models.Model):
+    """
+    A model object to re-index in the vector store, written by the save and
+    delete signals in the transaction of the change. The queue holds one entry
+    per object, however many times it changed: flush_index_queue indexes the
+    object as it is when the entry is flushed, or removes it from the store
+    when it no longer exists.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    model_label = models.CharField(max_length=100)  # "core.AppliedControl"
+    object_id = models.UUIDField()
+    queued_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model_label", "object_id"], name="unique_index_queue_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}:{self.object_id}"
+
+
+class IndexedObject(models.Model):
+    """
+    Hash of the point last written to the vector store for a model object
+    (text and payload): an unchanged object is not embedded again.
+    """
+
+    model_label = models.CharField(max_length=100)
+    object_id = models.UUIDField()
+    content_hash = models.CharField(max_length=64)
+    indexed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model_label", "object_id"], name="unique_indexed_object"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}:{self.object_id}"
+
+
 class QuestionnaireRun(AbstractBaseModel, FolderMixin):
     """Experimental: a customer security questionnaire being prefilled.
 
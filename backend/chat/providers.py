@@ -642,33 +642,33 @@ class StubLLM:
 
 def get_chat_settings() -> dict:
     """Load chat/LLM settings from global_settings."""
-    from global_settings.models import GlobalSettings
+    from global_settings.cache import get_global_setting
 
     try:
-        gs = GlobalSettings.objects.filter(name="general").first()
-        if gs and isinstance(gs.value, dict):
+        general = get_global_setting("general")
+        if isinstance(general, dict):
             return {
-                "llm_provider": gs.value.get("llm_provider", "ollama"),
-                "ollama_base_url": gs.value.get(
+                "llm_provider": general.get("llm_provider", "ollama"),
+                "ollama_base_url": general.get(
                     "ollama_base_url", "http://localhost:11434"
                 ),
-                "ollama_model": gs.value.get("ollama_model", "mistral"),
-                "ollama_embed_model": gs.value.get(
+                "ollama_model": general.get("ollama_model", "mistral"),
+                "ollama_embed_model": general.get(
                     "ollama_embed_model", "snowflake-arctic-embed2"
                 ),
-                "embedding_backend": gs.value.get(
+                "embedding_backend": general.get(
                     "embedding_backend", "sentence-transformers"
                 ),
-                "chat_system_prompt": gs.value.get("chat_system_prompt", ""),
-                "openai_api_base": gs.value.get(
+                "chat_system_prompt": general.get("chat_system_prompt", ""),
+                "openai_api_base": general.get(
                     "openai_api_base", "http://localhost:1234/v1"
                 ),
-                "openai_model": gs.value.get("openai_model", ""),
-                "openai_api_key": gs.value.get("openai_api_key", ""),
-                "chat_temperature_enabled": gs.value.get(
+                "openai_model": general.get("openai_model", ""),
+                "openai_api_key": general.get("openai_api_key", ""),
+                "chat_temperature_enabled": general.get(
                     "chat_temperature_enabled", True
                 ),
-                "chat_temperature": gs.value.get("chat_temperature", 0),
+                "chat_temperature": general.get("chat_temperature", 0),
             }
     except Exception as e:
         logger.warning("chat_settings_load_failed", error=e)
@@ -713,17 +713,38 @@ def get_embedder() -> Embedder:
                 base_url=settings["ollama_base_url"],
             )
             _ = embedder.dimensions  # Test connection
-            _cached_embedder = embedder
-            return embedder
+            _cached_embedder = _with_embedding_cache(
+                embedder, f"ollama:{embedder.model}"
+            )
+            return _cached_embedder
         except Exception as e:
             logger.warning(
                 "Ollama embedder failed (%s), falling back to sentence-transformers", e
             )
 
-    _cached_embedder = SentenceTransformerEmbedder()
+    _cached_embedder = _with_embedding_cache(
+        SentenceTransformerEmbedder(),
+        f"sentence-transformers:{DEFAULT_EMBEDDING_MODEL}",
+    )
     return _cached_embedder
 
 
+def _with_embedding_cache(embedder: Embedder, model_name: str) -> Embedder:
+    """Wrap `embedder` in the embedding cache, unless EMBEDDING_CACHE_PATH is empty."""
+    from django.conf import settings
+
+    path = getattr(settings, "EMBEDDING_CACHE_PATH", "")
+    if not path:
+        return embedder
+    from chat.embedding_cache import CachedEmbedder, EmbeddingCache
+
+    return CachedEmbedder(
+        embedder,
+        model_name,
+        EmbeddingCache(path, settings.EMBEDDING_CACHE_MAX_ENTRIES),
+    )
+
+
 def get_llm() -> LLM:
     """Get the configured LLM, cached after first successful init."""
     global _cached_llm
@@ -1,6 +1,10 @@
 """
 Django signals to trigger incremental re-indexing of model objects
 when they are created, updated, or deleted.
+
+The changed objects are queued (chat.tasks.queue_for_indexing) and indexed in
+bulk by flush_index_queue a few seconds later, so a burst of saves (e.g. the
+requirement assessments of a new audit) makes a single flush.
 """
 
 import structlog
@@ -38,6 +42,10 @@ def _get_model_classes():
 
 _connected = False
 
+# The on_change receivers connected below. Bulk writes (bulk_create and
+# bulk_update send no signals) stand in for them with on_bulk_change.
+CHANGE_RECEIVERS = []
+
 
 def connect_signals():
     """Connect post_save and post_delete signals for indexed models."""
@@ -54,35 +62,36 @@ def connect_signals():
     from global_settings.utils import ff_is_enabled
 
     for model_class in _get_model_classes():
-
+        # Saves and deletes both queue the object: the flush indexes it, or
+        # removes it from the store once it no longer exists.
         @receiver(post_save, sender=model_class, weak=False)
-        def on_save(sender, instance, **kwargs):
-            if not ff_is_enabled("chat_mode"):
-                return
-            from django.db import transaction
-            from .tasks import index_model_object
-
-            app = sender._meta.app_label
-            name = sender.__name__
-            obj_id = str(instance.id)
-            transaction.on_commit(lambda: index_model_object(app, name, obj_id))
-
         @receiver(post_delete, sender=model_class, weak=False)
-        def on_delete(sender, instance, **kwargs):
+        def on_change(sender, instance, **kwargs):
             if not ff_is_enabled("chat_mode"):
                 return
-            from django.db import transaction
-            from .tasks import remove_model_object
+            from .tasks import queue_for_indexing
+
+            queue_for_indexing(sender._meta.label, [instance.id])
 
-            app = sender._meta.app_label
-            name = sender.__name__
-            obj_id = str(instance.id)
-            transaction.on_commit(lambda: remove_model_object(app, name, obj_id))
+        CHANGE_RECEIVERS.append(on_change)
 
     # Auto-ingest evidence attachments when a new revision is uploaded
     _connect_evidence_signal(ff_is_enabled)
 
 
+def on_bulk_change(model_class, object_ids) -> None:
+    """Queue objects saved in bulk, as on_change does for each saved object."""
+    if not CHANGE_RECEIVERS or model_class._meta.label not in INDEXED_MODELS:
+        return
+    from global_settings.utils import ff_is_enabled
+
+    if not object_ids or not ff_is_enabled("chat_mode"):
+        return
+    from .tasks import queue_for_indexing
+
+    queue_for_indexing(model_class._meta.label, object_ids)
+
+
 def _connect_evidence_signal(ff_is_enabled):
     """Connect signal to auto-ingest evidence file attachments."""
     from django.apps import apps
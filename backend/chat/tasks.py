@@ -6,7 +6,8 @@ import structlog
 import uuid
 
 from django.utils import timezone
-from huey.contrib.djhuey import db_task
+from huey import crontab
+from huey.contrib.djhuey import db_periodic_task, db_task
 
 logger = structlog.get_logger(__name__)
 
@@ -167,6 +168,248 @@ def remove_model_object(app_label: str, model_name: str, object_id: str):
         )
 
 
+# ---------------------------------------------------------------------------
+# Debounced object indexing
+# ---------------------------------------------------------------------------
+# The save/delete signals write the changed objects to the IndexQueueEntry
+# table (see queue_for_indexing) and flush_index_queue indexes them a few
+# seconds later, in bulk: one query per model to load a batch, one embedding
+# call per EMBED_BATCH_SIZE texts, one Qdrant upsert per UPSERT_BATCH_SIZE
+# points. Objects whose text and payload did not change are skipped.
+
+INDEX_QUEUE_FLUSH_DELAY = 5  # seconds, lets the saves of a burst share a flush
+INDEX_QUEUE_BATCH_SIZE = 1000  # queue entries claimed at a time
+EMBED_BATCH_SIZE = 64
+UPSERT_BATCH_SIZE = 256
+
+# Relations read by _build_object_text and str(), loaded with the batch
+INDEX_SELECT_RELATED = {
+    "core.RequirementAssessment": ("requirement__framework", "compliance_assessment"),
+    "core.RiskScenario": ("risk_assessment",),
+}
+
+
+def queue_for_indexing(model_label: str, object_ids) -> None:
+    """
+    Queue objects for (re-)indexing, in the current transaction: nothing is
+    indexed if it rolls back. A flush is scheduled when the queue was empty;
+    otherwise one is already on its way and will pick these objects up.
+    """
+    from django.db import transaction
+
+    from .models import IndexQueueEntry
+
+    flushing = IndexQueueEntry.objects.exists()
+    IndexQueueEntry.objects.bulk_create(
+        [
+            IndexQueueEntry(model_label=model_label, object_id=object_id)
+            for object_id in object_ids
+        ],
+        ignore_conflicts=True,
+    )
+    if not flushing:
+        transaction.on_commit(
+            lambda: flush_index_queue.schedule(delay=INDEX_QUEUE_FLUSH_DELAY)
+        )
+
+
+def _point_id(model_label: str, object_id) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{model_label}:{object_id}"))
+
+
+def _object_point_payload(obj, model_name: str) -> dict | None:
+    """Payload of the Qdrant point of a model object, None if it is not indexable."""
+    text = _build_object_text(obj, model_name)
+    if not text:
+        return None
+    folder_id = _resolve_folder_id(obj)
+    if not folder_id:
+        return None
+    return {
+        "text": text,
+        "folder_id": folder_id,
+        "source_type": "model",
+        "object_type": _normalize_model_name(model_name),
+        "object_id": str(obj.id),
+        "name": str(obj),
+        "ref_id": getattr(obj, "ref_id", "") or "",
+    }
+
+
+def _content_hash(payload: dict) -> str:
+    import hashlib
+    import json
+
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def index_objects_batch(client, embedder, model_label: str, object_ids) -> dict:
+    """
+    Bring the points of the objects `object_ids` of `model_label` up to date:
+    upsert the changed ones, remove the deleted ones. Returns the counts.
+    """
+    from django.apps import apps
+    from qdrant_client.models import PointIdsList, PointStruct
+
+    from .models import IndexedObject
+    from .rag import COLLECTION_NAME
+
+    app_label, model_name = model_label.split(".")
+    model_class = apps.get_model(app_label, model_name)
+    object_ids = {str(object_id) for object_id in object_ids}
+    objects = {
+        str(obj.id): obj
+        for obj in model_class.objects.filter(id__in=object_ids).select_related(
+            *INDEX_SELECT_RELATED.get(model_label, ())
+        )
+    }
+    hashes = dict(
+        IndexedObject.objects.filter(
+            model_label=model_label, object_id__in=object_ids
+        ).values_list("object_id", "content_hash")
+    )
+    hashes = {
+        str(object_id): content_hash for object_id, content_hash in hashes.items()
+    }
+
+    removed = [object_id for object_id in object_ids if object_id not in objects]
+    changed = []
+    for object_id, obj in objects.items():
+        payload = _object_point_payload(obj, model_name)
+        if payload is None:
+            # No longer indexable: its point would keep the old content
+            removed.append(object_id)
+            continue
+        content_hash = _content_hash(payload)
+        if hashes.get(object_id) != content_hash:
+            changed.append((object_id, payload, content_hash))
+
+    if removed:
+        client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=PointIdsList(
+                points=[_point_id(model_label, object_id) for object_id in removed]
+            ),
+        )
+        IndexedObject.objects.filter(
+            model_label=model_label, object_id__in=removed
+        ).delete()
+
+    points = []
+    for start in range(0, len(changed), EMBED_BATCH_SIZE):
+        batch = changed[start : start + EMBED_BATCH_SIZE]
+        vectors = embedder.embed([payload["text"] for _, payload, _ in batch])
+        points.extend(
+            PointStruct(
+                id=_point_id(model_label, object_id), vector=vector, payload=payload
+            )
+            for (object_id, payload, _), vector in zip(batch, vectors)
+        )
+    for start in range(0, len(points), UPSERT_BATCH_SIZE):
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=points[start : start + UPSERT_BATCH_SIZE],
+        )
+    if changed:
+        now = timezone.now()
+        IndexedObject.objects.bulk_create(
+            [
+                IndexedObject(
+                    model_label=model_label,
+                    object_id=object_id,
+                    content_hash=content_hash,
+                    indexed_at=now,
+                )
+                for object_id, _, content_hash in changed
+            ],
+            update_conflicts=True,
+            unique_fields=["model_label", "object_id"],
+            update_fields=["content_hash", "indexed_at"],
+        )
+    return {
+        "indexed": len(changed),
+        "unchanged": len(object_ids) - len(changed) - len(removed),
+        "removed": len(removed),
+    }
+
+
+def _drain_index_queue(client, embedder) -> dict:
+    from .models import IndexQueueEntry
+
+    totals = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    while True:
+        entries = list(
+            IndexQueueEntry.objects.order_by("id").values_list(
+                "id", "model_label", "object_id"
+            )[:INDEX_QUEUE_BATCH_SIZE]
+        )
+        if not entries:
+            return totals
+        # Claimed before the objects are read: a change committed from now on
+        # queues its object again, for the next round.
+        IndexQueueEntry.objects.filter(id__in=[entry[0] for entry in entries]).delete()
+        by_model = {}
+        for _, model_label, object_id in entries:
+            by_model.setdefault(model_label, []).append(object_id)
+        failed = False
+        for model_label, object_ids in by_model.items():
+            try:
+                counts = index_objects_batch(client, embedder, model_label, object_ids)
+            except Exception as e:
+                # Left for the next flush, which the sweeper runs within a minute;
+                # the other models of the round are still indexed.
+                failed = True
+                logger.error(
+                    "index_queue_batch_failed",
+                    model=model_label,
+                    count=len(object_ids),
+                    error=e,
+                )
+                IndexQueueEntry.objects.bulk_create(
+                    [
+                        IndexQueueEntry(model_label=model_label, object_id=object_id)
+                        for object_id in object_ids
+                    ],
+                    ignore_conflicts=True,
+                )
+                totals["failed"] += len(object_ids)
+                continue
+            for key, count in counts.items():
+                totals[key] += count
+        if failed:
+            # Draining on would claim the queued-again entries right back
+            return totals
+
+
+@db_task()
+def flush_index_queue():
+    """Index the queued objects, batch after batch, until the queue is empty."""
+    from huey.contrib.djhuey import HUEY
+    from huey.exceptions import TaskLockedException
+
+    from .providers import get_embedder
+    from .rag import get_qdrant_client
+
+    try:
+        with HUEY.lock_task("chat-index-queue"):
+            totals = _drain_index_queue(get_qdrant_client(), get_embedder())
+    except TaskLockedException:
+        return "Busy: the index queue is already being flushed"
+    logger.info("index_queue_flushed", **totals)
+    return totals
+
+
+@db_periodic_task(crontab(minute="*"))
+def sweep_index_queue():
+    """Flush the entries whose flush was missed or failed."""
+    from .models import IndexQueueEntry
+
+    if IndexQueueEntry.objects.exists():
+        flush_index_queue()
+
+
 def _resolve_folder_id(obj) -> str:
     """Walk the FK chain to find a folder_id for a model object.
 
@@ -0,0 +1,104 @@
+"""The content-addressed embedding cache wrapped around an embedder."""
+
+import pytest
+
+from chat import embedding_cache
+from chat.embedding_cache import CachedEmbedder, EmbeddingCache, text_digest
+
+
+class _Embedder:
+    dimensions = 2
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[1.0, float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=10)
+
+
+def test_known_texts_are_not_embedded_again(cache):
+    inner = _Embedder()
+    embedder = CachedEmbedder(inner, "test-model", cache)
+
+    assert embedder.embed(["alpha", "beta", "alpha"]) == [
+        [1.0, 5.0],
+        [1.0, 4.0],
+        [1.0, 5.0],
+    ]
+    assert inner.calls == [["alpha", "beta"]]
+
+    # Normalized: whitespace differences hit the same entry
+    assert embedder.embed(["beta", "  alpha\n", "gamma"]) == [
+        [1.0, 4.0],
+        [1.0, 5.0],
+        [1.0, 5.0],
+    ]
+    assert embedder.embed_query("gamma") == [1.0, 5.0]
+    assert inner.calls == [["alpha", "beta"], ["gamma"]]
+
+    stats = embedder.stats()
+    assert stats["entries"] == 3
+    assert (stats["hits"], stats["misses"]) == (4, 3)
+    assert stats["hit_ratio"] == 0.571
+
+
+def test_entries_are_per_model(cache):
+    inner = _Embedder()
+    CachedEmbedder(inner, "model-a", cache).embed(["alpha"])
+    CachedEmbedder(inner, "model-b", cache).embed(["alpha"])
+    assert len(inner.calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "LAST_USED_RESOLUTION", 0.0)
+    embedder = CachedEmbedder(_Embedder(), "test-model", cache)
+    for index in range(10):
+        embedder.embed([f"text {index}"])
+    embedder.embed(["text 0"])  # Refreshes its last use
+    embedder.embed(["text 10"])
+
+    assert cache.stats()["entries"] == 9
+    kept = cache.get_many(
+        "test-model", [text_digest(f"text {index}") for index in range(11)]
+    )
+    assert text_digest("text 0") in kept
+    assert text_digest("text 10") in kept
+    assert text_digest("text 1") not in kept
+
+
+def test_hits_write_nothing(cache):
+    embedder = CachedEmbedder(_Embedder(), "test-model", cache)
+    embedder.embed(["alpha"])
+    changes = cache._connection().total_changes
+
+    for _ in range(3):
+        embedder.embed(["alpha"])
+    assert cache._connection().total_changes == changes
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (3, 1)
+
+
+def test_counts_are_flushed_periodically(cache, monkeypatch):
+    embedder = CachedEmbedder(_Embedder(), "test-model", cache)
+    embedder.embed(["alpha"])
+    embedder.embed(["alpha"])
+    # Read from another process
+    other = EmbeddingCache(cache.path, max_entries=10)
+    assert (other.stats()["hits"], other.stats()["misses"]) == (0, 1)
+
+    monkeypatch.setattr(embedding_cache, "COUNTER_FLUSH_INTERVAL", 0.0)
+    embedder.embed(["alpha"])
+    assert (other.stats()["hits"], other.stats()["misses"]) == (2, 1)
+
+
+def test_cache_errors_fall_back_to_the_embedder(tmp_path):
+    inner = _Embedder()
+    # A directory cannot be opened as a database
+    embedder = CachedEmbedder(inner, "test-model", EmbeddingCache(tmp_path, 10))
+    assert embedder.embed(["alpha"]) == [[1.0, 5.0]]
+    assert inner.calls == [["alpha"]]
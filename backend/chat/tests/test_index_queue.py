@@ -0,0 +1,176 @@
+"""The debounced indexing queue: saves are coalesced, flushed in bulk, and
+objects whose text did not change are not embedded again."""
+
+from unittest.mock import patch
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+class _Embedder:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[1.0, float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def client():
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, VectorParams
+
+    from chat.rag import COLLECTION_NAME
+
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION_NAME,
+        vectors_config=VectorParams(size=2, distance=Distance.COSINE),
+    )
+    return client
+
+
+@pytest.fixture
+def controls():
+    from core.models import AppliedControl
+    from iam.models import Folder
+
+    return [
+        AppliedControl.objects.create(
+            name=f"Control {index}", folder=Folder.get_root_folder()
+        )
+        for index in range(3)
+    ]
+
+
+def _points(client):
+    from chat.rag import COLLECTION_NAME
+
+    points, _ = client.scroll(COLLECTION_NAME, limit=100)
+    return {point.payload["object_id"]: point.payload for point in points}
+
+
+def test_queue_coalesces_and_schedules_one_flush(
+    controls, django_capture_on_commit_callbacks
+):
+    from chat import tasks
+    from chat.models import IndexQueueEntry
+
+    with (
+        patch.object(tasks.flush_index_queue, "schedule") as schedule,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        for control in controls + controls:
+            tasks.queue_for_indexing("core.AppliedControl", [control.id])
+
+    schedule.assert_called_once_with(delay=tasks.INDEX_QUEUE_FLUSH_DELAY)
+    assert IndexQueueEntry.objects.count() == 3
+
+
+def test_flush_embeds_in_batches_and_skips_unchanged(client, controls, monkeypatch):
+    from chat import tasks
+    from chat.models import IndexedObject, IndexQueueEntry
+
+    monkeypatch.setattr(tasks, "EMBED_BATCH_SIZE", 2)
+    embedder = _Embedder()
+    with patch.object(tasks.flush_index_queue, "schedule"):
+        tasks.queue_for_indexing("core.AppliedControl", [c.id for c in controls])
+
+    totals = tasks._drain_index_queue(client, embedder)
+    assert totals == {"indexed": 3, "unchanged": 0, "removed": 0, "failed": 0}
+    assert [len(texts) for texts in embedder.calls] == [2, 1]
+    assert set(_points(client)) == {str(c.id) for c in controls}
+    assert not IndexQueueEntry.objects.exists()
+
+    # One changed, one deleted, one untouched
+    controls[0].observation = "Reviewed"
+    controls[0].save()
+    deleted_id = controls[1].id
+    controls[1].delete()
+    embedder.calls.clear()
+    with patch.object(tasks.flush_index_queue, "schedule"):
+        tasks.queue_for_indexing("core.AppliedControl", [c.id for c in controls])
+        tasks.queue_for_indexing("core.AppliedControl", [deleted_id])
+
+    totals = tasks._drain_index_queue(client, embedder)
+    assert totals == {"indexed": 1, "unchanged": 1, "removed": 1, "failed": 0}
+    assert len(embedder.calls) == 1
+    assert "Observation: Reviewed" in embedder.calls[0][0]
+    points = _points(client)
+    assert set(points) == {str(controls[0].id), str(controls[2].id)}
+    assert IndexedObject.objects.count() == 2
+
+
+def test_failed_batch_is_queued_again(client, controls):
+    from chat import tasks
+    from chat.models import IndexedObject, IndexQueueEntry
+
+    class _Failing:
+        def embed(self, texts):
+            raise RuntimeError("embedder down")
+
+    with patch.object(tasks.flush_index_queue, "schedule"):
+        tasks.queue_for_indexing("core.AppliedControl", [c.id for c in controls])
+
+    totals = tasks._drain_index_queue(client, _Failing())
+    assert totals["failed"] == 3
+    assert IndexQueueEntry.objects.count() == 3
+    assert not IndexedObject.objects.exists()
+
+
+def test_failed_model_does_not_hold_back_the_others(client, controls):
+    from chat import tasks
+    from chat.models import IndexQueueEntry
+    from core.models import Asset
+    from iam.models import Folder
+
+    assets = [
+        Asset.objects.create(name=f"Asset {index}", folder=Folder.get_root_folder())
+        for index in range(2)
+    ]
+    index_objects_batch = tasks.index_objects_batch
+
+    def fail_controls(client, embedder, model_label, object_ids):
+        if model_label == "core.AppliedControl":
+            raise RuntimeError("controls down")
+        return index_objects_batch(client, embedder, model_label, object_ids)
+
+    with patch.object(tasks.flush_index_queue, "schedule"):
+        tasks.queue_for_indexing("core.AppliedControl", [c.id for c in controls])
+        tasks.queue_for_indexing("core.Asset", [a.id for a in assets])
+
+    with patch.object(tasks, "index_objects_batch", fail_controls):
+        totals = tasks._drain_index_queue(client, _Embedder())
+    assert totals == {"indexed": 2, "unchanged": 0, "removed": 0, "failed": 3}
+    assert set(_points(client)) == {str(a.id) for a in assets}
+    assert set(IndexQueueEntry.objects.values_list("model_label", flat=True)) == {
+        "core.AppliedControl"
+    }
+    assert IndexQueueEntry.objects.count() == 3
+
+
+def test_unindexable_object_loses_its_point(client, controls):
+    from chat import tasks
+    from chat.models import IndexedObject
+
+    with patch.object(tasks.flush_index_queue, "schedule"):
+        tasks.queue_for_indexing("core.AppliedControl", [c.id for c in controls])
+    tasks._drain_index_queue(client, _Embedder())
+
+    object_point_payload = tasks._object_point_payload
+    unindexable = str(controls[0].id)
+
+    def payload(obj, model_name):
+        if str(obj.id) == unindexable:
+            return None
+        return object_point_payload(obj, model_name)
+
+    with patch.object(tasks.flush_index_queue, "schedule"):
+        tasks.queue_for_indexing("core.AppliedControl", [c.id for c in controls])
+    with patch.object(tasks, "_object_point_payload", payload):
+        totals = tasks._drain_index_queue(client, _Embedder())
+    assert totals == {"indexed": 0, "unchanged": 2, "removed": 1, "failed": 0}
+    assert unindexable not in _points(client)
+    assert not IndexedObject.objects.filter(object_id=unindexable).exists()
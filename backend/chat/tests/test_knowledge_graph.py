@@ -2,7 +2,13 @@
 
 import pytest
 
-from chat.knowledge_graph import DiGraph, _resolve_framework, format_graph_result
+from chat import knowledge_graph
+from chat.knowledge_graph import (
+    DiGraph,
+    TextIndex,
+    _resolve_framework,
+    format_graph_result,
+)
 
 
 @pytest.fixture
@@ -137,6 +143,145 @@ class TestDigraph:
         assert G.get("missing") is None
 
 
+@pytest.fixture
+def requirement_graph(small_graph):
+    """small_graph with requirements in two frameworks and a threat."""
+    G = small_graph
+    iso = "urn:intuitem:risk:framework:iso27001-2022"
+    aircyber = "urn:intuitem:risk:framework:aircyber-v1.5.2"
+    requirements = [
+        (iso, "A.5.17", "Authentication information", "Passwords are managed"),
+        (iso, "A.8.24", "Use of cryptography", "Encryption keys and cryptography"),
+        (iso, "A.8.7", "Protection against malware", "Ransomware and malware"),
+        (aircyber, "AC-1", "Password policy", "Password length and password reuse"),
+    ]
+    for fw_urn, ref_id, name, description in requirements:
+        urn = f"urn:req:{ref_id}"
+        G.add_node(
+            urn,
+            node_type="requirement_node",
+            ref_id=ref_id,
+            name=name,
+            description=description,
+            framework_urn=fw_urn,
+            framework_name=G[fw_urn]["name"],
+        )
+        G.add_edge(fw_urn, urn, edge_type="has_requirement")
+    G.add_node("urn:threat:ransomware", node_type="threat", name="Ransomware")
+    G.add_edge("urn:req:A.8.7", "urn:threat:ransomware", edge_type="addresses_threat")
+    return G
+
+
+@pytest.fixture
+def indexed_graph(requirement_graph, monkeypatch):
+    monkeypatch.setattr(knowledge_graph, "_graph", requirement_graph)
+    monkeypatch.setattr(knowledge_graph, "_text_index", TextIndex(requirement_graph))
+    return requirement_graph
+
+
+class TestTextIndex:
+    def test_ranked_and_all_terms_required(self, requirement_graph):
+        index = TextIndex(requirement_graph)
+        results = index.search("password", "requirement_node")
+        # Twice in the description and in the name beats once
+        assert [node_id for node_id, _ in results] == [
+            "urn:req:AC-1",
+            "urn:req:A.5.17",
+        ]
+        assert results[0][1] > results[1][1]
+        assert [n for n, _ in index.search("password reuse", "requirement_node")] == [
+            "urn:req:AC-1"
+        ]
+        assert index.search("password quantum", "requirement_node") == []
+
+    def test_prefixes_match(self, requirement_graph):
+        index = TextIndex(requirement_graph)
+        assert [n for n, _ in index.search("crypto", "requirement_node")] == [
+            "urn:req:A.8.24"
+        ]
+        # Too short to expand
+        assert index.search("cr", "requirement_node") == []
+
+    def test_framework_restriction(self, requirement_graph):
+        index = TextIndex(requirement_graph)
+        iso = "urn:intuitem:risk:framework:iso27001-2022"
+        assert [
+            n
+            for n, _ in index.search("password", "requirement_node", framework_urn=iso)
+        ] == ["urn:req:A.5.17"]
+        assert [n for n, _ in index.search("", "requirement_node", iso, limit=2)] == [
+            "urn:req:A.5.17",
+            "urn:req:A.8.24",
+        ]
+
+    def test_query_functions(self, indexed_graph):
+        results = knowledge_graph.search_requirements("password", framework="AirCyber")
+        assert [r["ref_id"] for r in results] == ["AC-1"]
+        assert [
+            r["ref_id"] for r in knowledge_graph.search_requirements("PASSWORD")
+        ] == [
+            "AC-1",
+            "A.5.17",
+        ]
+        assert [f["ref_id"] for f in knowledge_graph.find_frameworks("27001")] == [
+            "ISO-27001-2022"
+        ]
+        assert [f["ref_id"] for f in knowledge_graph.find_frameworks(locale="en")] == [
+            "ISO-27001-2022",
+            "AirCyber-v1.5.2",
+        ]
+        results = knowledge_graph.find_controls_for_threat("ransom")
+        assert [r["requirement"]["ref_id"] for r in results] == ["A.8.7"]
+
+    def test_persisted_with_the_graph(self, requirement_graph, tmp_path, monkeypatch):
+        from chat.graph_store import MappedGraph
+
+        monkeypatch.setattr(knowledge_graph, "_CACHE_FILE", tmp_path / "kg.bin")
+        monkeypatch.setattr(knowledge_graph, "_LEGACY_CACHE_FILE", tmp_path / "kg.pkl")
+        monkeypatch.setattr(knowledge_graph, "_get_library_mtime", lambda: 0.0)
+
+        graph, index = knowledge_graph._save_cache(
+            requirement_graph, TextIndex(requirement_graph)
+        )
+        assert isinstance(graph, MappedGraph)
+        graph, index = knowledge_graph._load_or_build()
+        assert isinstance(graph, MappedGraph)
+        assert index.search("ransomware", "threat")[0][0] == "urn:threat:ransomware"
+        assert [n for n, _ in index.search("pass", "requirement_node")] == [
+            "urn:req:AC-1",
+            "urn:req:A.5.17",
+        ]
+
+
+class TestMappedGraph:
+    def test_same_graph_as_the_digraph(self, requirement_graph, tmp_path):
+        from chat.graph_store import MappedGraph, write_graph_file
+
+        G = requirement_graph
+        G.add_node("urn:req:A.8.7", assessable=True, depth=2, groups=["IG1", "IG2"])
+        G.add_node("urn:req:A.8.24", annotation=None, weight=0.5, extra={"a": 1})
+        G.add_edge("urn:req:A.5.17", "urn:req:AC-1", edge_type="maps_to", rationale="")
+        write_graph_file(tmp_path / "kg.bin", G, TextIndex(G))
+        M = MappedGraph(tmp_path / "kg.bin")
+
+        assert M.number_of_nodes() == G.number_of_nodes()
+        assert M.number_of_edges() == G.number_of_edges()
+        assert list(M.nodes(data=True)) == list(G.nodes(data=True))
+        for node_id in G.nodes():
+            assert list(M.out_edges(node_id, data=True)) == list(
+                G.out_edges(node_id, data=True)
+            )
+            assert list(M.in_edges(node_id)) == list(G.in_edges(node_id))
+        assert list(M.nodes_of_type("framework")) == list(G.nodes_of_type("framework"))
+        assert M["urn:req:A.8.7"]["groups"] == ["IG1", "IG2"]
+        assert "urn:missing" not in M
+        assert M.get("urn:missing") is None
+        assert list(M.out_edges("urn:missing")) == []
+        with pytest.raises(KeyError):
+            M["urn:missing"]
+        assert _resolve_framework(M, "3CF") == _resolve_framework(G, "3CF")
+
+
 class TestFormatGraphResult:
     def test_none(self):
         assert format_graph_result(None) == "No results found."
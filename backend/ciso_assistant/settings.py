@@ -502,6 +502,7 @@ MIDDLEWARE = [
     "core.custom_middleware.AuditlogMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "core.focus_middleware.FocusModeMiddleware",
+    "iam.permission_resolver.PermissionResolverMiddleware",
 ]
 ROOT_URLCONF = "ciso_assistant.urls"
 # we leave these for the API UI tools - even if Django templates and Admin are not used anymore
@@ -741,6 +742,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # SQLIte file can be changed, useful for tests
 SQLITE_FILE = os.environ.get("SQLITE_FILE", BASE_DIR / "db/ciso-assistant.sqlite3")
 LIBRARIES_PATH = library_path = BASE_DIR / "library/libraries"
+# Optional pre-parsed bundle of the libraries (storelibraries --write-bundle)
+LIBRARIES_BUNDLE_PATH = os.environ.get("LIBRARIES_BUNDLE_PATH")
 
 if "POSTGRES_NAME" in os.environ:
     DATABASES = {
@@ -883,6 +886,26 @@ HUEY = {
     "immediate": False,  # set to False to run in "live" mode regardless of DEBUG, otherwise it will follow
 }
 
+## IAM snapshot caches
+# "local": each process (gunicorn worker, Huey consumer) builds its own copy.
+# "mmap": snapshots are built once per version and shared by all the processes
+# of the host through memory-mapped files stored in IAM_SNAPSHOT_DIR, which
+# should be host-local (ideally a tmpfs such as /dev/shm).
+IAM_SNAPSHOT_BACKEND = os.environ.get("IAM_SNAPSHOT_BACKEND", "local").lower()
+IAM_SNAPSHOT_DIR = os.environ.get("IAM_SNAPSHOT_DIR", BASE_DIR / "db" / "snapshots")
+
+## Embedding cache
+# Chat embeddings are cached by (model, sha256 of the normalized text) in a
+# host-local SQLite file, shared by the processes of the host. The least
+# recently used vectors are evicted beyond EMBEDDING_CACHE_MAX_ENTRIES.
+# Set EMBEDDING_CACHE_PATH to an empty string to disable the cache.
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH", BASE_DIR / "db" / "embedding_cache.sqlite3"
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", 200_000)
+)
+
 AUDITLOG_RETENTION_DAYS = int(os.environ.get("AUDITLOG_RETENTION_DAYS", 90))
 AUDITLOG_MAX_RECORDS = int(os.environ.get("AUDITLOG_MAX_RECORDS", 50000))
 
@@ -892,6 +915,13 @@ WORKFLOWS_ASYNC_EXECUTION = (
     os.environ.get("WORKFLOWS_ASYNC_EXECUTION", "").lower() == "true"
 )
 
+# Batched workflow execution: a run keeps its tokens and graph in memory and
+# writes its token and log rows in bulk at checkpoints. "false" falls back to
+# one query-backed pick and immediate writes per step.
+WORKFLOWS_BATCHED_EXECUTION = (
+    os.environ.get("WORKFLOWS_BATCHED_EXECUTION", "true").lower() != "false"
+)
+
 # Kill-switch for inbound workflow webhooks: when disabled, hook
 # URLs answer 404 uniformly, for environments that want no unauthenticated
 # ingress at all.
@@ -72,22 +72,17 @@ def get_strategy() -> str:
     so every inheritance surface — analytics panels, report toggle — disappears
     while the backend logic stays intact behind the flag.
     """
+    from global_settings.cache import get_global_setting
     from global_settings.models import GlobalSettings
 
-    try:
-        flags = GlobalSettings.objects.get(
-            name=GlobalSettings.Names.FEATURE_FLAGS
-        ).value
-    except GlobalSettings.DoesNotExist:
-        flags = {}
+    flags = get_global_setting(GlobalSettings.Names.FEATURE_FLAGS)
     if not (flags or {}).get("audit_tree_inheritance", False):
         return AuditTreeAggregationStrategy.NONE
 
-    try:
-        gs = GlobalSettings.objects.get(name=GlobalSettings.Names.GENERAL)
-    except GlobalSettings.DoesNotExist:
+    general = get_global_setting(GlobalSettings.Names.GENERAL)
+    if general is None:
         return AuditTreeAggregationStrategy.NONE
-    strategy = (gs.value or {}).get(
+    strategy = (general or {}).get(
         "audit_tree_aggregation_strategy", AuditTreeAggregationStrategy.NONE
     )
     # Normalize: a typo or legacy value must disable inheritance, never silently
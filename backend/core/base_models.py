@@ -123,20 +123,36 @@ class AbstractBaseModel(models.Model):
             ).order_by("created_at", "id")
         return self.__class__.objects.all().order_by("created_at", "id")
 
-    def clean(self) -> None:
-        scope = self.get_scope()
+    def get_uniqueness_errors(self, is_unique) -> dict[str, str]:
+        """
+        Errors for the fields_to_check whose values are already used in the scope.
+
+        Args:
+            is_unique: callable telling whether the object is unique in its scope
+                based on the given fields
+
+        Returns:
+            a dict mapping field names to error messages, empty if the object is unique
+        """
         field_errors = {}
         _fields_to_check = (
             self.fields_to_check if hasattr(self, "fields_to_check") else []
         )
         # TODO: define fields_to_check explicitly where it is needed. ref_id should be preferred over name for referential objects
 
-        if not self.is_unique_in_scope(scope=scope, fields_to_check=_fields_to_check):
+        if not is_unique(_fields_to_check):
             for field in _fields_to_check:
-                if not self.is_unique_in_scope(scope=scope, fields_to_check=[field]):
+                if not is_unique([field]):
                     field_errors[field] = (
                         f"{getattr(self, field)} is already used in this scope. Please choose another value."
                     )
+        return field_errors
+
+    def clean(self) -> None:
+        scope = self.get_scope()
+        field_errors = self.get_uniqueness_errors(
+            lambda fields: self.is_unique_in_scope(scope=scope, fields_to_check=fields)
+        )
         super().clean()
         if field_errors:
             raise ValidationError(field_errors)
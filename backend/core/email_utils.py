@@ -11,7 +11,7 @@ from typing import Dict, Optional
 from django.conf import settings
 from django.utils.html import escape as html_escape
 from django.utils.translation import get_language
-from global_settings.models import GlobalSettings
+from global_settings.cache import get_global_setting
 from iam.models import User
 import structlog
 
@@ -44,9 +44,9 @@ def get_locale_for_email(email: str) -> str:
         logger.warning("Failed to resolve user locale for email lookup: %s", e)
 
     try:
-        general = GlobalSettings.objects.filter(name="general").first()
-        if general and isinstance(general.value, dict):
-            return general.value.get("default_language", "en")
+        general = get_global_setting("general")
+        if isinstance(general, dict):
+            return general.get("default_language", "en")
     except Exception as e:
         logger.warning("Failed to resolve default language from global settings: %s", e)
 
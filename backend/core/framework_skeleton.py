@@ -0,0 +1,233 @@
+"""Framework skeletons for the compliance assessment requirement trees.
+
+The requirement tree of an audit is the tree of its framework's requirement
+nodes, with the requirement assessments of the audit overlaid on it. The node
+part (order, parent links, translated names, questions...) only changes when
+the framework does, so it is built once per framework and language and kept
+in the ``core.framework_skeletons`` snapshot of the CacheRegistry: saving a
+framework, one of its requirement nodes or questions bumps the snapshot
+version with a ``framework:<id>`` journal entry, and every process drops the
+skeletons of that framework only.
+
+Skeletons are also keyed on ``Framework.updated_at``, which changes whenever
+the framework is (re)imported from its library, since bulk imports do not
+send the signals of the nodes they write.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+from django.db import transaction
+from django.utils.translation import get_language
+
+from iam.snapshot_cache import CacheRegistry, ChangeEntry
+from library.helpers import get_referential_translation
+
+from .models import Framework, RequirementNode
+from .utils import build_answers_dict, camel_case
+
+FRAMEWORK_SKELETON_KEY = "core.framework_skeletons"
+
+
+@dataclass(frozen=True, slots=True)
+class FrameworkSkeleton:
+    """
+    The requirement nodes of a framework, ready to be overlaid.
+
+    nodes holds the static payload of each node by node id, top_level the ids
+    of the root nodes and children the ids of the children of each node, both
+    sorted by order_id. score_bounds holds the (max_score, min_score) override
+    of the nodes that have one.
+    """
+
+    nodes: dict[str, dict]
+    top_level: tuple[str, ...]
+    children: dict[str, tuple[str, ...]]
+    score_bounds: dict[str, tuple[Optional[int], Optional[int]]]
+
+    @classmethod
+    def from_requirement_nodes(cls, requirement_nodes: list) -> "FrameworkSkeleton":
+        # Cope for old version not creating order_id correctly
+        for req in requirement_nodes:
+            if req.order_id is None:
+                req.order_id = req.created_at
+
+        children_by_urn: dict = {}
+        for node in requirement_nodes:
+            children_by_urn.setdefault(node.parent_urn, []).append(node)
+        for siblings in children_by_urn.values():
+            siblings.sort(key=lambda x: x.order_id)
+
+        top_level = [rn for rn in requirement_nodes if not rn.parent_urn]
+        top_level.sort(key=lambda x: x.order_id)
+
+        return cls(
+            nodes={
+                str(node.id): {
+                    "urn": node.urn,
+                    "parent_urn": node.parent_urn,
+                    "ref_id": node.ref_id,
+                    "name": get_referential_translation(node, "name"),
+                    "implementation_groups": node.implementation_groups or None,
+                    "weight": node.weight if node.weight else 1,
+                    "questions": node.get_questions_translated,
+                    "node_content": node.display_long,
+                    "display_mode": node.display_mode,
+                    "assessable": node.assessable,
+                    "description": get_referential_translation(node, "description"),
+                }
+                for node in requirement_nodes
+            },
+            top_level=tuple(str(node.id) for node in top_level),
+            children={
+                str(node.id): tuple(
+                    str(child.id) for child in children_by_urn.get(node.urn, ())
+                )
+                for node in requirement_nodes
+            },
+            score_bounds={
+                str(node.id): (node.max_score, node.min_score)
+                for node in requirement_nodes
+                if node.max_score is not None or node.min_score is not None
+            },
+        )
+
+    def build_tree(
+        self,
+        requirements_assessed: Optional[Iterable] = None,
+        max_score: int = 0,
+        min_score: int = 0,
+    ) -> dict:
+        """
+        Overlay requirement assessments on the skeleton. Returns the same tree
+        as get_sorted_requirement_nodes for the nodes of the skeleton.
+        max_score/min_score: the CA or framework scale, used when a node has
+        no override.
+        """
+        requirement_assessment_from_requirement_id = {
+            str(ra.requirement_id): ra for ra in (requirements_assessed or [])
+        }
+
+        def node_data(node_id: str, style: str) -> dict:
+            node = self.nodes[node_id]
+            req_as = requirement_assessment_from_requirement_id.get(node_id)
+            node_max, node_min = self.score_bounds.get(node_id, (None, None))
+            return {
+                "urn": node["urn"],
+                "parent_urn": node["parent_urn"],
+                "ref_id": node["ref_id"],
+                "name": node["name"],
+                "implementation_groups": node["implementation_groups"],
+                "ra_id": str(req_as.id) if req_as else None,
+                "status": req_as.status if req_as else None,
+                "result": req_as.result if req_as else None,
+                "extended_result": req_as.extended_result if req_as else None,
+                "is_scored": req_as.is_scored if req_as else None,
+                "score": req_as.score if req_as else None,
+                "documentation_score": req_as.documentation_score if req_as else None,
+                "max_score": (node_max if node_max is not None else max_score)
+                if req_as
+                else None,
+                "min_score": (node_min if node_min is not None else min_score)
+                if req_as
+                else None,
+                "weight": node["weight"],
+                "questions": node["questions"],
+                "answers": build_answers_dict(req_as.answers.all()) if req_as else None,
+                "mapping_inference": req_as.mapping_inference if req_as else None,
+                "status_display": req_as.get_status_display() if req_as else None,
+                "status_i18n": camel_case(req_as.status) if req_as else None,
+                "result_i18n": camel_case(req_as.result)
+                if req_as and req_as.result is not None
+                else None,
+                "node_content": node["node_content"],
+                "display_mode": node["display_mode"],
+                "style": style,
+                "assessable": node["assessable"],
+                "description": node["description"],
+                "children": build(self.children[node_id], "leaf"),
+            }
+
+        def build(node_ids: Sequence[str], style: str) -> dict:
+            return {node_id: node_data(node_id, style) for node_id in node_ids}
+
+        return build(self.top_level, "node")
+
+
+def build_framework_skeleton(framework: Framework) -> FrameworkSkeleton:
+    return FrameworkSkeleton.from_requirement_nodes(
+        list(
+            RequirementNode.objects.filter(framework=framework).prefetch_related(
+                "questions", "questions__choices"
+            )
+        )
+    )
+
+
+def get_framework_skeleton(framework: Framework) -> FrameworkSkeleton:
+    """The skeleton of `framework` in the active language, built on first use."""
+    skeletons = CacheRegistry.hydrate(FRAMEWORK_SKELETON_KEY)
+    key = (str(framework.id), framework.updated_at, get_language())
+    skeleton = skeletons.get(key)
+    if skeleton is None:
+        skeleton = skeletons[key] = build_framework_skeleton(framework)
+    return skeleton
+
+
+def apply_framework_skeleton_changes(
+    skeletons: dict, changes: Sequence[ChangeEntry]
+) -> dict:
+    """Drop the skeletons of the frameworks named in the journal."""
+    framework_ids = set()
+    for change in changes:
+        kind, _, framework_id = change.object_id.partition(":")
+        if kind != "framework":
+            return {}
+        framework_ids.add(framework_id)
+    return {
+        key: skeleton
+        for key, skeleton in skeletons.items()
+        if key[0] not in framework_ids
+    }
+
+
+def invalidate_framework_skeleton(framework_id) -> None:
+    """
+    Drop the skeletons of a framework in every process once the current
+    transaction commits. The frameworks changed by a transaction are journaled
+    in a single version bump, however many nodes and questions it saves.
+    """
+    if framework_id is None:
+        return
+    connection = transaction.get_connection()
+    flush = getattr(connection, "_framework_skeleton_flush", None)
+    # The callbacks of a rolled back transaction are dropped: start a new batch
+    if flush is None or not any(
+        func is flush for _, func, _ in connection.run_on_commit
+    ):
+        framework_ids = set()
+
+        def flush():
+            if getattr(connection, "_framework_skeleton_flush", None) is flush:
+                connection._framework_skeleton_flush = None
+            CacheRegistry.invalidate(
+                FRAMEWORK_SKELETON_KEY,
+                [ChangeEntry.upsert(f"framework:{pk}") for pk in sorted(framework_ids)],
+            )
+
+        flush.framework_ids = framework_ids
+        connection._framework_skeleton_flush = flush
+        framework_ids.add(str(framework_id))
+        transaction.on_commit(flush)
+    else:
+        flush.framework_ids.add(str(framework_id))
+
+
+# Import-time registration (DB-free). Skeletons are built on demand, so the
+# snapshot starts empty and is only hydrated by get_framework_skeleton.
+CacheRegistry.register(
+    FRAMEWORK_SKELETON_KEY,
+    dict,
+    delta_applier=apply_framework_skeleton_changes,
+    lazy=True,
+)
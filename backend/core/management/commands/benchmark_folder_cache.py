@@ -0,0 +1,169 @@
+"""
+Microbenchmark of the folder snapshot lookups used by RBAC resolution.
+
+Compares the former tree walks (children_map traversal for subtrees, parent_map
+walks for ancestors) with the Euler-tour index and ancestor tuples of
+FolderCacheState, on a synthetic tree. Needs no database.
+
+    python manage.py benchmark_folder_cache --folders 10000 --shape random
+"""
+
+import random
+import time
+import uuid
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from iam.cache_builders import (
+    descendant_ids_within,
+    folder_cache_state_from_folders,
+    is_descendant_id,
+)
+
+
+def _synthetic_folders(size, shape, rng):
+    folders = [
+        SimpleNamespace(
+            id=uuid.UUID(int=rng.getrandbits(128)),
+            name="Global",
+            parent_folder_id=None,
+            content_type="GL",
+        )
+    ]
+    for index in range(1, size):
+        if shape == "balanced":
+            parent = folders[(index - 1) // 10]
+        elif shape == "deep":
+            parent = folders[max(0, index - rng.randint(1, 5))]
+        else:
+            parent = rng.choice(folders)
+        folders.append(
+            SimpleNamespace(
+                id=uuid.UUID(int=rng.getrandbits(128)),
+                name=f"Domain {index}",
+                parent_folder_id=parent.id,
+                content_type="DO",
+            )
+        )
+    return folders
+
+
+# Former code paths, kept verbatim for comparison.
+def _walk_descendants(state, start_id):
+    stack = [start_id]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(reversed(state.children_map.get(current, ())))
+
+
+def _walk_is_in_perimeter(state, folder_id, perimeter_ids):
+    current = folder_id
+    while current is not None:
+        if current in perimeter_ids:
+            return True
+        current = state.parent_map.get(current)
+    return False
+
+
+def _walk_ancestors(state, folder_ids):
+    ancestor_ids = set()
+    for folder_id in folder_ids:
+        parent_id = state.parent_map.get(folder_id)
+        while parent_id and parent_id not in ancestor_ids:
+            ancestor_ids.add(parent_id)
+            parent_id = state.parent_map.get(parent_id)
+    return ancestor_ids
+
+
+def _indexed_ancestors(state, folder_ids):
+    ancestor_ids = set()
+    for folder_id in folder_ids:
+        for ancestor_id in reversed(state.ancestors_map[folder_id]):
+            if ancestor_id in ancestor_ids:
+                break
+            ancestor_ids.add(ancestor_id)
+    return ancestor_ids
+
+
+def _best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000.0, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark folder-tree lookups (tree walks vs Euler-tour index)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--folders", type=int, default=10000)
+        parser.add_argument(
+            "--shape", choices=["random", "balanced", "deep"], default="random"
+        )
+        parser.add_argument("--lookups", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        repeat = options["repeat"]
+        lookups = options["lookups"]
+        folders = _synthetic_folders(options["folders"], options["shape"], rng)
+
+        build_ms, state = _best_of(
+            repeat, lambda: folder_cache_state_from_folders(folders, "GL")
+        )
+        ids = list(state.folders)
+        depths = state.depth_map.values()
+        self.stdout.write(
+            f"{len(ids)} folders ({options['shape']}), max depth {max(depths)}, "
+            f"snapshot build {build_ms:.1f} ms"
+        )
+
+        scopes = [rng.choice(ids) for _ in range(lookups)]
+        perimeters = [rng.choice(ids) for _ in range(lookups)]
+        targets = [rng.choice(ids) for _ in range(lookups)]
+
+        cases = [
+            (
+                "recursive perimeter within scope",
+                lambda: [
+                    set(_walk_descendants(state, pf)) & set(_walk_descendants(state, s))
+                    for pf, s in zip(perimeters, scopes)
+                ],
+                lambda: [
+                    set(descendant_ids_within(state, pf, s))
+                    for pf, s in zip(perimeters, scopes)
+                ],
+            ),
+            (
+                "subtree membership",
+                lambda: [
+                    _walk_is_in_perimeter(state, f, {pf})
+                    for f, pf in zip(targets, perimeters)
+                ],
+                lambda: [
+                    is_descendant_id(state, f, pf) for f, pf in zip(targets, perimeters)
+                ],
+            ),
+            (
+                "published ancestors",
+                lambda: _walk_ancestors(state, targets),
+                lambda: _indexed_ancestors(state, targets),
+            ),
+        ]
+
+        self.stdout.write(f"{'case':<36}{'walk ms':>12}{'index ms':>12}{'speedup':>10}")
+        for label, legacy, indexed in cases:
+            legacy_ms, expected = _best_of(repeat, legacy)
+            indexed_ms, result = _best_of(repeat, indexed)
+            if result != expected:
+                raise AssertionError(f"{label}: results differ")
+            speedup = legacy_ms / indexed_ms if indexed_ms else float("inf")
+            self.stdout.write(
+                f"{label:<36}{legacy_ms:>12.2f}{indexed_ms:>12.2f}{speedup:>9.1f}x"
+            )
@@ -0,0 +1,102 @@
+"""
+Benchmark of the data wizard asset import on a synthetic CMDB extract: the
+records are imported into an empty domain, then imported again with
+on_conflict=update, row by row and in bulk. Writes into the configured
+database, inside a transaction that is rolled back.
+
+    python manage.py benchmark_record_import --assets 5000
+"""
+
+import random
+import time
+import uuid
+from unittest.mock import MagicMock
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Asset
+from data_wizard.views import AssetRecordConsumer, BaseContext, ConflictMode
+from iam.models import Folder, User
+
+LABELS = ["prod", "staging", "dev", "pci", "gdpr", "legacy"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the bulk asset import against the row-by-row import."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assets", type=int, default=5000)
+        parser.add_argument(
+            "--batch-size", type=int, default=AssetRecordConsumer.BULK_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--skip-row-by-row",
+            action="store_true",
+            help="Only time the bulk import.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.benchmark(options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, options):
+        rng = random.Random(options["seed"])
+        suffix = uuid.uuid4().hex[:8]
+        root = Folder.get_root_folder()
+        user = User.objects.create_superuser(f"benchmark-{suffix}@localhost")
+        request = MagicMock()
+        request.user = user
+
+        def records(count, revision):
+            rows = []
+            for index in range(count):
+                row = {
+                    "ref_id": f"CI-{index:06d}",
+                    "name": f"host-{index:06d}",
+                    "type": rng.choice(["primary", "support"]),
+                    "description": f"Configuration item {index} (rev. {revision})",
+                    "labels": "|".join(rng.sample(LABELS, 2)),
+                    "security_objectives": "confidentiality: 2, integrity: 3",
+                }
+                if index % 10:
+                    row["parent_assets"] = f"CI-{index - index % 10:06d}"
+                rows.append(row)
+            return rows
+
+        def run(label, batch_size, domain, on_conflict, rows):
+            AssetRecordConsumer.BULK_BATCH_SIZE = batch_size
+            context = BaseContext(
+                request=request, folder_id=str(domain.id), on_conflict=on_conflict
+            )
+            start = time.perf_counter()
+            result = AssetRecordConsumer(context).process_records(rows)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label:<11} {on_conflict.value:<7} {elapsed:7.2f} s "
+                f"({len(rows) / elapsed:,.0f} records/s) "
+                f"created={result.created} updated={result.updated} "
+                f"failed={result.failed}"
+            )
+
+        count = options["assets"]
+        initial, revised = records(count, 1), records(count, 2)
+        self.stdout.write(f"{count} assets, batch size {options['batch_size']}")
+        modes = [("bulk", options["batch_size"])]
+        if not options["skip_row_by_row"]:
+            modes.append(("row by row", 0))
+        batch_size = AssetRecordConsumer.BULK_BATCH_SIZE
+        try:
+            for label, size in modes:
+                domain = Folder.objects.create(
+                    parent_folder=root,
+                    name=f"benchmark-import-{label}-{suffix}",
+                    content_type=Folder.ContentType.DOMAIN,
+                )
+                run(label, size, domain, ConflictMode.STOP, initial)
+                run(label, size, domain, ConflictMode.UPDATE, revised)
+                assert Asset.objects.filter(folder=domain).count() == count
+        finally:
+            AssetRecordConsumer.BULK_BATCH_SIZE = batch_size
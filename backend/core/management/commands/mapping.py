@@ -7,6 +7,7 @@ import time
 from typing import Dict, Tuple
 import json
 import zlib
+from collections import defaultdict
 
 from core.utils import sizeof_json
 
@@ -14,6 +15,11 @@ NUM_FRAMEWORKS = 1000
 NUM_MAPPINGS = 100
 NUM_PIVOTS = 10
 
+BENCHMARK_REQUIREMENTS = 1000
+BENCHMARK_HOPS = 3
+BENCHMARK_RUNS = 20
+RELATIONSHIPS = ["equal", "superset", "subset", "intersect", "not_related"]
+
 
 class Command(BaseCommand):
     help = "Displays mappings with optional test data and pruning"
@@ -30,6 +36,23 @@ class Command(BaseCommand):
             default=None,
             help="Profondeur maximale des chemins à explorer (optionnel)",
         )
+        parser.add_argument(
+            "--benchmark",
+            action="store_true",
+            help="Benchmark mapping a simulated audit across a chain of mapping sets",
+        )
+        parser.add_argument(
+            "--requirements",
+            type=int,
+            default=BENCHMARK_REQUIREMENTS,
+            help="Number of requirements of each simulated framework (--benchmark)",
+        )
+        parser.add_argument(
+            "--hops",
+            type=int,
+            default=BENCHMARK_HOPS,
+            help="Number of mapping sets between source and target (--benchmark)",
+        )
 
     def generate_test_data(self) -> Dict[Tuple[str, str], bytes]:
         random.seed(42)  # Fixed seed for reproducibility
@@ -72,6 +95,137 @@ class Command(BaseCommand):
 
         return all_rms
 
+    def generate_chain_data(
+        self, n_requirements: int, hops: int
+    ) -> Tuple[Dict[Tuple[str, str], bytes], dict, dict]:
+        """
+        Simulated chain of frameworks urn:framework:0 -> ... -> urn:framework:<hops>,
+        each requirement being mapped to 1-3 requirements of the next framework,
+        and an audit of the first framework.
+        """
+        random.seed(42)
+        frameworks = [f"urn:framework:{i}" for i in range(hops + 1)]
+        all_rms: Dict[Tuple[str, str], bytes] = {}
+        for source, target in zip(frameworks, frameworks[1:]):
+            obj = {
+                "urn": f"urn:rms:{source}-{target}",
+                "name": f"{source} to {target}",
+                "library_urn": "urn:library:test",
+                "source_framework_urn": source,
+                "target_framework_urn": target,
+                "requirement_mappings": [
+                    {
+                        "source_requirement_urn": f"{source}:req:{i}",
+                        "target_requirement_urn": f"{target}:req:{j}",
+                        "relationship": random.choice(RELATIONSHIPS),
+                    }
+                    for i in range(n_requirements)
+                    for j in random.sample(range(n_requirements), random.randint(1, 3))
+                ],
+            }
+            all_rms[(source, target)] = zlib.compress(
+                json.dumps(obj, separators=(",", ":")).encode("utf-8")
+            )
+        framework_data = {
+            urn: {"min_score": 0, "max_score": 100, "id": urn, "name": urn}
+            for urn in frameworks
+        }
+        audit = {
+            "min_score": 0,
+            "max_score": 100,
+            "requirement_assessments": {
+                f"{frameworks[0]}:req:{i}": {
+                    "result": random.choice(
+                        ["compliant", "partially_compliant", "non_compliant"]
+                    ),
+                    "status": "done",
+                    "score": random.randint(0, 100),
+                    "is_scored": True,
+                    "observation": "",
+                    "documentation_score": None,
+                    "applied_controls": [str(uuid.uuid4())],
+                    "security_exceptions": [],
+                    "evidences": [],
+                    "name": f"Requirement {i}",
+                    "id": str(uuid.uuid4()),
+                    "source_framework": {"id": frameworks[0], "name": frameworks[0]},
+                }
+                for i in range(n_requirements)
+            },
+        }
+        return all_rms, framework_data, audit
+
+    def benchmark(self, n_requirements: int, hops: int) -> None:
+        all_rms, framework_data, audit = self.generate_chain_data(n_requirements, hops)
+        engine.frameworks = framework_data
+        engine.all_rms = all_rms
+        engine.framework_mappings = defaultdict(list)
+        engine.direct_mappings = set(all_rms)
+        for src, tgt in all_rms:
+            engine.framework_mappings[src].append(tgt)
+        source_urn, dest_urn = "urn:framework:0", f"urn:framework:{hops}"
+        path = engine.all_paths_between(source_urn, dest_urn)[0]
+
+        def map_uncompiled():
+            # Decompress and walk every mapping set for each hop
+            results = audit
+            for hop_index, (src, tgt) in enumerate(zip(path, path[1:]), start=1):
+                results = engine.map_audit_results(
+                    results, engine.get_rms((src, tgt)), hop_index, path
+                )
+            return results
+
+        def map_compiled():
+            return engine.best_mapping_inferences(audit, source_urn, dest_urn)[0]
+
+        def timed(func) -> float:
+            start = time.perf_counter()
+            for _ in range(BENCHMARK_RUNS):
+                results = func()
+            return (time.perf_counter() - start) * 1000 / BENCHMARK_RUNS, results
+
+        def count_uncompiled():
+            # Decompress the mapping set of each neighbour to count its mappings
+            coverage = {}
+            for neighbor in engine.get_framework_neighbors(source_urn):
+                rms = engine.get_rms((source_urn, neighbor))
+                relationships = [
+                    mapping["relationship"] for mapping in rms["requirement_mappings"]
+                ]
+                coverage[neighbor] = (
+                    sum(rel in ("subset", "intersect") for rel in relationships),
+                    sum(rel in ("equal", "superset") for rel in relationships),
+                )
+            return coverage
+
+        def count_compiled():
+            return engine.paths_and_coverages(source_urn)
+
+        start = time.perf_counter()
+        engine.compile_path(path)
+        compile_ms = (time.perf_counter() - start) * 1000
+        uncompiled_ms, uncompiled = timed(map_uncompiled)
+        compiled_ms, compiled = timed(map_compiled)
+        assert compiled == uncompiled
+        uncompiled_count_ms, uncompiled_count = timed(count_uncompiled)
+        compiled_count_ms, compiled_count = timed(count_compiled)
+        assert compiled_count == uncompiled_count
+
+        print(
+            f"📐 {n_requirements} requirements, {hops} hops, "
+            f"{len(compiled['requirement_assessments'])} inferred requirements"
+        )
+        print(f"   🧱 Index compilation: {compile_ms:.2f} ms (once per cache version)")
+        print(f"   🐢 Decompressing mapping sets: {uncompiled_ms:.2f} ms / audit")
+        print(f"   🚀 Compiled index: {compiled_ms:.2f} ms / audit")
+        print(
+            f"   🐢 Coverage counts, decompressing: {uncompiled_count_ms:.3f} ms "
+            "/ framework"
+        )
+        print(
+            f"   🚀 Coverage counts, compiled: {compiled_count_ms:.3f} ms / framework"
+        )
+
     def format_summary_inline(self, summary):
         """
         Return a prettified single-line summary of audit results.
@@ -104,6 +258,10 @@ class Command(BaseCommand):
         test_mode = options.get("test")
         max_depth = options.get("depth")
 
+        if options.get("benchmark"):
+            self.benchmark(options["requirements"], options["hops"])
+            return
+
         if test_mode:
             print("🔧 Test mode enabled: generating simulated data...")
             engine.all_rms = self.generate_test_data()
@@ -0,0 +1,90 @@
+"""Rebuild or verify the ComplianceAssessmentAggregate rows.
+
+The aggregates are maintained incrementally by RequirementAssessment.save()
+and rebuilt on read when missing or stale, so this command is not needed in
+normal operation. Use it to warm the rows after a migration or a bulk data
+fix, or with `--verify` to check that the stored rows match a full scan of
+the requirement assessments (nothing is written then).
+"""
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ComplianceAssessment, ComplianceAssessmentAggregate
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or verify) the aggregates of the compliance assessments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compliance-assessment",
+            type=str,
+            default=None,
+            help="UUID of a single compliance assessment (default: all).",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare the stored aggregates with a full recomputation instead of rebuilding them.",
+        )
+
+    def handle(self, *args, **options):
+        ca_uuid = options.get("compliance_assessment")
+        compliance_assessments = ComplianceAssessment.objects.select_related(
+            "framework"
+        ).order_by("created_at")
+        if ca_uuid:
+            try:
+                compliance_assessments = compliance_assessments.filter(pk=ca_uuid)
+                if not compliance_assessments.exists():
+                    raise ComplianceAssessment.DoesNotExist
+            except (ComplianceAssessment.DoesNotExist, ValidationError) as exc:
+                raise CommandError(
+                    f"ComplianceAssessment {ca_uuid!r} not found or not a valid UUID"
+                ) from exc
+
+        if options.get("verify"):
+            self._verify(compliance_assessments)
+            return
+
+        count = 0
+        for ca in compliance_assessments.iterator(chunk_size=200):
+            ComplianceAssessmentAggregate.rebuild(ca)
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt the aggregates of {count} audit(s).")
+        )
+
+    def _verify(self, compliance_assessments):
+        checked = 0
+        failures = []
+        for aggregate in ComplianceAssessmentAggregate.objects.filter(
+            compliance_assessment__in=compliance_assessments
+        ).select_related("compliance_assessment__framework"):
+            ca = aggregate.compliance_assessment
+            if aggregate.implementation_groups_key != (
+                ComplianceAssessmentAggregate.implementation_groups_key_for(ca)
+            ) or aggregate.parameters != (
+                ComplianceAssessmentAggregate.parameters_for(ca)
+            ):
+                continue  # Stale, rebuilt on its next read
+            checked += 1
+            mismatches = aggregate.verify()
+            if mismatches:
+                details = ", ".join(
+                    f"{field}: stored={stored!r} expected={expected!r}"
+                    for field, (stored, expected) in mismatches.items()
+                )
+                failures.append(f"CA={ca.pk}: {details}")
+
+        if failures:
+            joined = "\n  - ".join(failures)
+            raise CommandError(
+                f"{len(failures)} of {checked} aggregate(s) differ from a full "
+                f"recomputation. Run the command without --verify to rebuild "
+                f"them.\n  - {joined}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{checked} aggregate(s) match a full recomputation.")
+        )
@@ -6,17 +6,131 @@ from core.models import (
 )
 from django.db.models.query import QuerySet
 from collections import defaultdict, deque
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Sequence
 import json
 import zlib
 
+from django.db import transaction
+from django.db.utils import OperationalError, ProgrammingError
+
+from iam.snapshot_cache import CacheRegistry, ChangeEntry
+
+MAPPING_ENGINE_KEY = "core.mappings"
+
+# Relationship strength of a requirement mapping: what a source requirement
+# assessment tells about the target requirement.
+NO_COVERAGE = 0
+PARTIAL_COVERAGE = 1
+FULL_COVERAGE = 2
+
+RELATIONSHIP_STRENGTH = {
+    "equal": FULL_COVERAGE,
+    "superset": FULL_COVERAGE,
+    "subset": PARTIAL_COVERAGE,
+    "intersect": PARTIAL_COVERAGE,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledMappingSet:
+    """
+    A requirement mapping set parsed once per cache version, for repeated
+    inferences and coverage counts.
+
+    edges holds the (source requirement urn, target requirement urn,
+    relationship, strength) of the mappings in document order. Audits hold
+    every assessable requirement of their framework, so the edges are walked
+    in full rather than looked up by source requirement.
+    """
+
+    source_framework_urn: str
+    target_framework_urn: str
+    info: dict
+    edges: tuple[tuple[str, str, str, int], ...]
+    partial_count: int
+    full_count: int
+
+    @classmethod
+    def from_rms(cls, requirement_mapping_set: dict) -> "CompiledMappingSet":
+        edges = tuple(
+            (
+                mapping["source_requirement_urn"],
+                mapping["target_requirement_urn"],
+                mapping["relationship"],
+                RELATIONSHIP_STRENGTH.get(mapping["relationship"], NO_COVERAGE),
+            )
+            for mapping in requirement_mapping_set.get("requirement_mappings", [])
+        )
+        strengths = [strength for *_, strength in edges]
+        return cls(
+            source_framework_urn=requirement_mapping_set.get(
+                "source_framework_urn", ""
+            ),
+            target_framework_urn=requirement_mapping_set.get(
+                "target_framework_urn", ""
+            ),
+            info={
+                k: v
+                for k, v in {
+                    "urn": requirement_mapping_set.get("urn"),
+                    "name": requirement_mapping_set.get("name"),
+                    "ref_id": requirement_mapping_set.get("ref_id"),
+                    "id": requirement_mapping_set.get("id"),
+                    "library_urn": requirement_mapping_set.get("library_urn"),
+                }.items()
+                if v
+            },
+            edges=edges,
+            partial_count=strengths.count(PARTIAL_COVERAGE),
+            full_count=strengths.count(FULL_COVERAGE),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class MappingState:
+    """
+    Snapshot of the mapping engine data, shared through the CacheRegistry.
+
+    library_rms lists the (source, target) indexes of the RMS of each library
+    (by library id), so that a changed library only reloads its own RMS.
+    compiled holds the mapping sets compiled from all_rms, filled on demand.
+    """
+
+    frameworks: dict
+    all_rms: dict
+    framework_mappings: "defaultdict[str, list[str]]"
+    direct_mappings: set[tuple[str, str]]
+    library_rms: dict[str, tuple[tuple[str, str], ...]]
+    compiled: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_data(
+        cls, frameworks: dict, all_rms: dict, library_rms: dict
+    ) -> "MappingState":
+        framework_mappings: "defaultdict[str, list[str]]" = defaultdict(list)
+        for src, tgt in all_rms:
+            framework_mappings[src].append(tgt)
+        return cls(
+            frameworks=frameworks,
+            all_rms=all_rms,
+            framework_mappings=framework_mappings,
+            direct_mappings=set(all_rms),
+            library_rms=library_rms,
+        )
+
 
 class MappingEngine:
     def __init__(self):
         self._all_rms = None
+        self._compiled_rms = {}
         self._framework_mappings = None
         self._frameworks = None
         self._direct_mappings = None
+        # Data comes from the MAPPING_ENGINE_KEY snapshot of the CacheRegistry,
+        # until explicitly replaced through the setters (tests, simulations).
+        self._state = None
+        self._follows_registry = True
 
         self.fields_to_map: list[str] = [
             "result",
@@ -34,8 +148,28 @@ class MappingEngine:
         ]
 
     def _ensure_loaded(self):
-        if self._frameworks is None:
-            self.reload_cache()
+        if not getattr(self, "_follows_registry", False):
+            if self._frameworks is None:
+                self.reload_cache()
+            return
+        # Picks up the changes made by other processes: one version query,
+        # shared with the IAM caches and throttled by the CacheRegistry.
+        try:
+            state = CacheRegistry.hydrate(MAPPING_ENGINE_KEY)
+        except ProgrammingError, OperationalError:
+            # Tables might not exist during migrations. Preserve whatever
+            # cache state already exists and let the next access retry.
+            return
+        if state is not self._state:
+            self._use_state(state)
+
+    def _use_state(self, state: MappingState) -> None:
+        self._state = state
+        self._frameworks = state.frameworks
+        self._all_rms = state.all_rms
+        self._compiled_rms = state.compiled
+        self._framework_mappings = state.framework_mappings
+        self._direct_mappings = state.direct_mappings
 
     @property
     def all_rms(self):
@@ -44,7 +178,9 @@ class MappingEngine:
 
     @all_rms.setter
     def all_rms(self, value):
+        self._follows_registry = False
         self._all_rms = value
+        self._compiled_rms = {}
 
     @property
     def framework_mappings(self):
@@ -53,6 +189,7 @@ class MappingEngine:
 
     @framework_mappings.setter
     def framework_mappings(self, value):
+        self._follows_registry = False
         self._framework_mappings = value
 
     @property
@@ -62,6 +199,7 @@ class MappingEngine:
 
     @frameworks.setter
     def frameworks(self, value):
+        self._follows_registry = False
         self._frameworks = value
 
     @property
@@ -71,6 +209,7 @@ class MappingEngine:
 
     @direct_mappings.setter
     def direct_mappings(self, value):
+        self._follows_registry = False
         self._direct_mappings = value
 
     # --- Compression helpers ---
@@ -86,48 +225,119 @@ class MappingEngine:
             return None
         return self._decompress_rms(data)
 
+    def get_compiled_rms(self, index: tuple[str, str]) -> Optional[CompiledMappingSet]:
+        """Compiled mapping set of a (source, target) framework pair, built
+        on first use and kept until the RMS data is reloaded."""
+        all_rms = self.all_rms
+        compiled = self._compiled_rms.get(index)
+        if compiled is None and index in all_rms:
+            compiled = self._compiled_rms[index] = CompiledMappingSet.from_rms(
+                self._decompress_rms(all_rms[index])
+            )
+        return compiled
+
+    def compile_path(self, path: list[str]) -> list[CompiledMappingSet]:
+        """Compiled mapping sets of the hops of a path, up to the first hop
+        without a mapping set."""
+        hops = []
+        for source_urn, target_urn in zip(path, path[1:]):
+            compiled = self.get_compiled_rms((source_urn, target_urn))
+            if compiled is None:
+                break
+            hops.append(compiled)
+        return hops
+
     def reload_cache(self) -> None:
-        """Reloads all engine cache data: frameworks and RMS data.
+        """Reloads all engine cache data from the database: frameworks and
+        RMS data, and follows the CacheRegistry snapshot again.
 
-        Builds new local containers from the database first, and only swaps
-        them into the instance attributes after both reads succeed. If the
-        tables are not yet available (e.g. during migrations), the existing
-        instance cache is preserved so ``_ensure_loaded`` can retry later.
+        If the tables are not yet available (e.g. during migrations), the
+        existing instance cache is preserved so ``_ensure_loaded`` can retry
+        later.
         """
-        from django.db.utils import ProgrammingError, OperationalError
-
         try:
-            local_frameworks = self.load_frameworks()
-            (
-                local_all_rms,
-                local_framework_mappings,
-                local_direct_mappings,
-            ) = self.load_rms_data()
+            state = CacheRegistry.hydrate(MAPPING_ENGINE_KEY, force_reload=True)
         except ProgrammingError, OperationalError:
-            # Tables might not exist during migrations. Preserve whatever
-            # cache state already exists and let the next access retry.
             return
+        self._follows_registry = True
+        self._use_state(state)
+
+    def build_state(self) -> MappingState:
+        """Builds the mapping snapshot from the database (CacheRegistry builder)."""
+        frameworks = self.load_frameworks()
+        all_rms, library_rms = self.load_rms_data()
+        return MappingState.from_data(frameworks, all_rms, library_rms)
+
+    def apply_changes(
+        self, state: MappingState, changes: Sequence[ChangeEntry]
+    ) -> Optional[MappingState]:
+        """
+        Brings a snapshot up to date with journaled changes (CacheRegistry delta
+        applier): only the RMS of the changed libraries and the changed
+        frameworks are reloaded. Returns None to request a full rebuild.
+        """
+        library_ids, framework_ids = set(), set()
+        for change in changes:
+            kind, _, object_id = change.object_id.partition(":")
+            if kind == "library":
+                library_ids.add(object_id)
+            elif kind == "framework":
+                framework_ids.add(object_id)
+            else:
+                return None
+
+        frameworks = state.frameworks
+        if framework_ids:
+            frameworks = {
+                urn: info
+                for urn, info in frameworks.items()
+                if info["id"] not in framework_ids
+            }
+            frameworks.update(
+                self.load_frameworks(Framework.objects.filter(id__in=framework_ids))
+            )
 
-        self._frameworks = local_frameworks
-        self._all_rms = local_all_rms
-        self._framework_mappings = local_framework_mappings
-        self._direct_mappings = local_direct_mappings
+        all_rms, library_rms = state.all_rms, state.library_rms
+        if library_ids:
+            all_rms, library_rms = dict(all_rms), dict(library_rms)
+            removed = set()
+            for library_id in library_ids:
+                removed.update(library_rms.pop(library_id, ()))
+            other_indexes = {
+                index for indexes in library_rms.values() for index in indexes
+            }
+            if removed & other_indexes:
+                # An RMS shadowed another library's one: let a rebuild decide
+                return None
+            for index in removed:
+                del all_rms[index]
+            new_rms, new_library_rms = self.load_rms_data(
+                StoredLibrary.objects.filter(id__in=library_ids)
+            )
+            if new_rms.keys() & other_indexes:
+                return None
+            all_rms.update(new_rms)
+            library_rms.update(new_library_rms)
+
+        return MappingState.from_data(frameworks, all_rms, library_rms)
 
     def load_rms_data(
-        self,
-    ) -> tuple[dict, "defaultdict[str, list[str]]", set[tuple[str, str]]]:
+        self, libraries: Optional[QuerySet] = None
+    ) -> tuple[dict, dict[str, tuple[tuple[str, str], ...]]]:
         """
-        Loads requirement mapping sets (RMS) from libraries.
+        Loads requirement mapping sets (RMS) from libraries, all of them by
+        default.
 
-        Returns the tuple ``(all_rms, framework_mappings, direct_mappings)``
-        built from the database. The caller is responsible for swapping these
-        into the instance attributes once the load is known to have succeeded.
+        Returns the tuple ``(all_rms, library_rms)``: the compressed RMS by
+        (source, target) framework urns, and the indexes of the RMS of each
+        library id.
         """
+        if libraries is None:
+            libraries = StoredLibrary.objects.all()
         all_rms: dict = {}
-        framework_mappings: "defaultdict[str, list[str]]" = defaultdict(list)
-        direct_mappings: set[tuple[str, str]] = set()
+        library_rms: dict[str, tuple[tuple[str, str], ...]] = {}
 
-        for lib in StoredLibrary.objects.filter(
+        for lib in libraries.filter(
             Q(content__requirement_mapping_set__isnull=False)
             | Q(content__requirement_mapping_sets__isnull=False),
             is_loaded=True,
@@ -135,6 +345,7 @@ class MappingEngine:
             library_urn = lib.urn
             lib_id = lib.id
             content = lib.content
+            indexes = []
 
             if isinstance(content, dict):
                 if "requirement_mapping_set" in content:
@@ -143,6 +354,7 @@ class MappingEngine:
                     obj["library_urn"] = library_urn
                     obj["id"] = str(lib_id)
                     all_rms[index] = self._compress_rms(obj)
+                    indexes.append(index)
 
                 if "requirement_mapping_sets" in content:
                     for obj in content["requirement_mapping_sets"]:
@@ -153,19 +365,17 @@ class MappingEngine:
                         obj["library_urn"] = library_urn
                         obj["id"] = str(lib_id)
                         all_rms[index] = self._compress_rms(obj)
+                        indexes.append(index)
 
-        for src, tgt in all_rms:
-            framework_mappings[src].append(tgt)
-            direct_mappings.add((src, tgt))
-
-        return all_rms, framework_mappings, direct_mappings
+            library_rms[str(lib_id)] = tuple(indexes)
 
-    def load_frameworks(self) -> dict:
-        """Returns the frameworks mapping loaded from the database.
+        return all_rms, library_rms
 
-        The caller is responsible for swapping the returned dict into the
-        instance attribute after the full reload succeeds.
-        """
+    def load_frameworks(self, frameworks: Optional[QuerySet] = None) -> dict:
+        """Returns the frameworks mapping loaded from the database, for all
+        frameworks by default."""
+        if frameworks is None:
+            frameworks = Framework.objects.all()
         return dict(
             [
                 (
@@ -177,7 +387,7 @@ class MappingEngine:
                         "name": str(f),
                     },
                 )
-                for f in Framework.objects.all()
+                for f in frameworks
             ]
         )
 
@@ -229,20 +439,10 @@ class MappingEngine:
         # as we are in direct mapping only for the moment, the "current" variable is always the destination
         coverage = {}
         for neighbor in self.get_framework_neighbors(source_urn):
-            index = (source_urn, neighbor)
-            rms = self.get_rms(index)
-            if not rms:
+            compiled = self.get_compiled_rms((source_urn, neighbor))
+            if not compiled:
                 continue
-            full_cov = 0
-            partial_cov = 0
-            for requirement in rms["requirement_mappings"]:
-                if requirement["relationship"] in ("subset", "intersect"):
-                    partial_cov += 1
-                elif requirement["relationship"] in ("equal", "superset"):
-                    full_cov += 1
-                else:
-                    continue
-            coverage[neighbor] = (partial_cov, full_cov)
+            coverage[neighbor] = (compiled.partial_count, compiled.full_count)
 
         return coverage
 
@@ -368,7 +568,7 @@ class MappingEngine:
     def map_audit_results(
         self,
         source_audit: dict[str, str | dict[str, str]],
-        requirement_mapping_set: dict,
+        requirement_mapping_set: dict | CompiledMappingSet,
         hop_index: int,
         path: list[str],
     ) -> dict[str, str | dict[str, str]]:
@@ -376,6 +576,10 @@ class MappingEngine:
         # The first hop in 1.
         if not source_audit.get("requirement_assessments"):
             return {}
+        if not isinstance(requirement_mapping_set, CompiledMappingSet):
+            requirement_mapping_set = CompiledMappingSet.from_rms(
+                requirement_mapping_set
+            )
         target_audit: dict[str, str | dict[str, str | dict[str, str]]] = {
             "requirement_assessments": defaultdict(dict)
         }
@@ -383,8 +587,9 @@ class MappingEngine:
         # Framework info may be missing (library references frameworks not in DB).
         # Use .get() and treat missing info as "non equal" so we don't attempt
         # to copy scores that cannot be validated against a target framework.
-        target_framework_urn = requirement_mapping_set.get("target_framework_urn", "")
-        target_framework = self.frameworks.get(target_framework_urn)
+        target_framework = self.frameworks.get(
+            requirement_mapping_set.target_framework_urn
+        )
 
         # Check if score ranges match between source and target frameworks
         scores_compatible = (
@@ -393,21 +598,21 @@ class MappingEngine:
             and target_framework.get("max_score") == source_audit.get("max_score")
         )
 
-        for mapping in requirement_mapping_set["requirement_mappings"]:
-            src = mapping["source_requirement_urn"]
-            dst = mapping["target_requirement_urn"]
-            rel = mapping["relationship"]
+        source_assessments = source_audit["requirement_assessments"]
+        src_fw_urn = requirement_mapping_set.source_framework_urn
+        src_fw_info = self.frameworks.get(src_fw_urn, {})
 
+        for src, dst, _, strength in requirement_mapping_set.edges:
             # Fix 1: Use .get() to avoid defaultdict auto-creation for
             # non-existent source requirements.
-            src_assessment = source_audit["requirement_assessments"].get(src)
+            src_assessment = source_assessments.get(src)
             if src_assessment is None:
                 continue
 
             # Track whether this mapping entry actually wrote data.
             mapped = False
 
-            if rel in ("equal", "superset"):
+            if strength == FULL_COVERAGE:
                 # If we have matching score ranges on the target framework, copy
                 # the whole assessment (including score fields). Otherwise only
                 # copy non-score fields to avoid misrepresenting scores.
@@ -472,7 +677,7 @@ class MappingEngine:
                                 )
                     mapped = True
 
-            elif rel in ("subset", "intersect"):
+            elif strength == PARTIAL_COVERAGE:
                 target_assessment = target_audit["requirement_assessments"][dst]
                 result = src_assessment.get("result")
 
@@ -533,17 +738,7 @@ class MappingEngine:
 
             target_assessment = target_audit["requirement_assessments"][dst]
 
-            mapping_set_info = {
-                k: v
-                for k, v in {
-                    "urn": requirement_mapping_set.get("urn"),
-                    "name": requirement_mapping_set.get("name"),
-                    "ref_id": requirement_mapping_set.get("ref_id"),
-                    "id": requirement_mapping_set.get("id"),
-                    "library_urn": requirement_mapping_set.get("library_urn"),
-                }.items()
-                if v
-            }
+            mapping_set_info = dict(requirement_mapping_set.info)
 
             mapping_inference = target_assessment.get("mapping_inference", {})
             source_requirement_assessments = mapping_inference.get(
@@ -596,9 +791,7 @@ class MappingEngine:
                         "id": ra.get("id"),
                         "urn": src,
                         "str": ra.get("name"),
-                        "coverage": "full"
-                        if rel in ("equal", "superset")
-                        else "partial",
+                        "coverage": "full" if strength == FULL_COVERAGE else "partial",
                         "score": ra.get("score"),
                         "is_scored": ra.get("is_scored"),
                         "source_framework": ra.get("source_framework"),
@@ -609,7 +802,7 @@ class MappingEngine:
                 # Coverage is weakest-link along a path: an earlier-hop source
                 # can only remain "full" through this hop if this hop is also
                 # full (equal/superset). Otherwise it degrades to "partial".
-                hop_full = rel in ("equal", "superset")
+                hop_full = strength == FULL_COVERAGE
 
                 # Propagate sources from earlier hops.
                 for mif_id, mif_value in (
@@ -626,16 +819,12 @@ class MappingEngine:
 
                 # Also record the intermediate requirement itself so
                 # the user sees which mapping set was used for this hop.
-                src_fw_urn = requirement_mapping_set.get("source_framework_urn", "")
-                src_fw_info = self.frameworks.get(src_fw_urn, {})
                 merge_source_requirement_assessment(
                     src,
                     {
                         "urn": src,
                         "str": src_assessment.get("name"),
-                        "coverage": "full"
-                        if rel in ("equal", "superset")
-                        else "partial",
+                        "coverage": "full" if strength == FULL_COVERAGE else "partial",
                         "score": src_assessment.get("score"),
                         "is_scored": src_assessment.get("is_scored"),
                         "source_framework": {
@@ -689,20 +878,13 @@ class MappingEngine:
 
         for path in paths:
             tmp_inferences = source_audit.copy()
-            tmp_urn = source_urn
-            hop_index = 1
-            for urn in path[1:]:
-                rms = self.get_rms((tmp_urn, urn))
-                if not rms:
-                    break
+            for hop_index, rms in enumerate(self.compile_path(path), start=1):
                 tmp_inferences = self.map_audit_results(
                     tmp_inferences,
                     rms,
                     hop_index=hop_index,
                     path=path,
                 )
-                hop_index += 1
-                tmp_urn = urn
 
             if len(tmp_inferences) > len(inferences):
                 inferences = tmp_inferences
@@ -791,3 +973,29 @@ class MappingEngine:
 
 
 engine = MappingEngine()
+
+# Import-time registration (DB-free). Lazy: only hydrated by the engine itself.
+CacheRegistry.register(
+    MAPPING_ENGINE_KEY,
+    engine.build_state,
+    delta_applier=engine.apply_changes,
+    lazy=True,
+)
+
+
+def invalidate_mapping_cache(
+    *,
+    library_ids: Iterable[object] = (),
+    framework_ids: Iterable[object] = (),
+) -> Optional[int]:
+    """
+    Bump the mapping engine snapshot version once the current transaction
+    commits. Other processes then reload only the RMS of `library_ids` and the
+    `framework_ids` frameworks.
+    """
+    changes = [ChangeEntry.upsert(f"library:{pk}") for pk in library_ids] + [
+        ChangeEntry.upsert(f"framework:{pk}") for pk in framework_ids
+    ]
+    transaction.on_commit(
+        lambda: CacheRegistry.invalidate(MAPPING_ENGINE_KEY, changes or None)
+    )
@@ -1,33 +1,36 @@
-from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from core.models import StoredLibrary, Framework
-from core.mappings.engine import engine
+from core.mappings.engine import invalidate_mapping_cache
+
+
+def has_mapping_content(library: StoredLibrary) -> bool:
+    """Whether the library holds frameworks or requirement mapping sets."""
+    content = library.content
+    return isinstance(content, dict) and any(
+        key in content
+        for key in [
+            "requirement_mapping_set",
+            "requirement_mapping_sets",
+            "framework",
+            "frameworks",
+        ]
+    )
 
 
 @receiver(post_save, sender=StoredLibrary)
 @receiver(post_delete, sender=StoredLibrary)
 def update_mapping_engine_cache(sender, instance, **kwargs):
     # Reload RMS data whenever a relevant library is saved (potentially loaded/unloaded) or deleted.
-    content = instance.content
-    if isinstance(content, dict):
-        if any(
-            key in content
-            for key in [
-                "requirement_mapping_set",
-                "requirement_mapping_sets",
-                "framework",
-                "frameworks",
-            ]
-        ):
-            transaction.on_commit(engine.reload_cache)
+    if has_mapping_content(instance):
+        invalidate_mapping_cache(library_ids=[instance.pk])
 
 
 @receiver(post_save, sender=Framework)
 def update_mapping_engine_cache_on_framework_save(sender, instance, **kwargs):
-    transaction.on_commit(engine.reload_cache)
+    invalidate_mapping_cache(framework_ids=[instance.pk])
 
 
 @receiver(post_delete, sender=Framework)
 def update_mapping_engine_cache_on_framework_delete(sender, instance, **kwargs):
-    transaction.on_commit(engine.reload_cache)
+    invalidate_mapping_cache(framework_ids=[instance.pk])
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.7 on 2026-10-17 08:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0181_customizable_asset_classes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ComplianceAssessmentAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "implementation_groups_key",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Implementation groups"
+                    ),
+                ),
+                (
+                    "parameters",
+                    models.JSONField(default=dict, verbose_name="Parameters"),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("status_counts", models.JSONField(default=dict)),
+                ("result_counts", models.JSONField(default=dict)),
+                ("progress_total", models.IntegerField(default=0)),
+                ("progress_assessed", models.IntegerField(default=0)),
+                ("score_total", models.FloatField(default=0)),
+                ("score_weight", models.IntegerField(default=0)),
+                ("documentation_score_total", models.FloatField(default=0)),
+                ("documentation_score_weight", models.IntegerField(default=0)),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "compliance_assessment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="aggregates",
+                        to="core.complianceassessment",
+                        verbose_name="Compliance assessment",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("compliance_assessment", "implementation_groups_key")
+                },
+            },
+        ),
+    ]
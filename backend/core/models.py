@@ -5,7 +5,9 @@ import hashlib
 from datetime import date, datetime
 from pathlib import Path
 from typing import Self, Union, List, Optional, Literal, Tuple, Final, Iterable
+import math
 import statistics
+from contextlib import contextmanager
 
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
@@ -47,6 +49,7 @@ from library.helpers import (
 )
 
 from core.utils import format_currency as _fmt_currency
+from global_settings.cache import get_global_setting
 from global_settings.models import GlobalSettings
 from integrations.sync_mixin import IntegrationSyncableMixin
 
@@ -120,6 +123,52 @@ def match_urn(urn_string):
         return None
 
 
+def _question_fields_from_data(q_urn, q_data, order):
+    """Question fields (besides urn and requirement_node) from library data."""
+    raw_type = q_data.get("type", "text")
+    q_type = "unique_choice" if raw_type == "single_choice" else raw_type
+    parts = q_urn.split(":")
+    q_ref_id = parts[-1] if parts else q_urn
+
+    question_text = q_data.get("text", "")
+    return {
+        "ref_id": q_ref_id,
+        "text": question_text,
+        "annotation": q_data.get("annotation", question_text),
+        "type": q_type,
+        "config": q_data.get("config"),
+        "depends_on": q_data.get("depends_on"),
+        "order": order,
+        "weight": q_data.get("weight", 1),
+        "translations": q_data.get("translations"),
+    }
+
+
+def _choice_fields_from_data(choice, order):
+    """QuestionChoice fields (besides urn and question) from library data."""
+    c_urn = choice.get("urn") or None
+    c_parts = c_urn.split(":") if c_urn else []
+    c_ref_id = c_parts[-1] if c_parts else None
+
+    compute_result = choice.get("compute_result")
+    if compute_result is not None:
+        compute_result = str(compute_result).lower()
+
+    choice_value = choice.get("value", "")
+    return {
+        "value": choice_value,
+        "annotation": choice.get("annotation", choice_value),
+        "add_score": choice.get("add_score"),
+        "compute_result": compute_result,
+        "order": order,
+        "description": choice.get("description"),
+        "color": choice.get("color"),
+        "select_implementation_groups": choice.get("select_implementation_groups"),
+        "translations": choice.get("translations"),
+        "ref_id": c_ref_id,
+    }
+
+
 def _sync_questions_from_data(requirement_node, questions_data):
     """Sync Question and QuestionChoice objects for a RequirementNode.
 
@@ -135,23 +184,7 @@ def _sync_questions_from_data(requirement_node, questions_data):
 
     for order, (q_urn, q_data) in enumerate(questions_data.items()):
         incoming_urns.add(q_urn)
-        raw_type = q_data.get("type", "text")
-        q_type = "unique_choice" if raw_type == "single_choice" else raw_type
-        parts = q_urn.split(":")
-        q_ref_id = parts[-1] if parts else q_urn
-
-        question_text = q_data.get("text", "")
-        question_fields = {
-            "ref_id": q_ref_id,
-            "text": question_text,
-            "annotation": q_data.get("annotation", question_text),
-            "type": q_type,
-            "config": q_data.get("config"),
-            "depends_on": q_data.get("depends_on"),
-            "order": order,
-            "weight": q_data.get("weight", 1),
-            "translations": q_data.get("translations"),
-        }
+        question_fields = _question_fields_from_data(q_urn, q_data, order)
 
         if q_urn in existing_questions:
             question = existing_questions[q_urn]
@@ -200,28 +233,7 @@ def _sync_questions_from_data(requirement_node, questions_data):
         # 4. Create/Update choices
         for c_order, choice in enumerate(incoming_choices):
             c_urn = choice.get("urn") or None
-            c_parts = c_urn.split(":") if c_urn else []
-            c_ref_id = c_parts[-1] if c_parts else None
-
-            compute_result = choice.get("compute_result")
-            if compute_result is not None:
-                compute_result = str(compute_result).lower()
-
-            choice_value = choice.get("value", "")
-            choice_fields = {
-                "value": choice_value,
-                "annotation": choice.get("annotation", choice_value),
-                "add_score": choice.get("add_score"),
-                "compute_result": compute_result,
-                "order": c_order,
-                "description": choice.get("description"),
-                "color": choice.get("color"),
-                "select_implementation_groups": choice.get(
-                    "select_implementation_groups"
-                ),
-                "translations": choice.get("translations"),
-                "ref_id": c_ref_id,
-            }
+            choice_fields = _choice_fields_from_data(choice, c_order)
 
             if c_urn is not None:
                 if c_urn in existing_choices_by_urn:
@@ -473,6 +485,78 @@ class StoredLibrary(LibraryMixin):
             value["hash_checksum"] for value in cls.objects.values("hash_checksum")
         )
 
+    @classmethod
+    def validate_library_data(cls, library_data: dict) -> Tuple[str, str, int]:
+        """Check the header of parsed library data, returns (urn, locale, version)."""
+        missing_fields = StoredLibrary.REQUIRED_FIELDS - set(library_data.keys())
+
+        if missing_fields:
+            err = "The following fields are missing : {}".format(
+                ", ".join(repr(field) for field in missing_fields)
+            )
+            logger.error("Error while loading library content", error=err)
+            raise ValueError(err)
+
+        urn = library_data["urn"].lower()
+        if not match_urn(urn):
+            logger.error("Library URN is badly formatted", urn=urn)
+            raise ValueError("Library URN is badly formatted")
+        locale = library_data.get("locale", "en")
+        version = int(library_data["version"])
+        return urn, locale, version
+
+    @classmethod
+    def from_library_data(
+        cls,
+        library_data: dict,
+        urn: str,
+        locale: str,
+        version: int,
+        hash_checksum: str,
+        builtin: bool,
+        is_loaded: bool,
+    ) -> "StoredLibrary":
+        """Unsaved StoredLibrary for validated library data."""
+        objects_meta = {
+            key: (1 if key in ("framework", "preset") else len(value))
+            for key, value in library_data["objects"].items()
+        }
+
+        dependencies = library_data.get(
+            "dependencies", []
+        )  # I don't want whitespaces in URN anymore nontheless
+
+        library_objects = library_data["objects"]
+        return cls(
+            name=library_data["name"],
+            is_published=True,
+            urn=urn,
+            locale=locale,
+            version=version,
+            ref_id=library_data["ref_id"],
+            default_locale=False,  # We don't care about this value yet.
+            description=library_data.get("description"),
+            annotation=library_data.get("annotation"),
+            copyright=library_data.get("copyright"),
+            provider=library_data.get("provider"),
+            packager=library_data.get("packager"),
+            publication_date=library_data.get("publication_date"),
+            translations=library_data.get("translations", {}),
+            objects_meta=objects_meta,
+            dependencies=dependencies,
+            is_loaded=is_loaded,
+            # We have to add a "builtin: true" line to every builtin library file.
+            builtin=builtin,
+            hash_checksum=hash_checksum,
+            content=library_objects,
+            autoload=bool(
+                library_objects.get(
+                    "requirement_mapping_set",
+                    library_objects.get("requirement_mapping_sets"),
+                )
+            ),  # autoload is true if the library contains requirement mapping sets
+        )
+
     @classmethod
     def store_library_content(
         cls, library_content: bytes, builtin: bool = False, dry_run: bool = False
@@ -490,21 +574,7 @@ class StoredLibrary(LibraryMixin):
         except yaml.YAMLError as e:
             logger.error("Error while loading library content", error=e)
             raise e
-        missing_fields = StoredLibrary.REQUIRED_FIELDS - set(library_data.keys())
-
-        if missing_fields:
-            err = "The following fields are missing : {}".format(
-                ", ".join(repr(field) for field in missing_fields)
-            )
-            logger.error("Error while loading library content", error=err)
-            raise ValueError(err)
-
-        urn = library_data["urn"].lower()
-        if not match_urn(urn):
-            logger.error("Library URN is badly formatted", urn=urn)
-            raise ValueError("Library URN is badly formatted")
-        locale = library_data.get("locale", "en")
-        version = int(library_data["version"])
+        urn, locale, version = cls.validate_library_data(library_data)
         is_loaded = LoadedLibrary.objects.filter(  # We consider the library as loaded even if the loaded version is different
             urn=urn, locale=locale
         ).exists()
@@ -556,50 +626,15 @@ class StoredLibrary(LibraryMixin):
             ):
                 outdated_library.delete()
 
-            objects_meta = {
-                key: (1 if key in ("framework", "preset") else len(value))
-                for key, value in library_data["objects"].items()
-            }
-
-            dependencies = library_data.get(
-                "dependencies", []
-            )  # I don't want whitespaces in URN anymore nontheless
-
-            library_objects = library_data["objects"]
             label_names = library_data.get("labels", [])
             filtering_labels = [
                 LibraryFilteringLabel.objects.get_or_create(label=label_name)[0]
                 for label_name in label_names
             ]
-            new_library = StoredLibrary.objects.create(
-                name=library_data["name"],
-                is_published=True,
-                urn=urn,
-                locale=locale,
-                version=version,
-                ref_id=library_data["ref_id"],
-                default_locale=False,  # We don't care about this value yet.
-                description=library_data.get("description"),
-                annotation=library_data.get("annotation"),
-                copyright=library_data.get("copyright"),
-                provider=library_data.get("provider"),
-                packager=library_data.get("packager"),
-                publication_date=library_data.get("publication_date"),
-                translations=library_data.get("translations", {}),
-                objects_meta=objects_meta,
-                dependencies=dependencies,
-                is_loaded=is_loaded,
-                # We have to add a "builtin: true" line to every builtin library file.
-                builtin=builtin,
-                hash_checksum=hash_checksum,
-                content=library_objects,
-                autoload=bool(
-                    library_objects.get(
-                        "requirement_mapping_set",
-                        library_objects.get("requirement_mapping_sets"),
-                    )
-                ),  # autoload is true if the library contains requirement mapping sets
+            new_library = cls.from_library_data(
+                library_data, urn, locale, version, hash_checksum, builtin, is_loaded
             )
+            new_library.save()
             new_library.filtering_labels.set(filtering_labels)
             return new_library, None
 
@@ -612,6 +647,148 @@ class StoredLibrary(LibraryMixin):
 
         return StoredLibrary.store_library_content(library_content, builtin=builtin)
 
+    @classmethod
+    def store_parsed_libraries(
+        cls, libraries: List[Tuple[str, dict]], builtin: bool = False
+    ) -> List[Tuple[Optional["StoredLibrary"], Optional[str]]]:
+        """
+        Store already parsed libraries, given as (hash_checksum, library_data)
+        pairs, in a single transaction and with a constant number of queries.
+
+        The rules are those of store_library_content applied to the libraries
+        in order: a stored library of the same version only gets its checksum
+        updated, outdated libraries are rejected and older versions of a stored
+        library are replaced. Returns a (library, error) pair per library;
+        invalid library data gets the error message instead of raising.
+        """
+        results = [(None, None)] * len(libraries)
+        validated = []
+        for index, (hash_checksum, library_data) in enumerate(libraries):
+            try:
+                validated.append(
+                    (index, hash_checksum, library_data)
+                    + cls.validate_library_data(library_data)
+                )
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                results[index] = (None, str(e))
+        urns = {urn for _, _, _, urn, _, _ in validated}
+
+        with transaction.atomic():
+            # (urn, locale) -> {version: stored library, saved or pending}
+            versions = defaultdict(dict)
+            for stored_library in cls.objects.filter(urn__in=urns).only(
+                "id", "urn", "locale", "version", "hash_checksum"
+            ):
+                versions[stored_library.urn, stored_library.locale][
+                    stored_library.version
+                ] = stored_library
+            loaded = set(
+                LoadedLibrary.objects.filter(urn__in=urns).values_list("urn", "locale")
+            )
+
+            new_libraries, updated_checksums, outdated_ids = {}, [], []
+            for index, hash_checksum, library_data, urn, locale, version in validated:
+                stored_versions = versions[urn, locale]
+                if version in stored_versions:
+                    same_version_lib = stored_versions[version]
+                    if not same_version_lib._state.adding:
+                        # update hash following cosmetic change
+                        logger.info("update hash", urn=urn)
+                        same_version_lib.hash_checksum = hash_checksum
+                        same_version_lib.updated_at = timezone.now()
+                        updated_checksums.append(same_version_lib)
+                    results[index] = (None, "libraryAlreadyLoadedError")
+                    continue
+                if any(stored_version > version for stored_version in stored_versions):
+                    results[index] = (None, "libraryOutdatedError")
+                    continue
+                for outdated_library in stored_versions.values():
+                    if outdated_library._state.adding:
+                        # Superseded by a later library of the same batch
+                        outdated_index, *_ = new_libraries.pop(outdated_library.id)
+                        results[outdated_index] = (None, "libraryOutdatedError")
+                    else:
+                        outdated_ids.append(outdated_library.id)
+                new_library = cls.from_library_data(
+                    library_data,
+                    urn,
+                    locale,
+                    version,
+                    hash_checksum,
+                    builtin,
+                    (urn, locale) in loaded,
+                )
+                # What save() would have checked
+                new_library._validate_char_max_lengths()
+                new_library.clean()
+                stored_versions.clear()
+                stored_versions[version] = new_library
+                new_libraries[new_library.id] = (
+                    index,
+                    new_library,
+                    library_data.get("labels", []),
+                )
+
+            if outdated_ids:
+                outdated_labels = list(
+                    LibraryFilteringLabel.objects.filter(
+                        stored_libraries__in=outdated_ids
+                    ).distinct()
+                )
+                cls.objects.filter(id__in=outdated_ids).delete()
+                for library_label in outdated_labels:
+                    library_label.garbage_collect()
+            cls.objects.bulk_update(
+                updated_checksums, ["hash_checksum", "updated_at"], batch_size=100
+            )
+            cls.objects.bulk_create(
+                [new_library for _, new_library, _ in new_libraries.values()],
+                batch_size=100,
+            )
+
+            label_names = {
+                label_name
+                for _, _, label_names in new_libraries.values()
+                for label_name in label_names
+            }
+            filtering_labels = {}
+            for library_label in LibraryFilteringLabel.objects.filter(
+                label__in=label_names
+            ).order_by("created_at"):
+                filtering_labels.setdefault(library_label.label, library_label)
+            for label_name in label_names - filtering_labels.keys():
+                filtering_labels[label_name] = LibraryFilteringLabel.objects.create(
+                    label=label_name
+                )
+            through = cls.filtering_labels.through
+            through.objects.bulk_create(
+                [
+                    through(
+                        storedlibrary_id=new_library.id,
+                        libraryfilteringlabel_id=filtering_labels[label_name].id,
+                    )
+                    for _, new_library, label_names in new_libraries.values()
+                    for label_name in set(label_names)
+                ]
+            )
+
+        # bulk_create sends no post_save: do what the mapping engine receiver
+        # does for the stored libraries
+        from core.mappings.engine import invalidate_mapping_cache
+        from core.mappings.signals import has_mapping_content
+
+        mapping_library_ids = [
+            new_library.id
+            for _, new_library, _ in new_libraries.values()
+            if has_mapping_content(new_library)
+        ]
+        if mapping_library_ids:
+            invalidate_mapping_cache(library_ids=mapping_library_ids)
+
+        for index, new_library, _ in new_libraries.values():
+            results[index] = (new_library, None)
+        return results
+
     def get_loaded_library(self) -> Optional["LoadedLibrary"]:
         if not self.is_loaded:
             return
@@ -3825,6 +4002,9 @@ class Asset(
     )
 
     fields_to_check = ["ref_id", "name"]
+    # The data wizard saves assets in bulk (data_wizard.bulk_helpers.BulkWriter),
+    # reproducing save() and the save signal receivers: update it with them.
+    bulk_writes_supported = True
 
     class Meta:
         verbose_name_plural = _("Assets")
@@ -4181,9 +4361,9 @@ class Asset(
     @classmethod
     def _get_security_objective_scale(cls) -> str:
         """Fetches the global setting for the security objective scale."""
-        settings = GlobalSettings.objects.filter(name="general").first()
+        settings = get_global_setting("general")
         if settings:
-            return settings.value.get("security_objective_scale", "1-4")
+            return settings.get("security_objective_scale", "1-4")
         return "1-4"
 
     def get_security_objectives(self) -> dict[str, dict[str, dict[str, int | bool]]]:
@@ -4313,12 +4493,7 @@ class Asset(
         security_objectives = self.get_security_objectives()
         if len(security_objectives) == 0:
             return []
-        general_settings = GlobalSettings.objects.filter(name="general").first()
-        scale = (
-            general_settings.value.get("security_objective_scale", "1-4")
-            if general_settings
-            else "1-4"
-        )
+        scale = self._get_security_objective_scale()
         return [
             {key: self.SECURITY_OBJECTIVES_SCALES[scale][content.get("value", 0)]}
             for key, content in sorted(
@@ -4366,12 +4541,7 @@ class Asset(
         security_capabilities = self.get_security_capabilities()
         if len(security_capabilities) == 0:
             return []
-        general_settings = GlobalSettings.objects.filter(name="general").first()
-        scale = (
-            general_settings.value.get("security_objective_scale", "1-4")
-            if general_settings
-            else "1-4"
-        )
+        scale = self._get_security_objective_scale()
         return [
             {key: self.SECURITY_OBJECTIVES_SCALES[scale][content.get("value", 0)]}
             for key, content in sorted(
@@ -6249,15 +6419,11 @@ class Vulnerability(
     def _apply_sla_policy(self):
         from datetime import date, timedelta
 
-        from global_settings.models import GlobalSettings
-
-        try:
-            sla_settings = GlobalSettings.objects.get(name="vulnerability-sla")
-            sla_policy = (
-                sla_settings.value if isinstance(sla_settings.value, dict) else {}
-            )
-        except GlobalSettings.DoesNotExist:
+        sla_policy = get_global_setting("vulnerability-sla")
+        if sla_policy is None:
             return
+        if not isinstance(sla_policy, dict):
+            sla_policy = {}
         severity_label = self.get_severity_display()
         days = sla_policy.get(severity_label)
         if days is not None:
@@ -7478,7 +7644,7 @@ class ComplianceAssessment(Assessment):
     def upsert_daily_metrics(self):
         per_status = {item[1]: item[0] for item in self.get_requirements_status_count()}
         per_result = {item[1]: item[0] for item in self.get_requirements_result_count()}
-        total = RequirementAssessment.objects.filter(compliance_assessment=self).count()
+        total = self.get_aggregate().total
         score = self.get_global_score()
         progress = self.progress
 
@@ -7746,6 +7912,121 @@ class ComplianceAssessment(Assessment):
 
         return changes
 
+    def _score_contribution(
+        self, ras, ig, score_field, anchor_na_to_target=False
+    ) -> Optional[tuple[float, int]]:
+        """
+        Contribution of a requirement assessment to a score layer, as a
+        (value, weight) pair, or None when it does not contribute.
+
+        The value is the raw score for SUM, and the score normalized against
+        the RA's resolved scale (a ratio) for AVG and AVG_OF_AVG. See
+        _compute_score_for_field.
+        """
+        ca_min = self.min_score
+        ca_max = self.max_score
+        if ca_min is None or ca_max is None or ca_max <= ca_min:
+            return None
+        ca_range = ca_max - ca_min
+
+        if ig and not (ig & set(ras.requirement.implementation_groups or [])):
+            return None
+        weight = ras.requirement.weight or 1
+        is_na = ras.result == RequirementAssessment.Result.NOT_APPLICABLE
+
+        # SUM: raw weighted sum, no normalization. Kept distinct from the
+        # ratio path because summing arbitrary scales has no coherent
+        # denormalized value.
+        if self.score_calculation_method == self.CalculationMethod.SUM:
+            if is_na and anchor_na_to_target:
+                resolved = ras.get_resolved_scoring()
+                ra_min = resolved["min_score"]
+                ra_max = resolved["max_score"]
+                if (
+                    self.target_score is not None
+                    and ra_min is not None
+                    and ra_max is not None
+                    and ra_max > ra_min
+                ):
+                    # Project the CA-wide target score onto the RA scale as a
+                    # ratio so summing across mixed scales stays coherent
+                    # (raw injection would add 80/100 onto a 0-5 RA).
+                    ca_target_clamped = max(ca_min, min(self.target_score, ca_max))
+                    ca_ratio = (ca_target_clamped - ca_min) / ca_range
+                    score = ra_min + ca_ratio * (ra_max - ra_min)
+                elif ra_max is not None:
+                    score = ra_max
+                else:
+                    score = 0
+            else:
+                raw = getattr(ras, score_field)
+                if raw is None:
+                    if score_field == "score":
+                        return None
+                    raw = 0
+                score = raw
+            return score, weight
+
+        resolved = ras.get_resolved_scoring()
+        ra_min = resolved["min_score"]
+        ra_max = resolved["max_score"]
+        if ra_min is None or ra_max is None or ra_max <= ra_min:
+            return None
+        ra_range = ra_max - ra_min
+
+        if is_na and anchor_na_to_target:
+            # Project the CA-wide target onto the RA scale as a ratio so
+            # mixed scales stay coherent (CA target 80/100 contributes
+            # 80% of the RA range, not 80 raw).
+            if self.target_score is not None:
+                ca_target_clamped = max(ca_min, min(self.target_score, ca_max))
+                ca_ratio = (ca_target_clamped - ca_min) / ca_range
+                raw = ra_min + ca_ratio * ra_range
+            else:
+                raw = ra_max
+        else:
+            raw = getattr(ras, score_field)
+            if raw is None:
+                if score_field == "score":
+                    return None
+                raw = 0
+
+        ratio = (raw - ra_min) / ra_range
+        return ratio, weight
+
+    def _is_score_row(self, ras) -> bool:
+        """
+        Whether a requirement assessment enters the score layers (see
+        get_global_score): it must be scored, unless N/A items are anchored
+        to the target, otherwise N/A items are left out.
+        """
+        if self.anchor_na_to_target:
+            return ras.result == RequirementAssessment.Result.NOT_APPLICABLE or (
+                ras.is_scored and ras.score is not None
+            )
+        return (
+            ras.is_scored
+            and ras.score is not None
+            and ras.result != RequirementAssessment.Result.NOT_APPLICABLE
+        )
+
+    def get_aggregate(self) -> "ComplianceAssessmentAggregate":
+        return ComplianceAssessmentAggregate.for_assessment(self)
+
+    def _score_from_totals(self, total: float, total_weight: int) -> float:
+        """
+        Score of a SUM or AVG layer from the sums of the (value, weight)
+        contributions of its requirement assessments: -1 if none contributed.
+        """
+        if total_weight == 0:
+            return -1
+        if self.score_calculation_method == self.CalculationMethod.SUM:
+            return _truncate_one_decimal(total)
+        # AVG: average of weighted ratios, denormalized onto the CA scale.
+        return _truncate_one_decimal(
+            self.min_score + total / total_weight * (self.max_score - self.min_score)
+        )
+
     def _compute_score_for_field(
         self, requirement_assessments, ig, score_field, anchor_na_to_target=False
     ):
@@ -7773,81 +8054,8 @@ class ComplianceAssessment(Assessment):
             return -1
         ca_range = ca_max - ca_min
 
-        # SUM: raw weighted sum, no normalization. Kept distinct from the
-        # ratio path because summing arbitrary scales has no coherent
-        # denormalized value.
-        if self.score_calculation_method == self.CalculationMethod.SUM:
-            total = 0
-            total_weight = 0
-            for ras in requirement_assessments:
-                if ig and not (ig & set(ras.requirement.implementation_groups or [])):
-                    continue
-                weight = ras.requirement.weight or 1
-                is_na = ras.result == RequirementAssessment.Result.NOT_APPLICABLE
-                if is_na and anchor_na_to_target:
-                    resolved = ras.get_resolved_scoring()
-                    ra_min = resolved["min_score"]
-                    ra_max = resolved["max_score"]
-                    if (
-                        self.target_score is not None
-                        and ra_min is not None
-                        and ra_max is not None
-                        and ra_max > ra_min
-                    ):
-                        # Project the CA-wide target score onto the RA scale as a
-                        # ratio so summing across mixed scales stays coherent
-                        # (raw injection would add 80/100 onto a 0-5 RA).
-                        ca_target_clamped = max(ca_min, min(self.target_score, ca_max))
-                        ca_ratio = (ca_target_clamped - ca_min) / ca_range
-                        score = ra_min + ca_ratio * (ra_max - ra_min)
-                    elif ra_max is not None:
-                        score = ra_max
-                    else:
-                        score = 0
-                else:
-                    raw = getattr(ras, score_field)
-                    if raw is None:
-                        if score_field == "score":
-                            continue
-                        raw = 0
-                    score = raw
-                total += score * weight
-                total_weight += weight
-            if total_weight == 0:
-                return -1
-            return _truncate_one_decimal(total)
-
         def _ra_ratio_weight(ras):
-            if ig and not (ig & set(ras.requirement.implementation_groups or [])):
-                return None
-
-            resolved = ras.get_resolved_scoring()
-            ra_min = resolved["min_score"]
-            ra_max = resolved["max_score"]
-            if ra_min is None or ra_max is None or ra_max <= ra_min:
-                return None
-            ra_range = ra_max - ra_min
-
-            is_na = ras.result == RequirementAssessment.Result.NOT_APPLICABLE
-            if is_na and anchor_na_to_target:
-                # Project the CA-wide target onto the RA scale as a ratio so
-                # mixed scales stay coherent (CA target 80/100 contributes
-                # 80% of the RA range, not 80 raw).
-                if self.target_score is not None:
-                    ca_target_clamped = max(ca_min, min(self.target_score, ca_max))
-                    ca_ratio = (ca_target_clamped - ca_min) / ca_range
-                    raw = ra_min + ca_ratio * ra_range
-                else:
-                    raw = ra_max
-            else:
-                raw = getattr(ras, score_field)
-                if raw is None:
-                    if score_field == "score":
-                        return None
-                    raw = 0
-
-            ratio = (raw - ra_min) / ra_range
-            return ratio, (ras.requirement.weight or 1)
+            return self._score_contribution(ras, ig, score_field, anchor_na_to_target)
 
         if self.score_calculation_method == self.CalculationMethod.AVG_OF_AVG:
             leaf_ratios = {}
@@ -7943,22 +8151,18 @@ class ComplianceAssessment(Assessment):
             global_ratio = sum(category_ratios) / len(category_ratios)
             return _truncate_one_decimal(ca_min + global_ratio * ca_range)
 
-        total_ratio_weighted = 0
+        # SUM: raw weighted sum of scores. AVG: weighted ratios.
+        total = 0
         total_weight = 0
         for ras in requirement_assessments:
             r = _ra_ratio_weight(ras)
             if r is None:
                 continue
-            ratio, weight = r
-            total_ratio_weighted += ratio * weight
+            value, weight = r
+            total += value * weight
             total_weight += weight
 
-        if total_weight == 0:
-            return -1
-
-        # AVG: average of weighted ratios, denormalized onto the CA scale.
-        avg_ratio = total_ratio_weighted / total_weight
-        return _truncate_one_decimal(ca_min + avg_ratio * ca_range)
+        return self._score_from_totals(total, total_weight)
 
     def get_global_score(
         self, prefetched_requirements: Optional[list[RequirementAssessment]] = None
@@ -7984,24 +8188,30 @@ class ComplianceAssessment(Assessment):
 
         **WARNING:** If provided `prefetched_requirements` **MUST** be a list of `RequirementAssessment` `req` WHERE `req.compliance_assessment == self` AND `req.requirement.assessable is True`.
         """
+        if (
+            prefetched_requirements is None
+            and self.score_calculation_method != self.CalculationMethod.AVG_OF_AVG
+        ):
+            # AVG and SUM only need the sums maintained by the aggregate
+            aggregate = self.get_aggregate()
+            impl_score = self._score_from_totals(
+                aggregate.score_total, aggregate.score_weight
+            )
+            doc_score = None
+            if self.show_documentation_score:
+                doc_score = self._score_from_totals(
+                    aggregate.documentation_score_total,
+                    aggregate.documentation_score_weight,
+                )
+            return self._layered_scores(impl_score, doc_score)
+
         if prefetched_requirements is not None:
             # Caller supplied an in-memory list (e.g. the /recap action) — filter in Python.
-            if self.anchor_na_to_target:
-                requirement_assessments_scored = [
-                    requirement
-                    for requirement in prefetched_requirements
-                    if requirement.result == RequirementAssessment.Result.NOT_APPLICABLE
-                    or (requirement.is_scored and requirement.score is not None)
-                ]
-            else:
-                requirement_assessments_scored = [
-                    requirement
-                    for requirement in prefetched_requirements
-                    if requirement.is_scored
-                    and requirement.score is not None
-                    and requirement.result
-                    != RequirementAssessment.Result.NOT_APPLICABLE
-                ]
+            requirement_assessments_scored = [
+                requirement
+                for requirement in prefetched_requirements
+                if self._is_score_row(requirement)
+            ]
         else:
             qs = (
                 RequirementAssessment.objects.filter(compliance_assessment=self)
@@ -8040,6 +8250,10 @@ class ComplianceAssessment(Assessment):
                 self.anchor_na_to_target,
             )
 
+        return self._layered_scores(impl_score, doc_score)
+
+    @staticmethod
+    def _layered_scores(impl_score, doc_score) -> dict:
         # Maturity is the average of the enabled layers (ignore -1 / None)
         enabled = [s for s in [impl_score, doc_score] if s is not None and s != -1]
         if enabled:
@@ -8289,13 +8503,7 @@ class ComplianceAssessment(Assessment):
     def get_requirements_status_count(
         self,
     ) -> list[tuple[int, RequirementAssessment.Status]]:
-        queryset = (
-            RequirementAssessment.objects.filter(compliance_assessment=self)
-            .values("status")
-            .annotate(count=Count("status"))
-        )
-
-        count_by_status = {row["status"]: row["count"] for row in queryset}
+        count_by_status = self.get_aggregate().status_counts
 
         requirements_status_count = [
             (count_by_status.get(st, 0), st) for st in RequirementAssessment.Status
@@ -8305,29 +8513,11 @@ class ComplianceAssessment(Assessment):
     def get_requirements_result_count(
         self,
     ) -> list[tuple[int, RequirementAssessment.Result]]:
-        requirements = RequirementAssessment.objects.filter(
-            compliance_assessment=self, requirement__assessable=True
-        )
-        ig = (
-            set(self.selected_implementation_groups)
-            if self.selected_implementation_groups
-            else None
-        )
-
-        if ig is not None:
-            # Python-side set intersection for DB portability (no icontains on JSON)
-            matching_node_ids = [
-                ra.requirement_id
-                for ra in requirements.select_related("requirement")
-                if ra.requirement.implementation_groups
-                and ig & set(ra.requirement.implementation_groups)
-            ]
-            requirements = requirements.filter(requirement_id__in=matching_node_ids)
-
-        count_by_result = {
-            row["result"]: row["count"]
-            for row in requirements.values("result").annotate(count=Count("result"))
-        }
+        """
+        Result counts of the assessable requirements of the selected
+        implementation groups.
+        """
+        count_by_result = self.get_aggregate().result_counts
         return [(count_by_result.get(rs, 0), rs) for rs in RequirementAssessment.Result]
 
     def get_measures_status_count(self):
@@ -8650,16 +8840,19 @@ class ComplianceAssessment(Assessment):
             elif self.framework_id is not None:
                 min_score_fallback = self.framework.min_score
         framework_has_questions = not status_driven and self.has_questions
-        if framework_has_questions:
-            requirements = requirements.annotate(
-                _has_questions=RequirementAssessment.has_questions_subquery(),
-                _has_answers=Exists(
-                    Answer.objects.filter(requirement_assessment=OuterRef("pk"))
-                ),
-                _has_unanswered=Exists(
-                    RequirementAssessment._unanswered_answers_subquery()
-                ),
-            )
+        if not framework_has_questions:
+            # Answers are not aggregated: only question-free progress is
+            aggregate = self.get_aggregate()
+            return aggregate.progress_total, aggregate.progress_assessed
+        requirements = requirements.annotate(
+            _has_questions=RequirementAssessment.has_questions_subquery(),
+            _has_answers=Exists(
+                Answer.objects.filter(requirement_assessment=OuterRef("pk"))
+            ),
+            _has_unanswered=Exists(
+                RequirementAssessment._unanswered_answers_subquery()
+            ),
+        )
         assessed_filter = RequirementAssessment.progress_assessed_q(
             status_driven=status_driven,
             result_visible=result_visible,
@@ -8752,6 +8945,51 @@ class ComplianceAssessment(Assessment):
         ).exists()
 
 
+class RequirementAssessmentQuerySet(QuerySet):
+    """
+    Bulk writes bypass the aggregate deltas of RequirementAssessment.save(),
+    so they drop the ComplianceAssessmentAggregate rows of the audits they
+    touch; the rows are rebuilt on their next read.
+    """
+
+    def _compliance_assessment_ids(self) -> set:
+        return set(
+            self.order_by()
+            .values_list("compliance_assessment_id", flat=True)
+            .distinct()
+        )
+
+    def update(self, **kwargs):
+        if ComplianceAssessmentAggregate.AGGREGATED_FIELDS.isdisjoint(kwargs):
+            return super().update(**kwargs)
+        compliance_assessment_ids = self._compliance_assessment_ids()
+        count = super().update(**kwargs)
+        ComplianceAssessmentAggregate.invalidate(compliance_assessment_ids)
+        return count
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        count = super().bulk_update(objs, fields, batch_size=batch_size)
+        if not ComplianceAssessmentAggregate.AGGREGATED_FIELDS.isdisjoint(fields):
+            ComplianceAssessmentAggregate.invalidate(
+                {obj.compliance_assessment_id for obj in objs}
+            )
+        return count
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        ComplianceAssessmentAggregate.invalidate(
+            {obj.compliance_assessment_id for obj in objs}
+        )
+        return objs
+
+    def delete(self):
+        compliance_assessment_ids = self._compliance_assessment_ids()
+        result = super().delete()
+        ComplianceAssessmentAggregate.invalidate(compliance_assessment_ids)
+        return result
+
+
 class RequirementAssessment(AbstractBaseModel, FolderMixin, ETADueDateMixin):
     class Status(models.TextChoices):
         TODO = "to_do", _("To do")
@@ -8860,6 +9098,8 @@ class RequirementAssessment(AbstractBaseModel, FolderMixin, ETADueDateMixin):
         related_name="requirement_assessments",
     )
 
+    objects = RequirementAssessmentQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.requirement.display_short
 
@@ -9476,12 +9716,319 @@ class RequirementAssessment(AbstractBaseModel, FolderMixin, ETADueDateMixin):
             self._get_cel_relevant_changed_fields() if cel_fields_touched else set()
         )
 
-        super().save(*args, **kwargs)
+        with ComplianceAssessmentAggregate.tracking(self, update_fields):
+            super().save(*args, **kwargs)
         self.trigger_compliance_assessment_update_hooks()
 
         if cel_changed:
             self._defer_cel_evaluation()
 
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        ComplianceAssessmentAggregate.invalidate([self.compliance_assessment_id])
+        return result
+
+
+class ComplianceAssessmentAggregate(models.Model):
+    """
+    Aggregates of the requirement assessments of a compliance assessment for
+    one implementation groups selection: requirement counts per status and
+    result, progress counts, and the sums of the (value, weight) score
+    contributions of each score layer (see
+    ComplianceAssessment._score_contribution).
+
+    Rows are maintained with deltas by RequirementAssessment.save() and read
+    by the global score, progress, donut and daily metrics of the audit
+    instead of scanning its requirement assessments. A row is only valid for
+    the scoring and progress settings it was built with (parameters):
+    it is rebuilt on read when they changed. Bulk writes of requirement
+    assessments and changes of the framework's requirement nodes drop the
+    rows instead. The rebuild_compliance_aggregates command rebuilds or
+    verifies them.
+    """
+
+    # Requirement assessment fields the aggregates depend on
+    AGGREGATED_FIELDS: Final = frozenset(
+        {
+            "status",
+            "result",
+            "is_scored",
+            "score",
+            "documentation_score",
+            "requirement",
+            "requirement_id",
+            "compliance_assessment",
+            "compliance_assessment_id",
+        }
+    )
+    _LOADED_FIELDS: Final = (
+        "status",
+        "result",
+        "is_scored",
+        "score",
+        "documentation_score",
+    )
+
+    compliance_assessment = models.ForeignKey(
+        ComplianceAssessment,
+        on_delete=models.CASCADE,
+        related_name="aggregates",
+        verbose_name=_("Compliance assessment"),
+    )
+    implementation_groups_key = models.TextField(
+        blank=True, default="", verbose_name=_("Implementation groups")
+    )
+    parameters = models.JSONField(default=dict, verbose_name=_("Parameters"))
+    total = models.IntegerField(default=0)
+    status_counts = models.JSONField(default=dict)
+    result_counts = models.JSONField(default=dict)
+    progress_total = models.IntegerField(default=0)
+    progress_assessed = models.IntegerField(default=0)
+    score_total = models.FloatField(default=0)
+    score_weight = models.IntegerField(default=0)
+    documentation_score_total = models.FloatField(default=0)
+    documentation_score_weight = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        unique_together = ("compliance_assessment", "implementation_groups_key")
+
+    @staticmethod
+    def implementation_groups_key_for(compliance_assessment) -> str:
+        return ",".join(
+            sorted(compliance_assessment.selected_implementation_groups or [])
+        )
+
+    @property
+    def implementation_groups(self) -> Optional[set]:
+        return (
+            set(self.implementation_groups_key.split(","))
+            if self.implementation_groups_key
+            else None
+        )
+
+    @staticmethod
+    def parameters_for(compliance_assessment) -> dict:
+        """The audit settings the aggregates depend on."""
+        ca = compliance_assessment
+        framework = ca.framework
+        status_driven, result_visible = ca.progress_mode_from_visibility(
+            ca.field_visibility, framework.field_visibility
+        )
+        return {
+            "min_score": ca.min_score,
+            "max_score": ca.max_score,
+            "target_score": ca.target_score,
+            "score_calculation_method": ca.score_calculation_method,
+            "anchor_na_to_target": ca.anchor_na_to_target,
+            "status_driven": status_driven,
+            "result_visible": result_visible,
+            # Same fallback as ComplianceAssessment._get_progress_counts
+            "min_score_fallback": ca.min_score
+            if ca.min_score is not None
+            else framework.min_score,
+        }
+
+    def _reset(self) -> None:
+        self.total = 0
+        self.status_counts = {}
+        self.result_counts = {}
+        self.progress_total = 0
+        self.progress_assessed = 0
+        self.score_total = 0
+        self.score_weight = 0
+        self.documentation_score_total = 0
+        self.documentation_score_weight = 0
+
+    def _add(self, compliance_assessment, requirement_assessment, sign=1) -> None:
+        """Add (sign=1) or remove (sign=-1) a requirement assessment."""
+        ca = compliance_assessment
+        ra = requirement_assessment
+        requirement = ra.requirement
+        parameters = self.parameters
+        ig = self.implementation_groups
+
+        def _count(counts, key):
+            counts[key] = counts.get(key, 0) + sign
+            if not counts[key]:
+                del counts[key]
+
+        self.total += sign
+        if ra.status is not None:
+            _count(self.status_counts, ra.status)
+        if not requirement.assessable or (
+            ig and not (ig & set(requirement.implementation_groups or []))
+        ):
+            return
+
+        if ra.result is not None:
+            _count(self.result_counts, ra.result)
+        self.progress_total += sign
+        if RequirementAssessment.progress_assessed_scalar(
+            ra.status,
+            ra.result,
+            ra.score,
+            requirement.min_score,
+            status_driven=parameters["status_driven"],
+            has_questions=False,
+            result_visible=parameters["result_visible"],
+            min_score_fallback=parameters["min_score_fallback"],
+        ):
+            self.progress_assessed += sign
+
+        if not ca._is_score_row(ra):
+            return
+        contribution = ca._score_contribution(ra, ig, "score", ca.anchor_na_to_target)
+        if contribution is not None:
+            value, weight = contribution
+            self.score_total += sign * value * weight
+            self.score_weight += sign * weight
+        contribution = ca._score_contribution(
+            ra, ig, "documentation_score", ca.anchor_na_to_target
+        )
+        if contribution is not None:
+            value, weight = contribution
+            self.documentation_score_total += sign * value * weight
+            self.documentation_score_weight += sign * weight
+
+    @classmethod
+    def build(cls, compliance_assessment) -> "ComplianceAssessmentAggregate":
+        """Compute the aggregate of the audit from its requirement assessments (unsaved)."""
+        aggregate = cls(
+            compliance_assessment=compliance_assessment,
+            implementation_groups_key=cls.implementation_groups_key_for(
+                compliance_assessment
+            ),
+            parameters=cls.parameters_for(compliance_assessment),
+        )
+        aggregate._reset()
+        for ra in (
+            RequirementAssessment.objects.filter(
+                compliance_assessment=compliance_assessment
+            )
+            .select_related("requirement")
+            .only(*cls._LOADED_FIELDS, "compliance_assessment_id", "requirement")
+            .iterator(chunk_size=2000)
+        ):
+            ra.compliance_assessment = compliance_assessment
+            aggregate._add(compliance_assessment, ra)
+        return aggregate
+
+    @classmethod
+    def rebuild(cls, compliance_assessment) -> "ComplianceAssessmentAggregate":
+        """(Re)build and store the aggregate of the audit."""
+        with transaction.atomic():
+            # Lock first: concurrent saves apply their deltas after the rebuild
+            aggregate, _ = cls.objects.select_for_update().get_or_create(
+                compliance_assessment=compliance_assessment,
+                implementation_groups_key=cls.implementation_groups_key_for(
+                    compliance_assessment
+                ),
+                defaults={"parameters": {}},
+            )
+            built = cls.build(compliance_assessment)
+            built.pk = aggregate.pk
+            built.save()
+        return built
+
+    @classmethod
+    def for_assessment(cls, compliance_assessment) -> "ComplianceAssessmentAggregate":
+        """The up to date aggregate of the audit, rebuilt when missing or stale."""
+        aggregate = cls.objects.filter(
+            compliance_assessment=compliance_assessment,
+            implementation_groups_key=cls.implementation_groups_key_for(
+                compliance_assessment
+            ),
+        ).first()
+        if aggregate is None or aggregate.parameters != cls.parameters_for(
+            compliance_assessment
+        ):
+            aggregate = cls.rebuild(compliance_assessment)
+        aggregate.compliance_assessment = compliance_assessment
+        return aggregate
+
+    @classmethod
+    def invalidate(cls, compliance_assessment_ids: Iterable) -> None:
+        compliance_assessment_ids = set(compliance_assessment_ids)
+        if compliance_assessment_ids:
+            cls.objects.filter(
+                compliance_assessment_id__in=compliance_assessment_ids
+            ).delete()
+
+    @classmethod
+    def invalidate_framework(cls, framework_id) -> None:
+        """Drop the aggregates of the audits of a framework whose nodes changed."""
+        cls.objects.filter(compliance_assessment__framework_id=framework_id).delete()
+
+    @classmethod
+    @contextmanager
+    def tracking(cls, requirement_assessment, update_fields=None):
+        """
+        Apply the delta of a requirement assessment save, made within the
+        context, to the aggregates of its audit. The aggregates are locked
+        before reading the previous values, so concurrent saves serialize.
+        """
+        ra = requirement_assessment
+        if update_fields is not None and cls.AGGREGATED_FIELDS.isdisjoint(
+            update_fields
+        ):
+            yield
+            return
+        with transaction.atomic():
+            aggregates = list(
+                cls.objects.select_for_update().filter(
+                    compliance_assessment_id=ra.compliance_assessment_id
+                )
+            )
+            previous = None
+            values = (
+                RequirementAssessment.objects.filter(pk=ra.pk)
+                .values(*cls._LOADED_FIELDS, "requirement_id")
+                .first()
+                if aggregates
+                else None
+            )
+            if values is not None:
+                previous = RequirementAssessment(**values)
+            yield
+            if not aggregates:
+                return
+            ca = ra.compliance_assessment
+            if previous is not None:
+                previous.compliance_assessment = ca
+                if previous.requirement_id == ra.requirement_id:
+                    previous.requirement = ra.requirement
+            parameters = cls.parameters_for(ca)
+            for aggregate in aggregates:
+                if aggregate.parameters != parameters:
+                    continue  # Rebuilt on read
+                if previous is not None:
+                    aggregate._add(ca, previous, sign=-1)
+                aggregate._add(ca, ra)
+                aggregate.save()
+
+    def verify(self) -> dict:
+        """Fields whose stored value differs from a fresh build, with both values."""
+        built = self.build(self.compliance_assessment)
+        mismatches = {}
+        for field in (
+            "total",
+            "status_counts",
+            "result_counts",
+            "progress_total",
+            "progress_assessed",
+            "score_weight",
+            "documentation_score_weight",
+        ):
+            if getattr(self, field) != getattr(built, field):
+                mismatches[field] = (getattr(self, field), getattr(built, field))
+        for field in ("score_total", "documentation_score_total"):
+            if not math.isclose(
+                getattr(self, field), getattr(built, field), abs_tol=1e-6
+            ):
+                mismatches[field] = (getattr(self, field), getattr(built, field))
+        return mismatches
+
 
 class RequirementAssignment(AbstractBaseModel, FolderMixin):
     """
@@ -202,14 +202,12 @@ class BaseModelSerializer(serializers.ModelSerializer):
             return
         user = request.user
         root_folder = Folder.get_root_folder()
-        accessible_cache: dict = {}
-        for field_name, value in validated_data.items():
-            if not isinstance(value, list) or not value:
-                continue
-            if not all(isinstance(item, models.Model) for item in value):
-                continue
-            related_model = type(value[0])
-            if related_model not in accessible_cache:
+        # Shared by the serializers of a context (e.g. the rows of an import):
+        # cached ids are refreshed on a miss, as the object may be newer.
+        accessible_cache: dict = self.context.get("accessible_ids_cache", {})
+
+        def get_accessible_ids(related_model, refresh=False):
+            if refresh or related_model not in accessible_cache:
                 try:
                     ids = RoleAssignment.get_accessible_object_ids(
                         root_folder, user, related_model
@@ -217,9 +215,23 @@ class BaseModelSerializer(serializers.ModelSerializer):
                     accessible_cache[related_model] = {str(i) for i in ids}
                 except NotImplementedError, Permission.DoesNotExist:
                     accessible_cache[related_model] = None
-            accessible_ids = accessible_cache[related_model]
+            return accessible_cache[related_model]
+
+        for field_name, value in validated_data.items():
+            if not isinstance(value, list) or not value:
+                continue
+            if not all(isinstance(item, models.Model) for item in value):
+                continue
+            related_model = type(value[0])
+            accessible_ids = get_accessible_ids(related_model)
             if accessible_ids is None:
                 continue
+            if "accessible_ids_cache" in self.context and any(
+                str(item.id) not in accessible_ids for item in value
+            ):
+                accessible_ids = get_accessible_ids(related_model, refresh=True)
+                if accessible_ids is None:
+                    continue
             # keeping an already-linked object is not linking a new one
             current_ids: set = set()
             if self.instance is not None and not isinstance(self.instance, list):
@@ -374,15 +386,10 @@ class VulnerabilityReadSerializer(BaseModelSerializer):
     def _get_sla_policy(self):
         """Per-instance cache — one DB query per serializer instantiation."""
         if not hasattr(self, "_sla_policy"):
-            from global_settings.models import GlobalSettings
+            from global_settings.cache import get_global_setting
 
-            try:
-                sla_settings = GlobalSettings.objects.get(name="vulnerability-sla")
-                self._sla_policy = (
-                    sla_settings.value if isinstance(sla_settings.value, dict) else {}
-                )
-            except GlobalSettings.DoesNotExist:
-                self._sla_policy = {}
+            sla_policy = get_global_setting("vulnerability-sla")
+            self._sla_policy = sla_policy if isinstance(sla_policy, dict) else {}
         return self._sla_policy
 
     def get_state(self, obj):
@@ -1,8 +1,16 @@
 from django.dispatch import receiver
-from django.db.models.signals import pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from structlog import get_logger
 
-from core.models import EvidenceRevision
+from core.framework_skeleton import invalidate_framework_skeleton
+from core.models import (
+    ComplianceAssessmentAggregate,
+    EvidenceRevision,
+    Framework,
+    Question,
+    QuestionChoice,
+    RequirementNode,
+)
 
 logger = get_logger(__name__)
 
@@ -19,3 +27,40 @@ def _delete_evidence_revision_attachment(sender, instance: EvidenceRevision, **k
                 evidence_id=instance.evidence_id,
                 error=str(e),
             )
+
+
+@receiver(post_save, sender=Framework)
+@receiver(post_delete, sender=Framework)
+def _invalidate_framework_skeleton(sender, instance: Framework, **kwargs):
+    invalidate_framework_skeleton(instance.pk)
+
+
+@receiver(post_save, sender=RequirementNode)
+@receiver(post_delete, sender=RequirementNode)
+def _invalidate_framework_caches_on_node_change(
+    sender, instance: RequirementNode, **kwargs
+):
+    invalidate_framework_skeleton(instance.framework_id)
+    ComplianceAssessmentAggregate.invalidate_framework(instance.framework_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def _invalidate_framework_skeleton_on_question_change(
+    sender, instance: Question, **kwargs
+):
+    for framework_id in RequirementNode.objects.filter(
+        id=instance.requirement_node_id
+    ).values_list("framework_id", flat=True):
+        invalidate_framework_skeleton(framework_id)
+
+
+@receiver(post_save, sender=QuestionChoice)
+@receiver(post_delete, sender=QuestionChoice)
+def _invalidate_framework_skeleton_on_choice_change(
+    sender, instance: QuestionChoice, **kwargs
+):
+    for framework_id in Question.objects.filter(id=instance.question_id).values_list(
+        "requirement_node__framework_id", flat=True
+    ):
+        invalidate_framework_skeleton(framework_id)
@@ -0,0 +1,207 @@
+"""Tests for the incrementally maintained ComplianceAssessmentAggregate."""
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.models import (
+    ComplianceAssessment,
+    ComplianceAssessmentAggregate,
+    Framework,
+    Perimeter,
+    RequirementAssessment,
+    RequirementNode,
+)
+from iam.models import Folder
+
+
+@pytest.fixture
+def audit(db):
+    folder = Folder.get_root_folder()
+    framework = Framework.objects.create(
+        name="Aggregate Framework",
+        urn="urn:test:aggregate:fw",
+        folder=folder,
+        min_score=0,
+        max_score=10,
+    )
+    RequirementNode.objects.create(
+        name="Section",
+        urn="urn:test:aggregate:section",
+        framework=framework,
+        assessable=False,
+        folder=folder,
+    )
+    for index in range(6):
+        RequirementNode.objects.create(
+            name=f"Requirement {index}",
+            urn=f"urn:test:aggregate:req:{index}",
+            ref_id=str(index),
+            order_id=index,
+            framework=framework,
+            parent_urn="urn:test:aggregate:section",
+            assessable=True,
+            weight=index % 3 + 1,
+            implementation_groups=["base"] if index % 2 else ["advanced"],
+            max_score=4 if index == 5 else None,
+            folder=folder,
+        )
+    ca = ComplianceAssessment.objects.create(
+        name="Aggregate audit",
+        framework=framework,
+        folder=folder,
+        perimeter=Perimeter.objects.create(name="Aggregate", folder=folder),
+        min_score=0,
+        max_score=10,
+        show_documentation_score=True,
+    )
+    ca.create_requirement_assessments()
+    return ca
+
+
+def _ras(ca):
+    return list(
+        RequirementAssessment.objects.filter(compliance_assessment=ca)
+        .select_related("requirement")
+        .order_by("requirement__order_id")
+    )
+
+
+def _full_score(ca):
+    """get_global_score without the aggregate."""
+    return ca.get_global_score(
+        prefetched_requirements=[ra for ra in _ras(ca) if ra.requirement.assessable]
+    )
+
+
+def _assess(ca):
+    for ra in _ras(ca):
+        if not ra.requirement.assessable:
+            continue
+        index = ra.requirement.order_id
+        ra.status = RequirementAssessment.Status.DONE if index % 2 else "in_progress"
+        ra.result = (
+            RequirementAssessment.Result.NOT_APPLICABLE
+            if index == 3
+            else RequirementAssessment.Result.COMPLIANT
+        )
+        ra.is_scored = index != 2
+        ra.score = index + 1
+        ra.documentation_score = index
+        ra.save()
+
+
+@pytest.mark.django_db
+class TestComplianceAssessmentAggregate:
+    def test_deltas_match_a_rebuild(self, audit):
+        aggregate = audit.get_aggregate()
+        assert aggregate.total == 7
+        assert aggregate.progress_total == 6
+        assert aggregate.progress_assessed == 0
+
+        _assess(audit)
+        aggregate = ComplianceAssessmentAggregate.objects.get(
+            compliance_assessment=audit
+        )
+        assert aggregate.verify() == {}
+        assert aggregate.total == 7
+        assert aggregate.result_counts == {"compliant": 5, "not_applicable": 1}
+
+        # Moving back and forth, and saves not touching aggregated fields
+        ra = _ras(audit)[4]
+        ra.score = None
+        ra.result = RequirementAssessment.Result.NON_COMPLIANT
+        ra.save()
+        ra.observation = "Seen"
+        ra.save(update_fields=["observation"])
+        assert aggregate.pk == audit.get_aggregate().pk
+        assert audit.get_aggregate().verify() == {}
+
+    @pytest.mark.parametrize("method", ["avg", "sum"])
+    @pytest.mark.parametrize("anchor_na_to_target", [False, True])
+    @pytest.mark.parametrize("implementation_groups", [None, ["base"]])
+    def test_score_matches_the_full_computation(
+        self, audit, method, anchor_na_to_target, implementation_groups
+    ):
+        audit.score_calculation_method = method
+        audit.anchor_na_to_target = anchor_na_to_target
+        audit.target_score = 8
+        audit.selected_implementation_groups = implementation_groups
+        audit.save()
+        _assess(audit)
+
+        assert audit.get_global_score() == _full_score(audit)
+        assert audit.get_global_score()["implementation_score"] != -1
+
+    def test_counts(self, audit):
+        _assess(audit)
+        audit.selected_implementation_groups = ["base"]
+        audit.save()
+
+        status_counts = dict(
+            (status, count) for count, status in audit.get_requirements_status_count()
+        )
+        # All requirement assessments, whatever their implementation groups
+        assert status_counts["done"] == 3
+        assert status_counts["in_progress"] == 3
+        assert status_counts["to_do"] == 1
+        result_counts = dict(
+            (result, count) for count, result in audit.get_requirements_result_count()
+        )
+        # Assessable requirements of the selected groups only
+        assert result_counts["compliant"] == 2
+        assert result_counts["not_applicable"] == 1
+        assert audit._get_progress_counts() == (3, 3)
+
+    def test_bulk_writes_drop_the_rows(self, audit):
+        audit.get_aggregate()
+        RequirementAssessment.objects.filter(compliance_assessment=audit).update(
+            observation="Bulk"
+        )
+        assert audit.aggregates.exists()
+
+        RequirementAssessment.objects.filter(compliance_assessment=audit).update(
+            status=RequirementAssessment.Status.DONE
+        )
+        assert not audit.aggregates.exists()
+        assert audit.get_aggregate().status_counts == {"done": 7}
+
+        ras = _ras(audit)
+        for ra in ras:
+            ra.score = 5
+        RequirementAssessment.objects.bulk_update(ras, ["score"])
+        assert not audit.aggregates.exists()
+        audit.get_aggregate()
+
+        RequirementNode.objects.get(urn="urn:test:aggregate:req:1").save()
+        assert not audit.aggregates.exists()
+
+    def test_parameter_change_rebuilds(self, audit):
+        _assess(audit)
+        before = audit.get_global_score()
+        audit.max_score = 100
+        audit.save()
+        assert audit.get_global_score() == _full_score(audit) != before
+        assert audit.aggregates.get().parameters["max_score"] == 100
+
+
+@pytest.mark.django_db
+def test_rebuild_compliance_aggregates_command(audit):
+    _assess(audit)
+    call_command("rebuild_compliance_aggregates")
+    call_command("rebuild_compliance_aggregates", verify=True)
+
+    ComplianceAssessmentAggregate.objects.filter(compliance_assessment=audit).update(
+        progress_assessed=0
+    )
+    with pytest.raises(CommandError, match="progress_assessed"):
+        call_command(
+            "rebuild_compliance_aggregates",
+            compliance_assessment=str(audit.id),
+            verify=True,
+        )
+    call_command("rebuild_compliance_aggregates", compliance_assessment=str(audit.id))
+    call_command("rebuild_compliance_aggregates", verify=True)
+
+    with pytest.raises(CommandError, match="not found"):
+        call_command("rebuild_compliance_aggregates", compliance_assessment="nope")
@@ -0,0 +1,187 @@
+"""Tests for the cached framework skeletons of the requirement tree endpoints."""
+
+import pytest
+from django.utils import translation
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.framework_skeleton import FRAMEWORK_SKELETON_KEY, get_framework_skeleton
+from core.helpers import get_sorted_requirement_nodes
+from core.models import (
+    ComplianceAssessment,
+    Framework,
+    Perimeter,
+    Question,
+    QuestionChoice,
+    RequirementAssessment,
+    RequirementNode,
+)
+from iam.models import Folder, User, UserGroup
+from iam.snapshot_cache import CacheRegistry
+
+
+@pytest.fixture
+def audit(db, django_capture_on_commit_callbacks):
+    """
+    Section 2 (order 1)      Section 1 (order 0)
+      └── 2.1 (max 4)          ├── 1.2 (order 1, question)
+                               └── 1.1 (order 0)
+    """
+    with django_capture_on_commit_callbacks(execute=True):
+        return _create_audit()
+
+
+def _create_audit():
+    root_folder = Folder.get_root_folder()
+    framework = Framework.objects.create(
+        name="Skeleton Framework",
+        urn="urn:test:skeleton-framework",
+        folder=root_folder,
+    )
+
+    def node(ref_id, order_id, parent=None, **extra):
+        return RequirementNode.objects.create(
+            name=f"Requirement {ref_id}",
+            urn=f"urn:test:skeleton:{ref_id}",
+            ref_id=ref_id,
+            order_id=order_id,
+            framework=framework,
+            parent_urn=parent.urn if parent else None,
+            assessable=parent is not None,
+            folder=root_folder,
+            translations={"fr": {"name": f"Exigence {ref_id}"}},
+            **extra,
+        )
+
+    section_2 = node("2", 1)
+    section_1 = node("1", 0)
+    node("2.1", 0, section_2, max_score=4, weight=2)
+    req_1_2 = node("1.2", 1, section_1)
+    node("1.1", 0, section_1)
+    question = Question.objects.create(
+        requirement_node=req_1_2,
+        urn="urn:test:skeleton:1.2:q",
+        type=Question.Type.UNIQUE_CHOICE,
+        text="Is it?",
+        folder=root_folder,
+    )
+    QuestionChoice.objects.create(
+        question=question, urn="urn:test:skeleton:1.2:q:yes", value="Yes", order=0
+    )
+
+    ca = ComplianceAssessment.objects.create(
+        name="Skeleton audit",
+        framework=framework,
+        folder=root_folder,
+        perimeter=Perimeter.objects.create(name="Skeleton", folder=root_folder),
+    )
+    ca.create_requirement_assessments()
+    RequirementAssessment.objects.filter(
+        compliance_assessment=ca, requirement__ref_id="2.1"
+    ).update(is_scored=True, score=3, result="compliant")
+    return ca
+
+
+def _expected_tree(ca):
+    framework = ca.framework
+    return get_sorted_requirement_nodes(
+        list(RequirementNode.objects.filter(framework=framework)),
+        list(RequirementAssessment.objects.filter(compliance_assessment=ca)),
+        ca.max_score if ca.max_score is not None else framework.max_score,
+        ca.min_score if ca.min_score is not None else framework.min_score,
+    )
+
+
+def _build_tree(ca):
+    framework = ca.framework
+    return get_framework_skeleton(framework).build_tree(
+        RequirementAssessment.objects.filter(compliance_assessment=ca),
+        ca.max_score if ca.max_score is not None else framework.max_score,
+        ca.min_score if ca.min_score is not None else framework.min_score,
+    )
+
+
+@pytest.mark.django_db
+class TestFrameworkSkeleton:
+    @pytest.mark.parametrize("language", ["en", "fr"])
+    def test_same_tree_as_get_sorted_requirement_nodes(self, audit, language):
+        with translation.override(language):
+            tree = _build_tree(audit)
+            assert tree == _expected_tree(audit)
+        assert [node["ref_id"] for node in tree.values()] == ["1", "2"]
+        section_1 = next(iter(tree.values()))
+        assert [node["ref_id"] for node in section_1["children"].values()] == [
+            "1.1",
+            "1.2",
+        ]
+
+    def test_skeleton_is_reused(self, audit, django_assert_num_queries):
+        framework = audit.framework
+        skeleton = get_framework_skeleton(framework)
+        CacheRegistry._last_fetched_at = None
+        # The version query only
+        with django_assert_num_queries(1):
+            assert get_framework_skeleton(framework) is skeleton
+        with translation.override("fr"):
+            assert get_framework_skeleton(framework) is not skeleton
+
+    def test_node_change_drops_the_skeleton(
+        self, audit, django_capture_on_commit_callbacks
+    ):
+        framework = audit.framework
+        skeleton = get_framework_skeleton(framework)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Question.objects.get(urn="urn:test:skeleton:1.2:q").delete()
+            RequirementNode.objects.filter(urn="urn:test:skeleton:2.1").update(
+                name="Renamed"
+            )
+            # update() sends no signal: saving a node does
+            RequirementNode.objects.get(urn="urn:test:skeleton:1.1").save()
+
+        assert get_framework_skeleton(framework) is not skeleton
+        assert _build_tree(audit) == _expected_tree(audit)
+
+    def test_other_frameworks_are_kept(self, audit, django_capture_on_commit_callbacks):
+        skeleton = get_framework_skeleton(audit.framework)
+        other = Framework.objects.create(
+            name="Other", urn="urn:test:skeleton-other", folder=audit.folder
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            other.save()
+        # As another process, applying the journal
+        CacheRegistry.get_cache(FRAMEWORK_SKELETON_KEY)._snapshot = None
+        assert get_framework_skeleton(audit.framework) is not skeleton
+
+        skeleton = get_framework_skeleton(audit.framework)
+        cache = CacheRegistry.get_cache(FRAMEWORK_SKELETON_KEY)
+        snapshot = cache._snapshot
+        with django_capture_on_commit_callbacks(execute=True):
+            other.save()
+        cache._snapshot = snapshot
+        CacheRegistry._last_fetched_at = None
+        assert get_framework_skeleton(audit.framework) is skeleton
+
+
+@pytest.mark.django_db
+def test_tree_endpoint(audit):
+    from core.views import ComplianceAssessmentViewSet
+
+    admin = User.objects.create_superuser("skeleton@tests.com")
+    UserGroup.objects.get(name="BI-UG-ADM").user_set.add(admin)
+    request = APIRequestFactory().get(f"/compliance-assessments/{audit.id}/tree/")
+    force_authenticate(request, user=admin)
+
+    response = ComplianceAssessmentViewSet.as_view({"get": "tree"})(
+        request, pk=str(audit.id)
+    )
+    assert response.status_code == 200
+    leaf = next(
+        node
+        for section in response.data.values()
+        for node in section["children"].values()
+        if node["ref_id"] == "2.1"
+    )
+    assert leaf["style"] == "leaf"
+    assert leaf["score"] == 3
+    assert leaf["max_score"] == 4
+    assert leaf["aggregated_score"] is not None
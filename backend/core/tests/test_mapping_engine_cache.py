@@ -0,0 +1,132 @@
+"""Tests for the mapping engine snapshot shared through the CacheRegistry."""
+
+import uuid
+
+import pytest
+
+from core.mappings.engine import MAPPING_ENGINE_KEY, MappingEngine, engine
+from core.models import Framework, StoredLibrary
+from iam.models import Folder
+from iam.snapshot_cache import CacheRegistry
+
+
+def _mapping_library(name, source, target):
+    return StoredLibrary.objects.create(
+        name=name,
+        urn=f"urn:test:mapping-cache:library:{name}",
+        ref_id=name,
+        locale="en",
+        version=1,
+        is_loaded=True,
+        hash_checksum=uuid.uuid4().hex,
+        folder=Folder.get_root_folder(),
+        content={
+            "requirement_mapping_set": {
+                "urn": f"urn:test:mapping-cache:rms:{name}",
+                "ref_id": name,
+                "name": name,
+                "source_framework_urn": source,
+                "target_framework_urn": target,
+                "requirement_mappings": [
+                    {
+                        "source_requirement_urn": f"{source}:req",
+                        "target_requirement_urn": f"{target}:req",
+                        "relationship": "equal",
+                    }
+                ],
+            }
+        },
+    )
+
+
+def _as_other_worker(monkeypatch):
+    """Keep the current snapshot, forbid full rebuilds and force the next
+    version fetch, as a worker that did not make the change."""
+    cache = CacheRegistry.get_cache(MAPPING_ENGINE_KEY)
+    snapshot = cache._snapshot
+    assert snapshot is not None
+
+    def restore():
+        cache._snapshot = snapshot
+        CacheRegistry._last_fetched_at = None
+
+        def _no_rebuild():
+            raise AssertionError("full rebuild instead of delta")
+
+        monkeypatch.setattr(cache, "_builder", _no_rebuild)
+
+    return restore
+
+
+@pytest.mark.django_db
+class TestMappingEngineSnapshot:
+    def test_engine_follows_the_registry(self, django_capture_on_commit_callbacks):
+        engine.reload_cache()
+        assert ("urn:fw:a", "urn:fw:b") not in engine.all_rms
+
+        with django_capture_on_commit_callbacks(execute=True):
+            _mapping_library("ab", "urn:fw:a", "urn:fw:b")
+
+        assert ("urn:fw:a", "urn:fw:b") in engine.all_rms
+        assert "urn:fw:b" in engine.framework_mappings["urn:fw:a"]
+        assert ("urn:fw:a", "urn:fw:b") in engine.direct_mappings
+
+    def test_only_changed_libraries_are_reloaded(
+        self, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        ab = _mapping_library("ab", "urn:fw:a", "urn:fw:b")
+        _mapping_library("bc", "urn:fw:b", "urn:fw:c")
+        engine.reload_cache()
+        unchanged = engine.all_rms[("urn:fw:b", "urn:fw:c")]
+        restore = _as_other_worker(monkeypatch)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ab.delete()
+            _mapping_library("ac", "urn:fw:a", "urn:fw:c")
+        restore()
+
+        assert ("urn:fw:a", "urn:fw:b") not in engine.all_rms
+        assert ("urn:fw:a", "urn:fw:c") in engine.all_rms
+        assert engine.framework_mappings["urn:fw:a"] == ["urn:fw:c"]
+        # Same object: the RMS of the unchanged library was not reloaded
+        assert engine.all_rms[("urn:fw:b", "urn:fw:c")] is unchanged
+        assert engine.get_compiled_rms(("urn:fw:a", "urn:fw:c")).partial_count == 0
+
+    def test_framework_change_is_applied_as_delta(
+        self, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        framework = Framework.objects.create(
+            urn="urn:test:mapping-cache:framework",
+            name="Cached framework",
+            folder=Folder.get_root_folder(),
+        )
+        engine.reload_cache()
+        restore = _as_other_worker(monkeypatch)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            framework.max_score = 42
+            framework.save()
+        restore()
+        assert engine.frameworks[framework.urn]["max_score"] == 42
+
+        monkeypatch.undo()
+        engine.reload_cache()
+        restore = _as_other_worker(monkeypatch)
+        with django_capture_on_commit_callbacks(execute=True):
+            framework.delete()
+        restore()
+        assert framework.urn not in engine.frameworks
+
+    def test_is_not_hydrated_with_iam_caches(self):
+        cache = CacheRegistry.get_cache(MAPPING_ENGINE_KEY)
+        cache.invalidate()
+        CacheRegistry.hydrate_all(force_reload=True)
+        assert cache._snapshot is None
+
+    def test_detached_engine_keeps_its_data(self):
+        detached = MappingEngine()
+        detached.frameworks = {}
+        detached.all_rms = {}
+        detached.framework_mappings = {}
+        detached.direct_mappings = set()
+        assert detached.all_rms == {}
@@ -528,8 +528,14 @@ class TestGlobalScoreQueryPerformance:
         from django.test.utils import CaptureQueriesContext
         from django.db import connection
 
-        # get_global_score should use select_related("requirement"),
-        # producing a constant number of queries (not scaling with RA count)
+        # The first read builds the ComplianceAssessmentAggregate of the audit,
+        # with select_related("requirement"): a constant number of queries
+        # (not scaling with RA count)
+        with CaptureQueriesContext(connection) as ctx:
+            ca.get_global_score()
+        assert len(ctx.captured_queries) <= 10
+
+        # Later reads only fetch the aggregate
         with CaptureQueriesContext(connection) as ctx:
             score = ca.get_global_score()
 
@@ -116,10 +116,10 @@ _CURRENCY_FORMAT = {
 
 def get_global_currency() -> str:
     """Get the currency from global settings, defaulting to €."""
-    from global_settings.models import GlobalSettings
+    from global_settings.cache import get_global_setting
 
-    general_settings = GlobalSettings.objects.filter(name="general").first()
-    return general_settings.value.get("currency", "€") if general_settings else "€"
+    general_settings = get_global_setting("general")
+    return general_settings.get("currency", "€") if general_settings else "€"
 
 
 def format_currency(value, currency: str) -> str:
@@ -1,6 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from django.core.validators import BaseValidator
+from django.utils.functional import cached_property
 from django.utils.text import get_valid_filename, slugify
 import jsonschema
 
@@ -13,11 +14,18 @@ class JSONSchemaInstanceValidator(BaseValidator):
     def __init__(self, schema):
         self.schema = schema
 
+    @cached_property
+    def validator(self):
+        # What jsonschema.validate does on each call: checking the schema
+        # itself costs more than validating a value against it.
+        validator_class = jsonschema.validators.validator_for(self.schema)
+        validator_class.check_schema(self.schema)
+        return validator_class(self.schema)
+
     def __call__(self, value):
-        try:
-            jsonschema.validate(value, self.schema)
-        except jsonschema.exceptions.ValidationError as e:
-            raise ValidationError(e.message)
+        error = jsonschema.exceptions.best_match(self.validator.iter_errors(value))
+        if error is not None:
+            raise ValidationError(error.message)
 
 
 def validate_file_size(value):
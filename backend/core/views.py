@@ -79,6 +79,7 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from core.constants import LEGACY_TTP_LIBRARIES
 from core.permissions import FeatureFlagRequired
 from core.helpers import get_instance_metrics
+from core.framework_skeleton import get_framework_skeleton
 from core.instance_metrics import (
     nb_users_gauge,
     nb_first_login_gauge,
@@ -202,6 +203,7 @@ from serdes.serializers import ExportSerializer
 from django.contrib.admin.utils import NestedObjects
 from django.db import router
 from global_settings.models import GlobalSettings
+from global_settings.cache import get_global_setting
 from global_settings.utils import ff_is_enabled, general_setting_is_enabled
 
 import structlog
@@ -364,10 +366,10 @@ class NullableChoiceFilter(df.MultipleChoiceFilter):
 def get_mapping_max_depth():
     """Get mapping max depth from general settings at runtime; safe during migrations."""
     try:
-        gs = GlobalSettings.objects.filter(name="general").only("value").first()
-        if not gs or not isinstance(getattr(gs, "value", None), dict):
+        general = get_global_setting("general")
+        if not isinstance(general, dict):
             return MAPPING_MAX_DEPTH
-        raw = gs.value.get("mapping_max_depth", MAPPING_MAX_DEPTH)
+        raw = general.get("mapping_max_depth", MAPPING_MAX_DEPTH)
         try:
             val = int(raw)
         except TypeError, ValueError:
@@ -461,10 +463,7 @@ class ExportMixin:
 
     def _get_export_queryset(self):
         """Get filtered queryset with permissions applied."""
-        (viewable_ids, _, _) = RoleAssignment.get_accessible_object_ids(
-            Folder.get_root_folder(), self.request.user, self.model
-        )
-        queryset = self.model.objects.filter(id__in=viewable_ids)
+        queryset = RoleAssignment.accessible_queryset(self.request.user, self.model)
 
         if self.export_config:
             if self.export_config.get("select_related"):
@@ -913,7 +912,7 @@ class BaseModelViewSet(viewsets.ModelViewSet):
     def get_queryset(self) -> models.query.QuerySet:
         if not self.model:
             return None
-        object_ids_view = None
+        queryset = None
         if self.request.method == "GET":
             if q := re.match(
                 r"/api/[\w-]+/([\w-]+/)?([0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}(,[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12})+)",
@@ -923,14 +922,12 @@ class BaseModelViewSet(viewsets.ModelViewSet):
                 https://stackoverflow.com/questions/74048193/why-does-a-retrieve-request-end-up-calling-get-queryset"""
                 id = UUID(q.group(1))
                 if RoleAssignment.is_object_readable(self.request.user, self.model, id):
-                    object_ids_view = [id]
-
-        if not object_ids_view:
-            object_ids_view = RoleAssignment.get_accessible_object_ids(
-                Folder.get_root_folder(), self.request.user, self.model
-            )[0]
+                    queryset = self.model.objects.filter(id=id)
 
-        queryset = self.model.objects.filter(id__in=object_ids_view)
+        if queryset is None:
+            # Visibility is pushed down to SQL as a folder filter, so page
+            # latency depends on the page size rather than on the tenant size.
+            queryset = RoleAssignment.accessible_queryset(self.request.user, self.model)
 
         field_names = {f.name for f in self.model._meta.get_fields()}
         if "parent_folder" in field_names:
@@ -2537,9 +2534,9 @@ class AssetViewSet(IntegrationLinkViewSetMixin, ExportMixin, BaseModelViewSet):
         serializer_class = self.get_serializer_class(action="update")
         asset_data = serializer_class(super().get_object()).data
 
-        general_settings = GlobalSettings.objects.filter(name="general").first()
+        general_settings = get_global_setting("general")
         scale_key = (
-            general_settings.value.get("security_objective_scale", "1-4")
+            general_settings.get("security_objective_scale", "1-4")
             if general_settings
             else "1-4"
         )
@@ -4236,22 +4233,14 @@ class RiskAssessmentViewSet(BaseModelViewSet):
                 scenario.strength_of_knowledge = RiskScenario.DEFAULT_SOK_OPTIONS[
                     scenario.strength_of_knowledge
                 ]["name"]
-            general_settings = GlobalSettings.objects.filter(name="general").first()
-            swap_axes = general_settings.value.get("risk_matrix_swap_axes", False)
-            flip_vertical = general_settings.value.get(
-                "risk_matrix_flip_vertical", False
-            )
+            general_settings = get_global_setting("general", {})
+            swap_axes = general_settings.get("risk_matrix_swap_axes", False)
+            flip_vertical = general_settings.get("risk_matrix_flip_vertical", False)
             matrix_settings = {
                 "swap_axes": "_swapaxes" if swap_axes else "",
                 "flip_vertical": "_vflip" if flip_vertical else "",
             }
-            ff_settings = GlobalSettings.objects.filter(
-                name=GlobalSettings.Names.FEATURE_FLAGS
-            ).first()
-            if ff_settings is None:
-                feature_flags = {}
-            else:
-                feature_flags = ff_settings.value
+            feature_flags = get_global_setting(GlobalSettings.Names.FEATURE_FLAGS, {})
             data = {
                 "context": context,
                 "risk_assessment": risk_assessment,
@@ -12097,16 +12086,48 @@ class ComplianceAssessmentViewSet(BaseModelViewSet):
         else:
             return Response(status=status.HTTP_403_FORBIDDEN)
 
+    @staticmethod
+    def _requirement_tree(compliance_assessment, requirement_assessments) -> dict:
+        """Requirement tree of the assessment: the cached framework skeleton
+        with the requirement assessments overlaid, filtered by implementation
+        groups and annotated with the aggregated scores."""
+        _framework = compliance_assessment.framework
+        tree = get_framework_skeleton(_framework).build_tree(
+            requirement_assessments,
+            compliance_assessment.max_score
+            if compliance_assessment.max_score is not None
+            else _framework.max_score,
+            compliance_assessment.min_score
+            if compliance_assessment.min_score is not None
+            else _framework.min_score,
+        )
+        implementation_groups = compliance_assessment.selected_implementation_groups
+        if (
+            compliance_assessment.framework.is_dynamic()
+            and not compliance_assessment.selected_implementation_groups
+        ):
+            implementation_groups = None
+        tree = filter_graph_by_implementation_groups(tree, implementation_groups)
+        annotate_tree_with_aggregated_scores(tree, compliance_assessment)
+        return tree
+
+    @staticmethod
+    def _tree_requirement_assessments(compliance_assessment) -> list:
+        """All the requirement assessments of the assessment, with only what
+        the tree overlays: the node data comes from the framework skeleton."""
+        return list(
+            RequirementAssessment.objects.filter(
+                compliance_assessment=compliance_assessment
+            ).prefetch_related(
+                "answers", "answers__question", "answers__selected_choices"
+            )
+        )
+
     @action(detail=True, methods=["get"])
     def tree(self, request, pk):
         compliance_assessment = self.get_object()
-        _framework = compliance_assessment.framework
-        requirement_assessments = list(
-            compliance_assessment.get_requirement_assessments(
-                include_non_assessable=True,
-                lightweight=True,
-                skip_ig_filter=True,
-            )
+        requirement_assessments = self._tree_requirement_assessments(
+            compliance_assessment
         )
         # Auditee filtering: scope to assigned requirements only
         respondent_folders = get_respondent_scoped_folder_ids(request.user)
@@ -12122,45 +12143,9 @@ class ComplianceAssessmentViewSet(BaseModelViewSet):
                 ra for ra in requirement_assessments if ra.id in ra_ids
             ]
 
-        requirement_nodes = list(
-            RequirementNode.objects.filter(framework=_framework)
-            .select_related("framework")
-            .prefetch_related(
-                "reference_controls", "threats", "questions", "questions__choices"
-            )
-            .all(),
-        )
-        nodes_by_urn = {node.urn: node for node in requirement_nodes}
-        for node in requirement_nodes:
-            parent = nodes_by_urn.get(node.parent_urn)
-            if parent:
-                node._parent_requirement_obj = parent
-        for ra in requirement_assessments:
-            req = getattr(ra, "requirement", None)
-            if req:
-                parent = nodes_by_urn.get(req.parent_urn)
-                if parent:
-                    req._parent_requirement_obj = parent
-
-        tree = get_sorted_requirement_nodes(
-            requirement_nodes,
-            requirement_assessments,
-            compliance_assessment.max_score
-            if compliance_assessment.max_score is not None
-            else _framework.max_score,
-            compliance_assessment.min_score
-            if compliance_assessment.min_score is not None
-            else _framework.min_score,
+        return Response(
+            self._requirement_tree(compliance_assessment, requirement_assessments)
         )
-        implementation_groups = compliance_assessment.selected_implementation_groups
-        if (
-            compliance_assessment.framework.is_dynamic()
-            and not compliance_assessment.selected_implementation_groups
-        ):
-            implementation_groups = None
-        tree = filter_graph_by_implementation_groups(tree, implementation_groups)
-        annotate_tree_with_aggregated_scores(tree, compliance_assessment)
-        return Response(tree)
 
     @action(detail=True, methods=["get"])
     def combined_tree(self, request, pk):
@@ -12177,52 +12162,10 @@ class ComplianceAssessmentViewSet(BaseModelViewSet):
         from core.audit_inheritance import build_overlay_map
 
         compliance_assessment = self.get_object()
-        _framework = compliance_assessment.framework
-        requirement_assessments = list(
-            compliance_assessment.get_requirement_assessments(
-                include_non_assessable=True,
-                lightweight=True,
-                skip_ig_filter=True,
-            )
-        )
-        requirement_nodes = list(
-            RequirementNode.objects.filter(framework=_framework)
-            .select_related("framework")
-            .prefetch_related(
-                "reference_controls", "threats", "questions", "questions__choices"
-            )
-            .all(),
+        tree = self._requirement_tree(
+            compliance_assessment,
+            self._tree_requirement_assessments(compliance_assessment),
         )
-        nodes_by_urn = {node.urn: node for node in requirement_nodes}
-        for node in requirement_nodes:
-            parent = nodes_by_urn.get(node.parent_urn)
-            if parent:
-                node._parent_requirement_obj = parent
-        for ra in requirement_assessments:
-            req = getattr(ra, "requirement", None)
-            if req:
-                parent = nodes_by_urn.get(req.parent_urn)
-                if parent:
-                    req._parent_requirement_obj = parent
-
-        tree = get_sorted_requirement_nodes(
-            requirement_nodes,
-            requirement_assessments,
-            compliance_assessment.max_score
-            if compliance_assessment.max_score is not None
-            else _framework.max_score,
-            compliance_assessment.min_score
-            if compliance_assessment.min_score is not None
-            else _framework.min_score,
-        )
-        implementation_groups = compliance_assessment.selected_implementation_groups
-        if (
-            compliance_assessment.framework.is_dynamic()
-            and not compliance_assessment.selected_implementation_groups
-        ):
-            implementation_groups = None
-        tree = filter_graph_by_implementation_groups(tree, implementation_groups)
-        annotate_tree_with_aggregated_scores(tree, compliance_assessment)
 
         (viewable_ca_ids, _, _) = RoleAssignment.get_accessible_object_ids(
             Folder.get_root_folder(), request.user, ComplianceAssessment
@@ -0,0 +1,87 @@
+"""
+Benchmark of crq.utils.simulate_portfolio_annual_losses against the former
+scalar implementation (one rng.random()/rng.lognormal() call per simulation and
+scenario). Needs no database.
+
+    python manage.py benchmark_portfolio_simulation --scenarios 60 --simulations 100000
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from crq.utils import mu_sigma_from_lognorm_90pct, simulate_portfolio_annual_losses
+
+
+def _scalar_portfolio_annual_losses(scenario_params, n_simulations, random_seed):
+    """Former double loop, kept for comparison."""
+    rng = np.random.default_rng(random_seed)
+    distributions = []
+    for scenario in scenario_params:
+        mu, sigma = mu_sigma_from_lognorm_90pct(
+            scenario["lower_bound"], scenario["upper_bound"]
+        )
+        distributions.append((scenario["name"], scenario["probability"], mu, sigma))
+
+    results = {name: np.zeros(n_simulations) for name, _, _, _ in distributions}
+    for i in range(n_simulations):
+        for name, probability, mu, sigma in distributions:
+            if rng.random() < probability:
+                results[name][i] = rng.lognormal(mu, sigma)
+    results["Portfolio_Total"] = sum(results.values())
+    return results
+
+
+class Command(BaseCommand):
+    help = "Benchmark the batched portfolio Monte Carlo engine against the scalar loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", type=int, default=60)
+        parser.add_argument("--simulations", type=int, default=100_000)
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--skip-scalar",
+            action="store_true",
+            help="Only time the batched engine.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        n_simulations = options["simulations"]
+        scenarios = []
+        for index in range(options["scenarios"]):
+            lower_bound = float(rng.uniform(1e3, 1e5))
+            scenarios.append(
+                {
+                    "name": f"scenario {index}",
+                    "probability": float(rng.uniform(0.01, 0.5)),
+                    "lower_bound": lower_bound,
+                    "upper_bound": lower_bound * float(rng.uniform(2, 100)),
+                }
+            )
+
+        start = time.perf_counter()
+        batched = simulate_portfolio_annual_losses(
+            scenarios, n_simulations, options["seed"], options["chunk_size"]
+        )
+        batched_s = time.perf_counter() - start
+        self.stdout.write(
+            f"{len(scenarios)} scenarios x {n_simulations} simulations: "
+            f"batched {batched_s:.3f} s, "
+            f"mean portfolio loss {batched['Portfolio_Total'].mean():,.0f}"
+        )
+        if options["skip_scalar"]:
+            return
+
+        start = time.perf_counter()
+        scalar = _scalar_portfolio_annual_losses(
+            scenarios, n_simulations, options["seed"]
+        )
+        scalar_s = time.perf_counter() - start
+        self.stdout.write(
+            f"scalar {scalar_s:.3f} s, "
+            f"mean portfolio loss {scalar['Portfolio_Total'].mean():,.0f}, "
+            f"speedup {scalar_s / batched_s:.0f}x"
+        )
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.7 on 2026-10-17 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crq", "0003_remove_quantitativeriskscenario_new_owner_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PortfolioLossVector",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "risk_stage",
+                    models.CharField(
+                        choices=[
+                            ("inherent", "Inherent"),
+                            ("current", "Current"),
+                            ("residual", "Residual"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("scenario_id", models.UUIDField(blank=True, null=True)),
+                ("hypothesis_id", models.UUIDField(blank=True, null=True)),
+                ("fingerprint", models.CharField(blank=True, max_length=64)),
+                ("losses", models.BinaryField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "study",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="loss_vectors",
+                        to="crq.quantitativeriskstudy",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Portfolio loss vector",
+                "verbose_name_plural": "Portfolio loss vectors",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("study", "risk_stage", "scenario_id"),
+                        name="unique_loss_vector_per_scenario_stage",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("scenario_id__isnull", True)),
+                        fields=("study", "risk_stage"),
+                        name="unique_loss_vector_total_per_stage",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+import hashlib
+import json
+
+import numpy as np
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from core.base_models import ETADueDateMixin, NameDescriptionMixin
@@ -83,6 +88,11 @@ class QuantitativeRiskStudy(NameDescriptionMixin, ETADueDateMixin, FolderMixin):
         ),
     )
 
+    # Monte Carlo configuration of the portfolio simulation. Each risk stage has
+    # its own seed, from which every scenario gets its own random stream.
+    PORTFOLIO_N_SIMULATIONS = 100_000
+    PORTFOLIO_STAGE_SEEDS = {"inherent": 41, "current": 42, "residual": 43}
+
     def __str__(self):
         return f"{self.name}"
 
@@ -147,239 +157,216 @@ class QuantitativeRiskStudy(NameDescriptionMixin, ETADueDateMixin, FolderMixin):
 
     def get_or_generate_portfolio_simulation(self, force_refresh=False):
         """
-        Get cached portfolio simulation results or generate new ones if cache is empty/stale.
+        Get cached portfolio simulation results, scheduling their generation in
+        the background if the cache is empty (or if force_refresh is set).
 
         Args:
-            force_refresh: Force regeneration of cached data
+            force_refresh: Schedule a refresh even if cached data is available
 
         Returns:
-            Dict containing current and residual portfolio simulation results
+            Dict containing inherent, current and residual portfolio simulation
+            results. While the first simulation is pending, the stages are None
+            and metadata.status is "pending".
         """
-        from .utils import run_combined_simulation
         import logging
 
         logger = logging.getLogger(__name__)
 
-        # Check if cache exists and is not empty (unless forcing refresh)
-        if (
-            not force_refresh
-            and self.portfolio_simulation
-            and isinstance(self.portfolio_simulation, dict)
-            and self.portfolio_simulation.get("current")
-            and self.portfolio_simulation.get("residual")
-        ):
+        # A stage without a valid hypothesis is None in a ready simulation
+        cached = (
+            isinstance(self.portfolio_simulation, dict)
+            and (self.portfolio_simulation.get("metadata") or {}).get("status")
+            == "ready"
+        )
+        if cached and not force_refresh:
             logger.info(f"Using cached portfolio simulation for study {self.id}")
             return self.portfolio_simulation
 
-        logger.info(f"Generating portfolio simulation for study {self.id}")
-
-        portfolio_data = {
+        logger.info(f"Scheduling portfolio simulation for study {self.id}")
+        self.schedule_portfolio_simulation()
+        if cached:
+            return self.portfolio_simulation
+        return {
             "inherent": None,
             "current": None,
             "residual": None,
-            "metadata": {
-                "generated_at": str(self.updated_at),
-                "scenarios_count": self.risk_scenarios.count(),
-            },
+            "metadata": {"status": "pending"},
         }
 
-        # Generate inherent portfolio simulation
-        inherent_scenarios_params = {}
-        inherent_scenarios_info = []
-
-        for scenario in self.risk_scenarios.all():
-            inherent_hypothesis = scenario.hypotheses.filter(
-                risk_stage="inherent"
-            ).first()
-            if inherent_hypothesis and inherent_hypothesis.parameters:
-                params = inherent_hypothesis.parameters
-
-                # Extract and validate parameters
-                probability = params.get("probability")
-                impact = params.get("impact", {})
-                lower_bound = impact.get("lb")
-                upper_bound = impact.get("ub")
-                distribution = impact.get("distribution")
-
-                if (
-                    probability is not None
-                    and lower_bound is not None
-                    and upper_bound is not None
-                    and distribution == "LOGNORMAL-CI90"
-                    and lower_bound > 0
-                    and upper_bound > lower_bound
-                ):
-                    inherent_scenarios_params[scenario.name] = {
-                        "probability": probability,
-                        "lower_bound": lower_bound,
-                        "upper_bound": upper_bound,
-                    }
-                    inherent_scenarios_info.append(
-                        {
-                            "scenario_id": str(scenario.id),
-                            "scenario_name": scenario.name,
-                            "hypothesis_id": str(inherent_hypothesis.id),
-                            "hypothesis_name": inherent_hypothesis.name,
-                        }
-                    )
+    def schedule_portfolio_simulation(self):
+        """
+        Refresh the portfolio simulation in a Huey task once the transaction
+        commits, unless a refresh of the study is already waiting to run.
+        """
+        from .tasks import queue_portfolio_refresh
 
-        if inherent_scenarios_params:
-            try:
-                inherent_results = run_combined_simulation(
-                    scenarios_params=inherent_scenarios_params,
-                    n_simulations=100_000,
-                    random_seed=41,
-                    loss_threshold=self.loss_threshold,
-                )
-                if "Portfolio_Total" in inherent_results:
-                    portfolio_result = inherent_results["Portfolio_Total"]
-                    portfolio_data["inherent"] = {
-                        "loss": portfolio_result["loss"],
-                        "probability": portfolio_result["probability"],
-                        "metrics": portfolio_result.get("metrics", {}),
-                        "scenarios": inherent_scenarios_info,
-                        "total_scenarios": len(inherent_scenarios_info),
-                        "method": "direct_simulation",
-                    }
-            except Exception as e:
-                logger.warning(
-                    f"Failed to generate inherent portfolio simulation for study {self.id}: {str(e)}"
+        study_id = self.id
+        transaction.on_commit(lambda: queue_portfolio_refresh(study_id))
+
+    def update_portfolio_simulation(self) -> int:
+        """
+        Bring the cached portfolio simulation up to date.
+
+        For each risk stage, every scenario contributes the losses of its stage
+        hypothesis (the first one for inherent and current, the selected one for
+        residual), simulated from its own random stream and kept as a
+        PortfolioLossVector. Only the scenarios whose parameters changed are
+        re-simulated: their previous vector is subtracted from the stage total
+        and the new one added.
+
+        Returns:
+            The number of scenario vectors that were (re)simulated.
+        """
+        from .utils import (
+            LOSS_VECTOR_SCALE,
+            pack_loss_vector,
+            scenario_loss_vector,
+            summarize_losses,
+            unpack_loss_vector,
+        )
+
+        n_simulations = self.PORTFOLIO_N_SIMULATIONS
+        resimulated = 0
+
+        with transaction.atomic():
+            # Serialize concurrent refreshes of the same study
+            study = QuantitativeRiskStudy.objects.select_for_update().get(pk=self.pk)
+            scenarios = list(study.risk_scenarios.order_by("created_at"))
+            hypotheses = {}
+            for hypothesis in QuantitativeRiskHypothesis.objects.filter(
+                quantitative_risk_scenario__quantitative_risk_study=study
+            ).order_by("created_at"):
+                if hypothesis.risk_stage == "residual" and not hypothesis.is_selected:
+                    continue
+                hypotheses.setdefault(
+                    (hypothesis.quantitative_risk_scenario_id, hypothesis.risk_stage),
+                    hypothesis,
                 )
-                portfolio_data["inherent"] = {"error": str(e)}
-
-        # Generate current portfolio simulation
-        current_scenarios_params = {}
-        current_scenarios_info = []
-
-        for scenario in self.risk_scenarios.all():
-            current_hypothesis = scenario.hypotheses.filter(
-                risk_stage="current"
-            ).first()
-            if current_hypothesis and current_hypothesis.parameters:
-                params = current_hypothesis.parameters
-
-                # Extract and validate parameters
-                probability = params.get("probability")
-                impact = params.get("impact", {})
-                lower_bound = impact.get("lb")
-                upper_bound = impact.get("ub")
-                distribution = impact.get("distribution")
-
-                if (
-                    probability is not None
-                    and lower_bound is not None
-                    and upper_bound is not None
-                    and distribution == "LOGNORMAL-CI90"
-                    and lower_bound > 0
-                    and upper_bound > lower_bound
-                ):
-                    current_scenarios_params[scenario.name] = {
-                        "probability": probability,
-                        "lower_bound": lower_bound,
-                        "upper_bound": upper_bound,
-                    }
-                    current_scenarios_info.append(
-                        {
-                            "scenario_id": str(scenario.id),
-                            "scenario_name": scenario.name,
-                            "hypothesis_id": str(current_hypothesis.id),
-                            "hypothesis_name": current_hypothesis.name,
-                        }
+            vectors = {
+                (vector.risk_stage, vector.scenario_id): vector
+                for vector in study.loss_vectors.all()
+            }
+
+            portfolio_data = {
+                "inherent": None,
+                "current": None,
+                "residual": None,
+                "metadata": {
+                    "status": "ready",
+                    "generated_at": timezone.now().isoformat(),
+                    "scenarios_count": len(scenarios),
+                    "n_simulations": n_simulations,
+                },
+            }
+
+            for risk_stage, random_seed in self.PORTFOLIO_STAGE_SEEDS.items():
+                total_vector = vectors.pop((risk_stage, None), None)
+                if total_vector is None:
+                    # No total to update: rebuild the stage from scratch
+                    for key in [key for key in vectors if key[0] == risk_stage]:
+                        vectors.pop(key).delete()
+                    total = np.zeros(n_simulations)
+                    total_changed = True
+                else:
+                    total = unpack_loss_vector(total_vector.losses, n_simulations)
+                    total_changed = False
+
+                scenarios_info = []
+                for scenario in scenarios:
+                    hypothesis = hypotheses.get((scenario.id, risk_stage))
+                    params = (
+                        hypothesis.get_portfolio_parameters() if hypothesis else None
+                    )
+                    vector = vectors.pop((risk_stage, scenario.id), None)
+                    fingerprint = (
+                        self._portfolio_fingerprint(params, random_seed)
+                        if params
+                        else None
                     )
 
-        if current_scenarios_params:
-            try:
-                current_results = run_combined_simulation(
-                    scenarios_params=current_scenarios_params,
-                    n_simulations=100_000,
-                    random_seed=42,
-                    loss_threshold=self.loss_threshold,
-                )
-                if "Portfolio_Total" in current_results:
-                    portfolio_result = current_results["Portfolio_Total"]
-                    portfolio_data["current"] = {
-                        "loss": portfolio_result["loss"],
-                        "probability": portfolio_result["probability"],
-                        "metrics": portfolio_result.get("metrics", {}),
-                        "scenarios": current_scenarios_info,
-                        "total_scenarios": len(current_scenarios_info),
-                        "method": "direct_simulation",
-                    }
-            except Exception as e:
-                logger.warning(
-                    f"Failed to generate current portfolio simulation for study {self.id}: {str(e)}"
-                )
-                portfolio_data["current"] = {"error": str(e)}
-
-        # Generate residual portfolio simulation
-        residual_scenarios_params = {}
-        residual_scenarios_info = []
-
-        for scenario in self.risk_scenarios.all():
-            selected_residual_hypothesis = scenario.hypotheses.filter(
-                risk_stage="residual", is_selected=True
-            ).first()
-            if selected_residual_hypothesis and selected_residual_hypothesis.parameters:
-                params = selected_residual_hypothesis.parameters
-
-                # Extract and validate parameters
-                probability = params.get("probability")
-                impact = params.get("impact", {})
-                lower_bound = impact.get("lb")
-                upper_bound = impact.get("ub")
-                distribution = impact.get("distribution")
-
-                if (
-                    probability is not None
-                    and lower_bound is not None
-                    and upper_bound is not None
-                    and distribution == "LOGNORMAL-CI90"
-                    and lower_bound > 0
-                    and upper_bound > lower_bound
-                ):
-                    residual_scenarios_params[scenario.name] = {
-                        "probability": probability,
-                        "lower_bound": lower_bound,
-                        "upper_bound": upper_bound,
-                    }
-                    residual_scenarios_info.append(
+                    if vector is None or vector.fingerprint != fingerprint:
+                        if vector is not None:
+                            total -= unpack_loss_vector(vector.losses, n_simulations)
+                            total_changed = True
+                        if params is None:
+                            if vector is not None:
+                                vector.delete()
+                            continue
+                        cents = scenario_loss_vector(
+                            n_simulations=n_simulations,
+                            random_seed=random_seed,
+                            stream_key=scenario.id.int,
+                            **params,
+                        )
+                        total += cents
+                        total_changed = True
+                        resimulated += 1
+                        PortfolioLossVector.objects.update_or_create(
+                            study=study,
+                            risk_stage=risk_stage,
+                            scenario_id=scenario.id,
+                            defaults={
+                                "hypothesis_id": hypothesis.id,
+                                "fingerprint": fingerprint,
+                                "losses": pack_loss_vector(cents),
+                            },
+                        )
+                    elif vector.hypothesis_id != hypothesis.id:
+                        vector.hypothesis_id = hypothesis.id
+                        vector.save(update_fields=["hypothesis_id", "updated_at"])
+
+                    scenarios_info.append(
                         {
                             "scenario_id": str(scenario.id),
                             "scenario_name": scenario.name,
-                            "hypothesis_id": str(selected_residual_hypothesis.id),
-                            "hypothesis_name": selected_residual_hypothesis.name,
+                            "hypothesis_id": str(hypothesis.id),
+                            "hypothesis_name": hypothesis.name,
                         }
                     )
 
-        if residual_scenarios_params:
-            try:
-                residual_results = run_combined_simulation(
-                    scenarios_params=residual_scenarios_params,
-                    n_simulations=100_000,
-                    random_seed=43,
-                    loss_threshold=self.loss_threshold,
-                )
-                if "Portfolio_Total" in residual_results:
-                    portfolio_result = residual_results["Portfolio_Total"]
-                    portfolio_data["residual"] = {
-                        "loss": portfolio_result["loss"],
-                        "probability": portfolio_result["probability"],
-                        "metrics": portfolio_result.get("metrics", {}),
-                        "scenarios": residual_scenarios_info,
-                        "total_scenarios": len(residual_scenarios_info),
-                        "method": "direct_simulation",
-                    }
-            except Exception as e:
-                logger.warning(
-                    f"Failed to generate residual portfolio simulation for study {self.id}: {str(e)}"
-                )
-                portfolio_data["residual"] = {"error": str(e)}
+                # Remaining vectors belong to scenarios deleted since the last refresh
+                for key in [key for key in vectors if key[0] == risk_stage]:
+                    total -= unpack_loss_vector(vectors[key].losses, n_simulations)
+                    vectors.pop(key).delete()
+                    total_changed = True
+
+                if not scenarios_info:
+                    if total_vector is not None:
+                        total_vector.delete()
+                    continue
+                if total_changed:
+                    PortfolioLossVector.objects.update_or_create(
+                        study=study,
+                        risk_stage=risk_stage,
+                        scenario_id=None,
+                        defaults={"losses": pack_loss_vector(total)},
+                    )
 
-        # Cache the results
+                portfolio_data[risk_stage] = {
+                    **summarize_losses(
+                        total / LOSS_VECTOR_SCALE, loss_threshold=study.loss_threshold
+                    ),
+                    "scenarios": scenarios_info,
+                    "total_scenarios": len(scenarios_info),
+                    "method": "direct_simulation",
+                }
+
+            # Bypass save(): the cache is not an auditable change of the study
+            QuantitativeRiskStudy.objects.filter(pk=study.pk).update(
+                portfolio_simulation=portfolio_data
+            )
         self.portfolio_simulation = portfolio_data
-        self.save(update_fields=["portfolio_simulation"])
-
-        return portfolio_data
+        return resimulated
+
+    @staticmethod
+    def _portfolio_fingerprint(params, random_seed):
+        """Identify the inputs a scenario loss vector was simulated from."""
+        payload = {
+            **params,
+            "n_simulations": QuantitativeRiskStudy.PORTFOLIO_N_SIMULATIONS,
+            "random_seed": random_seed,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
 
     def save(self, *args, **kwargs):
         """
@@ -764,12 +751,36 @@ class QuantitativeRiskHypothesis(
                     study.risk_tolerance = updated_risk_tolerance
                     study.save(update_fields=["risk_tolerance"])
 
-            # Invalidate portfolio simulation cache since hypothesis simulation has changed
-            study.portfolio_simulation = {}
-            study.save(update_fields=["portfolio_simulation"])
+            # Update the portfolio simulation with this hypothesis' new parameters
+            study.schedule_portfolio_simulation()
 
         return simulation_results
 
+    def get_portfolio_parameters(self):
+        """
+        Return the parameters used for this hypothesis in the portfolio
+        simulation, or None if they are missing or invalid.
+        """
+        params = self.parameters or {}
+        probability = params.get("probability")
+        impact = params.get("impact") or {}
+        lower_bound = impact.get("lb")
+        upper_bound = impact.get("ub")
+        if (
+            probability is not None
+            and lower_bound is not None
+            and upper_bound is not None
+            and impact.get("distribution") == "LOGNORMAL-CI90"
+            and lower_bound > 0
+            and upper_bound > lower_bound
+        ):
+            return {
+                "probability": probability,
+                "lower_bound": lower_bound,
+                "upper_bound": upper_bound,
+            }
+        return None
+
     def get_simulation_parameters_display(self):
         """
         Returns a human-readable format of the simulation parameters.
@@ -1023,6 +1034,48 @@ class QuantitativeRiskHypothesis(
         super().save(*args, **kwargs)
 
 
+class PortfolioLossVector(models.Model):
+    """
+    Simulated annual losses of one risk stage of a study, in cents, stored as a
+    sparse binary array (see crq.utils.pack_loss_vector).
+    One row per scenario contributing to the stage, plus one row without
+    scenario holding the stage total, which is updated incrementally by
+    QuantitativeRiskStudy.update_portfolio_simulation.
+    """
+
+    study = models.ForeignKey(
+        QuantitativeRiskStudy, on_delete=models.CASCADE, related_name="loss_vectors"
+    )
+    risk_stage = models.CharField(
+        max_length=20, choices=QuantitativeRiskHypothesis.RISK_STAGE_OPTIONS
+    )
+    # Not foreign keys: the vector of a deleted scenario must outlive it until
+    # its losses are subtracted from the stage total.
+    scenario_id = models.UUIDField(null=True, blank=True)
+    hypothesis_id = models.UUIDField(null=True, blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True)
+    losses = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Portfolio loss vector"
+        verbose_name_plural = "Portfolio loss vectors"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["study", "risk_stage", "scenario_id"],
+                name="unique_loss_vector_per_scenario_stage",
+            ),
+            models.UniqueConstraint(
+                fields=["study", "risk_stage"],
+                condition=models.Q(scenario_id__isnull=True),
+                name="unique_loss_vector_total_per_stage",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.study_id}/{self.risk_stage}/{self.scenario_id or 'total'}"
+
+
 common_exclude = ["created_at", "updated_at"]
 auditlog.register(
     QuantitativeRiskStudy,
@@ -0,0 +1,50 @@
+import logging.config
+import time
+
+import structlog
+from django.conf import settings
+from huey.contrib.djhuey import HUEY, db_task
+
+from crq.models import QuantitativeRiskStudy
+
+logging.config.dictConfig(settings.LOGGING)
+logger = structlog.getLogger(__name__)
+
+# A queued refresh covers every change made before it starts, so a study has
+# at most one refresh waiting. Its marker is released when the refresh starts;
+# one older than this belongs to a refresh that was lost and is replaced.
+PENDING_REFRESH_TIMEOUT = 15 * 60
+
+
+def _pending_refresh_key(study_id):
+    return f"crq-portfolio-refresh-{study_id}"
+
+
+def queue_portfolio_refresh(study_id) -> bool:
+    """Queue a portfolio refresh of the study unless one is already waiting."""
+    key = _pending_refresh_key(study_id)
+    now = time.time()
+    if not HUEY.put_if_empty(key, now):
+        queued_at = HUEY.get(key, peek=True)
+        if queued_at is not None and now - queued_at < PENDING_REFRESH_TIMEOUT:
+            return False
+        HUEY.put(key, now)
+    refresh_portfolio_simulation(study_id)
+    return True
+
+
+@db_task()
+def refresh_portfolio_simulation(study_id):
+    """Incrementally update the cached portfolio simulation of a study."""
+    # Changes made from now on need another refresh
+    HUEY.get(_pending_refresh_key(study_id))
+    study = QuantitativeRiskStudy.objects.filter(pk=study_id).first()
+    if study is None:
+        logger.info("study deleted before portfolio refresh", study_id=str(study_id))
+        return
+    resimulated = study.update_portfolio_simulation()
+    logger.info(
+        "portfolio simulation refreshed",
+        study_id=str(study_id),
+        resimulated_vectors=resimulated,
+    )
@@ -0,0 +1,221 @@
+"""Tests for the background, incremental portfolio simulation of a study."""
+
+from unittest import mock
+
+import numpy as np
+import pytest
+from huey.contrib.djhuey import HUEY
+
+from crq.models import (
+    PortfolioLossVector,
+    QuantitativeRiskHypothesis,
+    QuantitativeRiskScenario,
+    QuantitativeRiskStudy,
+)
+from crq import tasks
+from crq.tasks import refresh_portfolio_simulation
+from crq.utils import (
+    LOSS_VECTOR_SCALE,
+    pack_loss_vector,
+    scenario_loss_vector,
+    unpack_loss_vector,
+)
+from iam.models import Folder
+
+
+def _parameters(probability, lower_bound, upper_bound):
+    return {
+        "probability": probability,
+        "impact": {
+            "distribution": "LOGNORMAL-CI90",
+            "lb": lower_bound,
+            "ub": upper_bound,
+        },
+    }
+
+
+@pytest.fixture
+def study(db):
+    folder = Folder.get_root_folder()
+    study = QuantitativeRiskStudy.objects.create(name="Portfolio", folder=folder)
+    for index in range(3):
+        scenario = QuantitativeRiskScenario.objects.create(
+            name=f"Scenario {index}", quantitative_risk_study=study, folder=folder
+        )
+        for risk_stage, probability in (
+            ("inherent", 0.4),
+            ("current", 0.2),
+            ("residual", 0.1),
+        ):
+            QuantitativeRiskHypothesis.objects.create(
+                name=f"{risk_stage} {index}",
+                quantitative_risk_scenario=scenario,
+                risk_stage=risk_stage,
+                is_selected=True,
+                parameters=_parameters(probability, 1_000 * (index + 1), 50_000),
+                folder=folder,
+            )
+    return study
+
+
+def _expected_total(study, risk_stage):
+    """Sum of freshly simulated vectors of the scenarios of a stage."""
+    n_simulations = QuantitativeRiskStudy.PORTFOLIO_N_SIMULATIONS
+    total = np.zeros(n_simulations)
+    for hypothesis in QuantitativeRiskHypothesis.objects.filter(
+        quantitative_risk_scenario__quantitative_risk_study=study,
+        risk_stage=risk_stage,
+        is_selected=True,
+    ):
+        if hypothesis.get_portfolio_parameters() is None:
+            continue
+        total += scenario_loss_vector(
+            n_simulations=n_simulations,
+            random_seed=QuantitativeRiskStudy.PORTFOLIO_STAGE_SEEDS[risk_stage],
+            stream_key=hypothesis.quantitative_risk_scenario_id.int,
+            **hypothesis.get_portfolio_parameters(),
+        )
+    return total
+
+
+def _stored_total(study, risk_stage):
+    vector = PortfolioLossVector.objects.get(
+        study=study, risk_stage=risk_stage, scenario_id=None
+    )
+    return unpack_loss_vector(
+        vector.losses, QuantitativeRiskStudy.PORTFOLIO_N_SIMULATIONS
+    )
+
+
+def test_loss_vector_roundtrip():
+    cents = scenario_loss_vector(0.3, 1e3, 1e6, 10_000, 7, 12345)
+    assert np.array_equal(cents, np.rint(cents))
+    data = pack_loss_vector(cents)
+    assert len(data) == 12 * np.count_nonzero(cents)
+    assert np.array_equal(unpack_loss_vector(data, 10_000), cents)
+    assert not np.array_equal(cents, scenario_loss_vector(0.3, 1e3, 1e6, 10_000, 7, 1))
+
+
+@pytest.mark.django_db
+class TestIncrementalPortfolio:
+    def test_first_refresh_simulates_every_scenario(self, study):
+        assert study.update_portfolio_simulation() == 9
+
+        data = study.portfolio_simulation
+        assert data["metadata"]["status"] == "ready"
+        for risk_stage in ("inherent", "current", "residual"):
+            assert data[risk_stage]["total_scenarios"] == 3
+            total = _expected_total(study, risk_stage)
+            assert np.array_equal(_stored_total(study, risk_stage), total)
+            assert data[risk_stage]["metrics"]["mean_annual_loss"] == pytest.approx(
+                total.mean() / LOSS_VECTOR_SCALE
+            )
+        study.refresh_from_db()
+        assert study.portfolio_simulation["current"] == data["current"]
+
+    def test_only_changed_hypothesis_is_resimulated(self, study):
+        study.update_portfolio_simulation()
+        assert study.update_portfolio_simulation() == 0
+
+        hypothesis = QuantitativeRiskHypothesis.objects.get(name="current 1")
+        hypothesis.parameters = _parameters(0.9, 10_000, 900_000)
+        hypothesis.save()
+        assert study.update_portfolio_simulation() == 1
+        # In-place update of the total is exact
+        for risk_stage in ("inherent", "current", "residual"):
+            assert np.array_equal(
+                _stored_total(study, risk_stage), _expected_total(study, risk_stage)
+            )
+
+    def test_removed_contributions_are_subtracted(self, study):
+        study.update_portfolio_simulation()
+
+        QuantitativeRiskScenario.objects.filter(name="Scenario 0").delete()
+        QuantitativeRiskHypothesis.objects.filter(name="residual 1").update(
+            is_selected=False
+        )
+        QuantitativeRiskHypothesis.objects.filter(name="inherent 2").update(
+            parameters={}
+        )
+        assert study.update_portfolio_simulation() == 0
+
+        data = study.portfolio_simulation
+        assert data["inherent"]["total_scenarios"] == 1
+        assert data["current"]["total_scenarios"] == 2
+        assert data["residual"]["total_scenarios"] == 1
+        for risk_stage in ("inherent", "current", "residual"):
+            assert np.array_equal(
+                _stored_total(study, risk_stage), _expected_total(study, risk_stage)
+            )
+        assert PortfolioLossVector.objects.filter(study=study).count() == 4 + 3
+
+    def test_stage_without_scenarios(self, study):
+        study.update_portfolio_simulation()
+        QuantitativeRiskHypothesis.objects.filter(risk_stage="residual").delete()
+
+        study.update_portfolio_simulation()
+        assert study.portfolio_simulation["residual"] is None
+        assert not PortfolioLossVector.objects.filter(
+            study=study, risk_stage="residual"
+        ).exists()
+
+
+@pytest.mark.django_db
+def test_empty_cache_schedules_refresh(study, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        data = study.get_or_generate_portfolio_simulation()
+    assert data["metadata"]["status"] == "pending"
+    assert data["current"] is None
+    assert len(callbacks) == 1
+
+    refresh_portfolio_simulation.call_local(study.id)
+    study.refresh_from_db()
+    with django_capture_on_commit_callbacks() as callbacks:
+        data = study.get_or_generate_portfolio_simulation()
+    assert data["metadata"]["status"] == "ready"
+    assert callbacks == []
+
+
+@pytest.mark.django_db
+def test_study_without_residual_hypotheses_is_cached(
+    study, django_capture_on_commit_callbacks
+):
+    QuantitativeRiskHypothesis.objects.filter(risk_stage="residual").delete()
+    refresh_portfolio_simulation.call_local(study.id)
+    study.refresh_from_db()
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        data = study.get_or_generate_portfolio_simulation()
+    assert data["metadata"]["status"] == "ready"
+    assert data["inherent"] is not None
+    assert data["current"] is not None
+    assert data["residual"] is None
+    assert callbacks == []
+
+
+@pytest.mark.django_db
+def test_pending_refresh_is_queued_once(study, django_capture_on_commit_callbacks):
+    with mock.patch.object(tasks, "refresh_portfolio_simulation") as refresh:
+        for _ in range(3):
+            with django_capture_on_commit_callbacks(execute=True):
+                data = study.get_or_generate_portfolio_simulation()
+            assert data["metadata"]["status"] == "pending"
+        refresh.assert_called_once_with(study.id)
+
+        # Once the refresh starts, later changes need a new one
+        refresh_portfolio_simulation.call_local(study.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            study.schedule_portfolio_simulation()
+        assert refresh.call_count == 2
+    HUEY.delete(tasks._pending_refresh_key(study.id))
+
+
+@pytest.mark.django_db
+def test_lost_pending_refresh_is_replaced(study):
+    key = tasks._pending_refresh_key(study.id)
+    HUEY.put(key, 0)
+    with mock.patch.object(tasks, "refresh_portfolio_simulation") as refresh:
+        assert tasks.queue_portfolio_refresh(study.id)
+        assert not tasks.queue_portfolio_refresh(study.id)
+    refresh.assert_called_once_with(study.id)
+    HUEY.delete(key)
@@ -0,0 +1,57 @@
+"""Tests for the batched Monte Carlo engine of crq.utils."""
+
+import numpy as np
+import pytest
+
+from crq.utils import simulate_portfolio_annual_losses
+
+SCENARIOS = [
+    {"name": "ransomware", "probability": 0.3, "lower_bound": 1e4, "upper_bound": 1e6},
+    {"name": "fraud", "probability": 0.05, "lower_bound": 5e3, "upper_bound": 5e5},
+    {"name": "outage", "probability": 0.9, "lower_bound": 1e3, "upper_bound": 2e4},
+]
+
+
+def test_seed_reproducibility_is_chunk_independent():
+    reference = simulate_portfolio_annual_losses(SCENARIOS, 10_000, random_seed=7)
+    for chunk_size in (1_000, 3_333, 10_000):
+        results = simulate_portfolio_annual_losses(
+            SCENARIOS, 10_000, random_seed=7, chunk_size=chunk_size
+        )
+        for name, losses in reference.items():
+            np.testing.assert_array_equal(results[name], losses)
+
+    other = simulate_portfolio_annual_losses(SCENARIOS, 10_000, random_seed=8)
+    assert not np.array_equal(other["Portfolio_Total"], reference["Portfolio_Total"])
+
+
+def test_distribution_matches_parameters():
+    results = simulate_portfolio_annual_losses(SCENARIOS, 200_000, random_seed=1)
+
+    for scenario in SCENARIOS:
+        losses = results[scenario["name"]]
+        occurred = losses[losses > 0]
+        assert len(occurred) / len(losses) == pytest.approx(
+            scenario["probability"], abs=0.005
+        )
+        # Bounds are the 5th and 95th percentiles of the loss when the event occurs
+        assert np.percentile(occurred, 5) == pytest.approx(
+            scenario["lower_bound"], rel=0.05
+        )
+        assert np.percentile(occurred, 95) == pytest.approx(
+            scenario["upper_bound"], rel=0.05
+        )
+
+    np.testing.assert_allclose(
+        results["Portfolio_Total"], sum(results[s["name"]] for s in SCENARIOS)
+    )
+
+
+def test_invalid_parameters():
+    assert simulate_portfolio_annual_losses([], 10) == {}
+    with pytest.raises(ValueError):
+        simulate_portfolio_annual_losses(
+            [{"name": "x", "probability": 0.1, "lower_bound": 10, "upper_bound": 5}]
+        )
+    with pytest.raises(ValueError):
+        simulate_portfolio_annual_losses(SCENARIOS, 10, chunk_size=0)
@@ -146,15 +146,27 @@ def calculate_risk_insights(
     return metrics
 
 
+# Upper bound on the number of (simulation, scenario) cells drawn at once by
+# simulate_portfolio_annual_losses when no explicit chunk size is given.
+PORTFOLIO_CHUNK_CELLS = 4_000_000
+
+
 def simulate_portfolio_annual_losses(
     scenario_params: List[Dict[str, float]],
     n_simulations: int = 100_000,
     random_seed: Optional[int] = None,
+    chunk_size: Optional[int] = None,
 ) -> Dict[str, np.ndarray]:
     """
     Run Monte Carlo simulation for multiple risk scenarios independently.
     Each scenario uses its own independent random draws for frequency and severity.
 
+    Draws are batched: each chunk of simulations draws its whole
+    (simulations x scenarios) frequency matrix at once, then the severities of
+    all the events that occurred. Frequency and severity use separate streams
+    spawned from the seed, so results only depend on the seed, not on the chunk
+    size.
+
     Args:
         scenario_params: List of dicts, each with keys:
             - 'name': scenario identifier
@@ -163,6 +175,8 @@ def simulate_portfolio_annual_losses(
             - 'upper_bound': 95th percentile of loss when event occurs
         n_simulations: Number of Monte Carlo iterations
         random_seed: Random seed for reproducibility
+        chunk_size: Number of simulations drawn per batch, to bound memory.
+            Defaults to PORTFOLIO_CHUNK_CELLS cells per batch.
 
     Returns:
         Dictionary with scenario names as keys and annual loss arrays as values.
@@ -171,12 +185,11 @@ def simulate_portfolio_annual_losses(
     if not scenario_params:
         return {}
 
-    rng = np.random.default_rng(random_seed)
-    results = {}
-
     # Pre-compute lognormal parameters for all scenarios
-    scenario_distributions = []
-    for scenario in scenario_params:
+    probabilities = np.empty(len(scenario_params))
+    mus = np.empty(len(scenario_params))
+    sigmas = np.empty(len(scenario_params))
+    for j, scenario in enumerate(scenario_params):
         if scenario["upper_bound"] <= scenario["lower_bound"]:
             raise ValueError(
                 f"Upper bound must be greater than lower bound for scenario {scenario.get('name', 'unnamed')}"
@@ -186,40 +199,41 @@ def simulate_portfolio_annual_losses(
                 f"Lower bound must be positive for scenario {scenario.get('name', 'unnamed')}"
             )
 
-        mu, sigma = mu_sigma_from_lognorm_90pct(
+        mus[j], sigmas[j] = mu_sigma_from_lognorm_90pct(
             scenario["lower_bound"], scenario["upper_bound"]
         )
-        scenario_distributions.append(
-            {
-                "name": scenario["name"],
-                "probability": scenario["probability"],
-                "mu": mu,
-                "sigma": sigma,
-            }
-        )
+        probabilities[j] = scenario["probability"]
 
-    # Initialize loss arrays
-    for scenario_dist in scenario_distributions:
-        results[scenario_dist["name"]] = np.zeros(n_simulations)
-
-    # Run simulation with independent random draws for each scenario
-    for i in range(n_simulations):
-        for scenario_dist in scenario_distributions:
-            # Independent frequency draw for each scenario
-            frequency_draw = rng.random()
-
-            # Stage 1: Frequency - does event occur this year?
-            if frequency_draw < scenario_dist["probability"]:
-                # Stage 2: Severity - what's the loss magnitude?
-                loss = rng.lognormal(scenario_dist["mu"], scenario_dist["sigma"])
-                results[scenario_dist["name"]][i] = loss
-            # else: loss remains 0 (initialized above)
+    n_scenarios = len(scenario_params)
+    if chunk_size is None:
+        chunk_size = max(1, PORTFOLIO_CHUNK_CELLS // n_scenarios)
+    elif chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    frequency_seed, severity_seed = np.random.SeedSequence(random_seed).spawn(2)
+    frequency_rng = np.random.default_rng(frequency_seed)
+    severity_rng = np.random.default_rng(severity_seed)
+
+    # One row per scenario, so that each scenario's losses are contiguous
+    losses = np.zeros((n_scenarios, n_simulations))
+    for start in range(0, n_simulations, chunk_size):
+        stop = min(start + chunk_size, n_simulations)
+
+        # Stage 1: Frequency - which events occur in each simulated year?
+        occurs = frequency_rng.random((stop - start, n_scenarios)) < probabilities
+        sim_idx, scenario_idx = np.nonzero(occurs)
+
+        # Stage 2: Severity - what's the loss magnitude of each event?
+        losses[scenario_idx, start + sim_idx] = np.exp(
+            mus[scenario_idx]
+            + sigmas[scenario_idx] * severity_rng.standard_normal(len(sim_idx))
+        )
 
+    results = {
+        scenario["name"]: losses[j] for j, scenario in enumerate(scenario_params)
+    }
     # Calculate portfolio total
-    portfolio_losses = np.zeros(n_simulations)
-    for scenario_name in results:
-        portfolio_losses += results[scenario_name]
-    results["Portfolio_Total"] = portfolio_losses
+    results["Portfolio_Total"] = losses.sum(axis=0)
 
     return results
 
@@ -363,31 +377,105 @@ def run_combined_simulation(
     results = {}
 
     for name, losses in loss_results.items():
-        # Create LEC
-        loss_values, exceedance_probs = create_loss_exceedance_curve(losses)
-
-        # Calculate metrics
         if name == "Portfolio_Total":
-            metrics = calculate_risk_insights(losses, loss_threshold=loss_threshold)
+            results[name] = summarize_losses(losses, loss_threshold=loss_threshold)
         else:
             original_probability = scenarios_params[name]["probability"]
-            metrics = calculate_risk_insights(
+            results[name] = summarize_losses(
                 losses, original_probability, loss_threshold
             )
+        results[name]["raw_losses"] = losses  # Keep for further analysis if needed
 
-        # Downsample for visualization
-        downsample_factor = max(1, len(loss_values) // 1000)
-        downsampled_losses = loss_values[::downsample_factor]
-        downsampled_probs = exceedance_probs[::downsample_factor]
+    return results
 
-        results[name] = {
-            "loss": downsampled_losses.tolist(),
-            "probability": downsampled_probs.tolist(),
-            "metrics": metrics,
-            "raw_losses": losses,  # Keep for further analysis if needed
-        }
 
-    return results
+def summarize_losses(
+    losses: np.ndarray,
+    probability: Optional[float] = None,
+    loss_threshold: Optional[float] = None,
+) -> Dict:
+    """
+    Build the downsampled Loss Exceedance Curve and risk metrics of a loss array.
+
+    Args:
+        losses: Array of annual loss values
+        probability: Original probability of the risk event (optional)
+        loss_threshold: Custom loss threshold for probability calculation (optional)
+
+    Returns:
+        Dictionary with 'loss', 'probability' (at most ~1000 points each) and 'metrics'.
+    """
+    loss_values, exceedance_probs = create_loss_exceedance_curve(losses)
+    metrics = calculate_risk_insights(losses, probability, loss_threshold)
+
+    # Downsample for visualization
+    downsample_factor = max(1, len(loss_values) // 1000)
+    return {
+        "loss": loss_values[::downsample_factor].tolist(),
+        "probability": exceedance_probs[::downsample_factor].tolist(),
+        "metrics": metrics,
+    }
+
+
+# Portfolio loss vectors hold whole cents. Integer-valued float64 arrays add and
+# subtract exactly (below 2**53), so a portfolio total can be updated in place
+# when one of its scenarios changes, without drifting from a full re-sum.
+LOSS_VECTOR_SCALE = 100
+
+
+def scenario_loss_vector(
+    probability: float,
+    lower_bound: float,
+    upper_bound: float,
+    n_simulations: int,
+    random_seed: int,
+    stream_key: int,
+) -> np.ndarray:
+    """
+    Simulate the annual losses of one scenario of a portfolio, in cents.
+
+    The draws come from a stream spawned from (random_seed, stream_key), so the
+    vector of a scenario does not depend on the other scenarios of the
+    portfolio and can be replaced on its own.
+
+    Args:
+        probability: Annual probability of event occurrence (0-1)
+        lower_bound: 5th percentile of loss when event occurs
+        upper_bound: 95th percentile of loss when event occurs
+        n_simulations: Number of Monte Carlo iterations
+        random_seed: Seed shared by the scenarios of the portfolio
+        stream_key: Non-negative integer identifying the scenario (e.g. UUID.int)
+
+    Returns:
+        Array of annual losses in cents (integer-valued float64)
+    """
+    seed = np.random.SeedSequence(random_seed, spawn_key=(stream_key,))
+    losses = simulate_scenario_annual_loss(
+        probability, lower_bound, upper_bound, n_simulations, seed
+    )
+    return np.rint(losses * LOSS_VECTOR_SCALE)
+
+
+def pack_loss_vector(cents: np.ndarray) -> bytes:
+    """
+    Serialize a loss vector sparsely: the non-zero values (little-endian
+    float64) followed by their indexes (little-endian uint32).
+    """
+    indexes = np.flatnonzero(cents)
+    return cents[indexes].astype("<f8").tobytes() + indexes.astype("<u4").tobytes()
+
+
+def unpack_loss_vector(data: bytes, n_simulations: int) -> np.ndarray:
+    """Inverse of pack_loss_vector; returns a dense array of n_simulations values."""
+    data = bytes(data)
+    count = len(data) // 12
+    if len(data) != count * 12:
+        raise ValueError("Truncated loss vector")
+    cents = np.zeros(n_simulations)
+    cents[np.frombuffer(data, "<u4", count, offset=8 * count)] = np.frombuffer(
+        data, "<f8", count
+    )
+    return cents
 
 
 def get_lognormal_params_from_points(point1: Dict, point2: Dict) -> Tuple[float, float]:
@@ -184,7 +184,7 @@ class QuantitativeRiskStudyViewSet(BaseModelViewSet):
                         }
                     )
 
-        # 2. Use cached portfolio simulation
+        # 2. Use cached portfolio simulation (refreshed in the background)
         portfolio_data = study.get_or_generate_portfolio_simulation()
 
         # Add inherent portfolio curve if available
@@ -348,6 +348,9 @@ class QuantitativeRiskStudyViewSet(BaseModelViewSet):
                 if residual_threshold_probability is not None
                 else None,
                 "note": "Portfolio risk calculations using cached simulation results for optimal performance",
+                "portfolio_status": portfolio_data.get("metadata", {}).get(
+                    "status", "ready"
+                ),
             }
         )
 
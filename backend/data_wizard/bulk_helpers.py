@@ -0,0 +1,486 @@
+"""
+Set-based writes for the data wizard record consumers (see
+RecordConsumer.BULK_BATCH_SIZE).
+
+BulkWriter saves the objects of a batch with bulk_create and bulk_update,
+which bypass Model.save() and send no signals. It does what saving them one by
+one through their serializer would have done:
+
+- once per batch: permission checks, model validation (the uniqueness in scope
+  is checked against an IdentityIndex instead of two queries per object),
+  many-to-many links, outbound integration sync and chat RAG indexing;
+- once per object: audit log entries. Each one is created between the pre_log
+  and post_log signals and saved on its own, so the LogEntry receivers (actor,
+  audit forwarding, workflow triggers) still run for every object.
+
+Only models that opt in with a bulk_writes_supported attribute are supported
+(supports_bulk_writes). Setting it states that the writer reproduces the save()
+of the model and the receivers of its save signals.
+"""
+
+import copy
+from collections import defaultdict
+from functools import partial
+
+import structlog
+from auditlog import get_logentry_model
+from auditlog.context import auditlog_disabled
+from auditlog.diff import model_instance_diff
+from auditlog.registry import auditlog
+from auditlog.signals import post_log, pre_log
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+from rest_framework import serializers
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.utils import model_meta
+
+from chat.signals import on_bulk_change
+from core.base_models import AbstractBaseModel
+from iam.models import Folder, PublishInRootFolderMixin
+from integrations.sync_mixin import IntegrationSyncableMixin
+
+logger = structlog.get_logger(__name__)
+
+IDENTITY_FIELDS = {"ref_id", "name"}
+
+
+def supports_bulk_writes(model_class) -> bool:
+    """Whether BulkWriter can save model_class objects: folder-scoped objects
+    identified by ref_id and/or name, with no unique field but the primary key,
+    of a model that opted in itself (subclasses do not inherit the opt-in)."""
+    return (
+        model_class.__dict__.get("bulk_writes_supported", False)
+        and hasattr(model_class, "folder")
+        and set(getattr(model_class, "fields_to_check", [])) <= IDENTITY_FIELDS
+        and model_class.clean is AbstractBaseModel.clean
+        # AbstractBaseModel.get_scope() is the object's folder
+        and not any(
+            hasattr(model_class, field)
+            for field in ("risk_scenario", "risk_assessment", "perimeter")
+        )
+        and not model_class._meta.unique_together
+        and not model_class._meta.total_unique_constraints
+        and all(
+            field.primary_key or not field.unique
+            for field in model_class._meta.concrete_fields
+        )
+    )
+
+
+def _upper(value) -> str:
+    # iexact, as compared by PostgreSQL (UPPER() on both sides)
+    return str(value).upper()
+
+
+class IdentityIndex:
+    """
+    ref_id and name of the objects of a model, per folder, loaded one query
+    per set of folders.
+
+    find() mirrors RecordConsumer.find_existing (exact ref_id first, then
+    case-insensitive name; the first object by primary key) and is_unique()
+    AbstractBaseModel.is_unique_in_scope, for fields_to_check limited to
+    ref_id and name. The writer keeps it up to date with the objects it saves.
+    """
+
+    def __init__(self, model_class):
+        self.model_class = model_class
+        self.fields_to_check = list(getattr(model_class, "fields_to_check", []))
+        self.folder_ids: set = set()
+        self._identities: dict = {}
+        # (folder_id, ref_id) -> pks, for find()
+        self._by_ref_id: dict = defaultdict(set)
+        # (field, folder_id, upper-cased value) -> pks
+        self._by_value: dict = defaultdict(set)
+
+    @staticmethod
+    def folder_id(folder):
+        """The primary key of a Folder, or of a folder given by its id."""
+        if isinstance(folder, Folder):
+            return folder.pk
+        return Folder._meta.pk.to_python(folder)
+
+    def load(self, folders) -> None:
+        folder_ids = {self.folder_id(folder) for folder in folders} - self.folder_ids
+        if not folder_ids:
+            return
+        fields = [f for f in ("ref_id", "name") if hasattr(self.model_class, f)]
+        for pk, folder_id, *values in self.model_class.objects.filter(
+            folder_id__in=folder_ids
+        ).values_list("pk", "folder_id", *fields):
+            self._add(pk, folder_id, dict(zip(fields, values)))
+        self.folder_ids |= folder_ids
+
+    def reload(self) -> None:
+        folder_ids = self.folder_ids
+        self.__init__(self.model_class)
+        self.load(folder_ids)
+
+    def _add(self, pk, folder_id, values: dict) -> None:
+        self._identities[pk] = (folder_id, values)
+        ref_id = values.get("ref_id")
+        if ref_id:
+            self._by_ref_id[(folder_id, ref_id)].add(pk)
+        for field, value in values.items():
+            if value is not None and value != "":
+                self._by_value[(field, folder_id, _upper(value))].add(pk)
+
+    def discard(self, pk) -> None:
+        if pk not in self._identities:
+            return
+        folder_id, values = self._identities.pop(pk)
+        self._by_ref_id.get((folder_id, values.get("ref_id")), set()).discard(pk)
+        for field, value in values.items():
+            if value is not None and value != "":
+                self._by_value.get((field, folder_id, _upper(value)), set()).discard(pk)
+
+    def add_instance(self, instance) -> None:
+        self.discard(instance.pk)
+        self._add(
+            instance.pk,
+            instance.folder_id,
+            {
+                field: getattr(instance, field)
+                for field in ("ref_id", "name")
+                if hasattr(instance, field)
+            },
+        )
+
+    def keys(self, folder, values: dict) -> set:
+        """The identity keys of an object with these field values, to tell
+        whether two objects may match or collide."""
+        folder_id = self.folder_id(folder)
+        return {
+            (field, folder_id, _upper(values[field]))
+            for field in self.fields_to_check
+            if values.get(field) is not None and values.get(field) != ""
+        }
+
+    def find(self, folder, record_data: dict):
+        """The primary key of the object record_data matches in folder, or None."""
+        folder_id = self.folder_id(folder)
+        self.load([folder_id])
+        if "ref_id" in self.fields_to_check:
+            ref_id = record_data.get("ref_id")
+            if ref_id:
+                pks = self._by_ref_id.get((folder_id, str(ref_id)))
+                if pks:
+                    return min(pks)
+        others = [
+            (field, record_data.get(field))
+            for field in self.fields_to_check
+            if field != "ref_id" and record_data.get(field) not in (None, "")
+        ]
+        if not others:
+            return None
+        candidates = set.intersection(
+            *(
+                self._by_value.get((field, folder_id, _upper(value)), set())
+                for field, value in others
+            )
+        )
+        return min(candidates) if candidates else None
+
+    def is_unique(self, instance, fields_to_check: list) -> bool:
+        folder_id = instance.folder_id
+        self.load([folder_id])
+        candidates = []
+        for field in fields_to_check:
+            value = getattr(instance, field, None)
+            if value is None or value == "":
+                continue
+            candidates.append(
+                self._by_value.get((field, folder_id, _upper(value)), set())
+            )
+        if not candidates:
+            return True
+        return not (set.intersection(*candidates) - {instance.pk})
+
+
+class BulkWriter:
+    """
+    Saves the objects validated by a serializer in bulk.
+
+    prepare_create() and prepare_update() turn validated data into an unsaved
+    object, raising what saving it through the serializer would raise, then
+    write() saves a batch of them in one transaction.
+    """
+
+    def __init__(self, serializer, index: IdentityIndex):
+        self.serializer = serializer
+        self.model_class = serializer.Meta.model
+        self.index = index
+        self.using = router.db_for_write(self.model_class)
+        self._field_info = model_meta.get_field_info(self.model_class)
+        self._permission_errors: dict = {}
+        self._creates: list = []
+        self._updates: list = []
+
+    def unsupported_fields(self) -> set:
+        """Serializer fields whose data cannot be written in bulk: the reverse
+        and signalled many-to-many relations and the custom fields."""
+        unsupported = set()
+        for name, field in self.serializer.fields.items():
+            if name == "custom_fields":
+                unsupported.add(name)
+                continue
+            relation = self._field_info.relations.get(field.source)
+            if relation is not None and relation.to_many:
+                if relation.reverse:
+                    unsupported.add(name)
+                    continue
+                through = getattr(self.model_class, field.source).through
+                if m2m_changed.has_listeners(through):
+                    unsupported.add(name)
+        return unsupported
+
+    def _check_permission(self, obj, action: str, folder) -> None:
+        # The permission only depends on the user, the action and the folder
+        key = (action, folder.pk)
+        if key not in self._permission_errors:
+            try:
+                self.serializer._check_object_perm(obj, action, folder=folder)
+                self._permission_errors[key] = None
+            except PermissionDenied as e:
+                self._permission_errors[key] = e
+        if self._permission_errors[key] is not None:
+            raise self._permission_errors[key]
+
+    def _pop_many_to_many(self, data: dict) -> dict:
+        strip = getattr(self.serializer, "_strip_integration_link_fields", None)
+        if strip is not None:
+            strip(data)
+        return {
+            field: data.pop(field)
+            for field in list(data)
+            if field in self._field_info.relations
+            and self._field_info.relations[field].to_many
+        }
+
+    def _full_clean(self, instance) -> None:
+        """Model.full_clean(), with AbstractBaseModel.clean() checked against
+        the index and no validate_unique() (no unique field but the pk)."""
+        errors = {}
+        try:
+            instance.clean_fields()
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        uniqueness_errors = instance.get_uniqueness_errors(
+            partial(self.index.is_unique, instance)
+        )
+        if uniqueness_errors:
+            errors = ValidationError(uniqueness_errors).update_error_dict(errors)
+        try:
+            instance.validate_constraints(exclude=set(errors))
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        if errors:
+            raise ValidationError(errors)
+        instance._validate_char_max_lengths()
+        if isinstance(instance, PublishInRootFolderMixin):
+            instance.publish_in_root_folder()
+
+    def prepare_create(self, validated_data: dict):
+        data = dict(validated_data)
+        many_to_many = self._pop_many_to_many(data)
+        folder = Folder.get_folder(data) or Folder.get_root_folder()
+        self._check_permission(data, "add", folder)
+        instance = self.model_class(**data)
+        try:
+            self._full_clean(instance)
+        except ValidationError as e:
+            raise serializers.ValidationError(e.args[0])
+        self._creates.append((instance, many_to_many))
+        return instance
+
+    def prepare_update(self, instance, validated_data: dict):
+        folder = Folder.get_folder(instance)
+        self._check_permission(instance, "change", folder)
+        if getattr(instance, "urn", None):
+            raise PermissionDenied({"urn": "Imported objects cannot be modified"})
+        data = dict(validated_data)
+        many_to_many = self._pop_many_to_many(data)
+        old = copy.copy(instance)
+        try:
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+            self._full_clean(instance)
+        except Exception as e:
+            raise serializers.ValidationError(e.args[0])
+        self._updates.append((old, instance, many_to_many))
+        return instance
+
+    def discard(self) -> None:
+        """Drop the prepared objects."""
+        self._creates, self._updates = [], []
+
+    def write(self) -> None:
+        """Save the prepared objects, with their side effects. Nothing is
+        written if this raises."""
+        creates, updates = self._creates, self._updates
+        self._creates, self._updates = [], []
+        if not creates and not updates:
+            return
+        with transaction.atomic(using=self.using):
+            self.model_class.objects.bulk_create([instance for instance, _ in creates])
+            if updates:
+                # Each CASE WHEN of bulk_update() is costly: only the fields
+                # changed on some object are written, and the auto_now ones.
+                fields = [
+                    field
+                    for field in self.model_class._meta.concrete_fields
+                    if getattr(field, "auto_now", False)
+                    or any(
+                        field.value_from_object(old)
+                        != field.value_from_object(instance)
+                        for old, instance, _ in updates
+                    )
+                ]
+                for _, instance, _ in updates:
+                    for field in fields:
+                        if getattr(field, "auto_now", False):
+                            field.pre_save(instance, False)
+                self.model_class.objects.bulk_update(
+                    [instance for _, instance, _ in updates],
+                    [field.name for field in fields if not field.primary_key],
+                )
+            self._set_many_to_many(
+                [(instance, m2m, True) for instance, m2m in creates]
+                + [(instance, m2m, False) for _, instance, m2m in updates]
+            )
+            self._log_saves(creates, updates)
+            if issubclass(self.model_class, IntegrationSyncableMixin):
+                self.model_class._trigger_sync_many(
+                    [(instance.pk, True, []) for instance, _ in creates]
+                    + [
+                        (instance.pk, False, instance._get_changed_fields(old))
+                        for old, instance, _ in updates
+                    ]
+                )
+            on_bulk_change(
+                self.model_class,
+                [instance.pk for instance, _ in creates]
+                + [instance.pk for _, instance, _ in updates],
+            )
+        for instance, _ in creates:
+            self.index.add_instance(instance)
+        for _, instance, _ in updates:
+            self.index.add_instance(instance)
+
+    def _set_many_to_many(self, saved: list) -> None:
+        """RelatedManager.set() of the many-to-many data of each object."""
+        by_field = defaultdict(list)
+        for instance, many_to_many, is_new in saved:
+            for field, values in many_to_many.items():
+                by_field[field].append((instance, values or [], is_new))
+        for field, entries in by_field.items():
+            descriptor = getattr(self.model_class, field)
+            through = descriptor.through
+            source = descriptor.field.m2m_field_name()
+            target = descriptor.field.m2m_reverse_field_name()
+            wanted = {
+                (instance.pk, getattr(value, "pk", value))
+                for instance, values, _ in entries
+                for value in values
+            }
+            updated_pks = [instance.pk for instance, _, is_new in entries if not is_new]
+            stale = []
+            for pk, source_id, target_id in through.objects.filter(
+                **{f"{source}__in": updated_pks}
+            ).values_list("pk", source, target):
+                if (source_id, target_id) in wanted:
+                    wanted.discard((source_id, target_id))
+                else:
+                    stale.append(pk)
+            if stale:
+                through.objects.filter(pk__in=stale).delete()
+            through.objects.bulk_create(
+                [
+                    through(**{f"{source}_id": source_id, f"{target}_id": target_id})
+                    for source_id, target_id in wanted
+                ],
+                ignore_conflicts=True,
+            )
+
+    def _log_saves(self, creates: list, updates: list) -> None:
+        """The entries auditlog's log_create and log_update receivers would
+        have logged, created one by one through LogEntryManager.log_create()
+        so that the receivers of LogEntry (actor, audit forwarding, workflow
+        triggers) see each of them as usual."""
+        if auditlog_disabled.get() or not auditlog.contains(self.model_class):
+            return
+        LogEntry = get_logentry_model()
+        logged = [
+            (LogEntry.Action.CREATE, None, instance) for instance, _ in creates
+        ] + [(LogEntry.Action.UPDATE, old, instance) for old, instance, _ in updates]
+        for action, old, instance in logged:
+            pre_log_results = pre_log.send(
+                self.model_class, instance=instance, action=action
+            )
+            if any(result is False for _, result in pre_log_results):
+                continue
+            changes = model_instance_diff(
+                old,
+                instance,
+                use_json_for_changes=settings.AUDITLOG_STORE_JSON_CHANGES,
+            )
+            if not changes:
+                continue
+            entry = LogEntry.objects.log_create(
+                instance, action=action, changes=changes
+            )
+            post_log.send(
+                self.model_class,
+                instance=instance,
+                instance_old=old,
+                action=action,
+                error=None,
+                pre_log_results=pre_log_results,
+                changes=changes,
+                log_entry=entry,
+                log_created=entry is not None,
+                use_json_for_changes=settings.AUDITLOG_STORE_JSON_CHANGES,
+            )
+
+
+def add_links(model_class, field_name: str, links: list) -> int:
+    """
+    Add (instance, related object) links of a many-to-many field, like
+    instance.<field_name>.add(related) for each of them.
+
+    Links that already exist are left alone. The new ones are inserted in
+    bulk when nothing listens to m2m_changed for the field; otherwise (e.g.
+    auditlog tracks the field) they are added one by one so that the
+    receivers run as usual. Returns the number of links added.
+    """
+    if not links:
+        return 0
+    descriptor = getattr(model_class, field_name)
+    through = descriptor.through
+    source = descriptor.field.m2m_field_name()
+    target = descriptor.field.m2m_reverse_field_name()
+    existing = set(
+        through.objects.filter(
+            **{f"{source}__in": {instance.pk for instance, _ in links}}
+        ).values_list(source, target)
+    )
+    added = []
+    for instance, related in links:
+        key = (instance.pk, related.pk)
+        if key not in existing:
+            existing.add(key)
+            added.append((instance, related))
+    if m2m_changed.has_listeners(through):
+        for instance, related in added:
+            getattr(instance, field_name).add(related)
+        return len(added)
+    through.objects.bulk_create(
+        [
+            through(**{f"{source}_id": instance.pk, f"{target}_id": related.pk})
+            for instance, related in added
+        ],
+        ignore_conflicts=True,
+    )
+    return len(added)
@@ -10,8 +10,11 @@ Tests are grouped by consumer. Each group covers:
 """
 
 import pytest
+from dataclasses import replace
 from unittest.mock import patch, MagicMock
 
+from django.db import transaction
+
 from core.models import (
     Actor,
     AppliedControl,
@@ -27,6 +30,7 @@ from core.models import (
 )
 from iam.models import Folder, User
 
+from data_wizard.bulk_helpers import BulkWriter, IdentityIndex, supports_bulk_writes
 from data_wizard.views import (
     AppliedControlRecordConsumer,
     AssetRecordConsumer,
@@ -428,6 +432,191 @@ class TestConflictModes:
         assert result.failed == 1
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Bulk imports — AssetRecordConsumer.BULK_BATCH_SIZE
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _import_snapshot(context, records, batch_size):
+    """Import records with the given batch size, rolled back: the report and
+    the assets it leaves behind."""
+    with (
+        patch.object(AssetRecordConsumer, "BULK_BATCH_SIZE", batch_size),
+        transaction.atomic(),
+    ):
+        result = _run(AssetRecordConsumer, context, records)
+        assets = sorted(
+            (
+                asset.ref_id,
+                asset.name,
+                asset.description,
+                sorted(label.label for label in asset.filtering_labels.all()),
+                sorted(parent.ref_id for parent in asset.parent_assets.all()),
+            )
+            for asset in Asset.objects.prefetch_related(
+                "filtering_labels", "parent_assets"
+            )
+        )
+        transaction.set_rollback(True)
+    return result.to_dict(), assets
+
+
+@pytest.mark.django_db
+class TestAssetBulkImport:
+    def _records(self):
+        return [
+            {"name": "Core switch", "ref_id": "CI-1", "labels": "network|prod"},
+            {"name": "Web server", "ref_id": "CI-2", "parent_assets": "CI-1"},
+            {"ref_id": "CI-3"},
+            {"name": "DB server", "ref_id": "CI-4", "parent_assets": "CI-2|CI-1"},
+            # matches CI-2, imported in the same file
+            {"name": "web SERVER", "description": "again"},
+            {"name": "Legacy", "ref_id": "CI-5", "description": "updated"},
+            {
+                "name": "Mail server",
+                "ref_id": "CI-6",
+                "type": "primary",
+                "security_objectives": "bad_format",
+            },
+            {"name": "Core switch", "ref_id": "CI-7"},
+        ]
+
+    @pytest.mark.parametrize(
+        "on_conflict", [ConflictMode.STOP, ConflictMode.SKIP, ConflictMode.UPDATE]
+    )
+    @pytest.mark.parametrize("batch_size", [1, 3, 500])
+    def test_same_outcome_as_row_by_row(
+        self, base_context, domain_folder, all_accessible, on_conflict, batch_size
+    ):
+        Asset.objects.create(
+            name="Legacy", ref_id="CI-5", folder=domain_folder, description="old"
+        )
+        context = replace(base_context, on_conflict=on_conflict)
+
+        expected = _import_snapshot(context, self._records(), 0)
+        assert _import_snapshot(context, self._records(), batch_size) == expected
+
+    def test_records_are_saved_in_bulk(
+        self, update_context, domain_folder, all_accessible
+    ):
+        records = [
+            {"name": f"Host {i}", "ref_id": f"H-{i}", "parent_assets": "H-0"}
+            for i in range(20)
+        ]
+        with (
+            patch.object(AssetRecordConsumer, "BULK_BATCH_SIZE", 8),
+            patch.object(
+                BulkWriter, "write", autospec=True, side_effect=BulkWriter.write
+            ) as write,
+        ):
+            result = _run(AssetRecordConsumer, update_context, records)
+            assert result.created == 20
+            assert write.call_count == 3
+
+            records[3]["description"] = "changed"
+            result = _run(AssetRecordConsumer, update_context, records)
+            assert result.updated == 20
+
+        host = Asset.objects.get(ref_id="H-3")
+        assert host.description == "changed"
+        assert [a.ref_id for a in host.parent_assets.all()] == ["H-0"]
+        assert Asset.objects.get(ref_id="H-0").parent_assets.count() == 0
+
+    def test_audit_log_entries_are_written(
+        self, base_context, domain_folder, all_accessible
+    ):
+        from auditlog.models import LogEntry
+
+        _run(
+            AssetRecordConsumer,
+            base_context,
+            [
+                {"name": "Parent", "ref_id": "PAR-1"},
+                {"name": "Child", "ref_id": "CHI-1", "parent_assets": "PAR-1"},
+            ],
+        )
+        child = Asset.objects.get(ref_id="CHI-1")
+        entries = LogEntry.objects.get_for_object(child).order_by("timestamp")
+        assert [entry.action for entry in entries] == [
+            LogEntry.Action.CREATE,
+            LogEntry.Action.UPDATE,
+        ]
+        assert entries[0].additional_data == {"folder_id": str(domain_folder.id)}
+        assert entries[1].changes == {
+            "parent_assets": {"type": "m2m", "operation": "add", "objects": ["Parent"]}
+        }
+
+    @pytest.mark.parametrize("batch_size", [1, 500])
+    def test_labels_are_created_for_written_records_only(
+        self, base_context, domain_folder, all_accessible, batch_size
+    ):
+        from core.models import FilteringLabel
+
+        records = [
+            {"name": "First", "ref_id": "F-1", "labels": "shared|first"},
+            # The import stops at this invalid record
+            {"name": "x" * 1000, "ref_id": "B-1", "labels": "broken"},
+            {"name": "Last", "ref_id": "L-1", "labels": "shared|last"},
+        ]
+        with patch.object(AssetRecordConsumer, "BULK_BATCH_SIZE", batch_size):
+            result = _run(AssetRecordConsumer, base_context, records)
+
+        assert result.stopped and result.created == 1
+        assert sorted(FilteringLabel.objects.values_list("label", flat=True)) == [
+            "first",
+            "shared",
+        ]
+        assert sorted(
+            Asset.objects.get(ref_id="F-1").filtering_labels.values_list(
+                "label", flat=True
+            )
+        ) == ["first", "shared"]
+
+    def test_failed_bulk_write_falls_back_to_row_by_row(
+        self, base_context, domain_folder, all_accessible
+    ):
+        with patch.object(BulkWriter, "write", side_effect=RuntimeError("boom")):
+            result = _run(
+                AssetRecordConsumer,
+                base_context,
+                [{"name": "A", "ref_id": "A-1"}, {"name": "B", "ref_id": "B-1"}],
+            )
+        assert result.created == 2
+        assert Asset.objects.filter(folder=domain_folder).count() == 2
+
+
+@pytest.mark.django_db
+class TestIdentityIndex:
+    def test_find_prefers_ref_id_then_name(self, domain_folder, other_folder):
+        by_ref = Asset.objects.create(name="Alpha", ref_id="A-1", folder=domain_folder)
+        by_name = Asset.objects.create(name="Beta", folder=domain_folder)
+        Asset.objects.create(name="Gamma", ref_id="G-1", folder=other_folder)
+        index = IdentityIndex(Asset)
+
+        assert index.find(domain_folder.id, {"ref_id": "A-1", "name": "x"}) == by_ref.pk
+        assert index.find(domain_folder.id, {"ref_id": "B-9", "name": "BETA"}) == (
+            by_name.pk
+        )
+        assert index.find(domain_folder.id, {"ref_id": "G-1", "name": "Gamma"}) is None
+        assert index.find(other_folder.id, {"name": "gamma"}) is not None
+
+    def test_is_unique_ignores_the_object_itself(self, domain_folder):
+        asset = Asset.objects.create(name="Alpha", ref_id="A-1", folder=domain_folder)
+        index = IdentityIndex(Asset)
+
+        assert index.is_unique(asset, ["ref_id", "name"])
+        other = Asset(name="ALPHA", folder=domain_folder)
+        assert not index.is_unique(other, ["name"])
+        assert not index.is_unique(other, ["ref_id", "name"])
+
+
+class TestBulkWritesOptIn:
+    def test_models_opt_in(self):
+        assert supports_bulk_writes(Asset)
+        # Folder-scoped and identified by name, but not opted in
+        assert not supports_bulk_writes(Evidence)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # EvidenceRecordConsumer
 # ─────────────────────────────────────────────────────────────────────────────
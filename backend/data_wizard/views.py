@@ -8,12 +8,13 @@ from types import MappingProxyType
 import re
 import pandas as pd
 from django.http import FileResponse
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import FileUploadParser
 
 from .serializers import LoadFileSerializer
+from .bulk_helpers import BulkWriter, IdentityIndex, add_links, supports_bulk_writes
 from core.base_models import AbstractBaseModel
 from core.utils import build_questions_dict
 from core.models import (
@@ -314,12 +315,10 @@ def _parse_time_to_seconds(s: str) -> int | None:
 
 def _get_security_objective_scale() -> list:
     """Return the active security-objective scale from GlobalSettings."""
-    from global_settings.models import GlobalSettings
+    from global_settings.cache import get_global_setting
 
-    settings = GlobalSettings.objects.filter(name="general").first()
-    scale_key = (
-        settings.value.get("security_objective_scale", "1-4") if settings else "1-4"
-    )
+    settings = get_global_setting("general")
+    scale_key = settings.get("security_objective_scale", "1-4") if settings else "1-4"
     return Asset.SECURITY_OBJECTIVES_SCALES[scale_key]
 
 
@@ -415,10 +414,14 @@ def _resolve_asset_class(value: Any, path_index: dict) -> Optional[AssetClass]:
     return candidates[0] if len(candidates) == 1 else None
 
 
-def _resolve_filtering_labels(value: Any) -> list[UUID]:
+def _resolve_filtering_labels(
+    value: Any, pending: Optional[dict[str, FilteringLabel]] = None
+) -> list[UUID]:
     """Parse pipe- or comma-separated label names and return list of FilteringLabel IDs.
 
-    Labels that do not yet exist are created on the fly.
+    Labels that do not yet exist are created on the fly, or only validated and
+    kept unsaved in `pending` (by name) when it is given, for
+    _save_pending_labels to create them once a record using them is written.
     """
     if not isinstance(value, str):
         return []
@@ -433,17 +436,30 @@ def _resolve_filtering_labels(value: Any) -> list[UUID]:
     label_ids: list[UUID] = []
     for label_name in label_names:
         label = FilteringLabel.objects.filter(label=label_name).first()
+        if label is None and pending is not None:
+            label = pending.get(label_name)
         if label is None:
             try:
                 label = FilteringLabel(label=label_name)
                 label.full_clean()
-                label.save()
+                if pending is None:
+                    label.save()
+                else:
+                    pending[label_name] = label
             except Exception:
                 logging.error(f"Failed to save label: {value}")
         label_ids.append(label.id)
     return label_ids
 
 
+def _save_pending_labels(pending: dict[str, FilteringLabel], label_ids: Any) -> None:
+    """Create the labels of `pending` among label_ids."""
+    label_ids = set(label_ids or [])
+    for label in [label for label in pending.values() if label.id in label_ids]:
+        label.save()
+        del pending[label.label]
+
+
 def _resolve_vulnerabilities(
     value: str | None, folder: "Folder"
 ) -> tuple[list[UUID], list[str]]:
@@ -796,11 +812,29 @@ class BaseContext:
     container_name: Optional[str] = None
 
 
+@dataclass
+class BulkRow:
+    """A record of a bulk batch and what is done with it."""
+
+    record: dict
+    record_data: dict
+    prepare_error: Optional[Error]
+    # "create", "update" or "skip"; None when the record failed
+    action: Optional[str] = None
+    pk: Any = None
+    error: Optional[Error] = None
+    stops: bool = False
+
+
 class RecordConsumer[Context = None](ABC):
     SERIALIZER_CLASS: ClassVar[type[BaseModelSerializer]]
     # Maps record_data keys to possible source record keys when they differ.
     # Override in subclasses that use alternative/aliased column names.
     SOURCE_KEY_MAP: ClassVar[Mapping[str, list[str]]] = MappingProxyType({})
+    # Records are saved in batches of this size with set-based queries (see
+    # data_wizard.bulk_helpers) instead of one by one, for the same Result.
+    # 0 keeps the row-by-row import.
+    BULK_BATCH_SIZE: ClassVar[int] = 0
 
     def __init__(self, base_context: BaseContext):
         self.request = base_context.request
@@ -813,6 +847,9 @@ class RecordConsumer[Context = None](ABC):
         self.target_id = base_context.target_id
         self.container_name = base_context.container_name
         self.side_effects: dict[str, list[str]] = {}
+        # New filtering labels of a bulk import, only created for the records
+        # that are written (see _resolve_filtering_labels)
+        self.pending_labels: Optional[dict[str, FilteringLabel]] = None
 
     def __init_subclass__(cls):
         provided_class = getattr(cls, "SERIALIZER_CLASS", None)
@@ -820,6 +857,10 @@ class RecordConsumer[Context = None](ABC):
         is_serializer = is_defined and issubclass(provided_class, BaseModelSerializer)
 
         assert is_serializer, f"Invalid serializer for class {cls.__name__}"
+        assert not cls.BULK_BATCH_SIZE or (
+            supports_bulk_writes(provided_class.Meta.model)
+            and cls.find_existing is RecordConsumer.find_existing
+        ), f"Bulk writes are not supported by class {cls.__name__}"
 
     @abstractmethod
     def create_context(self) -> tuple[Context, Optional[Error]]:
@@ -846,13 +887,7 @@ class RecordConsumer[Context = None](ABC):
 
         folder_filter = {}
         if hasattr(model_class, "folder"):
-            folder = record_data.get("folder") or self.folder_id
-            if folder is None:
-                raise FolderScopeError(
-                    "Cannot resolve existing record without folder context: "
-                    "provide an X-Folder-Id header or a 'domain' column"
-                )
-            folder_filter["folder"] = folder
+            folder_filter["folder"] = self._lookup_folder(record_data)
 
         if "ref_id" in fields_to_check:
             ref_id = record_data.get("ref_id")
@@ -879,6 +914,15 @@ class RecordConsumer[Context = None](ABC):
         query.update(folder_filter)
         return model_class.objects.filter(**query).first()
 
+    def _lookup_folder(self, record_data: dict):
+        folder = record_data.get("folder") or self.folder_id
+        if folder is None:
+            raise FolderScopeError(
+                "Cannot resolve existing record without folder context: "
+                "provide an X-Folder-Id header or a 'domain' column"
+            )
+        return folder
+
     def _build_update_data(self, record: dict, record_data: dict) -> dict:
         """
         Filter record_data to only include fields that the user actually
@@ -919,84 +963,16 @@ class RecordConsumer[Context = None](ABC):
         )
         viewable_ids = set(viewable_ids)
 
-        for record in records:
-            record_data, error = self.prepare_create(record, context)
-            if error is not None:
-                if error.is_warning:
-                    results.warnings.append(error)
-                else:
-                    results.add_error(error)
-                    if self.on_conflict == ConflictMode.STOP:
-                        results.stopped = True
-                        break
-                    continue
-
-            existing = None
-            internal_id = record.get("internal_id")
-            if internal_id:
-                existing = model_class.objects.filter(
-                    pk=internal_id, id__in=viewable_ids
-                ).first()
-            if existing is None:
-                try:
-                    existing = self.find_existing(record_data)
-                except FolderScopeError as e:
-                    results.add_error(Error(record=record, error=str(e)))
-                    if self.on_conflict == ConflictMode.STOP:
-                        results.stopped = True
-                        break
-                    continue
-
-            if existing:
-                match self.on_conflict:
-                    case ConflictMode.SKIP:
-                        results.add_skipped()
-                        continue
-                    case ConflictMode.STOP:
-                        results.add_error(
-                            Error(record=record, error="Record already exists")
-                        )
-                        results.stopped = True
-                        break
-                    case ConflictMode.UPDATE:
-                        update_data = self._build_update_data(record, record_data)
-                        serializer = self.SERIALIZER_CLASS(
-                            instance=existing,
-                            data=update_data,
-                            partial=True,
-                            context={"request": self.request},
-                        )
-                        if serializer.is_valid():
-                            try:
-                                serializer.save()
-                                results.add_updated()
-                            except Exception as e:
-                                results.add_error(Error(record=record, error=str(e)))
-                        else:
-                            results.add_error(
-                                Error(
-                                    record=record,
-                                    error=str(serializer.errors),
-                                )
-                            )
-                        continue
-
-            serializer = self.SERIALIZER_CLASS(
-                data=record_data, context={"request": self.request}
+        if self.BULK_BATCH_SIZE:
+            self._process_records_in_bulk(
+                records, context, viewable_ids, self._bulk_writer(), results
             )
-            if serializer.is_valid():
-                try:
-                    serializer.save()
-                    results.add_created()
-                except Exception as e:
-                    results.add_error(Error(record=record, error=str(e)))
-                    if self.on_conflict == ConflictMode.STOP:
-                        results.stopped = True
-                        break
-            else:
-                results.add_error(Error(record=record, error=str(serializer.errors)))
-                if self.on_conflict == ConflictMode.STOP:
-                    results.stopped = True
+        else:
+            for record in records:
+                record_data, error = self.prepare_create(record, context)
+                if self._consume_record(
+                    record, record_data, error, viewable_ids, results
+                ):
                     break
 
         for key, names in self.side_effects.items():
@@ -1010,6 +986,340 @@ class RecordConsumer[Context = None](ABC):
         )
         return results
 
+    def _consume_record(
+        self,
+        record: dict,
+        record_data: dict,
+        error: Optional[Error],
+        viewable_ids: set,
+        results: Result,
+    ) -> bool:
+        """Save a prepared record and report its outcome in results.
+        Returns True when the import stops there."""
+        model_class = self.SERIALIZER_CLASS.Meta.model
+        if error is not None:
+            if error.is_warning:
+                results.warnings.append(error)
+            else:
+                results.add_error(error)
+                if self.on_conflict == ConflictMode.STOP:
+                    results.stopped = True
+                    return True
+                return False
+
+        existing = None
+        internal_id = record.get("internal_id")
+        if internal_id:
+            existing = model_class.objects.filter(
+                pk=internal_id, id__in=viewable_ids
+            ).first()
+        if existing is None:
+            try:
+                existing = self.find_existing(record_data)
+            except FolderScopeError as e:
+                results.add_error(Error(record=record, error=str(e)))
+                if self.on_conflict == ConflictMode.STOP:
+                    results.stopped = True
+                    return True
+                return False
+
+        if existing:
+            match self.on_conflict:
+                case ConflictMode.SKIP:
+                    results.add_skipped()
+                    return False
+                case ConflictMode.STOP:
+                    results.add_error(
+                        Error(record=record, error="Record already exists")
+                    )
+                    results.stopped = True
+                    return True
+                case ConflictMode.UPDATE:
+                    update_data = self._build_update_data(record, record_data)
+                    serializer = self.SERIALIZER_CLASS(
+                        instance=existing,
+                        data=update_data,
+                        partial=True,
+                        context={"request": self.request},
+                    )
+                    if serializer.is_valid():
+                        try:
+                            serializer.save()
+                            results.add_updated()
+                        except Exception as e:
+                            results.add_error(Error(record=record, error=str(e)))
+                    else:
+                        results.add_error(
+                            Error(
+                                record=record,
+                                error=str(serializer.errors),
+                            )
+                        )
+                    return False
+
+        serializer = self.SERIALIZER_CLASS(
+            data=record_data, context={"request": self.request}
+        )
+        if serializer.is_valid():
+            try:
+                serializer.save()
+                results.add_created()
+            except Exception as e:
+                results.add_error(Error(record=record, error=str(e)))
+                if self.on_conflict == ConflictMode.STOP:
+                    results.stopped = True
+                    return True
+        else:
+            results.add_error(Error(record=record, error=str(serializer.errors)))
+            if self.on_conflict == ConflictMode.STOP:
+                results.stopped = True
+                return True
+        return False
+
+    def _bulk_writer(self) -> BulkWriter:
+        serializer = self.SERIALIZER_CLASS(
+            context={"request": self.request, "accessible_ids_cache": {}}
+        )
+        return BulkWriter(serializer, IdentityIndex(serializer.Meta.model))
+
+    def _process_records_in_bulk(
+        self,
+        records: list[dict],
+        context: Context,
+        viewable_ids: set,
+        writer: BulkWriter,
+        results: Result,
+    ) -> None:
+        """
+        Import the records in batches of BULK_BATCH_SIZE, each saved by the
+        writer in one transaction.
+
+        Existing records are looked up in an IdentityIndex loaded upfront. A
+        batch ends before a record matching or colliding with one of its
+        records, so that it can be written in any order. A batch that cannot
+        be written in bulk is imported row by row instead.
+        """
+        model_class = self.SERIALIZER_CLASS.Meta.model
+        index = writer.index
+        domains = {record.get("domain") for record in records}
+        index.load(
+            folder
+            for folder in [
+                self.folder_id,
+                *(
+                    self.folders_map.get(domain.lower())
+                    for domain in domains
+                    if isinstance(domain, str)
+                ),
+            ]
+            if folder is not None
+        )
+        internal_ids = {}
+        for record in records:
+            internal_id = record.get("internal_id")
+            if internal_id and internal_id not in internal_ids:
+                pk = model_class._meta.pk.to_python(internal_id)
+                internal_ids[internal_id] = pk if pk in viewable_ids else None
+        matched = [pk for pk in internal_ids.values() if pk is not None]
+        if matched:
+            index.load(
+                model_class.objects.filter(pk__in=matched)
+                .values_list("folder_id", flat=True)
+                .distinct()
+            )
+        unsupported_fields = writer.unsupported_fields()
+        self.pending_labels = {}
+
+        position, prepared = 0, None
+        while position < len(records) and not results.stopped:
+            rows: list[BulkRow] = []
+            batch_keys: set = set()
+            batch_pks: set = set()
+            while position < len(records) and len(rows) < self.BULK_BATCH_SIZE:
+                record = records[position]
+                if prepared is None:
+                    prepared = self.prepare_create(record, context)
+                row = BulkRow(record, *prepared)
+                if not self._resolve_bulk_row(
+                    row, index, internal_ids, batch_keys, batch_pks
+                ):
+                    # Written with the next batch, once this one is saved
+                    break
+                rows.append(row)
+                position, prepared = position + 1, None
+                if row.stops:
+                    break
+
+            written = self._prepare_bulk_rows(rows, writer, unsupported_fields)
+            if written:
+                try:
+                    writer.write()
+                except Exception as e:
+                    logger.warning(
+                        "Bulk write failed, importing the batch row by row",
+                        consumer=self.__class__.__name__,
+                        error=str(e),
+                    )
+                    written = False
+            if written:
+                self._report_bulk_rows(rows, results)
+            else:
+                writer.discard()
+                for row in rows:
+                    _save_pending_labels(
+                        self.pending_labels, row.record_data.get("filtering_labels")
+                    )
+                    if self._consume_record(
+                        row.record,
+                        row.record_data,
+                        row.prepare_error,
+                        viewable_ids,
+                        results,
+                    ):
+                        break
+                index.reload()
+
+    def _resolve_bulk_row(
+        self,
+        row: BulkRow,
+        index: IdentityIndex,
+        internal_ids: dict,
+        batch_keys: set,
+        batch_pks: set,
+    ) -> bool:
+        """Decide what to do with a record, as _consume_record would, from
+        the index. Returns False when the record matches or collides with a
+        record of the batch, leaving it for the next batch."""
+        record, record_data, error = row.record, row.record_data, row.prepare_error
+        if error is not None and not error.is_warning:
+            row.error = error
+            row.stops = self.on_conflict == ConflictMode.STOP
+            return True
+
+        folder = record_data.get("folder") or self.folder_id
+        keys = index.keys(folder, record_data) if folder is not None else set()
+        if keys & batch_keys:
+            return False
+        existing = None
+        internal_id = record.get("internal_id")
+        if internal_id:
+            existing = internal_ids[internal_id]
+        if existing is None and index.fields_to_check:
+            try:
+                existing = index.find(self._lookup_folder(record_data), record_data)
+            except FolderScopeError as e:
+                row.error = Error(record=record, error=str(e))
+                row.stops = self.on_conflict == ConflictMode.STOP
+                return True
+        if existing in batch_pks:
+            return False
+
+        if existing is None:
+            row.action = "create"
+        else:
+            match self.on_conflict:
+                case ConflictMode.SKIP:
+                    row.action = "skip"
+                    return True
+                case ConflictMode.STOP:
+                    row.error = Error(record=record, error="Record already exists")
+                    row.stops = True
+                    return True
+                case ConflictMode.UPDATE:
+                    row.action, row.pk = "update", existing
+                    batch_pks.add(existing)
+        batch_keys |= keys
+        return True
+
+    def _prepare_bulk_rows(
+        self, rows: list[BulkRow], writer: BulkWriter, unsupported_fields: set
+    ) -> bool:
+        """Validate the records to save and hand them to the writer, noting
+        the errors in their row, then create the new labels of the records
+        handed to the writer. Returns False when the batch cannot be written in
+        bulk."""
+        instances = (
+            self.SERIALIZER_CLASS.Meta.model.objects.select_related("folder")
+            .filter(pk__in=[row.pk for row in rows if row.action == "update"])
+            .in_bulk()
+        )
+        # One serializer per action, rebound to each record
+        create_serializer = writer.serializer
+        update_serializer = self.SERIALIZER_CLASS(
+            partial=True, context=create_serializer.context
+        )
+        labels = []
+        for row in rows:
+            if row.error is not None or row.action == "skip":
+                continue
+            instance = None
+            data = row.record_data
+            if row.action == "update":
+                instance = instances.get(row.pk)
+                if instance is None or getattr(instance, "builtin", False):
+                    return False
+                data = self._build_update_data(row.record, row.record_data)
+            if not unsupported_fields.isdisjoint(data):
+                return False
+
+            # New labels are validated already and written with the record
+            label_ids = set(data.get("filtering_labels") or [])
+            new_labels = [
+                label for label in self.pending_labels.values() if label.id in label_ids
+            ]
+            if new_labels:
+                new_ids = {label.id for label in new_labels}
+                data = {
+                    **data,
+                    "filtering_labels": [
+                        pk for pk in data["filtering_labels"] if pk not in new_ids
+                    ],
+                }
+
+            serializer = create_serializer if instance is None else update_serializer
+            serializer.instance, serializer.initial_data = instance, data
+            try:
+                validated_data = serializer.run_validation(data)
+            except serializers.ValidationError as e:
+                row.error = Error(record=row.record, error=str(e.detail))
+            else:
+                if new_labels:
+                    validated_data["filtering_labels"] = [
+                        *validated_data.get("filtering_labels", []),
+                        *new_labels,
+                    ]
+                try:
+                    if instance is None:
+                        writer.prepare_create(validated_data)
+                    else:
+                        writer.prepare_update(instance, validated_data)
+                except Exception as e:
+                    row.error = Error(record=row.record, error=str(e))
+                else:
+                    labels += new_labels
+            if row.error is not None and instance is None:
+                row.stops = self.on_conflict == ConflictMode.STOP
+                if row.stops:
+                    break
+        _save_pending_labels(self.pending_labels, [label.id for label in labels])
+        return True
+
+    def _report_bulk_rows(self, rows: list[BulkRow], results: Result) -> None:
+        for row in rows:
+            if row.prepare_error is not None and row.prepare_error.is_warning:
+                results.warnings.append(row.prepare_error)
+            if row.error is not None:
+                results.add_error(row.error)
+                if row.stops:
+                    results.stopped = True
+                    return
+            elif row.action == "skip":
+                results.add_skipped()
+            elif row.action == "create":
+                results.add_created()
+            elif row.action == "update":
+                results.add_updated()
+
     def _record_side_effects(self, key: str, resolved: SideObjects) -> None:
         self.side_effects.setdefault(key, []).extend(resolved.created)
 
@@ -1021,6 +1331,7 @@ class AssetRecordConsumer(RecordConsumer[list]):
     """
 
     SERIALIZER_CLASS = AssetWriteSerializer
+    BULK_BATCH_SIZE = 500
     SOURCE_KEY_MAP: ClassVar[Mapping[str, list[str]]] = MappingProxyType(
         {
             "reference_link": ["reference_link", "link"],
@@ -1090,7 +1401,7 @@ class AssetRecordConsumer(RecordConsumer[list]):
             or record.get("étiquette")
             or record.get("label")
         )
-        filtering_labels = _resolve_filtering_labels(raw_labels)
+        filtering_labels = _resolve_filtering_labels(raw_labels, self.pending_labels)
         if filtering_labels:
             data["filtering_labels"] = filtering_labels
 
@@ -1152,6 +1463,32 @@ class AssetRecordConsumer(RecordConsumer[list]):
         results = super().process_records(records)
 
         # Second pass: link parent_assets by ref_id
+        parent_refs = list(self._parent_asset_refs(records))
+        if self.BULK_BATCH_SIZE:
+            self._link_parent_assets_in_bulk(parent_refs)
+            return results
+
+        for record_folder_id, asset_ref_id, parent_ref_ids in parent_refs:
+            # Find the created asset (scoped to its folder)
+            asset = Asset.objects.filter(
+                ref_id=asset_ref_id, folder_id=record_folder_id
+            ).first()
+            if not asset:
+                continue
+
+            # Link parent assets (scoped to same folder)
+            for parent_ref_id in parent_ref_ids:
+                parent_asset = Asset.objects.filter(
+                    ref_id=parent_ref_id, folder_id=record_folder_id
+                ).first()
+                if parent_asset and parent_asset.id != asset.id:
+                    asset.parent_assets.add(parent_asset)
+
+        return results
+
+    def _parent_asset_refs(self, records: list[dict]):
+        """(folder id, asset ref_id, parent ref_ids) of the records naming
+        parent assets."""
         for record in records:
             parent_assets_ref = record.get("parent_assets") or record.get(
                 "parent_asset_ref_id"
@@ -1170,13 +1507,6 @@ class AssetRecordConsumer(RecordConsumer[list]):
                 else self.folder_id
             )
 
-            # Find the created asset (scoped to its folder)
-            asset = Asset.objects.filter(
-                ref_id=asset_ref_id, folder_id=record_folder_id
-            ).first()
-            if not asset:
-                continue
-
             # Parse parent ref_ids (comma or pipe separated)
             if isinstance(parent_assets_ref, str):
                 parent_ref_ids = [
@@ -1187,15 +1517,39 @@ class AssetRecordConsumer(RecordConsumer[list]):
             else:
                 parent_ref_ids = [str(parent_assets_ref)]
 
-            # Link parent assets (scoped to same folder)
+            yield record_folder_id, asset_ref_id, parent_ref_ids
+
+    def _link_parent_assets_in_bulk(self, parent_refs: list[tuple]) -> None:
+        """The second pass with the assets of the folders loaded at once."""
+        folder_ids = {
+            IdentityIndex.folder_id(folder_id)
+            for folder_id, _, _ in parent_refs
+            if folder_id is not None
+        }
+        if not folder_ids:
+            return
+        # The first asset by primary key, as .first() finds
+        assets = {}
+        for asset in (
+            Asset.objects.filter(folder_id__in=folder_ids)
+            .only("id", "name", "folder_id", "ref_id")
+            .order_by("pk")
+        ):
+            assets.setdefault((asset.folder_id, asset.ref_id), asset)
+
+        links = []
+        for record_folder_id, asset_ref_id, parent_ref_ids in parent_refs:
+            if record_folder_id is None:
+                continue
+            folder_id = IdentityIndex.folder_id(record_folder_id)
+            asset = assets.get((folder_id, str(asset_ref_id)))
+            if not asset:
+                continue
             for parent_ref_id in parent_ref_ids:
-                parent_asset = Asset.objects.filter(
-                    ref_id=parent_ref_id, folder_id=record_folder_id
-                ).first()
+                parent_asset = assets.get((folder_id, parent_ref_id))
                 if parent_asset and parent_asset.id != asset.id:
-                    asset.parent_assets.add(parent_asset)
-
-        return results
+                    links.append((asset, parent_asset))
+        add_links(Asset, "parent_assets", links)
 
 
 @dataclass(frozen=True)
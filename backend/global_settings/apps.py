@@ -6,3 +6,26 @@ from django.db.models.signals import post_migrate
 class SettingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "global_settings"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from global_settings.cache import invalidate_global_settings_cache
+        from global_settings.models import GlobalSettings
+
+        # Signals rather than save(): loaddata (backup restore) sends them too.
+        def _settings_changed(sender, instance, **kwargs):
+            invalidate_global_settings_cache([instance.name])
+
+        post_save.connect(
+            _settings_changed,
+            sender=GlobalSettings,
+            weak=False,
+            dispatch_uid="global_settings.invalidate_cache.save",
+        )
+        post_delete.connect(
+            _settings_changed,
+            sender=GlobalSettings,
+            weak=False,
+            dispatch_uid="global_settings.invalidate_cache.delete",
+        )
@@ -0,0 +1,83 @@
+"""
+Snapshot of the GlobalSettings rows, served from the CacheRegistry.
+
+The settings are read on hot paths (feature flag checks on every write and in
+many view guards), so every process keeps the values of all the categories in
+the ``global_settings`` snapshot, keyed by name. Saving or deleting a
+GlobalSettings row (post_save/post_delete, see SettingsConfig.ready) bumps the
+snapshot version with the name of the category, and every process reloads
+that category only on its next version check.
+
+Bulk writes (QuerySet.update(), raw SQL) send no signal: call
+invalidate_global_settings_cache() after them.
+"""
+
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+from iam.snapshot_cache import CacheRegistry, ChangeEntry
+
+GLOBAL_SETTINGS_CACHE_KEY = "global_settings"
+
+
+def _load_values(names: Optional[Iterable[str]] = None) -> dict[str, Any]:
+    from global_settings.models import GlobalSettings
+
+    queryset = GlobalSettings.objects.all()
+    if names is not None:
+        queryset = queryset.filter(name__in=names)
+    return dict(queryset.values_list("name", "value"))
+
+
+def build_global_settings_state() -> Mapping[str, Any]:
+    return MappingProxyType(_load_values())
+
+
+def apply_global_settings_changes(
+    state: Mapping[str, Any], changes: Sequence[ChangeEntry]
+) -> Mapping[str, Any]:
+    """Reload the categories named in the journal (deleted ones are dropped)."""
+    names = {change.object_id for change in changes}
+    values = {name: value for name, value in state.items() if name not in names}
+    values.update(_load_values(names))
+    return MappingProxyType(values)
+
+
+def get_global_settings_state() -> Mapping[str, Any]:
+    """{name: value} of every GlobalSettings row. The values must not be mutated."""
+    return CacheRegistry.hydrate(GLOBAL_SETTINGS_CACHE_KEY)
+
+
+def get_global_setting(name: str, default: Any = None) -> Any:
+    """
+    Value of the GlobalSettings row `name`, or `default` when there is none.
+    The value is shared by the whole process: copy it before changing it.
+    """
+    # str(): GlobalSettings.Names members do not hash like their value
+    return get_global_settings_state().get(str(name), default)
+
+
+def invalidate_global_settings_cache(
+    names: Optional[Iterable[str]] = None,
+) -> Optional[int]:
+    """
+    Pass the `names` of the changed categories so other processes reload them
+    only; without them the snapshot is rebuilt.
+    """
+    changes = None
+    if names is not None:
+        changes = [ChangeEntry.upsert(name) for name in names]
+        if not changes:
+            return None
+    return CacheRegistry.invalidate(GLOBAL_SETTINGS_CACHE_KEY, changes)
+
+
+# Import-time registration (DB-free). Lazy: hydrate_all() (IAM) does not need it.
+CacheRegistry.register(
+    GLOBAL_SETTINGS_CACHE_KEY,
+    build_global_settings_state,
+    delta_applier=apply_global_settings_changes,
+    lazy=True,
+)
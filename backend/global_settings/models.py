@@ -6,6 +6,7 @@ from django.db import models
 
 from iam.models import FolderMixin
 from core.base_models import AbstractBaseModel
+from global_settings.cache import get_global_setting
 
 
 def validate_ip_or_cidr(value: str) -> None:
@@ -59,8 +60,8 @@ class GlobalSettings(AbstractBaseModel, FolderMixin):
 
     @classmethod
     def get_daily_rate(cls) -> float:
-        gs = cls.objects.filter(name="general").only("value").first()
-        return gs.value.get("daily_rate", 500) if gs else 500
+        general = get_global_setting(cls.Names.GENERAL)
+        return general.get("daily_rate", 500) if general else 500
 
 
 # value holds all settings/flags; masked to scrub secrets while keeping the diff.
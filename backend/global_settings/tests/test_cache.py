@@ -0,0 +1,65 @@
+"""Tests for the GlobalSettings snapshot served from the CacheRegistry."""
+
+import pytest
+
+from global_settings.cache import (
+    GLOBAL_SETTINGS_CACHE_KEY,
+    get_global_setting,
+    get_global_settings_state,
+)
+from global_settings.models import GlobalSettings
+from global_settings.utils import ff_is_enabled, general_setting_is_enabled
+from iam.snapshot_cache import CacheRegistry
+
+
+def _set(name, value):
+    gs, _ = GlobalSettings.objects.get_or_create(name=name)
+    gs.value = value
+    gs.save()
+    return gs
+
+
+@pytest.mark.django_db
+class TestGlobalSettingsCache:
+    def test_lookups_do_not_query(self, django_assert_num_queries):
+        _set(GlobalSettings.Names.FEATURE_FLAGS, {"focus_mode": True})
+        _set(GlobalSettings.Names.GENERAL, {"personal_folders": True})
+        assert ff_is_enabled("focus_mode")
+
+        with django_assert_num_queries(0):
+            assert ff_is_enabled("focus_mode")
+            assert not ff_is_enabled("unknown_flag")
+            assert general_setting_is_enabled("personal_folders")
+            assert GlobalSettings.get_daily_rate() == 500
+        CacheRegistry._last_fetched_at = None
+        # The version query only
+        with django_assert_num_queries(1):
+            assert ff_is_enabled("focus_mode")
+
+    def test_saves_are_seen(self):
+        gs = _set(GlobalSettings.Names.FEATURE_FLAGS, {"focus_mode": True})
+        assert ff_is_enabled("focus_mode")
+        gs.value = {"focus_mode": False}
+        gs.save()
+        assert not ff_is_enabled("focus_mode")
+        assert get_global_setting(GlobalSettings.Names.FEATURE_FLAGS) == {
+            "focus_mode": False
+        }
+        assert get_global_setting("unknown", {}) == {}
+
+    def test_other_processes_reload_the_changed_category(self):
+        _set(GlobalSettings.Names.FEATURE_FLAGS, {"focus_mode": True})
+        _set(GlobalSettings.Names.GENERAL, {"daily_rate": 700})
+        state = get_global_settings_state()
+        cache = CacheRegistry.get_cache(GLOBAL_SETTINGS_CACHE_KEY)
+        snapshot = cache._snapshot
+
+        _set(GlobalSettings.Names.GENERAL, {"daily_rate": 800})
+        # As another process, applying the journal
+        cache._snapshot = snapshot
+        CacheRegistry._last_fetched_at = None
+        new_state = get_global_settings_state()
+        assert new_state is not state
+        assert new_state["general"] == {"daily_rate": 800}
+        assert new_state["feature-flags"] is state["feature-flags"]
+        assert GlobalSettings.get_daily_rate() == 800
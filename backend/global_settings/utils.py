@@ -1,5 +1,6 @@
 import json
 
+from global_settings.cache import get_global_setting
 from global_settings.models import GlobalSettings
 from global_settings.serializers import FeatureFlagsSerializer
 import structlog
@@ -75,18 +76,16 @@ def redact_secret_value(value: str) -> str:
 
 
 def ff_is_enabled(feature_flag: str):
-    ff_settings = GlobalSettings.objects.filter(
-        name=GlobalSettings.Names.FEATURE_FLAGS
-    ).first()
-    if ff_settings is None:
+    flags: dict[str, bool] | None = get_global_setting(
+        GlobalSettings.Names.FEATURE_FLAGS
+    )
+    if flags is None:
         logger.warning(
             "Feature flags settings not found, returning False",
             feature_flag=feature_flag,
         )
         return False
 
-    flags: dict[str, bool] = ff_settings.value
-
     if (flag := flags.get(feature_flag)) is None:
         logger.warning(
             "Feature flag not found, returning False", feature_flag=feature_flag
@@ -99,7 +98,7 @@ def ff_is_enabled(feature_flag: str):
 def general_setting_is_enabled(key: str) -> bool:
     """Check whether a boolean key in the 'general' GlobalSettings is enabled.
     Returns False when the settings row or the key is missing."""
-    gs = GlobalSettings.objects.filter(name="general").only("value").first()
-    if gs is None or not isinstance(gs.value, dict):
+    general = get_global_setting(GlobalSettings.Names.GENERAL)
+    if not isinstance(general, dict):
         return False
-    return bool(gs.value.get(key, False))
+    return bool(general.get(key, False))
@@ -23,23 +23,42 @@ class IamConfig(AppConfig):
 
         self._patch_client_check_secret(ServiceAccount)
 
-        def _user_groups_changed(sender, instance, action, **kwargs):
+        def _changed_ids(instance, reverse, pk_set):
+            """Ids of the forward side of an m2m change, None if unknown (clear)."""
+            if not reverse:
+                return [instance.pk]
+            return pk_set
+
+        # Memberships only feed the groups snapshot; role assignments are keyed
+        # by user/group id and do not depend on them.
+        def _user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
             if action in {"post_add", "post_remove", "post_clear"}:
-                invalidate_groups_cache()
-                invalidate_assignments_cache()
+                invalidate_groups_cache(
+                    user_ids=_changed_ids(instance, reverse, pk_set)
+                )
 
-        def _ra_perimeters_changed(sender, instance, action, **kwargs):
+        def _ra_perimeters_changed(sender, instance, action, reverse, pk_set, **kwargs):
             if action in {"post_add", "post_remove", "post_clear"}:
-                invalidate_assignments_cache()
+                invalidate_assignments_cache(
+                    assignment_ids=_changed_ids(instance, reverse, pk_set)
+                )
 
         def _role_permissions_changed(sender, instance, action, **kwargs):
             if action in {"post_add", "post_remove", "post_clear"}:
                 invalidate_roles_cache()
 
-        def _idp_group_membership_changed(sender, instance, action, **kwargs):
+        def _idp_group_membership_changed(
+            sender, instance, action, reverse, pk_set, **kwargs
+        ):
+            if action in {"post_add", "post_remove", "post_clear"}:
+                invalidate_groups_cache(
+                    user_ids=_changed_ids(instance, reverse, pk_set)
+                )
+
+        def _idp_group_grants_changed(sender, instance, action, **kwargs):
+            # Affects every member of the IdP group(s): rebuild.
             if action in {"post_add", "post_remove", "post_clear"}:
                 invalidate_groups_cache()
-                invalidate_assignments_cache()
 
         def _idp_group_deleted(sender, instance, **kwargs):
             invalidate_groups_cache()
@@ -70,7 +89,7 @@ class IamConfig(AppConfig):
             weak=False,
         )
         m2m_changed.connect(
-            _idp_group_membership_changed,
+            _idp_group_grants_changed,
             sender=IdPGroup.user_groups.through,
             dispatch_uid="iam.idpgroup.user_groups.m2m.invalidate_caches",
             weak=False,
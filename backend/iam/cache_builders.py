@@ -8,6 +8,9 @@ Design goals:
 - Import-time registration is DB-free (only CacheRegistry.register calls).
 - Actual DB work happens only when CacheRegistry.hydrate_all() rebuilds a snapshot.
 - Snapshots are immutable-ish via MappingProxyType + frozenset/tuple.
+- Each state has a SnapshotCodec (encode_*/decode_*) so that the "mmap" backend
+  can share it between processes; decoded states expose the same Mappings,
+  backed by the mapped file (see iam.snapshot_mmap).
 
 Keys:
 - folders
@@ -23,12 +26,15 @@ from collections import defaultdict
 from dataclasses import dataclass
 from types import MappingProxyType
 from typing import (
+    Collection,
     Dict,
     FrozenSet,
+    Iterable,
     Iterator,
     List,
     Mapping,
     Optional,
+    Sequence,
     Tuple,
     TYPE_CHECKING,
     cast,
@@ -36,11 +42,19 @@ from typing import (
 
 from django.apps import apps
 from django.contrib.auth.models import Permission
-from django.db import connection
+from django.db import connection, router
 from django.db.models import Prefetch
 from django.db.utils import OperationalError, ProgrammingError
 
-from iam.snapshot_cache import CacheRegistry, CacheVersion
+from iam.snapshot_cache import CacheRegistry, CacheVersion, ChangeEntry
+from iam.snapshot_mmap import (
+    Interner,
+    MappedMapping,
+    MappedSequence,
+    SnapshotCodec,
+    SnapshotReader,
+    SnapshotWriter,
+)
 
 # Only for type-checkers (no runtime import => no circular import)
 if TYPE_CHECKING:
@@ -88,6 +102,9 @@ def _ensure_cache_ready() -> None:
 # --------------------------------------------------------------------
 # Folder snapshot cache
 # --------------------------------------------------------------------
+_FOLDER_CACHED_FIELDS = ("id", "name", "parent_folder_id", "content_type", "builtin")
+
+
 @dataclass(frozen=True, slots=True)
 class FolderCacheState:
     folders: Mapping[uuid.UUID, "Folder"]
@@ -96,6 +113,14 @@ class FolderCacheState:
     depth_map: Mapping[uuid.UUID, int]
     root_ids: Tuple[uuid.UUID, ...]
     root_folder_id: Optional[uuid.UUID]
+    # Euler tour: folders in depth-first preorder (children sorted by name).
+    # The subtree of a folder is preorder[entry_map[id] : exit_map[id]], so
+    # subtree membership is a range check (see is_descendant_id).
+    preorder: Sequence[uuid.UUID]
+    entry_map: Mapping[uuid.UUID, int]
+    exit_map: Mapping[uuid.UUID, int]
+    # Ancestors of each folder, root first, the folder itself excluded.
+    ancestors_map: Mapping[uuid.UUID, Tuple[uuid.UUID, ...]]
 
 
 def build_folder_cache_state() -> FolderCacheState:
@@ -104,25 +129,26 @@ def build_folder_cache_state() -> FolderCacheState:
     """
     folder_model = apps.get_model("iam", "Folder")
 
-    folders = list(
-        folder_model.objects.all().only(
-            "id", "name", "parent_folder_id", "content_type", "builtin"
-        )
-    )
+    folders = folder_model.objects.all().only(*_FOLDER_CACHED_FIELDS)
+    return folder_cache_state_from_folders(folders, folder_model.ContentType.ROOT)
 
+
+def folder_cache_state_from_folders(
+    folders: Iterable["Folder"], root_content_type: str
+) -> FolderCacheState:
+    """
+    Index folder-like objects (id, name, parent_folder_id, content_type).
+    """
     folders_by_id: Dict[uuid.UUID, "Folder"] = {folder.id: folder for folder in folders}
     parent_map: Dict[uuid.UUID, Optional[uuid.UUID]] = {
-        folder.id: folder.parent_folder_id for folder in folders
+        folder.id: folder.parent_folder_id for folder in folders_by_id.values()
     }
 
     children_map: defaultdict[Optional[uuid.UUID], List[uuid.UUID]] = defaultdict(list)
     root_folder_id: Optional[uuid.UUID] = None
-    for folder in folders:
+    for folder in folders_by_id.values():
         children_map[folder.parent_folder_id].append(folder.id)
-        if (
-            root_folder_id is None
-            and folder.content_type == folder_model.ContentType.ROOT
-        ):
+        if root_folder_id is None and folder.content_type == root_content_type:
             root_folder_id = folder.id
 
     # Stable ordering for traversal
@@ -131,18 +157,28 @@ def build_folder_cache_state() -> FolderCacheState:
             key=lambda fid: folders_by_id[fid].name.casefold()  # type: ignore[attr-defined]
         )
 
-    depth_map: Dict[uuid.UUID, int] = {}
-
-    def _depth(current_id: uuid.UUID) -> int:
-        if current_id in depth_map:
-            return depth_map[current_id]
-        parent_id = parent_map[current_id]
-        depth_val = 0 if parent_id is None else _depth(parent_id) + 1
-        depth_map[current_id] = depth_val
-        return depth_val
-
-    for folder_id in folders_by_id:
-        _depth(folder_id)
+    # Euler tour (depth-first preorder) with each folder's ancestors
+    preorder: List[uuid.UUID] = []
+    entry_map: Dict[uuid.UUID, int] = {}
+    ancestors_map: Dict[uuid.UUID, Tuple[uuid.UUID, ...]] = {}
+    stack: List[Tuple[uuid.UUID, Tuple[uuid.UUID, ...]]] = [
+        (root_id, ()) for root_id in reversed(children_map.get(None, ()))
+    ]
+    while stack:
+        current, ancestors = stack.pop()
+        entry_map[current] = len(preorder)
+        preorder.append(current)
+        ancestors_map[current] = ancestors
+        below = (*ancestors, current)
+        for child in reversed(children_map.get(current, ())):
+            stack.append((child, below))
+
+    exit_map: Dict[uuid.UUID, int] = {}
+    for current in reversed(preorder):
+        children = children_map.get(current)
+        exit_map[current] = (
+            exit_map[children[-1]] if children else entry_map[current] + 1
+        )
 
     return FolderCacheState(
         folders=MappingProxyType(folders_by_id),
@@ -150,9 +186,156 @@ def build_folder_cache_state() -> FolderCacheState:
         children_map=MappingProxyType(
             {parent: tuple(children) for parent, children in children_map.items()}
         ),
-        depth_map=MappingProxyType(depth_map),
+        depth_map=MappingProxyType(
+            {fid: len(ancestors) for fid, ancestors in ancestors_map.items()}
+        ),
         root_ids=tuple(children_map.get(None, ())),
         root_folder_id=root_folder_id,
+        preorder=tuple(preorder),
+        entry_map=MappingProxyType(entry_map),
+        exit_map=MappingProxyType(exit_map),
+        ancestors_map=MappingProxyType(ancestors_map),
+    )
+
+
+class _ChildrenMapping(Mapping[Optional[uuid.UUID], Tuple[uuid.UUID, ...]]):
+    """children_map of a decoded FolderCacheState: parent id (None for roots) -> children."""
+
+    def __init__(self, by_parent: MappedMapping, root_ids: Tuple[uuid.UUID, ...]):
+        self._by_parent = by_parent
+        self._root_ids = root_ids
+
+    def __getitem__(self, key: Optional[uuid.UUID]) -> Tuple[uuid.UUID, ...]:
+        if key is None:
+            if not self._root_ids:
+                raise KeyError(key)
+            return self._root_ids
+        return self._by_parent[key]
+
+    def __iter__(self) -> Iterator[Optional[uuid.UUID]]:
+        if self._root_ids:
+            yield None
+        yield from self._by_parent
+
+    def __len__(self) -> int:
+        return len(self._by_parent) + (1 if self._root_ids else 0)
+
+
+def encode_folder_state(state: FolderCacheState, writer: SnapshotWriter) -> None:
+    ids = Interner(state.folders)
+    folders = [state.folders[fid] for fid in ids.values]
+    strings = Interner(
+        value for folder in folders for value in (folder.name, folder.content_type)
+    )
+    with_children = [
+        position
+        for position, fid in enumerate(ids.values)
+        if state.children_map.get(fid)
+    ]
+
+    writer.add_uuids("ids", ids.values)
+    writer.add_strings("strings", strings.values)
+    writer.add_array("name", "i", (strings.index[f.name] for f in folders))
+    writer.add_array(
+        "content_type", "i", (strings.index[f.content_type] for f in folders)
+    )
+    writer.add_array("builtin", "B", (bool(f.builtin) for f in folders))
+    writer.add_array(
+        "parent",
+        "i",
+        (
+            -1 if state.parent_map[fid] is None else ids.index[state.parent_map[fid]]
+            for fid in ids.values
+        ),
+    )
+    writer.add_array("depth", "i", (state.depth_map[fid] for fid in ids.values))
+    writer.add_array("with_children", "i", with_children)
+    writer.add_rows(
+        "children",
+        (
+            [ids.index[child] for child in state.children_map[ids.values[position]]]
+            for position in with_children
+        ),
+    )
+    writer.add_array("roots", "i", (ids.index[fid] for fid in state.root_ids))
+    writer.add_array("preorder", "i", (ids.index[fid] for fid in state.preorder))
+    writer.add_array("entry", "i", (state.entry_map[fid] for fid in ids.values))
+    writer.add_array("exit", "i", (state.exit_map[fid] for fid in ids.values))
+    writer.add_rows(
+        "ancestors",
+        (
+            [ids.index[ancestor] for ancestor in state.ancestors_map[fid]]
+            for fid in ids.values
+        ),
+    )
+    writer.meta["root_folder"] = (
+        -1 if state.root_folder_id is None else ids.index[state.root_folder_id]
+    )
+
+
+def decode_folder_state(reader: SnapshotReader) -> FolderCacheState:
+    folder_model = apps.get_model("iam", "Folder")
+    db = router.db_for_read(folder_model)
+    # Model.from_db expects the loaded values in concrete field order.
+    field_names = [
+        f.attname
+        for f in folder_model._meta.concrete_fields
+        if f.attname in _FOLDER_CACHED_FIELDS
+    ]
+
+    ids = reader.uuids("ids")
+    strings = reader.strings("strings")
+    name = reader.array("name")
+    content_type = reader.array("content_type")
+    builtin = reader.array("builtin")
+    parent = reader.array("parent")
+    depth = reader.array("depth")
+    children = reader.rows("children")
+    preorder = reader.array("preorder")
+    entry = reader.array("entry")
+    exit_ = reader.array("exit")
+    ancestors = reader.rows("ancestors")
+    positions = range(len(ids))
+
+    def parent_id_at(position: int) -> Optional[uuid.UUID]:
+        return None if parent[position] < 0 else ids[parent[position]]
+
+    def folder_at(position: int) -> "Folder":
+        values = {
+            "id": ids[position],
+            "name": strings[name[position]],
+            "parent_folder_id": parent_id_at(position),
+            "content_type": strings[content_type[position]],
+            "builtin": bool(builtin[position]),
+        }
+        return folder_model.from_db(
+            db, field_names, [values[field] for field in field_names]
+        )
+
+    root_ids = tuple(ids[position] for position in reader.array("roots"))
+    root_folder = int(reader.meta["root_folder"])
+    return FolderCacheState(
+        folders=MappedMapping(ids, positions, folder_at),
+        parent_map=MappedMapping(ids, positions, parent_id_at),
+        children_map=_ChildrenMapping(
+            MappedMapping(
+                ids,
+                reader.array("with_children"),
+                lambda row: tuple(ids[child] for child in children[row]),
+            ),
+            root_ids,
+        ),
+        depth_map=MappedMapping(ids, positions, lambda position: depth[position]),
+        root_ids=root_ids,
+        root_folder_id=None if root_folder < 0 else ids[root_folder],
+        preorder=MappedSequence(len(preorder), lambda i: ids[preorder[i]]),
+        entry_map=MappedMapping(ids, positions, lambda position: entry[position]),
+        exit_map=MappedMapping(ids, positions, lambda position: exit_[position]),
+        ancestors_map=MappedMapping(
+            ids,
+            positions,
+            lambda position: tuple(ids[i] for i in ancestors[position]),
+        ),
     )
 
 
@@ -165,13 +348,26 @@ def path_ids_from_root(
 ) -> Tuple[uuid.UUID, ...]:
     if folder_id not in state.folders:
         raise KeyError(f"Folder {folder_id} is not cached")
-    path: List[uuid.UUID] = []
-    current: Optional[uuid.UUID] = folder_id
-    while current is not None:
-        path.append(current)
-        current = state.parent_map.get(current)
-    path.reverse()
-    return tuple(path)
+    return (*state.ancestors_map[folder_id], folder_id)
+
+
+def is_descendant_id(
+    state: FolderCacheState,
+    folder_id: uuid.UUID,
+    ancestor_id: uuid.UUID,
+    *,
+    include_self: bool = True,
+) -> bool:
+    """
+    Whether `folder_id` is in the subtree of `ancestor_id` (O(1) range check).
+    """
+    if folder_id == ancestor_id:
+        return include_self
+    entry = state.entry_map.get(folder_id)
+    start = state.entry_map.get(ancestor_id)
+    if entry is None or start is None:
+        return False
+    return start < entry < state.exit_map[ancestor_id]
 
 
 def iter_descendant_ids(
@@ -181,13 +377,31 @@ def iter_descendant_ids(
     Yield descendant folder ids using the cached tree.
     Depth-first traversal, stable order.
     """
-    stack: List[Tuple[uuid.UUID, bool]] = [(start_id, include_start)]
-    while stack:
-        current, include_current = stack.pop()
-        if include_current:
-            yield current
-        for child in reversed(state.children_map.get(current, ())):
-            stack.append((child, True))
+    start = state.entry_map.get(start_id)
+    if start is None:
+        if include_start:
+            yield start_id
+        return
+    yield from state.preorder[
+        start if include_start else start + 1 : state.exit_map[start_id]
+    ]
+
+
+def descendant_ids_within(
+    state: FolderCacheState, start_id: uuid.UUID, scope_id: uuid.UUID
+) -> Sequence[uuid.UUID]:
+    """
+    Folders of the subtree of `start_id` (included) that are also in the subtree
+    of `scope_id` (included), in traversal order. Two subtrees are either nested
+    or disjoint, so this is a single slice of the Euler tour.
+    """
+    start = state.entry_map.get(start_id)
+    scope = state.entry_map.get(scope_id)
+    if start is None or scope is None:
+        return (start_id,) if start_id == scope_id else ()
+    low = max(start, scope)
+    high = min(state.exit_map[start_id], state.exit_map[scope_id])
+    return state.preorder[low:high] if low < high else ()
 
 
 def get_sub_folders_cached(folder_id: uuid.UUID) -> Iterator["Folder"]:
@@ -202,10 +416,8 @@ def get_parent_folders_cached(folder_id: uuid.UUID) -> Iterator["Folder"]:
     state = get_folder_state()
     if folder_id not in state.folders:
         raise KeyError(f"Folder {folder_id} is not cached")
-    current = state.parent_map.get(folder_id)
-    while current is not None:
-        yield state.folders[current]
-        current = state.parent_map.get(current)
+    for ancestor_id in reversed(state.ancestors_map[folder_id]):
+        yield state.folders[ancestor_id]
 
 
 def get_folder_path(
@@ -267,6 +479,67 @@ def build_roles_cache_state() -> RolesCacheState:
     )
 
 
+def encode_roles_state(state: RolesCacheState, writer: SnapshotWriter) -> None:
+    role_ids = Interner(state.role_permissions)
+    strings = Interner(
+        [
+            *state.permission_ids_by_codename,
+            *state.role_id_by_name,
+            *(c for codenames in state.role_permissions.values() for c in codenames),
+        ]
+    )
+    codenames = sorted(strings.index[c] for c in state.permission_ids_by_codename)
+    role_names = sorted(strings.index[n] for n in state.role_id_by_name)
+
+    writer.add_uuids("role_ids", role_ids.values)
+    writer.add_strings("strings", strings.values)
+    writer.add_rows(
+        "role_permissions",
+        (
+            sorted(strings.index[c] for c in state.role_permissions[role_id])
+            for role_id in role_ids.values
+        ),
+    )
+    writer.add_array("codenames", "i", codenames)
+    writer.add_array(
+        "permission_ids",
+        "q",
+        (state.permission_ids_by_codename[strings.values[i]] for i in codenames),
+    )
+    writer.add_array("role_names", "i", role_names)
+    writer.add_array(
+        "role_by_name",
+        "i",
+        (role_ids.index[state.role_id_by_name[strings.values[i]]] for i in role_names),
+    )
+
+
+def decode_roles_state(reader: SnapshotReader) -> RolesCacheState:
+    role_ids = reader.uuids("role_ids")
+    strings = reader.strings("strings")
+    role_permissions = reader.rows("role_permissions")
+    permission_ids = reader.array("permission_ids")
+    role_by_name = reader.array("role_by_name")
+
+    return RolesCacheState(
+        role_permissions=MappedMapping(
+            role_ids,
+            range(len(role_ids)),
+            lambda position: frozenset(strings[i] for i in role_permissions[position]),
+        ),
+        permission_ids_by_codename=MappedMapping(
+            strings,
+            reader.array("codenames"),
+            lambda position: permission_ids[position],
+        ),
+        role_id_by_name=MappedMapping(
+            strings,
+            reader.array("role_names"),
+            lambda position: role_ids[role_by_name[position]],
+        ),
+    )
+
+
 def invalidate_roles_cache() -> Optional[int]:
     return CacheRegistry.invalidate(IAM_ROLES_KEY)
 
@@ -280,15 +553,25 @@ class GroupsCacheState:
     user_group_ids: Mapping[uuid.UUID, FrozenSet[uuid.UUID]]
 
 
-def build_groups_cache_state() -> GroupsCacheState:
+def _load_user_group_ids(
+    user_ids: Optional[Collection[uuid.UUID]] = None,
+) -> Dict[uuid.UUID, FrozenSet[uuid.UUID]]:
+    """
+    Load user_id -> group_ids, for all users or only for `user_ids`.
+    """
     User = apps.get_model("iam", "User")
     IdPGroup = apps.get_model("iam", "IdPGroup")
 
     through = User.user_groups.through  # type: ignore[attr-defined]
-    rows = through.objects.all().values_list("user_id", "usergroup_id")
+    idp_through = User.idp_groups.through  # type: ignore[attr-defined]
+    memberships = through.objects.all()
+    idp_memberships = idp_through.objects.all()
+    if user_ids is not None:
+        memberships = memberships.filter(user_id__in=user_ids)
+        idp_memberships = idp_memberships.filter(user_id__in=user_ids)
 
     mapping: Dict[uuid.UUID, set[uuid.UUID]] = {}
-    for user_id, group_id in rows:
+    for user_id, group_id in memberships.values_list("user_id", "usergroup_id"):
         mapping.setdefault(user_id, set()).add(group_id)
 
     # Groups of groups: a user inherits the user_groups granted by each IdP
@@ -305,21 +588,77 @@ def build_groups_cache_state() -> GroupsCacheState:
         ):
             idp_user_groups.setdefault(idp_id, set()).add(group_id)
 
-        for user_id, idp_id in User.idp_groups.through.objects.values_list(
-            "user_id", "idpgroup_id"
-        ):
+        for user_id, idp_id in idp_memberships.values_list("user_id", "idpgroup_id"):
             granted = idp_user_groups.get(idp_id)
             if granted:
                 mapping.setdefault(user_id, set()).update(granted)
 
-    frozen: Dict[uuid.UUID, FrozenSet[uuid.UUID]] = {
-        u: frozenset(gids) for u, gids in mapping.items()
-    }
-    return GroupsCacheState(user_group_ids=MappingProxyType(frozen))
+    return {u: frozenset(gids) for u, gids in mapping.items()}
 
 
-def invalidate_groups_cache() -> Optional[int]:
-    return CacheRegistry.invalidate(IAM_GROUPS_KEY)
+def build_groups_cache_state() -> GroupsCacheState:
+    return GroupsCacheState(user_group_ids=MappingProxyType(_load_user_group_ids()))
+
+
+def encode_groups_state(state: GroupsCacheState, writer: SnapshotWriter) -> None:
+    ids = Interner(
+        [
+            *state.user_group_ids,
+            *(gid for gids in state.user_group_ids.values() for gid in gids),
+        ]
+    )
+    users = sorted(ids.index[user_id] for user_id in state.user_group_ids)
+
+    writer.add_uuids("ids", ids.values)
+    writer.add_array("users", "i", users)
+    writer.add_rows(
+        "groups",
+        (
+            sorted(ids.index[gid] for gid in state.user_group_ids[ids.values[i]])
+            for i in users
+        ),
+    )
+
+
+def decode_groups_state(reader: SnapshotReader) -> GroupsCacheState:
+    ids = reader.uuids("ids")
+    groups = reader.rows("groups")
+    return GroupsCacheState(
+        user_group_ids=MappedMapping(
+            ids,
+            reader.array("users"),
+            lambda position: frozenset(ids[i] for i in groups[position]),
+        )
+    )
+
+
+def apply_groups_changes(
+    state: GroupsCacheState, changes: Sequence[ChangeEntry]
+) -> GroupsCacheState:
+    """
+    Refresh the memberships of the users named in the journal (object_id = user id).
+    """
+    user_ids = {uuid.UUID(change.object_id) for change in changes}
+    mapping = dict(state.user_group_ids)
+    for user_id in user_ids:
+        mapping.pop(user_id, None)
+    mapping.update(_load_user_group_ids(user_ids))
+    return GroupsCacheState(user_group_ids=MappingProxyType(mapping))
+
+
+def invalidate_groups_cache(
+    *, user_ids: Optional[Iterable[uuid.UUID]] = None
+) -> Optional[int]:
+    """
+    Pass `user_ids` when only the memberships of those users changed, so other
+    processes refresh them instead of rebuilding every membership.
+    """
+    changes = None
+    if user_ids is not None:
+        changes = [ChangeEntry.upsert(uid) for uid in user_ids]
+        if not changes:
+            return None
+    return CacheRegistry.invalidate(IAM_GROUPS_KEY, changes)
 
 
 # --------------------------------------------------------------------
@@ -330,6 +669,7 @@ class AssignmentLite:
     role_id: uuid.UUID
     is_recursive: bool
     perimeter_folder_ids: FrozenSet[uuid.UUID]
+    assignment_id: Optional[uuid.UUID] = None
 
 
 @dataclass(frozen=True, slots=True)
@@ -338,50 +678,219 @@ class AssignmentsCacheState:
     by_group: Mapping[uuid.UUID, Tuple[AssignmentLite, ...]]
 
 
-def build_assignments_cache_state() -> AssignmentsCacheState:
+def _load_assignment_lites(
+    assignment_ids: Optional[Collection[uuid.UUID]] = None,
+) -> Iterator[Tuple[Optional[uuid.UUID], Optional[uuid.UUID], AssignmentLite]]:
+    """
+    Yield (user_id, user_group_id, lite) for all role assignments, or only
+    for `assignment_ids`.
+    """
     RoleAssignment = apps.get_model("iam", "RoleAssignment")
     folder_model = apps.get_model("iam", "Folder")
 
-    ras = (
-        RoleAssignment.objects.all()
-        .only("id", "user_id", "user_group_id", "role_id", "is_recursive")
-        .prefetch_related(
-            Prefetch(
-                "perimeter_folders",
-                queryset=folder_model.objects.only("id"),
-            )
+    ras = RoleAssignment.objects.all()
+    if assignment_ids is not None:
+        ras = ras.filter(id__in=assignment_ids)
+    ras = ras.only(
+        "id", "user_id", "user_group_id", "role_id", "is_recursive"
+    ).prefetch_related(
+        Prefetch(
+            "perimeter_folders",
+            queryset=folder_model.objects.only("id"),
         )
     )
 
-    by_user: Dict[uuid.UUID, List[AssignmentLite]] = {}
-    by_group: Dict[uuid.UUID, List[AssignmentLite]] = {}
-
     for ra in ras:
         lite = AssignmentLite(
             role_id=ra.role_id,
             is_recursive=ra.is_recursive,
             perimeter_folder_ids=frozenset(pf.id for pf in ra.perimeter_folders.all()),
+            assignment_id=ra.id,
         )
-        if ra.user_id:
-            by_user.setdefault(ra.user_id, []).append(lite)
-        if ra.user_group_id:
-            by_group.setdefault(ra.user_group_id, []).append(lite)
+        yield ra.user_id, ra.user_group_id, lite
+
 
+def _freeze_assignments(
+    by_user: Mapping[uuid.UUID, List[AssignmentLite]],
+    by_group: Mapping[uuid.UUID, List[AssignmentLite]],
+) -> AssignmentsCacheState:
     return AssignmentsCacheState(
-        by_user=MappingProxyType({k: tuple(v) for k, v in by_user.items()}),
-        by_group=MappingProxyType({k: tuple(v) for k, v in by_group.items()}),
+        by_user=MappingProxyType({k: tuple(v) for k, v in by_user.items() if v}),
+        by_group=MappingProxyType({k: tuple(v) for k, v in by_group.items() if v}),
     )
 
 
-def invalidate_assignments_cache() -> Optional[int]:
-    return CacheRegistry.invalidate(IAM_ASSIGNMENTS_KEY)
+def build_assignments_cache_state() -> AssignmentsCacheState:
+    by_user: Dict[uuid.UUID, List[AssignmentLite]] = {}
+    by_group: Dict[uuid.UUID, List[AssignmentLite]] = {}
+
+    for user_id, user_group_id, lite in _load_assignment_lites():
+        if user_id:
+            by_user.setdefault(user_id, []).append(lite)
+        if user_group_id:
+            by_group.setdefault(user_group_id, []).append(lite)
+
+    return _freeze_assignments(by_user, by_group)
+
+
+def encode_assignments_state(
+    state: AssignmentsCacheState, writer: SnapshotWriter
+) -> None:
+    # A lite shared by by_user and by_group (user and group assignment) is stored once.
+    lites: Dict[int, AssignmentLite] = {}
+    for source in (state.by_user, state.by_group):
+        for assigned in source.values():
+            for lite in assigned:
+                lites.setdefault(id(lite), lite)
+    lite_positions = {key: position for position, key in enumerate(lites)}
+    ids = Interner(
+        [
+            *state.by_user,
+            *state.by_group,
+            *(
+                value
+                for lite in lites.values()
+                for value in (
+                    lite.role_id,
+                    lite.assignment_id,
+                    *lite.perimeter_folder_ids,
+                )
+                if value is not None
+            ),
+        ]
+    )
+
+    writer.add_uuids("ids", ids.values)
+    writer.add_array("role", "i", (ids.index[lite.role_id] for lite in lites.values()))
+    writer.add_array(
+        "is_recursive", "B", (lite.is_recursive for lite in lites.values())
+    )
+    writer.add_array(
+        "assignment",
+        "i",
+        (
+            -1 if lite.assignment_id is None else ids.index[lite.assignment_id]
+            for lite in lites.values()
+        ),
+    )
+    writer.add_rows(
+        "perimeter",
+        (
+            sorted(ids.index[fid] for fid in lite.perimeter_folder_ids)
+            for lite in lites.values()
+        ),
+    )
+    for name, source in (("by_user", state.by_user), ("by_group", state.by_group)):
+        keys = sorted(ids.index[key] for key in source)
+        writer.add_array(f"{name}.keys", "i", keys)
+        writer.add_rows(
+            f"{name}.lites",
+            (
+                [lite_positions[id(lite)] for lite in source[ids.values[i]]]
+                for i in keys
+            ),
+        )
+
+
+def decode_assignments_state(reader: SnapshotReader) -> AssignmentsCacheState:
+    ids = reader.uuids("ids")
+    role = reader.array("role")
+    is_recursive = reader.array("is_recursive")
+    assignment = reader.array("assignment")
+    perimeter = reader.rows("perimeter")
+    lites: Dict[int, AssignmentLite] = {}
+
+    def lite_at(position: int) -> AssignmentLite:
+        lite = lites.get(position)
+        if lite is None:
+            lite = lites[position] = AssignmentLite(
+                role_id=ids[role[position]],
+                is_recursive=bool(is_recursive[position]),
+                perimeter_folder_ids=frozenset(ids[i] for i in perimeter[position]),
+                assignment_id=(
+                    None if assignment[position] < 0 else ids[assignment[position]]
+                ),
+            )
+        return lite
+
+    def by(name: str) -> MappedMapping:
+        rows = reader.rows(f"{name}.lites")
+        return MappedMapping(
+            ids,
+            reader.array(f"{name}.keys"),
+            lambda position: tuple(lite_at(i) for i in rows[position]),
+        )
+
+    return AssignmentsCacheState(by_user=by("by_user"), by_group=by("by_group"))
+
+
+def apply_assignments_changes(
+    state: AssignmentsCacheState, changes: Sequence[ChangeEntry]
+) -> AssignmentsCacheState:
+    """
+    Drop the journaled role assignments (object_id = assignment id) from the
+    snapshot and reload those that still exist.
+    """
+    changed_ids = {uuid.UUID(change.object_id) for change in changes}
+
+    def _without_changed(
+        source: Mapping[uuid.UUID, Tuple[AssignmentLite, ...]],
+    ) -> Dict[uuid.UUID, List[AssignmentLite]]:
+        return {
+            k: [lite for lite in v if lite.assignment_id not in changed_ids]
+            for k, v in source.items()
+        }
+
+    by_user = _without_changed(state.by_user)
+    by_group = _without_changed(state.by_group)
+
+    for user_id, user_group_id, lite in _load_assignment_lites(changed_ids):
+        if user_id:
+            by_user.setdefault(user_id, []).append(lite)
+        if user_group_id:
+            by_group.setdefault(user_group_id, []).append(lite)
+
+    return _freeze_assignments(by_user, by_group)
+
+
+def invalidate_assignments_cache(
+    *, assignment_ids: Optional[Iterable[uuid.UUID]] = None
+) -> Optional[int]:
+    """
+    Pass `assignment_ids` when only those role assignments were created, updated
+    or deleted, so other processes reload them instead of every assignment.
+    """
+    changes = None
+    if assignment_ids is not None:
+        changes = [ChangeEntry.upsert(ra_id) for ra_id in assignment_ids]
+        if not changes:
+            return None
+    return CacheRegistry.invalidate(IAM_ASSIGNMENTS_KEY, changes)
 
 
 # Import-time registration (DB-free).
-CacheRegistry.register(FOLDER_CACHE_KEY, build_folder_cache_state)
-CacheRegistry.register(IAM_ROLES_KEY, build_roles_cache_state)
-CacheRegistry.register(IAM_GROUPS_KEY, build_groups_cache_state)
-CacheRegistry.register(IAM_ASSIGNMENTS_KEY, build_assignments_cache_state)
+CacheRegistry.register(
+    FOLDER_CACHE_KEY,
+    build_folder_cache_state,
+    codec=SnapshotCodec(encode_folder_state, decode_folder_state),
+)
+CacheRegistry.register(
+    IAM_ROLES_KEY,
+    build_roles_cache_state,
+    codec=SnapshotCodec(encode_roles_state, decode_roles_state),
+)
+CacheRegistry.register(
+    IAM_GROUPS_KEY,
+    build_groups_cache_state,
+    delta_applier=apply_groups_changes,
+    codec=SnapshotCodec(encode_groups_state, decode_groups_state),
+)
+CacheRegistry.register(
+    IAM_ASSIGNMENTS_KEY,
+    build_assignments_cache_state,
+    delta_applier=apply_assignments_changes,
+    codec=SnapshotCodec(encode_assignments_state, decode_assignments_state),
+)
 
 
 def get_folder_state(*, force_reload: bool = False) -> FolderCacheState:
@@ -423,9 +932,20 @@ __all__ = [
     "AssignmentLite",
     "AssignmentsCacheState",
     "build_folder_cache_state",
+    "folder_cache_state_from_folders",
     "build_roles_cache_state",
     "build_groups_cache_state",
     "build_assignments_cache_state",
+    "apply_groups_changes",
+    "apply_assignments_changes",
+    "encode_folder_state",
+    "decode_folder_state",
+    "encode_roles_state",
+    "decode_roles_state",
+    "encode_groups_state",
+    "decode_groups_state",
+    "encode_assignments_state",
+    "decode_assignments_state",
     # helpers used from models.py
     "get_sub_folders_cached",
     "get_parent_folders_cached",
@@ -435,6 +955,8 @@ __all__ = [
     "invalidate_groups_cache",
     "invalidate_assignments_cache",
     "iter_descendant_ids",
+    "is_descendant_id",
+    "descendant_ids_within",
     "get_folder_state",
     "get_roles_state",
     "get_groups_state",
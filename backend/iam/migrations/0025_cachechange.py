@@ -0,0 +1,48 @@
+# Generated by Django 6.0.7 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("iam", "0024_serviceaccount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100)),
+                ("version", models.PositiveBigIntegerField()),
+                (
+                    "op",
+                    models.CharField(
+                        choices=[("upsert", "Upsert"), ("reset", "Reset")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+            ],
+            options={
+                "verbose_name": "Cache change",
+                "verbose_name_plural": "Cache changes",
+                "indexes": [
+                    models.Index(
+                        fields=["key", "version"], name="iam_cachech_key_a9d4f2_idx"
+                    )
+                ],
+            },
+        ),
+    ]
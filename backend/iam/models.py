@@ -6,7 +6,7 @@ from collections import defaultdict
 from dataclasses import dataclass
 from datetime import timedelta
 from typing import Any, Dict, Generator, List, Optional, Tuple
-from typing import TYPE_CHECKING, Set, cast
+from typing import TYPE_CHECKING, Mapping, Set, cast
 import secrets
 import uuid
 from allauth.account.models import EmailAddress
@@ -66,8 +66,11 @@ from iam.cache_builders import (
     invalidate_roles_cache,
     invalidate_groups_cache,
     invalidate_assignments_cache,
+    is_descendant_id,
     iter_descendant_ids,
+    descendant_ids_within,
 )
+from iam.permission_resolver import get_permission_resolver
 
 
 ALLOWED_PERMISSION_APPS = (
@@ -93,6 +96,13 @@ IGNORED_PERMISSION_MODELS = (
     "idpgroup",
     "scimtoken",
     "serviceaccount",
+    "complianceassessmentaggregate",
+    "webhookoutboxevent",
+    "indexqueueentry",
+    "indexedobject",
+    "posturecurrentresult",
+    "posturerunsnapshot",
+    "portfoliolossvector",
 )
 
 
@@ -424,7 +434,7 @@ class PublishInRootFolderMixin(models.Model):
     class Meta:
         abstract = True
 
-    def save(self, *args, **kwargs):
+    def publish_in_root_folder(self):
         # Root folder children must be published
         if (
             getattr(self, "folder") == Folder.get_root_folder()
@@ -432,6 +442,9 @@ class PublishInRootFolderMixin(models.Model):
             and not self.is_published
         ):
             self.is_published = True
+
+    def save(self, *args, **kwargs):
+        self.publish_in_root_folder()
         super().save(*args, **kwargs)
 
 
@@ -1104,6 +1117,168 @@ def _iter_assignment_lites_for_user(user: AbstractBaseUser | AnonymousUser):
     return iter((*direct, *via_groups))
 
 
+# Candidate ORM paths from an IAM-scoped model to its owning folder, in the
+# order they are probed. The first relation present on the model wins.
+FOLDER_LOOKUP_PATHS = (
+    "folder",
+    "risk_assessment__folder",
+    "entity__folder",
+    "provider_entity__folder",
+    "journey__folder",
+    "questionnaire_run__folder",
+    "agent_run__folder",
+)
+
+_folder_lookup_by_model: dict[type, str] = {}
+
+
+def get_folder_lookup(object_type: Any) -> str:
+    """Return the ORM path from `object_type` to its folder, e.g.
+    "risk_assessment__folder". Resolved once per model, then memoized.
+    Raises NotImplementedError for models that are not folder-scoped.
+    """
+    lookup = _folder_lookup_by_model.get(object_type)
+    if lookup is not None:
+        return lookup
+    for path in FOLDER_LOOKUP_PATHS:
+        if hasattr(object_type, path.split("__", 1)[0]):
+            lookup = path
+            break
+    else:
+        raise NotImplementedError("type not supported")
+    _folder_lookup_by_model[object_type] = lookup
+    return lookup
+
+
+def _inherits_published(object_type: Any) -> bool:
+    """Whether published objects of `object_type` are visible from sub-folders."""
+    return hasattr(object_type, "is_published") and (
+        hasattr(object_type, "folder") or object_type is Folder
+    )
+
+
+def _compute_folder_role_ids(
+    state: FolderCacheState,
+    roles_state: Any,
+    folder: Folder,
+    user: AbstractBaseUser | AnonymousUser,
+    focus_folder_id: uuid.UUID | None,
+) -> dict[uuid.UUID, frozenset[uuid.UUID]]:
+    perimeter_ids = set(iter_descendant_ids(state, folder.id, include_start=True))
+
+    if focus_folder_id:
+        focus_ids = set(descendant_ids_within(state, focus_folder_id, folder.id))
+        if state.root_folder_id in perimeter_ids:
+            focus_ids.add(state.root_folder_id)
+        perimeter_ids = focus_ids
+
+    role_ids_by_folder: dict[uuid.UUID, set[uuid.UUID]] = defaultdict(set)
+
+    for a in _iter_assignment_lites_for_user(user):
+        role_perm_codenames = roles_state.role_permissions.get(a.role_id, frozenset())
+
+        # Must be able to see folders at all
+        if "view_folder" not in role_perm_codenames:
+            continue
+
+        if a.is_recursive:
+            # Only the part of each perimeter subtree inside the requested one
+            reached: Set[uuid.UUID] = set()
+            for pf_id in a.perimeter_folder_ids:
+                reached.update(descendant_ids_within(state, pf_id, folder.id))
+            reached &= perimeter_ids
+        else:
+            reached = perimeter_ids & a.perimeter_folder_ids
+
+        for f_id in reached:
+            role_ids_by_folder[f_id].add(a.role_id)
+
+    return {f_id: frozenset(ids) for f_id, ids in role_ids_by_folder.items()}
+
+
+def _get_folder_role_ids(
+    state: FolderCacheState,
+    roles_state: Any,
+    folder: Folder,
+    user: AbstractBaseUser | AnonymousUser,
+) -> Mapping[uuid.UUID, frozenset[uuid.UUID]]:
+    """Map each folder of the `folder` perimeter to the ids of the roles the user
+    holds there (only roles granting view_folder). Uses caches only, and is
+    memoized for the request when a PermissionResolver is installed.
+    """
+    focus_folder_id = focus_folder_id_var.get()
+    resolver = get_permission_resolver()
+    if resolver is None:
+        return _compute_folder_role_ids(
+            state, roles_state, folder, user, focus_folder_id
+        )
+    return resolver.folder_role_ids(
+        (getattr(user, "id", None), folder.id, focus_folder_id),
+        (state, roles_state, get_groups_state(), get_assignments_state()),
+        lambda: _compute_folder_role_ids(
+            state, roles_state, folder, user, focus_folder_id
+        ),
+    )
+
+
+def _get_folder_perm_codes(
+    state: FolderCacheState,
+    roles_state: Any,
+    folder: Folder,
+    user: AbstractBaseUser | AnonymousUser,
+    class_name: str,
+) -> dict[uuid.UUID, set[str]]:
+    """Map each folder of the `folder` perimeter to the view/change/delete
+    codenames the user holds on `class_name` there. Uses caches only.
+    """
+    codes = (f"view_{class_name}", f"change_{class_name}", f"delete_{class_name}")
+
+    granted_by_role: dict[uuid.UUID, frozenset[str]] = {}
+    folder_perm_codes: dict[uuid.UUID, set[str]] = {}
+    for f_id, role_ids in _get_folder_role_ids(
+        state, roles_state, folder, user
+    ).items():
+        perms: set[str] = set()
+        for role_id in role_ids:
+            granted = granted_by_role.get(role_id)
+            if granted is None:
+                role_perm_codenames = roles_state.role_permissions.get(
+                    role_id, frozenset()
+                )
+                granted = frozenset(c for c in codes if c in role_perm_codenames)
+                granted_by_role[role_id] = granted
+            perms |= granted
+        if perms:
+            folder_perm_codes[f_id] = perms
+
+    return folder_perm_codes
+
+
+def _get_viewable_ancestor_ids(
+    state: FolderCacheState,
+    folder_perm_codes: dict[uuid.UUID, set[str]],
+    view_code: str,
+) -> set[uuid.UUID]:
+    """Collect the ancestors of every locally viewable, non-enclave folder.
+    Published objects living in those ancestors are inherited in view.
+    """
+    ancestor_ids: set[uuid.UUID] = set()
+    for folder_id, perms in folder_perm_codes.items():
+        if view_code not in perms:
+            continue
+
+        folder_obj = state.folders[folder_id]
+        if folder_obj.content_type == Folder.ContentType.ENCLAVE:
+            continue
+
+        # Nearest first: once an ancestor is known, so are all of its own.
+        for ancestor_id in reversed(state.ancestors_map.get(folder_id, ())):
+            if ancestor_id in ancestor_ids:
+                break
+            ancestor_ids.add(ancestor_id)
+    return ancestor_ids
+
+
 class RoleAssignment(NameDescriptionMixin, FolderMixin):
     """fundamental class for CISO Assistant RBAC model, similar to Azure IAM model"""
 
@@ -1122,12 +1297,13 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
 
     def save(self, *args, **kwargs):
         result = super().save(*args, **kwargs)
-        invalidate_assignments_cache()
+        invalidate_assignments_cache(assignment_ids=[self.id])
         return result
 
     def delete(self, *args, **kwargs):
+        assignment_id = self.id
         result = super().delete(*args, **kwargs)
-        invalidate_assignments_cache()
+        invalidate_assignments_cache(assignment_ids=[assignment_id])
         return result
 
     def __str__(self) -> str:
@@ -1165,14 +1341,12 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
 
         state = get_folder_state()
         focus_folder_id = focus_folder_id_var.get()
-        if focus_folder_id:
-            focus_ids = set(
-                iter_descendant_ids(state, focus_folder_id, include_start=True)
-            )
-            if state.root_folder_id is not None:
-                focus_ids.add(state.root_folder_id)
-            if folder.id not in focus_ids:
-                return False
+        if (
+            focus_folder_id
+            and folder.id != state.root_folder_id
+            and not is_descendant_id(state, folder.id, focus_folder_id)
+        ):
+            return False
         roles_state = get_roles_state()
 
         for a in _iter_assignment_lites_for_user(user):
@@ -1185,16 +1359,13 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
             if perm_codename == "add_filteringlabel":
                 return True
 
-            perimeter_ids = set(a.perimeter_folder_ids)
-
-            # walk up folder parents via cached parent_map
-            current_id: Optional[uuid.UUID] = folder.id
-            while current_id is not None:
-                if current_id in perimeter_ids:
-                    return True
-                if not a.is_recursive:
-                    break
-                current_id = state.parent_map.get(current_id)
+            if folder.id in a.perimeter_folder_ids:
+                return True
+            if a.is_recursive and any(
+                is_descendant_id(state, folder.id, pf_id)
+                for pf_id in a.perimeter_folder_ids
+            ):
+                return True
 
         return False
 
@@ -1226,44 +1397,26 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
         state = get_folder_state()
         roles_state = get_roles_state()
 
-        perimeter_ids = set(iter_descendant_ids(state, folder.id, include_start=True))
-        state = get_folder_state()
-        perimeter_ids = set(iter_descendant_ids(state, folder.id, include_start=True))
-
+        # Unlike object lookups, the root folder is not implicitly part of
+        # the focus perimeter here.
         focus_folder_id = focus_folder_id_var.get()
-        if focus_folder_id:
-            focus_ids = set(
-                iter_descendant_ids(state, focus_folder_id, include_start=True)
-            )
-            perimeter_ids &= focus_ids
+        hide_root = bool(focus_folder_id) and focus_folder_id != state.root_folder_id
 
-        accessible_ids: Set[uuid.UUID] = set()
-
-        for a in _iter_assignment_lites_for_user(user):
-            role_perms = roles_state.role_permissions.get(a.role_id, frozenset())
-            # Must be able to see folders + have requested permission
-            if "view_folder" not in role_perms or codename not in role_perms:
-                continue
-
-            ra_perimeter_ids = set(a.perimeter_folder_ids)
-            if a.is_recursive:
-                # Expand assignment perimeter downward
-                expanded: Set[uuid.UUID] = set()
-                for pf_id in ra_perimeter_ids:
-                    expanded.update(
-                        iter_descendant_ids(state, pf_id, include_start=True)
-                    )
-                ra_perimeter_ids = expanded
-
-            accessible_ids.update(perimeter_ids & ra_perimeter_ids)
-
-        # Filter by content_type and keep only within perimeter_ids
         result: list[uuid.UUID] = []
-        for folder_id in accessible_ids:
+        for folder_id, role_ids in _get_folder_role_ids(
+            state, roles_state, folder, user
+        ).items():
+            if hide_root and folder_id == state.root_folder_id:
+                continue
+            # Filter by content_type
             folder_obj = state.folders[folder_id]
             if content_type and folder_obj.content_type != content_type:
                 continue
-            if folder_id in perimeter_ids:
+            # Must have the requested permission (view_folder is implied)
+            if any(
+                codename in roles_state.role_permissions.get(role_id, frozenset())
+                for role_id in role_ids
+            ):
                 result.append(folder_id)
 
         return result
@@ -1299,60 +1452,10 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
         ):
             return ([], [], [])
 
-        # Cached state
         state = get_folder_state()
-
-        perimeter_ids = set(iter_descendant_ids(state, folder.id, include_start=True))
-
-        focus_folder_id = focus_folder_id_var.get()
-        if focus_folder_id:
-            focus_ids = set(
-                iter_descendant_ids(state, focus_folder_id, include_start=True)
-            )
-            if state.root_folder_id is not None:
-                focus_ids.add(state.root_folder_id)
-            perimeter_ids &= focus_ids
-
-        # folder_id -> set of granted permission codenames ("view_x", "change_x", "delete_x")
-        folder_perm_codes: dict[uuid.UUID, set[str]] = defaultdict(set)
-
-        # Compute folder permissions using caches only
-        for a in _iter_assignment_lites_for_user(user):
-            role_perm_codenames = roles_state.role_permissions.get(
-                a.role_id, frozenset()
-            )
-
-            # Must be able to see folders at all
-            if "view_folder" not in role_perm_codenames:
-                continue
-
-            ra_perimeter: Set[uuid.UUID] = set(a.perimeter_folder_ids)
-            if a.is_recursive:
-                expanded: Set[uuid.UUID] = set()
-                for pf_id in ra_perimeter:
-                    expanded.update(
-                        iter_descendant_ids(state, pf_id, include_start=True)
-                    )
-                ra_perimeter = expanded
-
-            target_folders = perimeter_ids & ra_perimeter
-            if not target_folders:
-                continue
-
-            can_view = view_code in role_perm_codenames
-            can_change = change_code in role_perm_codenames
-            can_delete = delete_code in role_perm_codenames
-
-            if not (can_view or can_change or can_delete):
-                continue
-
-            for f_id in target_folders:
-                if can_view:
-                    folder_perm_codes[f_id].add(view_code)
-                if can_change:
-                    folder_perm_codes[f_id].add(change_code)
-                if can_delete:
-                    folder_perm_codes[f_id].add(delete_code)
+        folder_perm_codes = _get_folder_perm_codes(
+            state, roles_state, folder, user, class_name
+        )
 
         if object_type is Permission:
             has_view = any(view_code in perms for perms in folder_perm_codes.values())
@@ -1383,38 +1486,13 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
 
         if folder_perm_codes:
             folder_ids = list(folder_perm_codes.keys())
-            if hasattr(object_type, "folder"):
-                objects_iter = object_type.objects.filter(
-                    folder_id__in=folder_ids
-                ).values_list("id", "folder_id")
-            elif object_type is Folder:
+            if object_type is Folder:
                 objects_iter = [(f_id, f_id) for f_id in folder_ids]
-            elif hasattr(object_type, "risk_assessment"):
-                objects_iter = object_type.objects.filter(
-                    risk_assessment__folder_id__in=folder_ids
-                ).values_list("id", "risk_assessment__folder_id")
-            elif hasattr(object_type, "entity"):
-                objects_iter = object_type.objects.filter(
-                    entity__folder_id__in=folder_ids
-                ).values_list("id", "entity__folder_id")
-            elif hasattr(object_type, "provider_entity"):
-                objects_iter = object_type.objects.filter(
-                    provider_entity__folder_id__in=folder_ids
-                ).values_list("id", "provider_entity__folder_id")
-            elif hasattr(object_type, "journey"):
-                objects_iter = object_type.objects.filter(
-                    journey__folder_id__in=folder_ids
-                ).values_list("id", "journey__folder_id")
-            elif hasattr(object_type, "questionnaire_run"):
-                objects_iter = object_type.objects.filter(
-                    questionnaire_run__folder_id__in=folder_ids
-                ).values_list("id", "questionnaire_run__folder_id")
-            elif hasattr(object_type, "agent_run"):
-                objects_iter = object_type.objects.filter(
-                    agent_run__folder_id__in=folder_ids
-                ).values_list("id", "agent_run__folder_id")
             else:
-                raise NotImplementedError("type not supported")
+                folder_id_path = f"{get_folder_lookup(object_type)}_id"
+                objects_iter = object_type.objects.filter(
+                    **{f"{folder_id_path}__in": folder_ids}
+                ).values_list("id", folder_id_path)
 
             for obj_id, folder_id in objects_iter:
                 perms = folder_perm_codes.get(folder_id, set())
@@ -1426,40 +1504,94 @@ class RoleAssignment(NameDescriptionMixin, FolderMixin):
                     result_delete.add(obj_id)
 
         # Published inheritance: published parents for local-view folders
-        # PERF: collect all ancestor folder_ids first, then do ONE query.""
-        if hasattr(object_type, "is_published") and (
-            hasattr(object_type, "folder") or object_type is Folder
-        ):
-            ancestor_ids: set[uuid.UUID] = set()
+        if _inherits_published(object_type):
+            ancestor_ids = _get_viewable_ancestor_ids(
+                state, folder_perm_codes, view_code
+            )
+            if ancestor_ids:
+                folder_id_path = "id" if object_type is Folder else "folder_id"
+                result_view.update(
+                    object_type.objects.filter(
+                        **{f"{folder_id_path}__in": ancestor_ids},
+                        is_published=True,
+                    ).values_list("id", flat=True)
+                )
+
+        return (list(result_view), list(result_change), list(result_delete))
+
+    @staticmethod
+    def accessible_queryset(
+        user: AbstractBaseUser | AnonymousUser,
+        object_type: Any,
+        perm: str = "view",
+        folder: Folder | None = None,
+    ) -> QuerySet:
+        """Queryset counterpart of get_accessible_object_ids for a single permission
+        (`perm` is one of "view", "change", "delete").
+        Visibility is expressed as a filter on the object's folder (plus the
+        published-ancestor clause in view) so that the database applies it,
+        instead of shipping every accessible id back as an IN list.
+        `folder` defaults to the root folder.
+        """
+        if perm not in ("view", "change", "delete"):
+            raise ValueError(f"unsupported permission: {perm}")
+
+        manager = object_type.objects
+        if not getattr(user, "is_authenticated", False):
+            return manager.none()
+
+        if folder is None:
+            folder = Folder.get_root_folder()
+
+        class_name = object_type.__name__.lower()
+        if class_name == "actor" or object_type is Permission:
+            # Not folder-scoped: visibility is derived from other models.
+            ids = RoleAssignment.get_accessible_object_ids(folder, user, object_type)[
+                ("view", "change", "delete").index(perm)
+            ]
+            return manager.filter(id__in=ids)
 
-            for folder_id, perms in folder_perm_codes.items():
-                if view_code not in perms:
-                    continue
+        roles_state = get_roles_state()
+        permissions_map = roles_state.permission_ids_by_codename
+        if any(
+            f"{p}_{class_name}" not in permissions_map
+            for p in ("view", "change", "delete")
+        ):
+            return manager.none()
 
-                folder_obj = state.folders[folder_id]
-                if folder_obj.content_type == Folder.ContentType.ENCLAVE:
-                    continue
+        state = get_folder_state()
+        folder_perm_codes = _get_folder_perm_codes(
+            state, roles_state, folder, user, class_name
+        )
 
-                parent_id = state.parent_map.get(folder_id)
-                while parent_id:
-                    ancestor_ids.add(parent_id)
-                    parent_id = state.parent_map.get(parent_id)
+        codename = f"{perm}_{class_name}"
+        folder_ids = [
+            folder_id
+            for folder_id, perms in folder_perm_codes.items()
+            if codename in perms
+        ]
 
+        visibility = Q()
+        if folder_ids:
+            folder_id_path = (
+                "id"
+                if object_type is Folder
+                else f"{get_folder_lookup(object_type)}_id"
+            )
+            visibility |= Q(**{f"{folder_id_path}__in": folder_ids})
+        if perm == "view" and _inherits_published(object_type):
+            ancestor_ids = _get_viewable_ancestor_ids(
+                state, folder_perm_codes, codename
+            )
             if ancestor_ids:
-                if object_type is Folder:
-                    result_view.update(
-                        object_type.objects.filter(
-                            id__in=ancestor_ids, is_published=True
-                        ).values_list("id", flat=True)
-                    )
-                else:
-                    result_view.update(
-                        object_type.objects.filter(
-                            folder_id__in=ancestor_ids, is_published=True
-                        ).values_list("id", flat=True)
-                    )
+                folder_id_path = "id" if object_type is Folder else "folder_id"
+                visibility |= Q(
+                    **{f"{folder_id_path}__in": ancestor_ids}, is_published=True
+                )
 
-        return (list(result_view), list(result_change), list(result_delete))
+        if not visibility:
+            return manager.none()
+        return manager.filter(visibility)
 
     @staticmethod
     def _get_actor_accessible_ids(
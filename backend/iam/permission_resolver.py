@@ -0,0 +1,120 @@
+"""
+permission_resolver.py
+
+Request-scoped memoization of IAM permission resolution.
+
+RoleAssignment.get_accessible_object_ids (and accessible_queryset) first work out
+which roles a user holds on which folder of a perimeter. Dashboards and the
+related-field masking of BaseModelViewSet ask that question many times per
+request for the same user and perimeter, only varying the model. When a
+PermissionResolver is installed (PermissionResolverMiddleware for HTTP requests,
+permission_resolution_scope() elsewhere), the folder -> role ids map is computed
+once per (user, perimeter folder, focus folder) and every later model lookup is
+served from it.
+
+Entries are bound to the IAM snapshots they were computed from: if any of the
+folder/roles/groups/assignments snapshots changes during the scope (its
+CacheVersion was bumped), the memo is discarded.
+"""
+
+from __future__ import annotations
+
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterator, Mapping, Optional, Sequence
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+FolderRoleIds = Mapping[uuid.UUID, frozenset[uuid.UUID]]
+
+
+@dataclass(slots=True)
+class ResolverStats:
+    resolved: int = 0  # folder -> roles maps actually computed
+    reused: int = 0  # lookups served from the memo (resolutions avoided)
+    discarded: int = 0  # memo resets caused by an IAM snapshot change
+
+
+class PermissionResolver:
+    """Per-scope memo of folder -> role ids maps, keyed on the IAM snapshots."""
+
+    def __init__(self) -> None:
+        self._snapshots: tuple[object, ...] = ()
+        self._folder_role_ids: dict[Hashable, FolderRoleIds] = {}
+        self.stats = ResolverStats()
+
+    def _sync(self, snapshots: Sequence[object]) -> None:
+        # Snapshots are immutable and replaced on rebuild: identity is enough.
+        if len(snapshots) == len(self._snapshots) and all(
+            current is previous for current, previous in zip(snapshots, self._snapshots)
+        ):
+            return
+        if self._folder_role_ids:
+            self.stats.discarded += 1
+            self._folder_role_ids.clear()
+        self._snapshots = tuple(snapshots)
+
+    def folder_role_ids(
+        self,
+        key: Hashable,
+        snapshots: Sequence[object],
+        compute: Callable[[], FolderRoleIds],
+    ) -> FolderRoleIds:
+        self._sync(snapshots)
+        cached = self._folder_role_ids.get(key)
+        if cached is not None:
+            self.stats.reused += 1
+            return cached
+        value = compute()
+        self._folder_role_ids[key] = value
+        self.stats.resolved += 1
+        return value
+
+
+permission_resolver_var: ContextVar[Optional[PermissionResolver]] = ContextVar(
+    "permission_resolver", default=None
+)
+
+
+def get_permission_resolver() -> Optional[PermissionResolver]:
+    return permission_resolver_var.get()
+
+
+@contextmanager
+def permission_resolution_scope() -> Iterator[PermissionResolver]:
+    """Install a fresh resolver for the duration of the block (e.g. a Huey task)."""
+    resolver = PermissionResolver()
+    token = permission_resolver_var.set(resolver)
+    try:
+        yield resolver
+    finally:
+        permission_resolver_var.reset(token)
+
+
+class PermissionResolverMiddleware:
+    """
+    Installs a PermissionResolver for each request and logs how many
+    permission resolutions it avoided.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with permission_resolution_scope() as resolver:
+            request.permission_resolver = resolver
+            response = self.get_response(request)
+        stats = resolver.stats
+        if stats.resolved or stats.reused:
+            logger.debug(
+                "Permission resolution",
+                path=request.path,
+                resolved=stats.resolved,
+                reused=stats.reused,
+                discarded=stats.discarded,
+            )
+        return response
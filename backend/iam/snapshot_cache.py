@@ -2,18 +2,39 @@
 Generic versioned snapshot caching logic for Django with:
 - One DB table for all cache versions
 - OR import-time self-registration via CacheRegistry.register(...)
+- An append-only change journal (CacheChange) written alongside each version bump,
+  so caches registered with a delta applier can catch up by applying the few
+  changes since their version instead of rebuilding the whole snapshot.
+- An optional host-wide backend (IAM_SNAPSHOT_BACKEND = "mmap", see
+  iam.snapshot_mmap) sharing snapshots between processes via memory-mapped files.
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
 import time
-from typing import Callable, Dict, Generic, Mapping, Optional, Sequence, Tuple, TypeVar
-
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    TYPE_CHECKING,
+)
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.db import models, transaction
 from django.db.models import F
 from django.db.utils import OperationalError, ProgrammingError
 
+if TYPE_CHECKING:
+    from iam.snapshot_mmap import SnapshotCodec
+
 T = TypeVar("T")
 
 
@@ -38,6 +59,48 @@ class CacheVersion(models.Model):
         return f"{self.key}={self.version}"
 
 
+class CacheChange(models.Model):
+    """
+    Append-only journal of what changed at each CacheVersion bump.
+    Every bump writes at least one row; a bump that cannot describe its change
+    writes a single RESET row, which forces a full rebuild.
+    Old rows are pruned, so a gap in the journal also means "rebuild".
+    """
+
+    class Op(models.TextChoices):
+        UPSERT = "upsert", "Upsert"  # object created, updated or deleted
+        RESET = "reset", "Reset"  # unspecified change: full rebuild
+
+    key = models.CharField(max_length=100)
+    version = models.PositiveBigIntegerField()
+    op = models.CharField(max_length=10, choices=Op.choices)
+    object_id = models.CharField(max_length=100, blank=True, default="")
+
+    class Meta:
+        verbose_name = "Cache change"
+        verbose_name_plural = "Cache changes"
+        indexes = [models.Index(fields=["key", "version"])]
+
+    def __str__(self) -> str:
+        return f"{self.key}@{self.version}: {self.op} {self.object_id}"
+
+
+@dataclass(frozen=True, slots=True)
+class ChangeEntry:
+    op: str
+    object_id: str = ""
+
+    @classmethod
+    def upsert(cls, object_id: object) -> "ChangeEntry":
+        return cls(CacheChange.Op.UPSERT, str(object_id))
+
+
+# Journal rows older than this many versions (per key) are pruned.
+JOURNAL_RETENTION = 1000
+# Past this many pending versions a full rebuild is cheaper than catching up.
+MAX_DELTA_VERSIONS = 200
+
+
 # -----------------------------
 # Version store (fetch-all + ensure + atomic bump)
 # -----------------------------
@@ -79,15 +142,64 @@ class VersionStore:
         return VersionSnapshot(versions=versions)
 
     @staticmethod
-    def bump(key: str) -> int:
+    def bump(key: str, changes: Optional[Iterable[ChangeEntry]] = None) -> int:
+        """
+        Atomically increment the version of `key` and journal `changes` under the
+        new version. Without `changes`, a RESET entry is journaled.
+        """
         with transaction.atomic():
             obj, _ = CacheVersion.objects.select_for_update().get_or_create(
                 key=key, defaults={"version": 1}
             )
             obj.version = F("version") + 1
-            obj.save(update_fields=["version"])
+            obj.save(update_fields=["version", "updated_at"])
             obj.refresh_from_db(fields=["version"])
-            return int(obj.version)
+            new_version = int(obj.version)
+
+            entries = list(changes) if changes is not None else []
+            if not entries:
+                entries = [ChangeEntry(CacheChange.Op.RESET)]
+            CacheChange.objects.bulk_create(
+                [
+                    CacheChange(
+                        key=key,
+                        version=new_version,
+                        op=entry.op,
+                        object_id=entry.object_id,
+                    )
+                    for entry in entries
+                ]
+            )
+            if new_version % 100 == 0:
+                CacheChange.objects.filter(
+                    key=key, version__lte=new_version - JOURNAL_RETENTION
+                ).delete()
+            return new_version
+
+    @staticmethod
+    def get_changes(
+        key: str, since: int, until: int
+    ) -> Optional[Tuple[ChangeEntry, ...]]:
+        """
+        Return the journaled changes of `key` for versions in (since, until], in
+        version order, or None when they cannot be replayed (journal truncated
+        or a RESET was recorded).
+        """
+        rows = (
+            CacheChange.objects.filter(key=key, version__gt=since, version__lte=until)
+            .order_by("version", "id")
+            .values_list("version", "op", "object_id")
+        )
+        seen_versions: set[int] = set()
+        entries: list[ChangeEntry] = []
+        for version, op, object_id in rows:
+            if op == CacheChange.Op.RESET:
+                return None
+            seen_versions.add(int(version))
+            entries.append(ChangeEntry(op, object_id))
+        if len(seen_versions) != until - since:
+            return None
+        return tuple(entries)
 
 
 # -----------------------------
@@ -99,14 +211,28 @@ class _Snapshot(Generic[T]):
     value: T
 
 
+DeltaApplier = Callable[[T, Sequence[ChangeEntry]], Optional[T]]
+
+
 class VersionedSnapshotCache(Generic[T]):
     """
     Process-local immutable snapshot cache keyed by a DB version row in CacheVersion.
+
+    When a `delta_applier` is given, a snapshot that is a few versions behind is
+    brought up to date by replaying the journaled changes through it (it returns
+    a new snapshot, or None to request a full rebuild).
     """
 
-    def __init__(self, *, key: str, builder: Callable[[], T]):
+    def __init__(
+        self,
+        *,
+        key: str,
+        builder: Callable[[], T],
+        delta_applier: Optional[DeltaApplier[T]] = None,
+    ):
         self.key = key
         self._builder = builder
+        self._delta_applier = delta_applier
         self._snapshot: Optional[_Snapshot[T]] = None
 
     def get(self, versions: Mapping[str, int], *, force_reload: bool = False) -> T:
@@ -131,23 +257,53 @@ class VersionedSnapshotCache(Generic[T]):
         ):
             return self._snapshot.value
 
-        value = self._builder()
+        value = self._load(v, force_reload=force_reload)
         self._snapshot = _Snapshot(version=v, value=value)
         return value
 
-    def invalidate(self) -> Optional[int]:
+    def _load(self, version: int, *, force_reload: bool) -> T:
+        """Produce the snapshot for `version`: catch up with deltas, else rebuild."""
+        value = None if force_reload else self._catch_up(version)
+        if value is None:
+            value = self._builder()
+        return value
+
+    def _catch_up(self, version: int) -> Optional[T]:
+        """Apply journaled changes to the current snapshot, if possible."""
+        snapshot = self._snapshot
+        if self._delta_applier is None or snapshot is None:
+            return None
+        pending = version - snapshot.version
+        if pending <= 0 or pending > MAX_DELTA_VERSIONS:
+            return None
+        changes = VersionStore.get_changes(self.key, snapshot.version, version)
+        if changes is None:
+            return None
+        return self._delta_applier(snapshot.value, changes)
+
+    def invalidate(
+        self, changes: Optional[Iterable[ChangeEntry]] = None
+    ) -> Optional[int]:
         """
         Best-effort invalidation: if the CacheVersion table isn't available yet
         (e.g. during migrations), do not crash the caller.
+        `changes` describes what changed, letting every process, this one
+        included, catch up with deltas; without it they rebuild the snapshot
+        from scratch.
         """
+        if changes is not None:
+            changes = list(changes)
         try:
-            new_v = VersionStore.bump(self.key)
+            new_v = VersionStore.bump(self.key, changes)
         except OperationalError, ProgrammingError:
             # Still clear local snapshot so this process rebuilds next time it can.
             self._snapshot = None
             return None
 
-        self._snapshot = None
+        snapshot = self._snapshot
+        # A snapshot already at new_v was stamped in a rolled back transaction
+        if not changes or snapshot is None or snapshot.version >= new_v:
+            self._snapshot = None
         return new_v
 
     def clear_local(self) -> None:
@@ -162,6 +318,7 @@ class CacheRegistry:
     """
 
     _caches: Dict[str, VersionedSnapshotCache] = {}
+    _lazy_keys: set[str] = set()
     _last_versions: Optional[Mapping[str, int]] = None
     _last_fetched_at: Optional[float] = None
     _MIN_FETCH_INTERVAL_MS = 500.0
@@ -172,19 +329,52 @@ class CacheRegistry:
         key: str,
         builder: Callable[[], object],
         *,
+        delta_applier: Optional[DeltaApplier] = None,
+        codec: Optional["SnapshotCodec"] = None,
         allow_replace: bool = False,
+        lazy: bool = False,
     ) -> None:
         """
         Register a single cache (DB-free). Safe to call at import time.
 
+        A `lazy` cache is not hydrated by hydrate_all() but only when requested
+        with hydrate(key); its version is still fetched with the others.
+
+        Caches registered with a `codec` are shared between the processes of a
+        host through memory-mapped files when settings.IAM_SNAPSHOT_BACKEND is
+        "mmap" (see iam.snapshot_mmap); otherwise every process keeps its own copy.
+
         If key already exists:
           - allow_replace=False -> no-op
           - allow_replace=True  -> replace cache/builder
         """
         if key in cls._caches and not allow_replace:
             return
+        if lazy:
+            cls._lazy_keys.add(key)
+        else:
+            cls._lazy_keys.discard(key)
+
+        backend = getattr(settings, "IAM_SNAPSHOT_BACKEND", "local")
+        if backend not in ("local", "mmap"):
+            raise ImproperlyConfigured(
+                f"Unknown IAM_SNAPSHOT_BACKEND {backend!r} (expected 'local' or 'mmap')"
+            )
+        if backend == "mmap" and codec is not None:
+            from iam.snapshot_mmap import MappedSnapshotCache
+
+            cls._caches[key] = MappedSnapshotCache(
+                key=key,
+                builder=builder,
+                codec=codec,
+                directory=settings.IAM_SNAPSHOT_DIR,
+                delta_applier=delta_applier,
+            )
+            return
 
-        cls._caches[key] = VersionedSnapshotCache(key=key, builder=builder)
+        cls._caches[key] = VersionedSnapshotCache(
+            key=key, builder=builder, delta_applier=delta_applier
+        )
 
     @classmethod
     def hydrate_all(cls, *, force_reload: bool = False) -> Mapping[str, object]:
@@ -197,6 +387,31 @@ class CacheRegistry:
                 "No caches registered. Call CacheRegistry.register(...) before hydrate_all()."
             )
 
+        versions = cls._fetch_versions(force_reload=force_reload)
+
+        # Hydrate each cache
+        return {
+            key: cache.get(versions, force_reload=force_reload)
+            for key, cache in cls._caches.items()
+            if key not in cls._lazy_keys
+        }
+
+    @classmethod
+    def hydrate(cls, key: str, *, force_reload: bool = False) -> object:
+        """
+        Hydrate a single cache (typically a lazy one), with the same version
+        fetch as hydrate_all().
+        """
+        cache = cls.get_cache(key)
+        versions = cls._fetch_versions(force_reload=force_reload)
+        return cache.get(versions, force_reload=force_reload)
+
+    @classmethod
+    def _fetch_versions(cls, *, force_reload: bool = False) -> Mapping[str, int]:
+        """
+        Versions of all registered caches, fetched at most once every
+        _MIN_FETCH_INTERVAL_MS unless force_reload.
+        """
         keys = tuple(cls._caches.keys())
 
         now = time.monotonic() * 1000.0
@@ -206,6 +421,8 @@ class CacheRegistry:
             and cls._last_versions is not None
             and cls._last_fetched_at is not None
             and now - cls._last_fetched_at < cls._MIN_FETCH_INTERVAL_MS
+            # A cache registered since the last fetch needs its row
+            and all(key in cls._last_versions for key in keys)
         ):
             versions = cls._last_versions
 
@@ -214,11 +431,7 @@ class CacheRegistry:
             cls._last_versions = versions
             cls._last_fetched_at = now
 
-        # Hydrate each cache
-        return {
-            key: cache.get(versions, force_reload=force_reload)
-            for key, cache in cls._caches.items()
-        }
+        return versions
 
     @classmethod
     def get_cache(cls, key: str) -> VersionedSnapshotCache:
@@ -228,8 +441,15 @@ class CacheRegistry:
             raise KeyError(f"Unknown cache key: {key}") from e
 
     @classmethod
-    def invalidate(cls, key: str) -> Optional[int]:
-        return cls.get_cache(key).invalidate()
+    def invalidate(
+        cls, key: str, changes: Optional[Iterable[ChangeEntry]] = None
+    ) -> Optional[int]:
+        new_v = cls.get_cache(key).invalidate(changes)
+        if new_v is not None and cls._last_versions is not None:
+            # Read our own writes: the local snapshot catches up with (or is
+            # rebuilt at) the new version at once, not at the next fetch.
+            cls._last_versions = {**cls._last_versions, key: new_v}
+        return new_v
 
     @classmethod
     def keys(cls) -> Tuple[str, ...]:
@@ -241,3 +461,4 @@ class CacheRegistry:
         Useful for tests: clears registered caches.
         """
         cls._caches.clear()
+        cls._lazy_keys.clear()
@@ -0,0 +1,465 @@
+"""
+snapshot_mmap.py
+
+Memory-mapped backend for CacheRegistry snapshots
+(settings.IAM_SNAPSHOT_BACKEND = "mmap").
+
+With the default "local" backend every process (gunicorn worker, Huey consumer)
+builds and keeps its own copy of each snapshot. With "mmap", the first process
+to see a new version builds the snapshot, encodes it once into a compact binary
+file under settings.IAM_SNAPSHOT_DIR and atomically renames it into place.
+Every process on the host then maps that file read-only: the pages are shared
+through the OS page cache, and rebuild queries run once per version per host
+instead of once per process.
+
+File layout: magic, a small JSON header (meta + section directory), then
+8-byte aligned sections, either raw bytes or `array` typecode arrays. UUIDs and
+strings are interned in sorted tables and referenced by index everywhere else.
+Decoders expose the sections through read-only Mapping views (MappedMapping):
+lookups bisect the mapped memory and only the values actually accessed are
+materialized as Python objects.
+
+Only caches registered with a SnapshotCodec use this backend; the others stay
+process-local. The directory must be host-local (ideally a tmpfs such as
+/dev/shm). Files are named after the cache key, its version and the
+CacheVersion.updated_at stamp of that version; older files of a key are removed
+once a newer one is published.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import uuid
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import structlog
+
+from iam.snapshot_cache import CacheVersion, DeltaApplier, VersionedSnapshotCache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MAGIC = b"CISOSNP1"
+_ALIGN = 8
+_UUID_SIZE = 16
+
+
+class SnapshotFormatError(ValueError):
+    """Raised when a snapshot file is truncated or was not written by SnapshotWriter."""
+
+
+# --------------------------------------------------------------------
+# Writing
+# --------------------------------------------------------------------
+class Interner(Generic[K]):
+    """Sorted table of distinct values with their index, used to encode references."""
+
+    def __init__(self, values: Iterable[K]):
+        self.values: List[K] = sorted(set(values))
+        self.index: Dict[K, int] = {value: i for i, value in enumerate(self.values)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class SnapshotWriter:
+    def __init__(self) -> None:
+        self.meta: Dict[str, object] = {}
+        self._sections: Dict[str, Tuple[str, bytes]] = {}
+
+    def add_bytes(self, name: str, data: bytes) -> None:
+        self._sections[name] = ("", bytes(data))
+
+    def add_array(self, name: str, typecode: str, values: Iterable[int]) -> None:
+        self._sections[name] = (typecode, array(typecode, values).tobytes())
+
+    def add_uuids(self, name: str, values: Sequence[uuid.UUID]) -> None:
+        """`values` must be sorted (see Interner)."""
+        self.add_bytes(name, b"".join(value.bytes for value in values))
+
+    def add_strings(self, name: str, values: Sequence[str]) -> None:
+        """`values` must be sorted (see Interner)."""
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = [0]
+        for chunk in encoded:
+            offsets.append(offsets[-1] + len(chunk))
+        self.add_array(f"{name}.offsets", "q", offsets)
+        self.add_bytes(f"{name}.data", b"".join(encoded))
+
+    def add_rows(self, name: str, rows: Iterable[Iterable[int]]) -> None:
+        """Variable-length rows of int32 (CSR layout: offsets + flat values)."""
+        offsets = [0]
+        flat: List[int] = []
+        for row in rows:
+            flat.extend(row)
+            offsets.append(len(flat))
+        self.add_array(f"{name}.offsets", "q", offsets)
+        self.add_array(f"{name}.values", "i", flat)
+
+    def to_bytes(self) -> bytes:
+        directory: Dict[str, Tuple[str, int, int]] = {}
+        offset = 0
+        for name, (typecode, data) in self._sections.items():
+            directory[name] = (typecode, offset, len(data))
+            offset += _padded(len(data))
+        header = json.dumps(
+            {"meta": self.meta, "sections": directory}, separators=(",", ":")
+        ).encode("utf-8")
+        prefix = _MAGIC + struct.pack("<I", len(header)) + header
+        parts = [prefix, b"\0" * (_padded(len(prefix)) - len(prefix))]
+        for _, data in self._sections.values():
+            parts.append(data)
+            parts.append(b"\0" * (_padded(len(data)) - len(data)))
+        return b"".join(parts)
+
+
+def _padded(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+# --------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------
+class UUIDTable:
+    """Sorted table of interned UUIDs living in mapped memory."""
+
+    def __init__(self, data: memoryview):
+        self._data = data
+        self._size = len(data) // _UUID_SIZE
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> uuid.UUID:
+        start = index * _UUID_SIZE
+        return uuid.UUID(bytes=bytes(self._data[start : start + _UUID_SIZE]))
+
+    def _raw(self, index: int) -> bytes:
+        start = index * _UUID_SIZE
+        return bytes(self._data[start : start + _UUID_SIZE])
+
+    def index(self, value: object) -> int:
+        """Index of `value`, or -1 when it is not interned."""
+        if not isinstance(value, uuid.UUID):
+            return -1
+        target = value.bytes
+        position = bisect_left(range(self._size), target, key=self._raw)
+        if position < self._size and self._raw(position) == target:
+            return position
+        return -1
+
+
+class StringTable:
+    """Sorted table of interned strings living in mapped memory."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+        self._size = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> str:
+        return str(self._data[self._offsets[index] : self._offsets[index + 1]], "utf-8")
+
+    def index(self, value: object) -> int:
+        """Index of `value`, or -1 when it is not interned."""
+        if not isinstance(value, str):
+            return -1
+        position = bisect_left(range(self._size), value, key=self.__getitem__)
+        if position < self._size and self[position] == value:
+            return position
+        return -1
+
+
+class Rows:
+    """Read side of SnapshotWriter.add_rows."""
+
+    def __init__(self, offsets: memoryview, values: memoryview):
+        self._offsets = offsets
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> memoryview:
+        return self._values[self._offsets[index] : self._offsets[index + 1]]
+
+
+class SnapshotReader:
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            try:
+                self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # empty file
+                raise SnapshotFormatError(f"Empty snapshot file {path}") from e
+        buffer = memoryview(self._mmap)
+        if bytes(buffer[: len(_MAGIC)]) != _MAGIC:
+            raise SnapshotFormatError(f"Not a snapshot file: {path}")
+        (header_size,) = struct.unpack_from("<I", buffer, len(_MAGIC))
+        header_start = len(_MAGIC) + 4
+        try:
+            header = json.loads(
+                bytes(buffer[header_start : header_start + header_size])
+            )
+        except ValueError as e:
+            raise SnapshotFormatError(f"Corrupted snapshot header: {path}") from e
+        self.meta: Mapping[str, object] = header["meta"]
+        self._sections: Mapping[str, List] = header["sections"]
+        self._data = buffer[_padded(header_start + header_size) :]
+        if any(
+            offset + size > len(self._data)
+            for _, offset, size in self._sections.values()
+        ):
+            raise SnapshotFormatError(f"Truncated snapshot file: {path}")
+
+    def bytes(self, name: str) -> memoryview:
+        _, offset, size = self._sections[name]
+        return self._data[offset : offset + size]
+
+    def array(self, name: str) -> memoryview:
+        typecode, offset, size = self._sections[name]
+        return self._data[offset : offset + size].cast(typecode)
+
+    def uuids(self, name: str) -> UUIDTable:
+        return UUIDTable(self.bytes(name))
+
+    def strings(self, name: str) -> StringTable:
+        return StringTable(self.array(f"{name}.offsets"), self.bytes(f"{name}.data"))
+
+    def rows(self, name: str) -> Rows:
+        return Rows(self.array(f"{name}.offsets"), self.array(f"{name}.values"))
+
+
+class MappedMapping(Mapping[K, V]):
+    """
+    Read-only mapping over interned keys: `key_indexes` is the sorted sequence of
+    the table indexes of the keys, `value_at(position)` decodes the value stored
+    at a position of that sequence. Decoded values are memoized.
+    """
+
+    def __init__(
+        self,
+        table: UUIDTable | StringTable,
+        key_indexes: Sequence[int],
+        value_at: Callable[[int], V],
+    ):
+        self._table = table
+        self._key_indexes = key_indexes
+        self._value_at = value_at
+        self._values: Dict[int, V] = {}
+
+    def _position(self, key: object) -> int:
+        index = self._table.index(key)
+        if index < 0:
+            return -1
+        position = bisect_left(self._key_indexes, index)
+        if position < len(self._key_indexes) and self._key_indexes[position] == index:
+            return position
+        return -1
+
+    def __getitem__(self, key: K) -> V:
+        position = self._position(key)
+        if position < 0:
+            raise KeyError(key)
+        try:
+            return self._values[position]
+        except KeyError:
+            value = self._values[position] = self._value_at(position)
+            return value
+
+    def __contains__(self, key: object) -> bool:
+        return self._position(key) >= 0
+
+    def __iter__(self) -> Iterator[K]:
+        for index in self._key_indexes:
+            yield self._table[index]
+
+    def __len__(self) -> int:
+        return len(self._key_indexes)
+
+
+class MappedSequence(Sequence[V]):
+    """Read-only sequence decoding `value_at(index)` on access; slices give tuples."""
+
+    def __init__(self, length: int, value_at: Callable[[int], V]):
+        self._length = length
+        self._value_at = value_at
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._value_at(i) for i in range(*index.indices(self._length)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._value_at(index)
+
+    def __len__(self) -> int:
+        return self._length
+
+
+@dataclass(frozen=True, slots=True)
+class SnapshotCodec(Generic[T]):
+    encode: Callable[[T, SnapshotWriter], None]
+    decode: Callable[[SnapshotReader], T]
+
+
+# --------------------------------------------------------------------
+# Cache
+# --------------------------------------------------------------------
+class MappedSnapshotCache(VersionedSnapshotCache[T]):
+    """
+    VersionedSnapshotCache whose snapshots are published to, and served from, a
+    memory-mapped file shared by all the processes of the host.
+    """
+
+    def __init__(
+        self,
+        *,
+        key: str,
+        builder: Callable[[], T],
+        codec: SnapshotCodec[T],
+        directory: str | os.PathLike,
+        delta_applier: Optional[DeltaApplier[T]] = None,
+    ):
+        super().__init__(key=key, builder=builder, delta_applier=delta_applier)
+        self._codec = codec
+        self._directory = os.fspath(directory)
+        self._file_pattern = re.compile(rf"^{re.escape(key)}@\d+-\d+\.snap$")
+
+    def _load(self, version: int, *, force_reload: bool) -> T:
+        stamp = self._stamp(version)
+        if stamp is None:
+            # The version moved on while we were hydrating: build privately.
+            return super()._load(version, force_reload=force_reload)
+
+        path = os.path.join(self._directory, f"{self.key}@{version}-{stamp}.snap")
+        if not force_reload:
+            mapped = self._map(path)
+            if mapped is not None:
+                return mapped
+
+        with self._publish_lock():
+            # Another process may have published it while we waited.
+            mapped = None if force_reload else self._map(path)
+            if mapped is not None:
+                return mapped
+            value = super()._load(version, force_reload=force_reload)
+            if not self._publish(path, value):
+                return value
+
+        mapped = self._map(path)
+        return value if mapped is None else mapped
+
+    def _stamp(self, version: int) -> Optional[int]:
+        """
+        Identify the version row beyond its number, so that a version number
+        reused after a restore or a new database never maps a stale file.
+        """
+        updated_at = (
+            CacheVersion.objects.filter(key=self.key, version=version)
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return None
+        return int(updated_at.timestamp() * 1_000_000)
+
+    def _map(self, path: str) -> Optional[T]:
+        try:
+            reader = SnapshotReader(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, SnapshotFormatError) as e:
+            logger.warning("Ignoring unreadable snapshot file", path=path, error=str(e))
+            return None
+        return self._codec.decode(reader)
+
+    def _publish(self, path: str, value: T) -> bool:
+        writer = SnapshotWriter()
+        self._codec.encode(value, writer)
+        writer.meta["key"] = self.key
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self._directory, prefix=f".{self.key}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(writer.to_bytes())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(
+                "Could not publish snapshot file, keeping a local copy",
+                key=self.key,
+                path=path,
+                error=str(e),
+            )
+            return False
+        self._prune(os.path.basename(path))
+        return True
+
+    def _prune(self, current: str) -> None:
+        """Remove superseded files (processes still mapping them are unaffected)."""
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return
+        for name in names:
+            if name != current and self._file_pattern.match(name):
+                try:
+                    os.unlink(os.path.join(self._directory, name))
+                except OSError:
+                    pass
+
+    @contextmanager
+    def _publish_lock(self) -> Iterator[None]:
+        """Serialize builds of this key across processes so each version is built once."""
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            lock_file = open(os.path.join(self._directory, f".{self.key}.lock"), "a")
+        except OSError:
+            yield
+            return
+        with lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
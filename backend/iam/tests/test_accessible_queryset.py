@@ -0,0 +1,104 @@
+"""Tests for RoleAssignment.accessible_queryset, the SQL-side counterpart of
+get_accessible_object_ids used by list/export/autocomplete querysets."""
+
+import pytest
+from django.contrib.auth.models import AnonymousUser, Permission
+
+from core.models import Perimeter, Threat
+from iam.models import Folder, Role, RoleAssignment, User
+
+
+@pytest.fixture
+def tree(db):
+    root = Folder.get_root_folder()
+    domain = Folder.objects.create(
+        parent_folder=root, name="domain", content_type=Folder.ContentType.DOMAIN
+    )
+    sub = Folder.objects.create(
+        parent_folder=domain, name="sub", content_type=Folder.ContentType.DOMAIN
+    )
+    other = Folder.objects.create(
+        parent_folder=root, name="other", content_type=Folder.ContentType.DOMAIN
+    )
+    return root, domain, sub, other
+
+
+@pytest.fixture
+def reader_role(db):
+    role = Role.objects.create(name="test reader")
+    role.permissions.set(
+        Permission.objects.filter(
+            codename__in=["view_folder", "view_perimeter", "view_threat"]
+        )
+    )
+    return role
+
+
+def _assign(role, folder, user, *, is_recursive=False):
+    ra = RoleAssignment.objects.create(
+        user=user, role=role, folder=folder, is_recursive=is_recursive
+    )
+    ra.perimeter_folders.add(folder)
+    return ra
+
+
+def _ids(queryset):
+    return set(queryset.values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+class TestAccessibleQueryset:
+    def test_anonymous_user_sees_nothing(self, tree):
+        assert not RoleAssignment.accessible_queryset(AnonymousUser(), Perimeter)
+
+    def test_unsupported_permission_is_rejected(self, tree):
+        user = User.objects.create_user(email="bad@example.com")
+        with pytest.raises(ValueError):
+            RoleAssignment.accessible_queryset(user, Perimeter, "add")
+
+    def test_matches_accessible_object_ids(self, tree, reader_role):
+        root, domain, sub, other = tree
+        user = User.objects.create_user(email="reader@example.com")
+        _assign(reader_role, domain, user, is_recursive=True)
+        for folder in (domain, sub, other):
+            Perimeter.objects.create(name=f"perimeter {folder.name}", folder=folder)
+        Threat.objects.create(name="published root threat", folder=root)
+        Threat.objects.create(name="domain threat", folder=domain)
+        Threat.objects.create(name="other threat", folder=other)
+
+        for model in (Perimeter, Threat, Folder):
+            for index, perm in enumerate(("view", "change", "delete")):
+                expected = set(
+                    RoleAssignment.get_accessible_object_ids(root, user, model)[index]
+                )
+                assert (
+                    _ids(RoleAssignment.accessible_queryset(user, model, perm))
+                    == expected
+                ), (model, perm)
+
+    def test_published_ancestors_are_inherited_in_view_only(self, tree, reader_role):
+        root, domain, sub, other = tree
+        user = User.objects.create_user(email="inherit@example.com")
+        _assign(reader_role, sub, user)
+        published = Threat.objects.create(name="published", folder=domain)
+        Threat.objects.filter(id=published.id).update(is_published=True)
+        unpublished = Threat.objects.create(name="unpublished", folder=domain)
+        Threat.objects.filter(id=unpublished.id).update(is_published=False)
+
+        visible = _ids(RoleAssignment.accessible_queryset(user, Threat))
+        assert published.id in visible
+        assert unpublished.id not in visible
+        assert not RoleAssignment.accessible_queryset(user, Threat, "change")
+
+    def test_folder_restricts_perimeter(self, tree, reader_role):
+        root, domain, sub, other = tree
+        user = User.objects.create_user(email="focus@example.com")
+        _assign(reader_role, root, user, is_recursive=True)
+        in_domain = Perimeter.objects.create(name="in domain", folder=domain)
+        in_other = Perimeter.objects.create(name="in other", folder=other)
+
+        visible = _ids(
+            RoleAssignment.accessible_queryset(user, Perimeter, folder=domain)
+        )
+        assert in_domain.id in visible
+        assert in_other.id not in visible
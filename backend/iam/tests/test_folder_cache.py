@@ -0,0 +1,99 @@
+"""Tests for the Euler-tour index and ancestor tuples of the folder snapshot."""
+
+import random
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from iam.cache_builders import (
+    folder_cache_state_from_folders,
+    descendant_ids_within,
+    is_descendant_id,
+    iter_descendant_ids,
+    path_ids_from_root,
+)
+
+
+def _synthetic_state(size, seed=0):
+    rng = random.Random(seed)
+    folders = [
+        SimpleNamespace(
+            id=uuid.UUID(int=rng.getrandbits(128)),
+            name="root",
+            parent_folder_id=None,
+            content_type="GL",
+        )
+    ]
+    for index in range(1, size):
+        folders.append(
+            SimpleNamespace(
+                id=uuid.UUID(int=rng.getrandbits(128)),
+                name=f"Folder {rng.randrange(size)}",
+                parent_folder_id=rng.choice(folders).id,
+                content_type="DO",
+            )
+        )
+    return folder_cache_state_from_folders(folders, "GL")
+
+
+def _walk(state, start_id):
+    """Reference depth-first traversal over children_map."""
+    stack = [start_id]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(reversed(state.children_map.get(current, ())))
+
+
+@pytest.fixture(scope="module")
+def state():
+    return _synthetic_state(500)
+
+
+class TestFolderTreeIndex:
+    def test_descendants_match_tree_walk(self, state):
+        for folder_id in state.folders:
+            expected = list(_walk(state, folder_id))
+            assert list(iter_descendant_ids(state, folder_id, include_start=True)) == (
+                expected
+            )
+            assert (
+                list(iter_descendant_ids(state, folder_id, include_start=False))
+                == expected[1:]
+            )
+
+    def test_ancestors_match_parent_walk(self, state):
+        for folder_id in state.folders:
+            ancestors = []
+            parent_id = state.parent_map[folder_id]
+            while parent_id is not None:
+                ancestors.append(parent_id)
+                parent_id = state.parent_map[parent_id]
+            assert state.ancestors_map[folder_id] == tuple(reversed(ancestors))
+            assert state.depth_map[folder_id] == len(ancestors)
+            assert path_ids_from_root(state, folder_id)[-1] == folder_id
+
+    def test_range_checks(self, state):
+        rng = random.Random(1)
+        ids = list(state.folders)
+        for _ in range(200):
+            folder_id, scope_id = rng.choice(ids), rng.choice(ids)
+            subtree = set(_walk(state, scope_id))
+            assert is_descendant_id(state, folder_id, scope_id) == (
+                folder_id in subtree
+            )
+            assert set(descendant_ids_within(state, folder_id, scope_id)) == (
+                set(_walk(state, folder_id)) & subtree
+            )
+        assert not is_descendant_id(state, ids[0], ids[0], include_self=False)
+
+    def test_unknown_folder(self, state):
+        unknown = uuid.uuid4()
+        root_id = state.root_folder_id
+        assert list(iter_descendant_ids(state, unknown, include_start=True)) == [
+            unknown
+        ]
+        assert not is_descendant_id(state, unknown, root_id)
+        assert descendant_ids_within(state, unknown, root_id) == ()
+        assert descendant_ids_within(state, unknown, unknown) == (unknown,)
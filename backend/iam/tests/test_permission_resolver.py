@@ -0,0 +1,105 @@
+"""Tests for the request-scoped PermissionResolver memoizing folder -> role
+resolution across repeated get_accessible_object_ids calls."""
+
+import pytest
+from django.contrib.auth.models import Permission
+
+from core.models import AppliedControl, Perimeter, Threat
+from iam.models import Folder, Role, RoleAssignment, User
+from iam.permission_resolver import (
+    get_permission_resolver,
+    permission_resolution_scope,
+)
+
+
+@pytest.fixture
+def domain_folder(db):
+    return Folder.objects.create(
+        parent_folder=Folder.get_root_folder(),
+        name="resolver domain",
+        content_type=Folder.ContentType.DOMAIN,
+    )
+
+
+@pytest.fixture
+def reader_role(db):
+    role = Role.objects.create(name="resolver reader")
+    role.permissions.set(
+        Permission.objects.filter(
+            codename__in=[
+                "view_folder",
+                "view_perimeter",
+                "view_threat",
+                "view_appliedcontrol",
+            ]
+        )
+    )
+    return role
+
+
+def _assign(role, folder, user):
+    ra = RoleAssignment.objects.create(user=user, role=role, folder=folder)
+    ra.perimeter_folders.add(folder)
+    return ra
+
+
+@pytest.mark.django_db
+class TestPermissionResolver:
+    def test_no_resolver_outside_scope(self):
+        assert get_permission_resolver() is None
+        with permission_resolution_scope() as resolver:
+            assert get_permission_resolver() is resolver
+        assert get_permission_resolver() is None
+
+    def test_repeated_lookups_are_memoized(self, domain_folder, reader_role):
+        user = User.objects.create_user(email="memo@example.com")
+        _assign(reader_role, domain_folder, user)
+        perimeter = Perimeter.objects.create(name="p", folder=domain_folder)
+        root = Folder.get_root_folder()
+        models = (Perimeter, Threat, AppliedControl, Folder)
+
+        def resolve(model):
+            return tuple(
+                set(ids)
+                for ids in RoleAssignment.get_accessible_object_ids(root, user, model)
+            )
+
+        expected = {model: resolve(model) for model in models}
+
+        with permission_resolution_scope() as resolver:
+            for model in models:
+                assert resolve(model) == expected[model]
+            assert (
+                perimeter.id
+                in RoleAssignment.get_accessible_object_ids(root, user, Perimeter)[0]
+            )
+
+        assert resolver.stats.resolved == 1
+        assert resolver.stats.reused == len(models)
+
+    def test_snapshot_change_discards_memo(self, domain_folder, reader_role):
+        user = User.objects.create_user(email="bump@example.com")
+        other = Folder.objects.create(
+            parent_folder=Folder.get_root_folder(),
+            name="resolver other",
+            content_type=Folder.ContentType.DOMAIN,
+        )
+        _assign(reader_role, domain_folder, user)
+        perimeter = Perimeter.objects.create(name="other p", folder=other)
+        root = Folder.get_root_folder()
+
+        with permission_resolution_scope() as resolver:
+            visible, _, _ = RoleAssignment.get_accessible_object_ids(
+                root, user, Perimeter
+            )
+            assert perimeter.id not in visible
+
+            _assign(reader_role, other, user)
+
+            visible, _, _ = RoleAssignment.get_accessible_object_ids(
+                root, user, Perimeter
+            )
+            assert perimeter.id in visible
+
+        assert resolver.stats.discarded >= 1
+        assert resolver.stats.resolved == 2
@@ -0,0 +1,180 @@
+"""Tests for the CacheChange journal and delta catch-up of IAM snapshot caches."""
+
+from dataclasses import replace
+
+import pytest
+from django.contrib.auth.models import Permission
+
+from iam.cache_builders import (
+    IAM_ASSIGNMENTS_KEY,
+    IAM_GROUPS_KEY,
+    get_assignments_state,
+    get_groups_state,
+)
+from iam.models import Folder, Role, RoleAssignment, User, UserGroup
+from iam.snapshot_cache import (
+    CacheChange,
+    CacheRegistry,
+    ChangeEntry,
+    VersionStore,
+)
+
+
+def _as_other_worker(key, monkeypatch):
+    """Simulate a worker still holding the pre-change snapshot: keep the current
+    snapshot, forbid full rebuilds and force the next version fetch."""
+    cache = CacheRegistry.get_cache(key)
+    snapshot = cache._snapshot
+    assert snapshot is not None
+
+    def restore():
+        cache._snapshot = snapshot
+        CacheRegistry._last_fetched_at = None
+
+        def _no_rebuild():
+            raise AssertionError("full rebuild instead of delta")
+
+        monkeypatch.setattr(cache, "_builder", _no_rebuild)
+
+    return restore
+
+
+@pytest.mark.django_db
+class TestChangeJournal:
+    def test_bump_journals_changes(self):
+        v1 = VersionStore.bump("test.journal", [ChangeEntry.upsert("a")])
+        v2 = VersionStore.bump(
+            "test.journal", [ChangeEntry.upsert("b"), ChangeEntry.upsert("c")]
+        )
+
+        assert VersionStore.get_changes("test.journal", v1 - 1, v2) == (
+            ChangeEntry.upsert("a"),
+            ChangeEntry.upsert("b"),
+            ChangeEntry.upsert("c"),
+        )
+
+    def test_bump_without_changes_forces_rebuild(self):
+        v1 = VersionStore.bump("test.journal", [ChangeEntry.upsert("a")])
+        v2 = VersionStore.bump("test.journal")
+
+        assert VersionStore.get_changes("test.journal", v1 - 1, v1) is not None
+        assert VersionStore.get_changes("test.journal", v1 - 1, v2) is None
+
+    def test_truncated_journal_forces_rebuild(self):
+        v1 = VersionStore.bump("test.journal", [ChangeEntry.upsert("a")])
+        v2 = VersionStore.bump("test.journal", [ChangeEntry.upsert("b")])
+        CacheChange.objects.filter(key="test.journal", version=v1).delete()
+
+        assert VersionStore.get_changes("test.journal", v1 - 1, v2) is None
+        assert VersionStore.get_changes("test.journal", v1, v2) == (
+            ChangeEntry.upsert("b"),
+        )
+
+
+@pytest.mark.django_db
+class TestDeltaCatchUp:
+    def test_group_membership_change_is_applied_as_delta(self, monkeypatch):
+        folder = Folder.get_root_folder()
+        group = UserGroup.objects.create(name="journal group", folder=folder)
+        user = User.objects.create_user(email="journal@example.com")
+        other = User.objects.create_user(email="bystander@example.com")
+        other.user_groups.add(group)
+
+        get_groups_state(force_reload=True)
+        restore = _as_other_worker(IAM_GROUPS_KEY, monkeypatch)
+
+        user.user_groups.add(group)
+        restore()
+
+        state = get_groups_state()
+        assert group.id in state.user_group_ids[user.id]
+        assert group.id in state.user_group_ids[other.id]
+
+    def test_role_assignment_change_is_applied_as_delta(self, monkeypatch):
+        folder = Folder.get_root_folder()
+        role = Role.objects.create(name="journal role")
+        role.permissions.set(Permission.objects.filter(codename="view_folder"))
+        user = User.objects.create_user(email="journal-ra@example.com")
+        ra = RoleAssignment.objects.create(user=user, role=role, folder=folder)
+
+        get_assignments_state(force_reload=True)
+        restore = _as_other_worker(IAM_ASSIGNMENTS_KEY, monkeypatch)
+
+        ra.perimeter_folders.add(folder)
+        restore()
+
+        (lite,) = get_assignments_state().by_user[user.id]
+        assert lite.assignment_id == ra.id
+        assert lite.perimeter_folder_ids == frozenset({folder.id})
+
+        monkeypatch.undo()
+        get_assignments_state(force_reload=True)
+        restore = _as_other_worker(IAM_ASSIGNMENTS_KEY, monkeypatch)
+
+        ra.delete()
+        restore()
+
+        assert user.id not in get_assignments_state().by_user
+
+    def test_own_invalidation_is_applied_as_delta(self, monkeypatch):
+        folder = Folder.get_root_folder()
+        group = UserGroup.objects.create(name="own journal group", folder=folder)
+        user = User.objects.create_user(email="own-journal@example.com")
+
+        get_groups_state(force_reload=True)
+        snapshot = CacheRegistry.get_cache(IAM_GROUPS_KEY)._snapshot
+
+        def _no_rebuild():
+            raise AssertionError("full rebuild instead of delta")
+
+        monkeypatch.setattr(
+            CacheRegistry.get_cache(IAM_GROUPS_KEY), "_builder", _no_rebuild
+        )
+        user.user_groups.add(group)
+
+        # The local snapshot is kept and caught up with the journaled change
+        assert CacheRegistry.get_cache(IAM_GROUPS_KEY)._snapshot is snapshot
+        assert group.id in get_groups_state().user_group_ids[user.id]
+
+    def test_snapshot_of_rolled_back_version_is_dropped(self):
+        folder = Folder.get_root_folder()
+        group = UserGroup.objects.create(name="rolled back group", folder=folder)
+        user = User.objects.create_user(email="rolled-back@example.com")
+
+        get_groups_state(force_reload=True)
+        cache = CacheRegistry.get_cache(IAM_GROUPS_KEY)
+        # Stamped with a version a rolled back transaction bumped to
+        cache._snapshot = replace(cache._snapshot, version=cache._snapshot.version + 1)
+        user.user_groups.add(group)
+
+        assert cache._snapshot is None
+        assert group.id in get_groups_state().user_group_ids[user.id]
+
+
+@pytest.mark.django_db
+class TestOwnInvalidation:
+    KEY = "test.own_invalidation"
+
+    @pytest.fixture
+    def builds(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        CacheRegistry.register(self.KEY, build, lazy=True)
+        yield builds
+        CacheRegistry._caches.pop(self.KEY, None)
+        CacheRegistry._lazy_keys.discard(self.KEY)
+
+    def test_rebuild_after_own_invalidation_is_kept(self, builds):
+        CacheRegistry.hydrate(self.KEY, force_reload=True)
+        CacheRegistry.invalidate(self.KEY)
+
+        # Rebuilt within the fetch interval of the bump
+        assert CacheRegistry.hydrate(self.KEY) == 2
+        # and stamped with the new one: the next fetch does not rebuild it
+        CacheRegistry._last_fetched_at = None
+        assert CacheRegistry.hydrate(self.KEY) == 2
+        assert len(builds) == 2
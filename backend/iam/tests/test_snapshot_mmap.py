@@ -0,0 +1,209 @@
+"""Tests for the memory-mapped IAM snapshot backend (IAM_SNAPSHOT_BACKEND="mmap")."""
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from iam.cache_builders import (
+    build_assignments_cache_state,
+    build_folder_cache_state,
+    build_groups_cache_state,
+    build_roles_cache_state,
+    decode_assignments_state,
+    decode_folder_state,
+    decode_groups_state,
+    decode_roles_state,
+    encode_assignments_state,
+    encode_folder_state,
+    encode_groups_state,
+    encode_roles_state,
+)
+from iam.models import Folder, Role, RoleAssignment, User, UserGroup
+from iam.snapshot_cache import CacheRegistry, VersionStore, VersionedSnapshotCache
+from iam.snapshot_mmap import (
+    MappedSnapshotCache,
+    SnapshotCodec,
+    SnapshotFormatError,
+    SnapshotReader,
+    SnapshotWriter,
+)
+
+
+@pytest.fixture
+def iam_data(db):
+    root = Folder.get_root_folder()
+    domain = Folder.objects.create(
+        parent_folder=root, name="Zeta domain", content_type=Folder.ContentType.DOMAIN
+    )
+    Folder.objects.create(
+        parent_folder=domain, name="éclair", content_type=Folder.ContentType.DOMAIN
+    )
+    Folder.objects.create(
+        parent_folder=root, name="alpha", content_type=Folder.ContentType.DOMAIN
+    )
+    role = Role.objects.create(name="mmap reader")
+    role.permissions.set(
+        Permission.objects.filter(codename__in=["view_folder", "view_perimeter"])
+    )
+    group = UserGroup.objects.create(name="mmap group", folder=domain)
+    user = User.objects.create_user(email="mmap@example.com")
+    user.user_groups.add(group)
+    ra = RoleAssignment.objects.create(user=user, role=role, folder=domain)
+    ra.perimeter_folders.add(domain, root)
+    RoleAssignment.objects.create(
+        user_group=group, role=role, folder=domain, is_recursive=True
+    ).perimeter_folders.add(domain)
+    return domain
+
+
+def _roundtrip(state, encode, decode, tmp_path):
+    writer = SnapshotWriter()
+    encode(state, writer)
+    path = tmp_path / "state.snap"
+    path.write_bytes(writer.to_bytes())
+    return decode(SnapshotReader(str(path)))
+
+
+def _test_codec():
+    def encode(value, writer):
+        writer.add_array("values", "q", value)
+
+    def decode(reader):
+        return tuple(reader.array("values"))
+
+    return SnapshotCodec(encode, decode)
+
+
+@pytest.mark.django_db
+class TestSnapshotCodecs:
+    def test_folder_state(self, iam_data, tmp_path):
+        state = build_folder_cache_state()
+        decoded = _roundtrip(state, encode_folder_state, decode_folder_state, tmp_path)
+
+        assert dict(decoded.parent_map) == dict(state.parent_map)
+        assert dict(decoded.children_map) == dict(state.children_map)
+        assert dict(decoded.depth_map) == dict(state.depth_map)
+        assert decoded.root_ids == state.root_ids
+        assert decoded.root_folder_id == state.root_folder_id
+        assert tuple(decoded.preorder) == tuple(state.preorder)
+        assert decoded.preorder[1:3] == tuple(state.preorder[1:3])
+        assert dict(decoded.entry_map) == dict(state.entry_map)
+        assert dict(decoded.exit_map) == dict(state.exit_map)
+        assert dict(decoded.ancestors_map) == dict(state.ancestors_map)
+        assert decoded.children_map.get(iam_data.id) == state.children_map.get(
+            iam_data.id
+        )
+        assert Folder.objects.count() == len(decoded.folders)
+        for folder_id, folder in state.folders.items():
+            mapped = decoded.folders[folder_id]
+            assert isinstance(mapped, Folder)
+            assert (
+                mapped.id,
+                mapped.name,
+                mapped.parent_folder_id,
+                mapped.content_type,
+                mapped.builtin,
+            ) == (
+                folder.id,
+                folder.name,
+                folder.parent_folder_id,
+                folder.content_type,
+                folder.builtin,
+            )
+
+    def test_roles_state(self, iam_data, tmp_path):
+        state = build_roles_cache_state()
+        decoded = _roundtrip(state, encode_roles_state, decode_roles_state, tmp_path)
+
+        assert dict(decoded.role_permissions) == dict(state.role_permissions)
+        assert dict(decoded.permission_ids_by_codename) == dict(
+            state.permission_ids_by_codename
+        )
+        assert dict(decoded.role_id_by_name) == dict(state.role_id_by_name)
+        assert decoded.permission_ids_by_codename.get("missing") is None
+
+    def test_groups_and_assignments_state(self, iam_data, tmp_path):
+        groups = build_groups_cache_state()
+        decoded = _roundtrip(groups, encode_groups_state, decode_groups_state, tmp_path)
+        assert dict(decoded.user_group_ids) == dict(groups.user_group_ids)
+
+        assignments = build_assignments_cache_state()
+        decoded = _roundtrip(
+            assignments, encode_assignments_state, decode_assignments_state, tmp_path
+        )
+        assert dict(decoded.by_user) == dict(assignments.by_user)
+        assert dict(decoded.by_group) == dict(assignments.by_group)
+
+    def test_rejects_foreign_file(self, tmp_path):
+        path = tmp_path / "garbage.snap"
+        path.write_bytes(b"not a snapshot")
+        with pytest.raises(SnapshotFormatError):
+            SnapshotReader(str(path))
+
+
+@pytest.mark.django_db
+class TestMappedSnapshotCache:
+    def _cache(self, tmp_path, builder):
+        return MappedSnapshotCache(
+            key="test.mmap", builder=builder, codec=_test_codec(), directory=tmp_path
+        )
+
+    def test_snapshot_is_built_once_per_version(self, tmp_path):
+        builds = []
+
+        def builder():
+            builds.append(1)
+            return (1, 2, 3)
+
+        def no_build():
+            raise AssertionError("second worker rebuilt the snapshot")
+
+        versions = VersionStore.ensure_and_get_versions(["test.mmap"]).versions
+        assert self._cache(tmp_path, builder).get(versions) == (1, 2, 3)
+        assert self._cache(tmp_path, no_build).get(versions) == (1, 2, 3)
+        assert len(builds) == 1
+
+        # A new version is published under a new file and the old one is pruned.
+        VersionStore.bump("test.mmap")
+        versions = VersionStore.ensure_and_get_versions(["test.mmap"]).versions
+        assert self._cache(tmp_path, builder).get(versions) == (1, 2, 3)
+        assert len(builds) == 2
+        (published,) = [p.name for p in tmp_path.iterdir() if p.suffix == ".snap"]
+        assert published.startswith(f"test.mmap@{versions['test.mmap']}-")
+
+    def test_unpublishable_snapshot_stays_local(self, tmp_path):
+        directory = tmp_path / "file"
+        directory.write_text("not a directory")
+        cache = self._cache(directory, lambda: (4, 5))
+
+        versions = VersionStore.ensure_and_get_versions(["test.mmap"]).versions
+        assert cache.get(versions) == (4, 5)
+
+
+class TestBackendSelection:
+    def teardown_method(self):
+        CacheRegistry._caches.pop("test.backend", None)
+
+    @override_settings(IAM_SNAPSHOT_BACKEND="mmap")
+    def test_mmap_backend_requires_codec(self, tmp_path):
+        with override_settings(IAM_SNAPSHOT_DIR=tmp_path):
+            CacheRegistry.register("test.backend", tuple, codec=_test_codec())
+            assert isinstance(
+                CacheRegistry.get_cache("test.backend"), MappedSnapshotCache
+            )
+            CacheRegistry.register("test.backend", tuple, allow_replace=True)
+            assert not isinstance(
+                CacheRegistry.get_cache("test.backend"), MappedSnapshotCache
+            )
+
+    @override_settings(IAM_SNAPSHOT_BACKEND="local")
+    def test_local_backend_keeps_process_copies(self):
+        CacheRegistry.register("test.backend", tuple, codec=_test_codec())
+        cache = CacheRegistry.get_cache("test.backend")
+        assert type(cache) is VersionedSnapshotCache
+
+    @override_settings(IAM_SNAPSHOT_BACKEND="redis")
+    def test_unknown_backend(self):
+        with pytest.raises(ImproperlyConfigured):
+            CacheRegistry.register("test.backend", tuple)
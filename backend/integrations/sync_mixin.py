@@ -43,39 +43,60 @@ class IntegrationSyncableMixin:
         )
         return self._get_changed_fields(old) if old else []
 
-    def _trigger_sync(self, is_new: bool, changed_fields: list[str]) -> None:
-        """Queue an outbound sync for every active ITSM integration that has a
-        mapping configured for this model. No-op when nothing relevant changed
-        or no configured integration applies."""
-        if not (is_new or changed_fields):
-            return
-
-        from django.contrib.contenttypes.models import ContentType
-        from django.db import transaction
-
+    @classmethod
+    def _sync_configuration_ids(cls) -> list:
+        """Ids of the active ITSM integrations with a mapping configured for
+        this model."""
         from iam.models import Folder
         from integrations.models import IntegrationConfiguration
         from integrations.settings_access import is_model_configured
-        from integrations.tasks import sync_object_to_integrations
 
         configurations = IntegrationConfiguration.objects.filter(
             folder=Folder.get_root_folder(),
             provider__provider_type="itsm",
             is_active=True,
         )
-        config_ids = [
+        return [
             c.id
             for c in configurations
-            if is_model_configured(c.settings, self.INTEGRATION_MODEL_KEY)
+            if is_model_configured(c.settings, cls.INTEGRATION_MODEL_KEY)
         ]
+
+    def _trigger_sync(self, is_new: bool, changed_fields: list[str]) -> None:
+        """Queue an outbound sync for every active ITSM integration that has a
+        mapping configured for this model. No-op when nothing relevant changed
+        or no configured integration applies."""
+        self._trigger_sync_many([(self.pk, is_new, changed_fields)])
+
+    @classmethod
+    def _trigger_sync_many(cls, changes: list[tuple]) -> None:
+        """``_trigger_sync`` for objects saved in bulk: ``changes`` holds one
+        (pk, is_new, changed_fields) per object, and the integrations are
+        looked up once for all of them."""
+        changes = [
+            (pk, is_new, changed_fields)
+            for pk, is_new, changed_fields in changes
+            if is_new or changed_fields
+        ]
+        if not changes:
+            return
+
+        from django.contrib.contenttypes.models import ContentType
+        from django.db import transaction
+
+        from integrations.tasks import sync_object_to_integrations
+
+        config_ids = cls._sync_configuration_ids()
         if not config_ids:
             return
 
-        content_type = ContentType.objects.get_for_model(self)
-        pk = self.pk
-        transaction.on_commit(
-            lambda: sync_object_to_integrations.schedule(
-                args=(content_type, pk, config_ids, changed_fields),
-                delay=1,
+        content_type = ContentType.objects.get_for_model(cls)
+        for pk, _, changed_fields in changes:
+            transaction.on_commit(
+                lambda pk=pk, changed_fields=changed_fields: (
+                    sync_object_to_integrations.schedule(
+                        args=(content_type, pk, config_ids, changed_fields),
+                        delay=1,
+                    )
+                )
             )
-        )
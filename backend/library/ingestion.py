@@ -0,0 +1,150 @@
+"""
+Cold-path parsing of library files for the storelibraries command.
+
+Parsing the bundled YAML libraries is what makes a fresh install (or the first
+boot after a release touching them) slow, so files whose checksum is not
+stored yet are parsed in a process pool with the libyaml based loader when
+available. The parsed libraries can also be written to a JSON bundle, e.g. at
+image build time, which is much faster to read back than the YAML files.
+
+This module must not import Django models: worker processes only import it to
+parse YAML.
+"""
+
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import structlog
+import yaml
+
+logger = structlog.get_logger(__name__)
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+LIBRARY_BUNDLE_VERSION = 1
+
+
+@dataclass
+class ParsedLibrary:
+    filename: str
+    hash_checksum: str
+    data: Optional[dict] = None
+    error: Optional[str] = None
+
+
+def parse_library_content(library_content: bytes) -> dict:
+    library_data = yaml.load(library_content, Loader=YAML_LOADER)
+    if not isinstance(library_data, dict):
+        raise yaml.YAMLError(
+            f"The YAML content must be a dictionary but it's been interpreted as a {type(library_data).__name__} !"
+        )
+    return library_data
+
+
+def parse_library_file(fname: str) -> ParsedLibrary:
+    with open(fname, "rb") as f:
+        library_content = f.read()
+    parsed_library = ParsedLibrary(
+        filename=str(fname),
+        hash_checksum=hashlib.sha256(library_content).hexdigest(),
+    )
+    try:
+        parsed_library.data = parse_library_content(library_content)
+    except yaml.YAMLError as e:
+        parsed_library.error = str(e)
+    return parsed_library
+
+
+def changed_library_files(
+    library_files: Iterable[Path], known_checksums: Iterable[str] = ()
+) -> List[Path]:
+    """Library files whose sha256 is not among known_checksums."""
+    known_checksums = set(known_checksums)
+    return [
+        fname
+        for fname in library_files
+        if hashlib.sha256(Path(fname).read_bytes()).hexdigest() not in known_checksums
+    ]
+
+
+def parse_library_files(
+    library_files: Iterable[Path], workers: Optional[int] = None
+) -> List[ParsedLibrary]:
+    """
+    Parse library files, in parallel when there are several of them.
+    Results are in the same order as library_files.
+    """
+    library_files = [str(fname) for fname in library_files]
+    workers = min(workers or os.cpu_count() or 1, len(library_files))
+    if workers > 1:
+        try:
+            # forkserver: workers do not inherit the database connections
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            ) as executor:
+                return list(executor.map(parse_library_file, library_files))
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(
+                "Parallel library parsing unavailable, parsing serially", error=e
+            )
+    return [parse_library_file(fname) for fname in library_files]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_library_bundle(
+    library_files: Iterable[Path], bundle_path: Path, workers: Optional[int] = None
+) -> int:
+    """Parse library files and write them to a bundle. Returns the library count."""
+    parsed_libraries = [
+        parsed_library
+        for parsed_library in parse_library_files(library_files, workers)
+        if parsed_library.error is None
+    ]
+    with open(bundle_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": LIBRARY_BUNDLE_VERSION,
+                "libraries": [
+                    {
+                        "filename": Path(parsed_library.filename).name,
+                        "hash_checksum": parsed_library.hash_checksum,
+                        "data": parsed_library.data,
+                    }
+                    for parsed_library in parsed_libraries
+                ],
+            },
+            f,
+            default=_json_default,
+            separators=(",", ":"),
+        )
+    return len(parsed_libraries)
+
+
+def read_library_bundle(
+    bundle_path: Path, known_checksums: Iterable[str] = ()
+) -> List[ParsedLibrary]:
+    """Libraries of a bundle whose checksum is not among known_checksums."""
+    with open(bundle_path, encoding="utf-8") as f:
+        bundle = json.load(f)
+    if bundle.get("version") != LIBRARY_BUNDLE_VERSION:
+        raise ValueError(f"Unsupported library bundle version: {bundle.get('version')}")
+    known_checksums = set(known_checksums)
+    return [
+        ParsedLibrary(**library)
+        for library in bundle["libraries"]
+        if library["hash_checksum"] not in known_checksums
+    ]
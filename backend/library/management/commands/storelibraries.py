@@ -7,6 +7,13 @@ from django.db.models import Exists, OuterRef
 
 from django.conf import settings
 from core.models import StoredLibrary, LoadedLibrary
+from library.ingestion import (
+    changed_library_files,
+    parse_library_files,
+    read_library_bundle,
+    write_library_bundle,
+)
+from library.utils import upsert_preset_from_stored_library
 
 logger = structlog.getLogger(__name__)
 
@@ -18,9 +25,23 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser) -> None:
         parser.add_argument("--path", type=str, help="Path to library files")
+        parser.add_argument(
+            "--bundle",
+            type=str,
+            help="Pre-parsed library bundle to store instead of the library files",
+        )
+        parser.add_argument(
+            "--write-bundle",
+            type=str,
+            help="Parse the library files into a bundle and exit",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of processes parsing library files (default: CPU count)",
+        )
 
     def handle(self, *args, **options):
-        StoredLibrary.__init_class__()
         path = Path(options.get("path") or settings.LIBRARIES_PATH)
         if path.is_dir():
             library_files = sorted(
@@ -28,36 +49,87 @@ class Command(BaseCommand):
             )
         else:
             library_files = [path]
-        for fname in library_files:
-            try:
-                library, error = StoredLibrary.store_library_file(fname, True)
-                if library:
-                    if library.is_preset:
-                        from library.utils import upsert_preset_from_stored_library
 
-                        try:
-                            upsert_preset_from_stored_library(library)
-                        except Exception:
-                            logger.exception(
-                                "Failed to upsert preset from stored library",
-                                filename=fname,
-                                urn=library.urn,
-                            )
-                    logger.info(
-                        "Successfully stored library",
-                        filename=fname,
-                        library=library,
+        if options.get("write_bundle"):
+            count = write_library_bundle(
+                library_files, Path(options["write_bundle"]), options.get("workers")
+            )
+            logger.info(
+                "Library bundle written",
+                filename=options["write_bundle"],
+                libraries=count,
+            )
+            return
+
+        StoredLibrary.__init_class__()
+        bundle = options.get("bundle") or settings.LIBRARIES_BUNDLE_PATH
+        if bundle and Path(bundle).is_file() and not options.get("path"):
+            parsed_libraries = read_library_bundle(
+                Path(bundle), StoredLibrary.HASH_CHECKSUM_SET
+            )
+        else:
+            parsed_libraries = parse_library_files(
+                changed_library_files(library_files, StoredLibrary.HASH_CHECKSUM_SET),
+                options.get("workers"),
+            )
+
+        for parsed_library in parsed_libraries:
+            if parsed_library.error:
+                logger.error(
+                    "Invalid library file",
+                    filename=parsed_library.filename,
+                    reason=parsed_library.error,
+                )
+        parsed_libraries = [
+            parsed_library
+            for parsed_library in parsed_libraries
+            if parsed_library.error is None
+        ]
+        libraries = [
+            (parsed_library.hash_checksum, parsed_library.data)
+            for parsed_library in parsed_libraries
+        ]
+        try:
+            results = StoredLibrary.store_parsed_libraries(libraries, builtin=True)
+        except Exception:
+            # Do not let one library prevent the others from being stored
+            logger.exception("Bulk library storage failed, storing one by one")
+            results = []
+            for library, parsed_library in zip(libraries, parsed_libraries):
+                try:
+                    results += StoredLibrary.store_parsed_libraries(
+                        [library], builtin=True
                     )
-                elif error:
-                    if error == "libraryAlreadyLoadedError":
-                        continue
-                    logger.warning(
-                        "Library skipped",
-                        filename=fname,
-                        reason=error,
+                except Exception:
+                    logger.error(
+                        "Invalid library file", filename=parsed_library.filename
                     )
-            except Exception:
-                logger.error("Invalid library file", filename=fname)
+                    results.append((None, None))
+        for parsed_library, (library, error) in zip(parsed_libraries, results):
+            fname = parsed_library.filename
+            if library:
+                if library.is_preset:
+                    try:
+                        upsert_preset_from_stored_library(library)
+                    except Exception:
+                        logger.exception(
+                            "Failed to upsert preset from stored library",
+                            filename=fname,
+                            urn=library.urn,
+                        )
+                logger.info(
+                    "Successfully stored library",
+                    filename=fname,
+                    library=library,
+                )
+            elif error:
+                if error == "libraryAlreadyLoadedError":
+                    continue
+                logger.warning(
+                    "Library skipped",
+                    filename=fname,
+                    reason=error,
+                )
 
         invisible_libraries = (
             LoadedLibrary.objects.filter(
@@ -0,0 +1,158 @@
+"""Tests for the bulk requirement node import of FrameworkImporter."""
+
+import pytest
+from core.models import (
+    Framework,
+    LoadedLibrary,
+    Question,
+    QuestionChoice,
+    ReferenceControl,
+    RequirementNode,
+    Threat,
+)
+from iam.models import Folder
+from library.utils import FrameworkImporter
+
+N_NODES = 60
+
+
+@pytest.fixture
+def library(db):
+    folder = Folder.get_root_folder()
+    for index in range(3):
+        Threat.objects.create(
+            urn=f"urn:test:bulk:threat:{index}", name=f"Threat {index}", folder=folder
+        )
+        ReferenceControl.objects.create(
+            urn=f"urn:test:bulk:rc:{index}", name=f"Control {index}", folder=folder
+        )
+    return LoadedLibrary.objects.create(
+        name="Bulk Import Library",
+        urn="urn:test:bulk:lib",
+        ref_id="BULK-LIB",
+        version=1,
+        locale="en",
+        default_locale=True,
+        folder=folder,
+        is_published=True,
+    )
+
+
+def _node(index, **extra):
+    return {
+        "urn": f"URN:TEST:BULK:REQ:{index}",
+        "ref_id": f"REQ-{index}",
+        "name": f"Requirement {index}",
+        "assessable": index % 2 == 0,
+        "parent_urn": "URN:TEST:BULK:REQ:0" if index else None,
+        "threats": [f"urn:test:bulk:threat:{index % 3}"],
+        "reference_controls": [
+            f"urn:test:bulk:rc:{index % 3}",
+            f"urn:test:bulk:rc:{(index + 1) % 3}",
+        ],
+        "questions": {
+            f"urn:test:bulk:q:{index}": {
+                "type": "single_choice",
+                "text": f"Question {index}",
+                "choices": [
+                    {"urn": f"urn:test:bulk:q:{index}:yes", "value": "Yes"},
+                    {"urn": f"urn:test:bulk:q:{index}:no", "value": "No"},
+                ],
+            }
+        },
+        **extra,
+    }
+
+
+def _import(library, nodes):
+    importer = FrameworkImporter(
+        {
+            "urn": "urn:test:bulk:fw",
+            "ref_id": "BULK",
+            "name": "Bulk framework",
+            "requirement_nodes": nodes,
+        }
+    )
+    assert importer.init() is None
+    importer.import_framework(library)
+    return Framework.objects.get(urn="urn:test:bulk:fw")
+
+
+@pytest.mark.django_db
+class TestFrameworkBulkImport:
+    def test_fresh_import(self, library):
+        framework = _import(library, [_node(index) for index in range(N_NODES)])
+
+        nodes = RequirementNode.objects.filter(framework=framework)
+        assert nodes.count() == N_NODES
+        node = nodes.get(urn="urn:test:bulk:req:7")
+        assert node.ref_id == "REQ-7"
+        assert node.order_id == 7
+        assert node.parent_urn == "urn:test:bulk:req:0"
+        assert node.folder == Folder.get_root_folder()
+        assert node.is_published
+        assert node.created_at is not None
+        assert list(node.threats.values_list("urn", flat=True)) == [
+            "urn:test:bulk:threat:1"
+        ]
+        assert set(node.reference_controls.values_list("urn", flat=True)) == {
+            "urn:test:bulk:rc:1",
+            "urn:test:bulk:rc:2",
+        }
+        question = node.questions.get()
+        assert question.type == Question.Type.UNIQUE_CHOICE
+        assert question.ref_id == "7"
+        assert list(question.choices.values_list("value", "order")) == [
+            ("Yes", 0),
+            ("No", 1),
+        ]
+
+    def test_query_count_does_not_depend_on_node_count(
+        self, library, django_assert_max_num_queries
+    ):
+        with django_assert_max_num_queries(40):
+            _import(library, [_node(index) for index in range(N_NODES)])
+        assert QuestionChoice.objects.count() == 2 * N_NODES
+
+    def test_reimport_updates_in_place(self, library):
+        framework = _import(library, [_node(index) for index in range(N_NODES)])
+        framework.library = None
+        framework.save()
+        node_id = RequirementNode.objects.get(urn="urn:test:bulk:req:1").id
+        question_id = Question.objects.get(urn="urn:test:bulk:q:1").id
+
+        changed = _node(
+            1,
+            name="Renamed",
+            threats=[],
+            reference_controls=["urn:test:bulk:rc:0"],
+            questions={
+                "urn:test:bulk:q:1": {
+                    "type": "text",
+                    "text": "Now a text question",
+                }
+            },
+        )
+        _import(library, [_node(0), changed, _node(2)])
+
+        assert RequirementNode.objects.filter(framework=framework).count() == 3
+        node = RequirementNode.objects.get(urn="urn:test:bulk:req:1")
+        assert node.id == node_id
+        assert node.name == "Renamed"
+        assert not node.threats.exists()
+        assert list(node.reference_controls.values_list("urn", flat=True)) == [
+            "urn:test:bulk:rc:0"
+        ]
+        question = node.questions.get()
+        assert question.id == question_id
+        assert question.type == "text"
+        assert not question.choices.exists()
+        assert RequirementNode.objects.get(urn="urn:test:bulk:req:2").threats.count()
+
+    def test_unknown_reference_writes_nothing(self, library):
+        nodes = [_node(0), _node(1, threats=["urn:test:bulk:threat:missing"])]
+        with pytest.raises(ValueError, match="Unknown threat"):
+            _import(library, nodes)
+        assert not RequirementNode.objects.filter(
+            urn__startswith="urn:test:bulk:req"
+        ).exists()
@@ -0,0 +1,134 @@
+"""Tests for the bulk, pre-parsed library storage used by storelibraries."""
+
+import pytest
+from django.core.management import call_command
+
+from core.models import LibraryFilteringLabel, StoredLibrary
+from library.ingestion import parse_library_content
+
+LIBRARY_YAML = """
+urn: urn:test:bulkstore:library:{name}
+locale: en
+ref_id: {name}
+name: Library {name}
+version: {version}
+publication_date: 2025-05-22
+provider: Test
+labels:
+- {label}
+objects:
+  threats:
+  - urn: urn:test:bulkstore:threat:{name}
+    ref_id: T-{name}
+    name: Threat {name}
+"""
+
+
+def _library(name, version=1, label="shared"):
+    content = LIBRARY_YAML.format(name=name, version=version, label=label).encode()
+    return content, parse_library_content(content)
+
+
+def _store(*libraries):
+    return StoredLibrary.store_parsed_libraries(
+        [(f"{name}-{version}" * 8, data) for name, version, data in libraries],
+        builtin=True,
+    )
+
+
+@pytest.mark.django_db
+class TestStoreParsedLibraries:
+    def test_same_rows_as_store_library_content(self):
+        content, data = _library("serial")
+        serial, error = StoredLibrary.store_library_content(content, builtin=True)
+        assert error is None
+        serial.delete()
+
+        [(library, error)] = _store(("serial", 1, data))
+        assert error is None
+        library.refresh_from_db()
+        assert library.urn == serial.urn
+        assert str(library.publication_date) == "2025-05-22"
+        assert library.objects_meta == serial.objects_meta == {"threats": 1}
+        assert library.content == serial.content
+        assert library.builtin and not library.autoload and not library.is_loaded
+        assert list(library.filtering_labels.values_list("label", flat=True)) == [
+            "shared"
+        ]
+
+    def test_versions(self):
+        _, first = _library("a", version=2)
+        _, second = _library("b")
+        results = _store(("a", 2, first), ("b", 1, second))
+        assert all(library is not None for library, _ in results)
+        assert LibraryFilteringLabel.objects.filter(label="shared").count() == 1
+
+        _, older = _library("a", version=1)
+        _, newer = _library("a", version=3, label="newer")
+        _, invalid = _library("c")
+        invalid["urn"] = "not an urn"
+        results = _store(("a", 2, first), ("a", 1, older), ("a", 3, newer))
+        assert [error for _, error in results] == [
+            "libraryAlreadyLoadedError",
+            "libraryOutdatedError",
+            None,
+        ]
+        assert _store(("c", 1, invalid)) == [(None, "Library URN is badly formatted")]
+
+        stored = StoredLibrary.objects.get(urn="urn:test:bulkstore:library:a")
+        assert stored.version == 3
+        assert list(stored.filtering_labels.values_list("label", flat=True)) == [
+            "newer"
+        ]
+        # Still used by library b
+        assert LibraryFilteringLabel.objects.filter(label="shared").exists()
+
+    def test_only_the_last_of_several_versions_is_kept(self):
+        _, first = _library("a", version=1)
+        _, second = _library("a", version=2)
+        results = _store(("a", 1, first), ("a", 2, second))
+        assert results[0] == (None, "libraryOutdatedError")
+        assert (
+            StoredLibrary.objects.get(urn="urn:test:bulkstore:library:a").version == 2
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("use_bundle", [False, True])
+def test_storelibraries_command(tmp_path, use_bundle):
+    library_dir = tmp_path / "libraries"
+    library_dir.mkdir()
+    for name in ("one", "two", "three"):
+        (library_dir / f"{name}.yaml").write_bytes(_library(name)[0])
+    (library_dir / "broken.yaml").write_text("urn: [unclosed")
+
+    options = {"path": str(library_dir), "workers": 2}
+    if use_bundle:
+        bundle = tmp_path / "libraries.json"
+        call_command("storelibraries", write_bundle=str(bundle), **options)
+        assert not StoredLibrary.objects.filter(urn__contains="bulkstore").exists()
+        options = {"bundle": str(bundle)}
+    call_command("storelibraries", **options)
+    assert StoredLibrary.objects.filter(urn__contains="bulkstore").count() == 3
+
+    (library_dir / "one.yaml").write_bytes(_library("one", version=2)[0])
+    call_command("storelibraries", path=str(library_dir))
+    assert StoredLibrary.objects.get(urn="urn:test:bulkstore:library:one").version == 2
+
+    def test_mapping_libraries_invalidate_the_mapping_cache(self):
+        from unittest.mock import patch
+
+        _, threats = _library("threats")
+        _, framework = _library("framework")
+        framework["objects"] = {
+            "framework": {
+                "urn": "urn:test:bulkstore:framework:framework",
+                "ref_id": "F",
+                "name": "Framework",
+            }
+        }
+        with patch("core.mappings.engine.invalidate_mapping_cache") as invalidate:
+            results = _store(("threats", 1, threats), ("framework", 1, framework))
+
+        framework_library = results[1][0]
+        invalidate.assert_called_once_with(library_ids=[framework_library.id])
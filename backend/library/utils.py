@@ -6,6 +6,7 @@ from typing import List, Union
 
 # interesting thread: https://stackoverflow.com/questions/27743711/can-i-speedup-yaml
 from core.models import (
+    ComplianceAssessmentAggregate,
     Framework,
     Preset,
     Question,
@@ -19,11 +20,14 @@ from core.models import (
     ReferenceControl,
     Terminology,
     Threat,
+    _choice_fields_from_data,
+    _question_fields_from_data,
     _sync_questions_from_data,
 )
 from sec_intel.models import Tactic, Technique, TTPCatalog
 from metrology.models import MetricDefinition
 from django.db import transaction
+from django.utils import timezone
 from iam.models import Folder
 
 from django.db.utils import IntegrityError, OperationalError
@@ -111,56 +115,70 @@ class RequirementNodeImporter:
         if missing_fields := self.REQUIRED_FIELDS - set(self.requirement_data.keys()):
             return "Missing the following fields : {}".format(", ".join(missing_fields))
 
-    def import_requirement_node(self, framework_object: Framework):
+    def requirement_node_fields(self, framework_object: Framework) -> dict:
         parent_urn = self.requirement_data.get("parent_urn")
         if parent_urn:
             parent_urn = parent_urn.lower()
+        return dict(
+            folder=Folder.get_root_folder(),
+            parent_urn=parent_urn,
+            assessable=self.requirement_data.get("assessable"),
+            ref_id=self.requirement_data.get("ref_id"),
+            annotation=self.requirement_data.get("annotation"),
+            typical_evidence=self.requirement_data.get("typical_evidence"),
+            provider=framework_object.provider,
+            order_id=self.index,
+            name=self.requirement_data.get("name"),
+            description=self.requirement_data.get("description"),
+            implementation_groups=self.requirement_data.get("implementation_groups"),
+            display_mode=self.requirement_data.get(
+                "display_mode", RequirementNode.DisplayMode.DEFAULT
+            ),
+            weight=self.requirement_data.get("weight", 1),
+            min_score=self.requirement_data.get("min_score"),
+            max_score=self.requirement_data.get("max_score"),
+            scores_definition_ref=self.requirement_data.get("scores_definition_ref"),
+            locale=framework_object.locale,
+            default_locale=framework_object.default_locale,
+            translations=self.requirement_data.get("translations", {}),
+            is_published=True,
+        )
+
+    def questions_data(self) -> dict:
+        questions_data = self.requirement_data.get("questions")
+        return questions_data if isinstance(questions_data, dict) else {}
+
+    def unknown_reference_error(self, label: str, urn: str) -> ValueError:
+        requirement_identifier = self.requirement_data.get(
+            "ref_id", self.requirement_data.get("urn")
+        )
+        error_message = (
+            f"Unknown {label} '{urn or 'unknown'}' "
+            f"referenced in requirement '{requirement_identifier}'."
+        )
+        logger.error(error_message)
+        return ValueError(error_message)
 
+    def import_requirement_node(self, framework_object: Framework):
+        """
+        Import this node alone. Frameworks are imported through
+        RequirementNodeBulkImporter, which does the same for all the nodes of
+        a framework with a constant number of queries.
+        """
         # update_or_create scoped to the framework: identical to create()
         # for fresh imports, updates in place when the framework row was
         # adopted (see FrameworkImporter.import_framework).
         requirement_node, _ = RequirementNode.objects.update_or_create(
             framework=framework_object,
             urn=self.requirement_data["urn"].lower(),
-            defaults=dict(
-                folder=Folder.get_root_folder(),
-                parent_urn=parent_urn,
-                assessable=self.requirement_data.get("assessable"),
-                ref_id=self.requirement_data.get("ref_id"),
-                annotation=self.requirement_data.get("annotation"),
-                typical_evidence=self.requirement_data.get("typical_evidence"),
-                provider=framework_object.provider,
-                order_id=self.index,
-                name=self.requirement_data.get("name"),
-                description=self.requirement_data.get("description"),
-                implementation_groups=self.requirement_data.get(
-                    "implementation_groups"
-                ),
-                display_mode=self.requirement_data.get(
-                    "display_mode", RequirementNode.DisplayMode.DEFAULT
-                ),
-                weight=self.requirement_data.get("weight", 1),
-                min_score=self.requirement_data.get("min_score"),
-                max_score=self.requirement_data.get("max_score"),
-                scores_definition_ref=self.requirement_data.get(
-                    "scores_definition_ref"
-                ),
-                locale=framework_object.locale,
-                default_locale=framework_object.default_locale,
-                translations=self.requirement_data.get("translations", {}),
-                is_published=True,
-            ),
+            defaults=self.requirement_node_fields(framework_object),
         )
         requirement_node.clean()
 
         # Sync Question + QuestionChoice objects: pure create for fresh
         # imports, upsert-and-prune for adopted nodes that already carry
         # question rows.
-        questions_data = self.requirement_data.get("questions")
-        _sync_questions_from_data(
-            requirement_node,
-            questions_data if isinstance(questions_data, dict) else {},
-        )
+        _sync_questions_from_data(requirement_node, self.questions_data())
 
         # Use .set() rather than .add(): on the adopt-in-place / re-import
         # path the node already exists, and a link removed in the document
@@ -170,16 +188,7 @@ class RequirementNodeImporter:
             try:
                 threats.append(Threat.objects.get(urn=threat.lower()))
             except Threat.DoesNotExist as exc:
-                threat_name = threat or "unknown"
-                requirement_identifier = self.requirement_data.get(
-                    "ref_id", self.requirement_data.get("urn")
-                )
-                error_message = (
-                    f"Unknown threat '{threat_name}' "
-                    f"referenced in requirement '{requirement_identifier}'."
-                )
-                logger.error(error_message)
-                raise ValueError(error_message) from exc
+                raise self.unknown_reference_error("threat", threat) from exc
         if threats or requirement_node.threats.exists():
             requirement_node.threats.set(threats)
 
@@ -190,20 +199,163 @@ class RequirementNodeImporter:
                     ReferenceControl.objects.get(urn=reference_control.lower())
                 )
             except ReferenceControl.DoesNotExist as exc:
-                reference_control_name = reference_control or "unknown"
-                requirement_identifier = self.requirement_data.get(
-                    "ref_id", self.requirement_data.get("urn")
-                )
-                error_message = (
-                    f"Unknown reference control '{reference_control_name}' "
-                    f"referenced in requirement '{requirement_identifier}'."
-                )
-                logger.error(error_message)
-                raise ValueError(error_message) from exc
+                raise self.unknown_reference_error(
+                    "reference control", reference_control
+                ) from exc
         if reference_controls or requirement_node.reference_controls.exists():
             requirement_node.reference_controls.set(reference_controls)
 
 
+class RequirementNodeBulkImporter:
+    """
+    Import the requirement nodes of a framework in bulk.
+
+    Referenced threats and reference controls are resolved with one query per
+    model, nodes are created or updated with bulk_create / bulk_update keyed
+    on (framework, urn), and M2M links, questions and choices are written with
+    bulk operations, so the query count does not grow with the number of
+    nodes. The result is the same as importing every node with
+    RequirementNodeImporter.import_requirement_node, including on the
+    adopt-in-place path where the nodes already exist.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, requirement_nodes: List[RequirementNodeImporter]):
+        # A URN listed twice is updated twice by update_or_create: last wins
+        self.importers = {
+            importer.requirement_data["urn"].lower(): importer
+            for importer in requirement_nodes
+        }
+
+    def resolve_references(self, model, field: str, label: str) -> dict:
+        urns = {
+            urn.lower()
+            for importer in self.importers.values()
+            for urn in importer.requirement_data.get(field, [])
+        }
+        objects = model.objects.in_bulk(urns, field_name="urn")
+        for importer in self.importers.values():
+            for urn in importer.requirement_data.get(field, []):
+                if urn.lower() not in objects:
+                    raise importer.unknown_reference_error(label, urn)
+        return objects
+
+    def save_requirement_nodes(self, framework_object: Framework) -> dict:
+        existing = RequirementNode.objects.filter(
+            framework=framework_object, urn__in=list(self.importers)
+        ).in_bulk(field_name="urn")
+        now = timezone.now()
+        nodes, to_create, to_update = {}, [], []
+        update_fields = {"updated_at"}
+        for urn, importer in self.importers.items():
+            fields = importer.requirement_node_fields(framework_object)
+            requirement_node = existing.get(urn)
+            if requirement_node is None:
+                requirement_node = RequirementNode(
+                    framework=framework_object, urn=urn, **fields
+                )
+                to_create.append(requirement_node)
+            else:
+                for attr, value in fields.items():
+                    setattr(requirement_node, attr, value)
+                # auto_now is not applied by bulk_update
+                requirement_node.updated_at = now
+                update_fields.update(fields)
+                to_update.append(requirement_node)
+            # What save() would have checked
+            requirement_node._validate_char_max_lengths()
+            requirement_node.clean()
+            nodes[urn] = requirement_node
+
+        RequirementNode.objects.bulk_create(to_create, batch_size=self.BATCH_SIZE)
+        if to_update:
+            RequirementNode.objects.bulk_update(
+                to_update, list(update_fields), batch_size=self.BATCH_SIZE
+            )
+            # Weights, implementation groups... of assessed nodes may change
+            ComplianceAssessmentAggregate.invalidate_framework(framework_object.id)
+        return nodes
+
+    def set_links(self, field_name: str, nodes: dict, targets: dict):
+        """Bulk equivalent of requirement_node.<field_name>.set() for all nodes."""
+        field = RequirementNode._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+
+        wanted = {
+            (nodes[urn].id, targets[ref.lower()].id)
+            for urn, importer in self.importers.items()
+            for ref in importer.requirement_data.get(field_name, [])
+        }
+        current = {
+            (node_id, target_id): pk
+            for pk, node_id, target_id in through.objects.filter(
+                **{f"{source}__in": [node.id for node in nodes.values()]}
+            ).values_list("pk", source, target)
+        }
+        stale = [pk for link, pk in current.items() if link not in wanted]
+        if stale:
+            through.objects.filter(pk__in=stale).delete()
+        through.objects.bulk_create(
+            [
+                through(**{source: node_id, target: target_id})
+                for node_id, target_id in wanted - current.keys()
+            ],
+            batch_size=self.BATCH_SIZE,
+        )
+
+    def save_questions(self, nodes: dict):
+        with_questions = set(
+            Question.objects.filter(
+                requirement_node__in=list(nodes.values())
+            ).values_list("requirement_node_id", flat=True)
+        )
+        questions, choices = [], []
+        for urn, importer in self.importers.items():
+            requirement_node = nodes[urn]
+            if requirement_node.id in with_questions:
+                # Adopted node with question rows: upsert-and-prune
+                _sync_questions_from_data(requirement_node, importer.questions_data())
+                continue
+            for order, (q_urn, q_data) in enumerate(importer.questions_data().items()):
+                question = Question(
+                    requirement_node=requirement_node,
+                    urn=q_urn,
+                    folder=requirement_node.folder,
+                    is_published=True,
+                    **_question_fields_from_data(q_urn, q_data, order),
+                )
+                questions.append(question)
+                for c_order, choice in enumerate(q_data.get("choices", [])):
+                    choices.append(
+                        QuestionChoice(
+                            question=question,
+                            urn=choice.get("urn") or None,
+                            folder=requirement_node.folder,
+                            is_published=True,
+                            **_choice_fields_from_data(choice, c_order),
+                        )
+                    )
+        for obj in questions + choices:
+            obj._validate_char_max_lengths()
+        Question.objects.bulk_create(questions, batch_size=self.BATCH_SIZE)
+        QuestionChoice.objects.bulk_create(choices, batch_size=self.BATCH_SIZE)
+
+    def import_requirement_nodes(self, framework_object: Framework) -> dict:
+        # Resolve every reference before writing anything
+        threats = self.resolve_references(Threat, "threats", "threat")
+        reference_controls = self.resolve_references(
+            ReferenceControl, "reference_controls", "reference control"
+        )
+        nodes = self.save_requirement_nodes(framework_object)
+        self.save_questions(nodes)
+        self.set_links("threats", nodes, threats)
+        self.set_links("reference_controls", nodes, reference_controls)
+        return nodes
+
+
 class RequirementMappingImporter:
     REQUIRED_FIELDS = {
         "target_requirement_urn",
@@ -436,8 +588,9 @@ class FrameworkImporter:
                 is_published=True,
             ),
         )
-        for requirement_node in self._requirement_nodes:
-            requirement_node.import_requirement_node(framework_object)
+        RequirementNodeBulkImporter(self._requirement_nodes).import_requirement_nodes(
+            framework_object
+        )
         if not framework_created:
             # Adopted framework: live nodes absent from the document were
             # deleted in the draft. No-op for fresh imports.
@@ -39,10 +39,10 @@ DEFAULT_SETTINGS = {
 def get_feed_settings() -> dict:
     """Return feed settings dict. Returns all-disabled defaults on any error."""
     try:
-        from global_settings.models import GlobalSettings
+        from global_settings.cache import get_global_setting
 
-        gs = GlobalSettings.objects.get(name="sec-intel-feeds")
-        return gs.value if isinstance(gs.value, dict) else DEFAULT_SETTINGS
+        feed_settings = get_global_setting("sec-intel-feeds")
+        return feed_settings if isinstance(feed_settings, dict) else DEFAULT_SETTINGS
     except Exception:
         return DEFAULT_SETTINGS
 
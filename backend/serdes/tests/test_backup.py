@@ -0,0 +1,142 @@
+"""Tests for the streaming full-database backup (serdes.backup)."""
+
+import gzip
+import io
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from iam.models import Folder, User, UserGroup
+from serdes.backup import (
+    backup_meta,
+    gzip_chunks,
+    iter_backup,
+    read_backup,
+    strip_enterprise_objects,
+)
+from serdes.views import ExportBackupView, LoadBackupView
+
+
+@pytest.fixture
+def backup_admin(db):
+    admin = User.objects.create_superuser("streaming_backup@tests.com")
+    UserGroup.objects.get(name="BI-UG-ADM").user_set.add(admin)
+    return admin
+
+
+@pytest.fixture
+def domains(db):
+    root = Folder.get_root_folder()
+    return [
+        Folder.objects.create(
+            parent_folder=root,
+            name=f"Domain {index}\u2028line separator",
+            content_type=Folder.ContentType.DOMAIN,
+        )
+        for index in range(5)
+    ]
+
+
+@pytest.mark.django_db
+class TestStreamingBackup:
+    def test_layouts_hold_the_same_objects(self, domains):
+        meta, objects = json.loads("".join(iter_backup("json", chunk_size=2)))
+        # Not splitlines(): it would also split on the U+2028 of folder names
+        lines = "".join(iter_backup("jsonl", chunk_size=2)).split("\n")
+
+        assert meta == backup_meta()
+        assert json.loads(lines[0]) == backup_meta()
+        assert lines[-1] == ""
+        assert [json.loads(line) for line in lines[1:-1]] == objects
+        names = {
+            obj["fields"]["name"] for obj in objects if obj["model"] == "iam.folder"
+        }
+        assert {domain.name for domain in domains} <= names
+        models = [obj["model"] for obj in objects]
+        assert "knox.authtoken" not in models
+        # Folders are dumped before the objects referencing them
+        assert models.index("iam.folder") < models.index("iam.role")
+
+    @pytest.mark.parametrize("backup_format", ["json", "jsonl"])
+    def test_read_backup(self, domains, backup_format):
+        expected = json.loads("".join(iter_backup("json")))[1]
+        data = b"".join(gzip_chunks(iter_backup(backup_format, chunk_size=3)))
+
+        for payload in (data, gzip.decompress(data)):
+            meta, objects = read_backup(io.BytesIO(payload))
+            assert meta == backup_meta()["meta"]
+            assert list(objects) == expected
+
+    def test_strip_enterprise_objects(self):
+        objects = [
+            {"model": "enterprise_core.clientsettings", "fields": {}},
+            {
+                "model": "iam.role",
+                "fields": {
+                    "permissions": [
+                        ["view_folder", "iam"],
+                        ["view_clientsettings", "enterprise_core"],
+                    ]
+                },
+            },
+        ]
+        assert list(strip_enterprise_objects(objects)) == [
+            {"model": "iam.role", "fields": {"permissions": [["view_folder", "iam"]]}}
+        ]
+
+
+def _export(user, **params):
+    request = APIRequestFactory().get("/serdes/dump-db/", params)
+    force_authenticate(request, user=user)
+    return ExportBackupView.as_view()(request)
+
+
+@pytest.mark.django_db
+def test_export_streams_gzipped_jsonl(backup_admin):
+    response = _export(backup_admin, backup_format="jsonl")
+    assert response.status_code == 200
+    assert response.streaming
+    assert settings.VERSION in response["Content-Disposition"]
+    data = gzip.decompress(b"".join(response.streaming_content))
+    assert data.startswith(json.dumps(backup_meta()).encode() + b"\n")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_jsonl_backup(backup_admin):
+    folder = {
+        "model": "iam.folder",
+        "pk": str(uuid.uuid4()),
+        "fields": {
+            "name": "Streamed domain",
+            "content_type": "DO",
+            "builtin": False,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+        },
+    }
+    enterprise = {"model": "enterprise_core.clientsettings", "fields": {}}
+    lines = [backup_meta(), folder] + (
+        [] if apps.is_installed("enterprise_core") else [enterprise]
+    )
+    request = APIRequestFactory().post(
+        "/serdes/load-backup/",
+        data=gzip.compress("".join(json.dumps(line) + "\n" for line in lines).encode()),
+        content_type="application/octet-stream",
+        HTTP_CONTENT_DISPOSITION='attachment; filename="backup.jsonl"',
+    )
+    request.session = SessionStore()
+    force_authenticate(request, user=backup_admin)
+
+    assert LoadBackupView.as_view()(request).status_code == 200
+    assert Folder.objects.filter(name="Streamed domain").exists()
+
+
+@pytest.mark.django_db
+def test_export_rejects_unknown_format(backup_admin):
+    assert _export(backup_admin, backup_format="xml").status_code == 400
@@ -1,15 +1,14 @@
-import gzip
 import io
 import json
 import struct
 import sys
+import tempfile
 from datetime import datetime
 
 import structlog
 from django.core import management
-from django.core.management.commands import dumpdata
 from django.core.files.storage import default_storage
-from django.http import HttpResponse, StreamingHttpResponse
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.parsers import FileUploadParser
 from rest_framework.response import Response
@@ -18,6 +17,14 @@ from rest_framework.pagination import LimitOffsetPagination
 from core.models import EvidenceRevision
 from core.utils import compare_schema_versions
 from iam.models import User
+from serdes.backup import (
+    BACKUP_EXCLUDE,
+    BACKUP_FORMATS,
+    gzip_chunks,
+    iter_backup,
+    read_backup,
+    strip_enterprise_objects,
+)
 from serdes.serializers import LoadBackupSerializer
 
 from django.db.models.signals import post_save
@@ -29,61 +36,75 @@ import hashlib
 
 logger = structlog.get_logger(__name__)
 
-GZIP_MAGIC_NUMBER = b"\x1f\x8b"
-
 
 class ExportBackupView(APIView):
     def get(self, request, *args, **kwargs):
         if not request.user.has_backup_permission:
             return Response(status=status.HTTP_403_FORBIDDEN)
-        response = HttpResponse(content_type="application/json")
+        # "json" (default) or "jsonl", see serdes.backup
+        backup_format = request.query_params.get("backup_format", "json")
+        if backup_format not in BACKUP_FORMATS:
+            return Response(
+                {"error": "InvalidBackupFormat"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        # NOTE: We will not be able to dump selected folders with this method.
+        response = StreamingHttpResponse(
+            gzip_chunks(iter_backup(backup_format)),
+            content_type="application/json"
+            if backup_format == "json"
+            else "application/jsonl",
+        )
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
         response["Content-Disposition"] = (
-            f'attachment; filename="ciso-assistant-db-{settings.VERSION}-{timestamp}.json"'
+            f'attachment; filename="ciso-assistant-db-{settings.VERSION}-{timestamp}.{backup_format}"'
         )
+        return response
 
-        buffer = io.StringIO()
-        buffer.write(
-            f'[{{"meta": [{{"media_version": "{settings.VERSION}", "schema_version": "{settings.SCHEMA_VERSION}"}}]}},\n'
-        )
-        # Here we dump th data to stdout
-        # NOTE: We will not be able to dump selected folders with this method.
-        management.call_command(
-            dumpdata.Command(),
-            exclude=[
-                "contenttypes",
-                "auth.permission",
-                "sessions.session",
-                "iam.personalaccesstoken",
-                "iam.ssosettings",
-                "knox.authtoken",
-                "auditlog.logentry",
-            ],
-            indent=4,
-            stdout=buffer,
-            natural_foreign=True,
+
+def check_backup_meta(metadata):
+    """
+    Return the media version of a backup from its meta header, or raise
+    ValueError/TypeError if it cannot be restored on this instance.
+    """
+    backup_version = None
+    schema_version = 0
+
+    for metadata_part in metadata:
+        backup_version = metadata_part.get("media_version")
+        schema_version = metadata_part.get("schema_version")
+        if backup_version is not None or schema_version is not None:
+            break
+
+    schema_version_int = int(schema_version)
+    compare_schema_versions(schema_version_int, backup_version)
+    if backup_version != settings.VERSION:
+        raise ValueError(
+            "The version of the current instance and the one that generated the backup are not the same."
         )
-        buffer.write("]")
-        buffer.seek(0)
-        buffer_data = gzip.compress(buffer.getvalue().encode())
-        response.write(buffer_data)
-        return response
+    return backup_version
 
 
 class LoadBackupView(APIView):
     parser_classes = (FileUploadParser,)
     serializer_class = LoadBackupSerializer
 
-    def load_backup(self, request, decompressed_data, backup_version, current_version):
+    def load_backup(self, request, objects, backup_version, current_version):
+        """
+        Replace the content of the database with the objects of a backup (an
+        iterable of deserialized objects, consumed lazily), restoring the
+        current content if the backup cannot be loaded.
+        """
         # The LogEntry enrichment receiver disconnected here in #1707 is gone:
         # folder is now captured inline via AbstractBaseModel.get_additional_data,
         # so loaddata of auditlog.logentry fixtures no longer triggers enrichment.
-        backup_buffer = io.StringIO()
+        # The current DB state is spooled to a temporary file rather than kept
+        # in memory.
+        current_backup = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
         try:
             management.call_command(
                 "dumpdata",
-                stdout=backup_buffer,
-                format="json",
+                stdout=current_backup,
+                format="jsonl",
                 verbosity=0,
                 exclude=[
                     "contenttypes",
@@ -94,115 +115,71 @@ class LoadBackupView(APIView):
                 ],
             )
         except Exception as e:
+            current_backup.close()
             logger.error("Error dumping current DB state", exc_info=e)
             return Response(
                 {"error": "BackupDumpFailed"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
-        current_backup = backup_buffer.getvalue()
+
+        def restore_current_backup():
+            current_backup.seek(0)
+            sys.stdin = current_backup
+            management.call_command("flush", interactive=False)
+            management.call_command(
+                "loaddata",
+                "-",
+                format="jsonl",
+                verbosity=0,
+                exclude=[
+                    "contenttypes",
+                    "auth.permission",
+                    "sessions.session",
+                    "iam.ssosettings",
+                    "knox.authtoken",
+                ],
+            )
 
         # Prepare to load the uploaded backup.
-        # Reset sys.stdin so loaddata reads from our provided backup data.
-        sys.stdin = io.StringIO(decompressed_data)
+        # Reset sys.stdin so loaddata reads from our provided backup objects,
+        # which are already deserialized, hence the "python" format.
+        sys.stdin = (obj for obj in objects)
         request.session.flush()
 
         try:
-            last_model = None
-
-            def fixture_callback(sender, **kwargs):
-                nonlocal last_model
-                if "instance" in kwargs:
-                    instance = kwargs["instance"]
-                    last_model = (
-                        f"{instance._meta.app_label}.{instance._meta.model_name}"
-                    )
-                    logger.debug(f"Loaded: {last_model} with pk={instance.pk}")
-
-            # Connect to the post_save signal
-            post_save.connect(fixture_callback)
-            with disable_auditlog():
-                management.call_command("flush", interactive=False)
-                management.call_command(
-                    "loaddata",
-                    "-",
-                    format="json",
-                    verbosity=2,
-                    exclude=[
-                        "contenttypes",
-                        "auth.permission",
-                        "sessions.session",
-                        "iam.personalaccesstoken",
-                        "iam.ssosettings",
-                        "knox.authtoken",
-                        "auditlog.logentry",
-                    ],
-                )
-
-        except Exception as e:
-            logger.error("Error while loading backup", exc_info=e)
-            logger.error(
-                f"Error while loading backup. Last successful model: {last_model}",
-                exc_info=e,
-            )
-            # On failure, restore the original data.
             try:
-                sys.stdin = io.StringIO(current_backup)
-                management.call_command("flush", interactive=False)
-                management.call_command(
-                    "loaddata",
-                    "-",
-                    format="json",
-                    verbosity=0,
-                    exclude=[
-                        "contenttypes",
-                        "auth.permission",
-                        "sessions.session",
-                        "iam.ssosettings",
-                        "knox.authtoken",
-                    ],
-                )
-            except Exception as restore_error:
-                logger.error("Error restoring original backup", exc_info=restore_error)
-                return Response(
-                    {"error": "RestoreFailed"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            if backup_version != current_version:
-                logger.error("Backup version different than current version")
-                return Response(
-                    {"error": "LowerBackupVersion"}, status=status.HTTP_400_BAD_REQUEST
-                )
-            return Response({}, status=status.HTTP_400_BAD_REQUEST)
-        finally:
-            post_save.disconnect(fixture_callback)
+                last_model = None
+
+                def fixture_callback(sender, **kwargs):
+                    nonlocal last_model
+                    if "instance" in kwargs:
+                        instance = kwargs["instance"]
+                        last_model = (
+                            f"{instance._meta.app_label}.{instance._meta.model_name}"
+                        )
+                        logger.debug(f"Loaded: {last_model} with pk={instance.pk}")
 
-        # Enforce LICENSE_SEATS after successful restore
-        license_seats = getattr(settings, "LICENSE_SEATS", None)
-        if license_seats is not None:
-            editor_count = len(User.get_editors())
-            if editor_count > license_seats:
-                logger.error(
-                    "Backup exceeds license seats, rolling back",
-                    editor_count=editor_count,
-                    license_seats=license_seats,
-                )
-                try:
-                    sys.stdin = io.StringIO(current_backup)
+                # Connect to the post_save signal
+                post_save.connect(fixture_callback)
+                with disable_auditlog():
                     management.call_command("flush", interactive=False)
                     management.call_command(
                         "loaddata",
                         "-",
-                        format="json",
-                        verbosity=0,
-                        exclude=[
-                            "contenttypes",
-                            "auth.permission",
-                            "sessions.session",
-                            "iam.ssosettings",
-                            "knox.authtoken",
-                        ],
+                        format="python",
+                        verbosity=2,
+                        exclude=BACKUP_EXCLUDE,
                     )
+
+            except Exception as e:
+                logger.error("Error while loading backup", exc_info=e)
+                logger.error(
+                    f"Error while loading backup. Last successful model: {last_model}",
+                    exc_info=e,
+                )
+                # On failure, restore the original data.
+                try:
+                    restore_current_backup()
                 except Exception as restore_error:
                     logger.error(
                         "Error restoring original backup", exc_info=restore_error
@@ -211,12 +188,45 @@ class LoadBackupView(APIView):
                         {"error": "RestoreFailed"},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     )
-                return Response(
-                    {"error": "errorLicenseSeatsExceeded"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
 
-        return Response({}, status=status.HTTP_200_OK)
+                if backup_version != current_version:
+                    logger.error("Backup version different than current version")
+                    return Response(
+                        {"error": "LowerBackupVersion"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                return Response({}, status=status.HTTP_400_BAD_REQUEST)
+            finally:
+                post_save.disconnect(fixture_callback)
+
+            # Enforce LICENSE_SEATS after successful restore
+            license_seats = getattr(settings, "LICENSE_SEATS", None)
+            if license_seats is not None:
+                editor_count = len(User.get_editors())
+                if editor_count > license_seats:
+                    logger.error(
+                        "Backup exceeds license seats, rolling back",
+                        editor_count=editor_count,
+                        license_seats=license_seats,
+                    )
+                    try:
+                        restore_current_backup()
+                    except Exception as restore_error:
+                        logger.error(
+                            "Error restoring original backup", exc_info=restore_error
+                        )
+                        return Response(
+                            {"error": "RestoreFailed"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        )
+                    return Response(
+                        {"error": "errorLicenseSeatsExceeded"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+            return Response({}, status=status.HTTP_200_OK)
+        finally:
+            current_backup.close()
 
     def post(self, request, *args, **kwargs):
         if not request.user.has_backup_permission:
@@ -228,68 +238,27 @@ class LoadBackupView(APIView):
             return Response(
                 {"error": "backupLoadNoData"}, status=status.HTTP_400_BAD_REQUEST
             )
-        backup_file = request.data["file"]
-        data = backup_file.read()
-        is_gzip = data.startswith(GZIP_MAGIC_NUMBER)
-        full_decompressed_data = gzip.decompress(data) if is_gzip else data
-        # Performances could be improved (by avoiding the json.loads + json.dumps calls with a direct raw manipulation on the JSON body)
-        # But performances of the backup loading is not that much important.
-
-        full_decompressed_data = json.loads(full_decompressed_data)
-        metadata, decompressed_data = full_decompressed_data
-        metadata = metadata["meta"]
-
+        # JSONL backups are streamed from the uploaded file; legacy JSON backups
+        # are parsed at once.
+        metadata, objects = read_backup(request.data["file"])
         current_version = settings.VERSION.split("-")[0]
-        backup_version = None
-        schema_version = 0
-
-        for metadata_part in metadata:
-            backup_version = metadata_part.get("media_version")
-            schema_version = metadata_part.get("schema_version")
-            if backup_version is not None or schema_version is not None:
-                break
 
         try:
-            schema_version_int = int(schema_version)
-            compare_schema_versions(schema_version_int, backup_version)
-            if backup_version != settings.VERSION:
-                raise ValueError(
-                    "The version of the current instance and the one that generated the backup are not the same."
-                )
+            backup_version = check_backup_meta(metadata)
         except (ValueError, TypeError) as e:
             logger.error(
                 "Invalid schema version format",
-                schema_version=schema_version,
+                metadata=metadata,
                 exc_info=e,
             )
             return Response(
                 {"error": "InvalidSchemaVersion"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        is_enterprise = apps.is_installed("enterprise_core")
-        if not is_enterprise:
-            for obj in decompressed_data:
-                if obj["model"] != "iam.role":
-                    continue
-                permissions = obj["fields"]["permissions"]
-                enterprise_perms_indices = [
-                    i
-                    for i, perm in enumerate(permissions)
-                    if perm[1] == "enterprise_core"
-                ]
-                for perm_index in reversed(enterprise_perms_indices):
-                    permissions.pop(perm_index)
-
-            decompressed_data = [
-                obj
-                for obj in decompressed_data
-                if obj["model"].split(".", 1)[0] != "enterprise_core"
-            ]
-
-        decompressed_data = json.dumps(decompressed_data)
-        return self.load_backup(
-            request, decompressed_data, backup_version, current_version
-        )
+        if not apps.is_installed("enterprise_core"):
+            objects = strip_enterprise_objects(objects)
+
+        return self.load_backup(request, objects, backup_version, current_version)
 
 
 class FullRestoreView(APIView):
@@ -326,35 +295,15 @@ class FullRestoreView(APIView):
         logger.info("Step 1/2: Restoring database backup")
 
         try:
-            data = backup_file.read()
-            is_gzip = data.startswith(GZIP_MAGIC_NUMBER)
-            full_decompressed_data = gzip.decompress(data) if is_gzip else data
-
-            full_decompressed_data = json.loads(full_decompressed_data)
-            metadata, decompressed_data = full_decompressed_data
-            metadata = metadata["meta"]
-
+            metadata, objects = read_backup(backup_file)
             current_version = settings.VERSION.split("-")[0]
-            backup_version = None
-            schema_version = 0
-
-            for metadata_part in metadata:
-                backup_version = metadata_part.get("media_version")
-                schema_version = metadata_part.get("schema_version")
-                if backup_version is not None or schema_version is not None:
-                    break
 
             try:
-                schema_version_int = int(schema_version)
-                compare_schema_versions(schema_version_int, backup_version)
-                if backup_version != settings.VERSION:
-                    raise ValueError(
-                        "The version of the current instance and the one that generated the backup are not the same."
-                    )
+                backup_version = check_backup_meta(metadata)
             except (ValueError, TypeError) as e:
                 logger.error(
                     "Invalid schema version format",
-                    schema_version=schema_version,
+                    metadata=metadata,
                     exc_info=e,
                 )
                 return Response(
@@ -362,32 +311,13 @@ class FullRestoreView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            is_enterprise = apps.is_installed("enterprise_core")
-            if not is_enterprise:
-                for obj in decompressed_data:
-                    if obj["model"] != "iam.role":
-                        continue
-                    permissions = obj["fields"]["permissions"]
-                    enterprise_perms_indices = [
-                        i
-                        for i, perm in enumerate(permissions)
-                        if perm[1] == "enterprise_core"
-                    ]
-                    for perm_index in reversed(enterprise_perms_indices):
-                        permissions.pop(perm_index)
-
-                decompressed_data = [
-                    obj
-                    for obj in decompressed_data
-                    if obj["model"].split(".", 1)[0] != "enterprise_core"
-                ]
-
-            decompressed_data = json.dumps(decompressed_data)
+            if not apps.is_installed("enterprise_core"):
+                objects = strip_enterprise_objects(objects)
 
             # Reuse existing load_backup logic
             load_backup_view = LoadBackupView()
             db_response = load_backup_view.load_backup(
-                request, decompressed_data, backup_version, current_version
+                request, objects, backup_version, current_version
             )
 
             if db_response.status_code != 200:
@@ -0,0 +1,83 @@
+# Generated by Django 6.0.7 on 2026-10-17 09:57
+
+import django.core.serializers.json
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("webhooks", "0005_alter_webhookendpoint_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookendpoint",
+            name="batch_size",
+            field=models.PositiveIntegerField(
+                default=100,
+                help_text="Maximum number of events per batch (batched delivery).",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(1000),
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookendpoint",
+            name="delivery_mode",
+            field=models.CharField(
+                choices=[("immediate", "Immediate"), ("batched", "Batched")],
+                default="immediate",
+                help_text="Send each event on its own, or queue events and send them in batches.",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookendpoint",
+            name="max_concurrent_batches",
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text="Maximum number of batches sent in parallel to this endpoint (batched delivery). Batches are sent in order when set to 1.",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(16),
+                ],
+            ),
+        ),
+        migrations.CreateModel(
+            name="WebhookOutboxEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("event_type", models.CharField(max_length=100)),
+                (
+                    "payload",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("batch_id", models.UUIDField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "endpoint",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbox_events",
+                        to="webhooks.webhookendpoint",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["endpoint", "batch_id", "id"],
+                        name="webhooks_we_endpoin_bb1696_idx",
+                    )
+                ],
+            },
+        ),
+    ]
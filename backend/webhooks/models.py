@@ -3,6 +3,9 @@ from auditlog.registry import auditlog
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 from core.base_models import NameDescriptionMixin
 from core.models import Actor
 from core.net_safety import BlockedRequestError, assert_public_url
@@ -47,6 +50,10 @@ class WebhookEndpoint(NameDescriptionMixin, FolderMixin):
         OCSF = "ocsf", "OCSF"
         RAW = "raw", "Raw LogEntry"
 
+    class DeliveryMode(models.TextChoices):
+        IMMEDIATE = "immediate", "Immediate"
+        BATCHED = "batched", "Batched"
+
     payload_format = models.CharField(
         verbose_name="Payload Format",
         max_length=10,
@@ -128,6 +135,26 @@ class WebhookEndpoint(NameDescriptionMixin, FolderMixin):
         help_text="Global toggle to enable/disable sending events to this endpoint.",
     )
 
+    # Batched delivery (integration webhooks only): events are written to the
+    # outbox and sent in signed batches instead of one request per event.
+    delivery_mode = models.CharField(
+        max_length=10,
+        choices=DeliveryMode.choices,
+        default=DeliveryMode.IMMEDIATE,
+        help_text="Send each event on its own, or queue events and send them in batches.",
+    )
+    batch_size = models.PositiveIntegerField(
+        default=100,
+        validators=[MinValueValidator(1), MaxValueValidator(1000)],
+        help_text="Maximum number of events per batch (batched delivery).",
+    )
+    max_concurrent_batches = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(16)],
+        help_text="Maximum number of batches sent in parallel to this endpoint "
+        "(batched delivery). Batches are sent in order when set to 1.",
+    )
+
     def __str__(self):
         return f"{self.owner} - {self.url}"
 
@@ -153,6 +180,32 @@ class WebhookEndpoint(NameDescriptionMixin, FolderMixin):
         super().save(*args, **kwargs)
 
 
+class WebhookOutboxEvent(models.Model):
+    """
+    An event waiting to be sent to a batched endpoint. Events are claimed in
+    batches by the outbox workers (batch_id), and deleted once delivered or
+    given up on. next_attempt_at is the lease of the worker sending the batch,
+    then the time of its next retry.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    endpoint = models.ForeignKey(
+        WebhookEndpoint, on_delete=models.CASCADE, related_name="outbox_events"
+    )
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    batch_id = models.UUIDField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["endpoint", "batch_id", "id"])]
+
+    def __str__(self):
+        return f"{self.endpoint_id} - {self.event_type}"
+
+
 # secret, headers (SIEM token) and kafka_config (SASL password) are redacted.
 auditlog.register(
     WebhookEndpoint,
@@ -46,6 +46,9 @@ class WebhookEndpointSerializer(BaseModelSerializer):
             "secret",
             "has_secret",
             "target_folders",
+            "delivery_mode",
+            "batch_size",
+            "max_concurrent_batches",
         ]
         read_only_fields = ["id", "created_at"]
 
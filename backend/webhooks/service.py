@@ -4,9 +4,9 @@ from django.db.models import Q, Count
 from global_settings.utils import ff_is_enabled
 from iam.models import Folder
 
-from .models import WebhookEndpoint
+from .models import WebhookEndpoint, WebhookOutboxEvent
 from .registry import webhook_registry
-from .tasks import send_webhook_request
+from .tasks import OUTBOX_FLUSH_DELAY, flush_webhook_outbox, send_webhook_request
 
 
 def dispatch_webhook_event(instance, action, serializer=None):
@@ -47,8 +47,18 @@ def dispatch_webhook_event(instance, action, serializer=None):
         )
         payloads[str(endpoint.id)] = config.get_payload(instance, _serializer)
 
+    batched = [
+        endpoint
+        for endpoint in endpoints
+        if endpoint.delivery_mode == WebhookEndpoint.DeliveryMode.BATCHED
+    ]
+    if batched:
+        _queue_outbox_events(batched, event_type, payloads)
+
     # Enqueue tasks
     for endpoint in endpoints:
+        if endpoint.delivery_mode == WebhookEndpoint.DeliveryMode.BATCHED:
+            continue
         transaction.on_commit(
             (
                 lambda e_id=str(endpoint.id): send_webhook_request.schedule(
@@ -56,3 +66,39 @@ def dispatch_webhook_event(instance, action, serializer=None):
                 )
             )
         )
+
+
+def _queue_outbox_events(endpoints, event_type, payloads):
+    """
+    Write the event to the outbox of batched endpoints, in the transaction of
+    the change: it is only sent if the change commits. A flush is scheduled
+    for the endpoints whose outbox was empty; the others already have one on
+    its way, which will send this event along with the previous ones.
+    """
+    endpoint_ids = [endpoint.id for endpoint in endpoints]
+    flushing = set(
+        WebhookOutboxEvent.objects.filter(
+            endpoint_id__in=endpoint_ids, batch_id__isnull=True
+        )
+        .order_by()
+        .values_list("endpoint_id", flat=True)
+        .distinct()
+    )
+    WebhookOutboxEvent.objects.bulk_create(
+        [
+            WebhookOutboxEvent(
+                endpoint_id=endpoint_id,
+                event_type=event_type,
+                payload=payloads[str(endpoint_id)],
+            )
+            for endpoint_id in endpoint_ids
+        ]
+    )
+    for endpoint_id in endpoint_ids:
+        if endpoint_id in flushing:
+            continue
+        transaction.on_commit(
+            lambda e_id=str(endpoint_id): flush_webhook_outbox.schedule(
+                args=(e_id,), delay=OUTBOX_FLUSH_DELAY
+            )
+        )
@@ -4,20 +4,28 @@ import hmac
 import json
 import secrets
 import time
-from datetime import datetime, timezone
+import uuid
+from datetime import datetime, timedelta, timezone
 
 import requests
-from huey.contrib.djhuey import db_task
+from huey import crontab
+from huey.contrib.djhuey import HUEY, db_periodic_task, db_task
+from huey.exceptions import TaskLockedException
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Min
 
 from auditlog.models import LogEntry
-from core.net_safety import BlockedRequestError, assert_public_url_unless_dev
+from core.net_safety import (
+    BlockedRequestError,
+    DnsLookupError,
+    assert_public_url_unless_dev,
+)
 from global_settings.utils import ff_is_enabled
 from iam.models import Folder
 
-from .models import WebhookEndpoint
+from .models import WebhookEndpoint, WebhookOutboxEvent
 from .ocsf import build_audit_body
 
 import structlog
@@ -25,6 +33,25 @@ import structlog
 logger = structlog.get_logger(__name__)
 
 
+def _signed_headers(secret, webhook_id, json_payload):
+    timestamp_unix = str(int(time.time()))
+
+    content_to_sign = f"{webhook_id}.{timestamp_unix}.{json_payload}"
+
+    digest = hmac.new(
+        secret.encode("utf-8"), content_to_sign.encode("utf-8"), hashlib.sha256
+    ).digest()
+
+    signature = base64.b64encode(digest).decode("utf-8")
+
+    return {
+        "Content-Type": "application/json",
+        "webhook-id": webhook_id,
+        "webhook-timestamp": timestamp_unix,
+        "webhook-signature": f"v1,{signature}",
+    }
+
+
 @db_task(retries=5, retry_delay=60, retry_backoff=2.0)
 def send_webhook_request(endpoint_id, event_type, data_payload):
     """
@@ -51,23 +78,9 @@ def send_webhook_request(endpoint_id, event_type, data_payload):
     )
 
     # Generate headers & signature
-    webhook_id = f"msg_{secrets.token_hex(16)}"
-    timestamp_unix = str(int(time.time()))
-
-    content_to_sign = f"{webhook_id}.{timestamp_unix}.{json_payload}"
-
-    digest = hmac.new(
-        endpoint.secret.encode("utf-8"), content_to_sign.encode("utf-8"), hashlib.sha256
-    ).digest()
-
-    signature = base64.b64encode(digest).decode("utf-8")
-
-    headers = {
-        "Content-Type": "application/json",
-        "webhook-id": webhook_id,
-        "webhook-timestamp": timestamp_unix,
-        "webhook-signature": f"v1,{signature}",
-    }
+    headers = _signed_headers(
+        endpoint.secret, f"msg_{secrets.token_hex(16)}", json_payload
+    )
 
     # Re-validate at send time: model.clean() only blocks IP-literal
     # hostnames, so DNS-based targets and post-save DNS changes need
@@ -117,6 +130,227 @@ def send_webhook_request(endpoint_id, event_type, data_payload):
         raise Exception(f"Webhook network error for {endpoint_id}: {e}")
 
 
+# Batched delivery: events of the endpoints in batched mode are written to the
+# outbox (see service.dispatch_webhook_event) and sent by flush_webhook_outbox
+# in signed batches, over the keep-alive connections of the process session.
+
+OUTBOX_FLUSH_DELAY = 2  # seconds, lets the events of a burst share a batch
+OUTBOX_MAX_ATTEMPTS = 6  # the first attempt and 5 retries, as send_webhook_request
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_RETRY_BACKOFF = 2.0
+# A claimed batch is taken over by another worker past this delay (e.g. when
+# its worker was killed while sending it)
+OUTBOX_LEASE = timedelta(minutes=5)
+OUTBOX_POOL_SIZE = 16
+
+_http_session = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    The HTTP session of the process, shared by the outbox flushes so that the
+    batches sent to an endpoint reuse its keep-alive connections.
+    """
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=OUTBOX_POOL_SIZE, pool_maxsize=OUTBOX_POOL_SIZE
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http_session = session
+    return _http_session
+
+
+def _claim_outbox_batch(endpoint):
+    """
+    Claim the next batch of the endpoint: a batch due for a retry, else up to
+    batch_size pending events. Returns the batch id, or None if there is
+    nothing to send. Claims are conditional updates, so concurrent flushes of
+    an endpoint never send the same batch.
+    No new batch is claimed while a failed one awaits its retry, so batches
+    are delivered in order when max_concurrent_batches is 1.
+    """
+    now = datetime.now(timezone.utc)
+    lease = now + OUTBOX_LEASE
+    due_batch_ids = (
+        WebhookOutboxEvent.objects.filter(
+            endpoint=endpoint, batch_id__isnull=False, next_attempt_at__lte=now
+        )
+        .values("batch_id")
+        .annotate(first_id=Min("id"))
+        .order_by("first_id")
+        .values_list("batch_id", flat=True)
+    )
+    for batch_id in due_batch_ids:
+        if WebhookOutboxEvent.objects.filter(
+            batch_id=batch_id, next_attempt_at__lte=now
+        ).update(next_attempt_at=lease):
+            return batch_id
+
+    if WebhookOutboxEvent.objects.filter(
+        endpoint=endpoint, batch_id__isnull=False, attempts__gt=0
+    ).exists():
+        return None
+
+    while True:
+        event_ids = list(
+            WebhookOutboxEvent.objects.filter(endpoint=endpoint, batch_id__isnull=True)
+            .order_by("id")
+            .values_list("id", flat=True)[: endpoint.batch_size]
+        )
+        if not event_ids:
+            return None
+        batch_id = uuid.uuid4()
+        if WebhookOutboxEvent.objects.filter(
+            id__in=event_ids, batch_id__isnull=True
+        ).update(batch_id=batch_id, next_attempt_at=lease):
+            return batch_id
+
+
+def _retry_outbox_batch(endpoint, batch_id, attempts, reason):
+    attempts += 1
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        logger.error(
+            "Webhook batch dropped after retries",
+            endpoint_id=str(endpoint.id),
+            batch_id=str(batch_id),
+            reason=reason,
+        )
+        WebhookOutboxEvent.objects.filter(batch_id=batch_id).delete()
+        return
+    delay = OUTBOX_RETRY_DELAY * OUTBOX_RETRY_BACKOFF ** (attempts - 1)
+    logger.warning(
+        "Webhook batch failed, will retry",
+        endpoint_id=str(endpoint.id),
+        batch_id=str(batch_id),
+        reason=reason,
+        retry_in=delay,
+    )
+    WebhookOutboxEvent.objects.filter(batch_id=batch_id).update(
+        attempts=attempts,
+        next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+    )
+
+
+def _send_outbox_batch(endpoint, batch_id) -> bool:
+    """
+    Send a claimed batch, deleting its events once delivered or given up on.
+    Returns False when the batch is to be retried: the endpoint is failing,
+    so its next batches are left for later.
+    """
+    events = list(WebhookOutboxEvent.objects.filter(batch_id=batch_id).order_by("id"))
+    if not events:
+        return True
+    endpoint_id = str(endpoint.id)
+
+    # The body only depends on the stored events and the webhook-id on the
+    # batch, so a retry sends the same message: only its signature, which
+    # covers the send timestamp, is recomputed.
+    json_payload = json.dumps(
+        {
+            "type": "batch",
+            "data": [
+                {
+                    "type": event.event_type,
+                    "timestamp": event.created_at.isoformat().replace("+00:00", "Z"),
+                    "data": event.payload,
+                }
+                for event in events
+            ],
+        },
+        separators=(",", ":"),
+        cls=DjangoJSONEncoder,
+    )
+    headers = _signed_headers(endpoint.secret, f"msg_{batch_id.hex}", json_payload)
+
+    try:
+        assert_public_url_unless_dev(endpoint.url, allowed_schemes=("http", "https"))
+        response = get_http_session().post(
+            endpoint.url,
+            data=json_payload.encode("utf-8"),
+            headers=headers,
+            timeout=15,
+            allow_redirects=False,
+        )
+    except BlockedRequestError:
+        # Terminal, as in send_webhook_request
+        logger.error(
+            "Webhook blocked by SSRF guard",
+            endpoint_id=endpoint_id,
+            exc_info=True,
+        )
+        WebhookOutboxEvent.objects.filter(batch_id=batch_id).delete()
+        return True
+    except (DnsLookupError, requests.exceptions.RequestException) as e:
+        _retry_outbox_batch(endpoint, batch_id, events[0].attempts, str(e))
+        return False
+
+    if 300 <= response.status_code < 400:
+        # Terminal, as in send_webhook_request
+        logger.warning(
+            "Webhook target returned redirect; not followed",
+            endpoint_id=endpoint_id,
+            status_code=response.status_code,
+        )
+    elif not 200 <= response.status_code < 300:
+        _retry_outbox_batch(
+            endpoint, batch_id, events[0].attempts, f"status {response.status_code}"
+        )
+        return False
+    WebhookOutboxEvent.objects.filter(batch_id=batch_id).delete()
+    return True
+
+
+def _drain_webhook_outbox(endpoint):
+    batches = 0
+    while (batch_id := _claim_outbox_batch(endpoint)) is not None:
+        if not _send_outbox_batch(endpoint, batch_id):
+            break
+        batches += 1
+    return f"Flushed: {batches} batch(es) sent to {endpoint.url}"
+
+
+@db_task()
+def flush_webhook_outbox(endpoint_id):
+    """
+    Send the outbox of a batched endpoint, batch after batch, until it is
+    empty or the endpoint fails. At most max_concurrent_batches flushes of an
+    endpoint run at the same time.
+    """
+    endpoint = WebhookEndpoint.objects.filter(id=endpoint_id, is_active=True).first()
+    if endpoint is None:
+        return f"Aborted: endpoint {endpoint_id} not found"
+    for slot in range(endpoint.max_concurrent_batches):
+        try:
+            with HUEY.lock_task(f"webhook-outbox-{endpoint_id}-{slot}"):
+                return _drain_webhook_outbox(endpoint)
+        except TaskLockedException:
+            continue
+    return f"Busy: {endpoint_id} is already being flushed"
+
+
+@db_periodic_task(crontab(minute="*"))
+def flush_webhook_outboxes():
+    """
+    Flush the endpoints with batches due for a retry, and with pending events
+    whose flush was missed (queued while the previous flush was finishing).
+    """
+    endpoint_ids = (
+        WebhookOutboxEvent.objects.filter(
+            Q(batch_id__isnull=True)
+            | Q(next_attempt_at__lte=datetime.now(timezone.utc)),
+            endpoint__is_active=True,
+        )
+        .order_by()
+        .values_list("endpoint_id", flat=True)
+        .distinct()
+    )
+    for endpoint_id in endpoint_ids:
+        flush_webhook_outbox(str(endpoint_id))
+
+
 def _deliver(endpoint, body):
     # Route an audit event to the sink's transport.
     if endpoint.transport == WebhookEndpoint.Transport.KAFKA:
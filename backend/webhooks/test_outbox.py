@@ -0,0 +1,204 @@
+"""Tests for the batched (outbox) webhook delivery."""
+
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.test import override_settings
+
+from core.models import AppliedControl
+from iam.models import Folder
+from webhooks import tasks
+from webhooks.models import WebhookEndpoint, WebhookEventType, WebhookOutboxEvent
+from webhooks.service import dispatch_webhook_event
+
+SECRET = "s" * 32
+
+
+@pytest.fixture
+def batched_endpoint(db):
+    with override_settings(ALLOW_PRIVATE_NETWORK_REQUESTS=True):
+        endpoint = WebhookEndpoint.objects.create(
+            name="batched",
+            url="https://example.com/hook",
+            secret=SECRET,
+            delivery_mode=WebhookEndpoint.DeliveryMode.BATCHED,
+            batch_size=2,
+        )
+    event_type, _ = WebhookEventType.objects.get_or_create(
+        name="appliedcontrol.updated"
+    )
+    endpoint.event_types.add(event_type)
+    return endpoint
+
+
+def _queue(endpoint, count):
+    WebhookOutboxEvent.objects.bulk_create(
+        [
+            WebhookOutboxEvent(
+                endpoint=endpoint,
+                event_type="appliedcontrol.updated",
+                payload={"id": str(index)},
+            )
+            for index in range(count)
+        ]
+    )
+
+
+def _session(*status_codes):
+    session = MagicMock()
+    session.post.side_effect = [MagicMock(status_code=code) for code in status_codes]
+    return session
+
+
+def _sent(session):
+    """(webhook-id, body) of each request, after checking its signature."""
+    requests = []
+    for call in session.post.call_args_list:
+        headers = call.kwargs["headers"]
+        body = call.kwargs["data"].decode("utf-8")
+        signed = f"{headers['webhook-id']}.{headers['webhook-timestamp']}.{body}"
+        digest = hmac.new(SECRET.encode(), signed.encode(), hashlib.sha256).digest()
+        assert headers["webhook-signature"] == f"v1,{base64.b64encode(digest).decode()}"
+        requests.append((headers["webhook-id"], json.loads(body)))
+    return requests
+
+
+@pytest.fixture(autouse=True)
+def allow_private_network(settings):
+    settings.ALLOW_PRIVATE_NETWORK_REQUESTS = True
+
+
+@pytest.mark.django_db
+class TestWebhookOutbox:
+    def test_dispatch_writes_the_outbox(
+        self, batched_endpoint, django_capture_on_commit_callbacks
+    ):
+        controls = [
+            AppliedControl.objects.create(
+                name=f"Control {index}", folder=Folder.get_root_folder()
+            )
+            for index in range(3)
+        ]
+        with (
+            patch("webhooks.service.ff_is_enabled", return_value=True),
+            patch.object(tasks.flush_webhook_outbox, "schedule") as schedule,
+            patch.object(tasks.send_webhook_request, "schedule") as send,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            for control in controls:
+                dispatch_webhook_event(control, "updated")
+
+        # A single flush for the burst, no per-event task
+        schedule.assert_called_once()
+        assert schedule.call_args.kwargs["args"] == (str(batched_endpoint.id),)
+        send.assert_not_called()
+        assert list(
+            WebhookOutboxEvent.objects.order_by("id").values_list("payload", flat=True)
+        ) == [{"id": str(control.id)} for control in controls]
+
+    def test_flush_sends_signed_batches(self, batched_endpoint):
+        _queue(batched_endpoint, 3)
+        session = _session(200, 200)
+        with patch.object(tasks, "get_http_session", return_value=session):
+            result = tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+
+        assert result.startswith("Flushed: 2 batch(es)")
+        (first_id, first), (second_id, second) = _sent(session)
+        assert first_id != second_id
+        assert first["type"] == "batch"
+        assert [event["data"]["id"] for event in first["data"] + second["data"]] == [
+            "0",
+            "1",
+            "2",
+        ]
+        assert first["data"][0]["type"] == "appliedcontrol.updated"
+        assert not WebhookOutboxEvent.objects.exists()
+
+    def test_failed_batch_is_retried_as_is(self, batched_endpoint):
+        _queue(batched_endpoint, 3)
+        session = _session(503, 200, 200)
+        with patch.object(tasks, "get_http_session", return_value=session):
+            tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+            # The endpoint failed: the next batch waits
+            assert session.post.call_count == 1
+            failed = WebhookOutboxEvent.objects.filter(batch_id__isnull=False)
+            assert failed.count() == 2
+            assert {event.attempts for event in failed} == {1}
+
+            # Not due yet, and the next batch waits for it
+            tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+            assert session.post.call_count == 1
+            WebhookOutboxEvent.objects.update(
+                next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+            )
+            tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+
+        (failed_id, failed_body), (retry_id, retry_body), (_, other_body) = _sent(
+            session
+        )
+        # Same message, signed again with the new timestamp
+        assert retry_id == failed_id
+        assert retry_body == failed_body
+        assert [event["data"]["id"] for event in other_body["data"]] == ["2"]
+        assert not WebhookOutboxEvent.objects.exists()
+
+    def test_batches_stay_in_order_across_retries(self, batched_endpoint):
+        _queue(batched_endpoint, 2)
+        session = _session(503, 500, 200, 200, 200)
+        with patch.object(tasks, "get_http_session", return_value=session):
+            tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+            # Events queued while the batch awaits its retry are sent after it
+            _queue(batched_endpoint, 3)
+            tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+            assert session.post.call_count == 1
+            for _ in range(2):
+                WebhookOutboxEvent.objects.filter(batch_id__isnull=False).update(
+                    next_attempt_at=datetime.now(timezone.utc)
+                )
+                tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+
+        sent = _sent(session)
+        assert [webhook_id for webhook_id, _ in sent[:3]] == [sent[0][0]] * 3
+        assert [
+            event["data"]["id"] for _, body in sent[2:] for event in body["data"]
+        ] == ["0", "1", "0", "1", "2"]
+        assert not WebhookOutboxEvent.objects.exists()
+
+    def test_batch_is_dropped_after_the_last_attempt(self, batched_endpoint):
+        _queue(batched_endpoint, 1)
+        session = _session(*[500] * tasks.OUTBOX_MAX_ATTEMPTS)
+        with patch.object(tasks, "get_http_session", return_value=session):
+            for _ in range(tasks.OUTBOX_MAX_ATTEMPTS):
+                WebhookOutboxEvent.objects.filter(batch_id__isnull=False).update(
+                    next_attempt_at=datetime.now(timezone.utc)
+                )
+                tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+        assert session.post.call_count == tasks.OUTBOX_MAX_ATTEMPTS
+        assert not WebhookOutboxEvent.objects.exists()
+
+    def test_claims_do_not_overlap(self, batched_endpoint):
+        _queue(batched_endpoint, 5)
+        batch_ids = [tasks._claim_outbox_batch(batched_endpoint) for _ in range(4)]
+        assert batch_ids[-1] is None
+        assert len(set(batch_ids[:3])) == 3
+        assert [
+            WebhookOutboxEvent.objects.filter(batch_id=batch_id).count()
+            for batch_id in batch_ids[:3]
+        ] == [2, 2, 1]
+
+    def test_blocked_url_drops_the_batch(self, batched_endpoint, settings):
+        settings.ALLOW_PRIVATE_NETWORK_REQUESTS = False
+        WebhookEndpoint.objects.filter(id=batched_endpoint.id).update(
+            url="http://10.0.0.1/admin"
+        )
+        _queue(batched_endpoint, 1)
+        session = _session()
+        with patch.object(tasks, "get_http_session", return_value=session):
+            tasks.flush_webhook_outbox.call_local(str(batched_endpoint.id))
+        session.post.assert_not_called()
+        assert not WebhookOutboxEvent.objects.exists()